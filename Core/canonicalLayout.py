@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import os
+import json
+
+import nbtlib
+
+from Core import metrics
+from Core.defaultNbtParser import write_json_pieces, replace_if_changed
+from Core.serializers import load_translation
+from Core.typedNbt import (RawNode, tag_name, iter_typed_text, iter_typed_node_text,
+                           document_to_nbt)
+
+# In the canonical layout every chunk is a folder holding chunk.json plus the
+# lists below, moved out to their own files so that an in-game change only
+# touches the few small files it affects. Each rule is (path to the list,
+# target, per_item): per-item lists get one file per element in a folder
+# named `target`, other lists are written whole to `target`.json.
+SPLIT_LISTS = (
+    (('sections',), 'sections', True),
+    (('Level', 'Sections'), 'sections', True),
+    (('block_entities',), 'block_entities', False),
+    (('Level', 'TileEntities'), 'block_entities', False),
+    (('Level', 'Entities'), 'entities', False),
+    (('Entities',), 'entities', False),
+)
+
+CHUNK_MAIN_FILE = 'chunk.json'
+
+
+def _write_text(pieces, path):
+    tmp_path = path + '.tmp'
+    with metrics.stage('serialize'):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            write_json_pieces(pieces, f)
+    if metrics.enabled():
+        metrics.count('bytes_out', os.path.getsize(tmp_path))
+    replace_if_changed(tmp_path, path)
+
+
+def remove_stale(chunk_dir, written):
+    """
+    Delete files of an earlier translation of the chunk that were not written
+    this time, such as sections that no longer exist.
+    """
+    for root, dirs, files in os.walk(chunk_dir, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, chunk_dir).replace(os.sep, '/') not in written:
+                os.remove(path)
+        if root != chunk_dir and not os.listdir(root):
+            os.rmdir(root)
+
+
+def _section_name(index, section, used):
+    """
+    Name a section file after its Y level so that adding a section does not
+    rename the others. Falls back to the list position.
+    """
+    y = section.get('Y') if isinstance(section, nbtlib.tag.Compound) else None
+    name = str(int(y)) if y is not None else f"i{index}"
+    if name in used:
+        name = f"i{index}"
+    used.add(name)
+    return name
+
+
+def _detach(root, path):
+    """
+    Return (copy of root with the list at `path` detached, parent copy, list)
+    or None. Only the compounds along the path are copied, so the original
+    tree is left untouched.
+    """
+    parents = [root]
+    node = root
+    for key in path[:-1]:
+        node = node.get(key)
+        if not isinstance(node, nbtlib.tag.Compound):
+            return None
+        parents.append(node)
+    value = node.get(path[-1])
+    if not isinstance(value, nbtlib.tag.List):
+        return None
+
+    copies = [nbtlib.tag.Compound(parent) for parent in parents]
+    if isinstance(root, nbtlib.File):
+        copies[0] = nbtlib.File(root, root_name=root.root_name)
+    for depth, key in enumerate(path[:-1]):
+        copies[depth][key] = copies[depth + 1]
+    return copies[0], copies[-1], value
+
+
+def iter_canonical_files(nbt_data, header=None, array_mode='base64'):
+    """
+    Yield (path relative to the chunk folder, text pieces) for every file of
+    a chunk in the canonical layout, chunk.json last.
+    """
+    root = nbt_data
+    for path, target, per_item in SPLIT_LISTS:
+        detached = _detach(root, path)
+        if detached is None:
+            continue
+        root, parent, items = detached
+        reference = RawNode(type='list', items=tag_name(items.subtype))
+        if per_item:
+            used = set()
+            files = []
+            for index, item in enumerate(items):
+                rel_path = f"{target}/{_section_name(index, item, used)}.json"
+                yield rel_path, iter_typed_node_text(item, array_mode=array_mode, sort_keys=True)
+                files.append(rel_path)
+            reference['files'] = files
+        else:
+            rel_path = f"{target}.json"
+            yield rel_path, iter_typed_node_text(items, array_mode=array_mode, sort_keys=True)
+            reference['file'] = rel_path
+        parent[path[-1]] = reference
+
+    yield CHUNK_MAIN_FILE, iter_typed_text(root, header, array_mode=array_mode, sort_keys=True)
+
+
+def save_canonical_chunk(nbt_data, chunk_dir, header=None, array_mode='base64'):
+    """
+    Write a chunk in the canonical layout: a folder with chunk.json and the
+    split-out section and entity files, all with sorted keys.
+
+    Files whose content did not change are left alone and files left over
+    from an earlier translation are removed.
+    """
+    written = set()
+    for rel_path, pieces in iter_canonical_files(nbt_data, header, array_mode):
+        path = os.path.join(chunk_dir, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_text(pieces, path)
+        written.add(rel_path)
+    remove_stale(chunk_dir, written)
+
+
+def _load_node(chunk_dir, rel_path):
+    with open(os.path.join(chunk_dir, *rel_path.split('/')), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _inline_references(node, chunk_dir):
+    """
+    Replace split-out references found in a typed compound payload by the
+    content of the files they point to.
+    """
+    for key, child in node.items():
+        if child.get('type') != 'compound' and child.get('type') != 'list':
+            continue
+        if 'files' in child:
+            element_name = child['items']
+            values = []
+            for rel_path in child['files']:
+                loaded = _load_node(chunk_dir, rel_path)
+                # Array and list nodes already have the shape of a list element
+                values.append(loaded if 'value' not in loaded or element_name == 'list'
+                              or element_name.endswith('_array') else loaded['value'])
+            node[key] = {'type': 'list', 'items': element_name, 'value': values}
+        elif 'file' in child:
+            node[key] = _load_node(chunk_dir, child['file'])
+        elif child['type'] == 'compound':
+            _inline_references(child['value'], chunk_dir)
+
+
+def load_canonical_chunk(chunk_dir):
+    """
+    Load a chunk folder written by save_canonical_chunk(). Returns (header, nbtlib.File).
+    """
+    with open(os.path.join(chunk_dir, CHUNK_MAIN_FILE), 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    _inline_references(document['root'], chunk_dir)
+    return document_to_nbt(document)
+
+
+def load_chunk_translation(path):
+    """
+    Load a chunk translation in either layout: a c.<x>.<z> file in a
+    lossless format (see Core/serializers.py) or a canonical c.<x>.<z> folder.
+    """
+    if os.path.isdir(path):
+        return load_canonical_chunk(path)
+    return load_translation(path)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import collections
+
+from Core.manifest import find_manifest, manifest_key, file_hash, changed_chunks
+from Core.regionParser import region_timestamps, iter_region_chunks, chunk_index
+from Core.savePipeline import REGION_EXTENSIONS, iter_save_stats
+from Core.volatileFields import mask_volatile, masked_hash
+
+# One changed file of a save. `chunks` and `removed_chunks` list region
+# header slots and are empty for standalone files.
+Change = collections.namedtuple('Change', 'path status chunks removed_chunks size')
+
+_STATUS_LETTERS = {'added': 'A', 'modified': 'M', 'removed': 'D'}
+
+
+def _weight(change):
+    if change.chunks or change.removed_chunks:
+        return len(change.chunks) + len(change.removed_chunks)
+    return 1
+
+
+def edited_chunks(path, indices, digests, volatile):
+    """
+    Return the slots among `indices` whose chunk differs from the masked
+    digest recorded for it in more than its volatile fields.
+    """
+    ticked = set()
+    for chunk_x, chunk_z, timestamp, compression, nbt_data in iter_region_chunks(
+            path, [index for index in indices if index in digests]):
+        index = chunk_index(chunk_x, chunk_z)
+        if masked_hash(mask_volatile(nbt_data, volatile)[0]) == digests[index]:
+            ticked.add(index)
+    return [index for index in indices if index not in ticked]
+
+
+def ticked_only(path, digest, volatile):
+    """
+    Return True if a standalone file differs from the masked digest recorded
+    for it only in its volatile fields. A file that cannot be parsed counts
+    as changed.
+    """
+    from Core.defaultNbtParser import load_nbt_file
+    try:
+        nbt_file, _ = load_nbt_file(path)
+    except Exception:
+        return False
+    return masked_hash(mask_volatile(nbt_file, volatile)[0]) == digest
+
+
+def file_change(save_dir, rel_path, stat, previous, volatile=None):
+    """
+    Compare one save file with its manifest entry. Returns a Change or None.
+
+    Nothing is read when size and mtime match. Otherwise regions compare the
+    chunk timestamps of their header and other files their content hash.
+    With `volatile` rules (those of the translation), the chunks and files
+    that moved are parsed and compared with their recorded masked digest,
+    so ones that were only ticked are not reported.
+    """
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime_ns:
+        return None
+    status = 'modified' if previous else 'added'
+    path = os.path.join(save_dir, rel_path)
+    try:
+        if rel_path.endswith(REGION_EXTENSIONS):
+            chunks, removed = changed_chunks((previous or {}).get('chunks'), region_timestamps(path))
+            if previous and chunks and volatile is not None and previous.get('masked'):
+                chunks = edited_chunks(path, chunks, previous['masked'], volatile)
+            if previous and not chunks and not removed:
+                return None
+        else:
+            if previous and previous.get('hash') == file_hash(path):
+                return None
+            if previous and volatile is not None and previous.get('masked') and ticked_only(
+                    path, previous['masked'], volatile):
+                return None
+            chunks, removed = [], []
+    except OSError as e:
+        print(f"Failed to read {path}: {e}")
+        return None
+    return Change(rel_path, status, chunks, removed, stat.st_size)
+
+
+def detect_changes(save_dir, manifest):
+    """
+    Return the changes of a world folder since `manifest` was written,
+    largest first: regions are ranked by their number of changed chunks.
+    Changes to the volatile fields masked by the translation are ignored.
+    """
+    volatile = manifest.options.get('volatile')
+    changes = []
+    seen = set()
+    for rel_path, stat in iter_save_stats(save_dir):
+        key = manifest_key(rel_path)
+        seen.add(key)
+        change = file_change(save_dir, rel_path, stat, manifest.files.get(key), volatile)
+        if change:
+            changes.append(change)
+    for key, entry in manifest.files.items():
+        if key not in seen:
+            changes.append(Change(key.replace('/', os.sep), 'removed', [],
+                                  sorted(entry.get('chunks', {})), 0))
+    changes.sort(key=lambda change: (-_weight(change), change.path))
+    return changes
+
+
+def describe_change(change):
+    """
+    Return a one-line summary such as "M region/r.0.0.mca (12 chunks)".
+    """
+    text = f"{_STATUS_LETTERS[change.status]} {change.path.replace(os.sep, '/')}"
+    count = len(change.chunks) + len(change.removed_chunks)
+    if count:
+        text += f" ({count} chunk{'s' if count != 1 else ''})"
+    return text
+
+
+def status_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='status',
+        description="List the files and chunks of a world folder changed since the last "
+                    "translation or commit.")
+    parser.add_argument('save_dir', help="world folder to check")
+    parser.add_argument('output', help="translated folder or git repository written by "
+                                       "translate-save or commit-save")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    for change in detect_changes(args.save_dir, find_manifest(args.output)):
+        print(describe_change(change))
+    return 0
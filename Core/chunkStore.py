@@ -0,0 +1,767 @@
+#!/usr/bin/env python3
+import io
+import os
+import sys
+import json
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+import base64
+import argparse
+
+import nbtlib
+
+from Core import metrics
+from Core.lazyNbt import LazyNbt, TAG_LIST, TAG_COMPOUND
+from Core.defaultNbtParser import write_if_changed
+from Core.regionParser import (HEADER_SIZE, COMPRESSION_EXTERNAL, iter_chunk_data, chunk_coords, chunk_index,
+                               chunk_output_dir, chunk_output_name, decompress_chunk, render_chunk)
+from Core.serializers import get_serializer
+from Core.volatileFields import (VOLATILE_SUFFIX, mask_volatile, mark_masked, masked_hash, render_volatile,
+                                 write_sidecar)
+
+# Lists split out of a chunk so that chunks differing in a few blocks still
+# share the storage of their untouched sections
+SECTION_PATHS = ('sections', 'Level.Sections')
+
+# Chunk parts smaller than this are kept inside the chunk record rather than
+# as objects of their own, which would cost a file system block each
+INLINE_SIZE = 1024
+
+SNAPSHOTS_DIR = 'snapshots'
+
+# Part of the key of stored translations; raised whenever the same chunk and
+# options translate differently or the records gain a field, so older
+# translations are not reused
+RENDER_VERSION = 3
+# Files of a world folder that are never backed up
+SKIPPED_FILES = ('session.lock',)
+
+
+def content_key(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def default_store_dir():
+    """
+    Return the per-user store shared by every save.
+    """
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(base, 'pygitmc', 'store')
+
+
+def split_sections(raw):
+    """
+    Cut the section list out of uncompressed chunk NBT without parsing it.
+
+    Returns (skeleton, offset, sections): the chunk with an empty section
+    list, the offset of that list's payload and the raw payload of every
+    section. A chunk without sections is returned whole with offset None.
+    """
+    lazy = LazyNbt(raw)
+    for path in SECTION_PATHS:
+        for _, tag_id, offset in lazy.find(path):
+            item_id, count, position = lazy.list_info(offset)
+            if tag_id != TAG_LIST or item_id != TAG_COMPOUND or not count:
+                continue
+            sections = []
+            for _ in range(count):
+                end = lazy.skip(TAG_COMPOUND, position)
+                sections.append(raw[position:end])
+                position = end
+            skeleton = raw[:offset] + struct.pack('>Bi', TAG_COMPOUND, 0) + raw[position:]
+            return skeleton, offset, sections
+    return raw, None, []
+
+
+def join_sections(skeleton, offset, sections):
+    """
+    Reverse split_sections(). The result is byte-for-byte the original chunk.
+    """
+    if offset is None:
+        return skeleton
+    return (skeleton[:offset] + struct.pack('>Bi', TAG_COMPOUND, len(sections)) + b''.join(sections)
+            + skeleton[offset + 5:])
+
+
+class ChunkStore:
+    """
+    A content-addressed store of chunks, chunk sections and whole files.
+
+    Blobs live under objects/ keyed by the hash of their content and are
+    written once however many saves, backups or translations use them. A
+    chunk is recorded under chunks/, keyed by the hash of its uncompressed
+    NBT, as a skeleton blob plus one blob per section. links/ maps derived
+    keys, such as the hash of a stored region payload, to what they were
+    computed into, so known data is never decompressed or parsed again.
+    Parts smaller than INLINE_SIZE are kept in the chunk record itself.
+
+    `written` and `reused` count the stored bytes that were new and the
+    logical bytes that were already present.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.written = 0
+        self.reused = 0
+
+    def _path(self, namespace, key):
+        return os.path.join(self.root, namespace, key[:2], key[2:])
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Workers of several processes may store the same object at once
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.written += len(data)
+
+    def put_blob(self, data):
+        key = content_key(data)
+        path = self._path('objects', key)
+        if os.path.exists(path):
+            self.reused += len(data)
+        else:
+            self._write(path, zlib.compress(data))
+        return key
+
+    def get_blob(self, key):
+        with open(self._path('objects', key), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _put_part(self, data):
+        if len(data) < INLINE_SIZE:
+            return {'inline': base64.b64encode(data).decode('ascii')}
+        return self.put_blob(data)
+
+    def _get_part(self, part):
+        if isinstance(part, dict):
+            return base64.b64decode(part['inline'])
+        return self.get_blob(part)
+
+    def has_chunk(self, key):
+        return os.path.exists(self._path('chunks', key))
+
+    def put_chunk(self, raw, key=None):
+        """
+        Store uncompressed chunk NBT. Returns its key.
+        """
+        key = key or content_key(raw)
+        if self.has_chunk(key):
+            self.reused += len(raw)
+            return key
+        skeleton, offset, sections = split_sections(raw)
+        record = {'size': len(raw), 'skeleton': self._put_part(skeleton), 'offset': offset,
+                  'sections': [self._put_part(section) for section in sections]}
+        self._write(self._path('chunks', key), zlib.compress(json.dumps(record).encode('utf-8')))
+        return key
+
+    def chunk_record(self, key):
+        with open(self._path('chunks', key), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def get_chunk(self, key):
+        record = self.chunk_record(key)
+        return join_sections(self._get_part(record['skeleton']), record['offset'],
+                             [self._get_part(section) for section in record['sections']])
+
+    def link(self, namespace, key, value):
+        path = self._path(os.path.join('links', namespace), key)
+        if not os.path.exists(path):
+            self._write(path, json.dumps(value).encode('utf-8'))
+
+    def resolve(self, namespace, key):
+        """
+        Return what link() recorded for a derived key, or None.
+        """
+        try:
+            with open(self._path(os.path.join('links', namespace), key), 'rb') as f:
+                return json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+
+def open_store(store):
+    return store if isinstance(store, ChunkStore) else ChunkStore(store)
+
+
+def iter_stored_chunks(store, filepath, indices=None, failed=None):
+    """
+    Yield (chunk_x, chunk_z, timestamp, compression, key, raw) for the chunks
+    of a region file, storing the ones the store does not know yet.
+
+    Stored payloads are recognised by their hash, so `raw` is None unless
+    the chunk had to be decompressed. Unreadable chunks are reported and
+    skipped; their (chunk_x, chunk_z) are appended to `failed` if given.
+    """
+    if os.path.getsize(filepath) < HEADER_SIZE:
+        return
+    directory = os.path.dirname(filepath)
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as region:
+            chunks = iter_chunk_data(region, indices=indices)
+            try:
+                for index, timestamp, compression, payload in chunks:
+                    chunk_x, chunk_z = chunk_coords(filepath, index)
+                    try:
+                        raw = None
+                        payload_key = None
+                        if not compression & COMPRESSION_EXTERNAL:
+                            payload_key = content_key(bytes((compression,)) + payload)
+                            key = store.resolve('payloads', payload_key)
+                        if payload_key is None or key is None or not store.has_chunk(key):
+                            external_path = os.path.join(directory, f"c.{chunk_x}.{chunk_z}.mcc")
+                            raw = decompress_chunk(compression, payload, external_path)
+                            key = store.put_chunk(raw)
+                            if payload_key is not None:
+                                store.link('payloads', payload_key, key)
+                    except Exception as e:
+                        print(f"Failed to read chunk ({chunk_x}, {chunk_z}): {e}")
+                        if failed is not None:
+                            failed.append((chunk_x, chunk_z))
+                        continue
+                    finally:
+                        payload.release()
+                    yield chunk_x, chunk_z, timestamp, compression & ~COMPRESSION_EXTERNAL, key, raw
+            finally:
+                chunks.close()
+
+
+def translation_key(files):
+    """
+    Hash the files of one chunk translation, given as (path relative to the
+    chunk output, bytes) with the sidecar named VOLATILE_SUFFIX. build_region()
+    looks chunks up by this key.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for rel_path, data in sorted(files):
+        digest.update(rel_path.encode('utf-8') + b'\0' + content_key(data).encode('ascii'))
+    return digest.hexdigest()
+
+
+def read_translation_files(path):
+    """
+    Return the (relative path, bytes) of a chunk translation on disk, in the
+    form translation_key() expects.
+    """
+    files = []
+    if os.path.isdir(path):
+        for root, dirs, names in os.walk(path):
+            for name in names:
+                file_path = os.path.join(root, name)
+                with open(file_path, 'rb') as f:
+                    files.append((os.path.relpath(file_path, path).replace(os.sep, '/'), f.read()))
+    else:
+        with open(path, 'rb') as f:
+            files.append(('', f.read()))
+    if os.path.isfile(path + VOLATILE_SUFFIX):
+        with open(path + VOLATILE_SUFFIX, 'rb') as f:
+            files.append((VOLATILE_SUFFIX, f.read()))
+    return files
+
+
+def _render_stored(store, key, raw, header, options):
+    """
+    Return the translation of a stored chunk as (files, sidecar, masked):
+    `files` lists (path relative to the chunk output or '', bytes or None)
+    as render_chunk() does, and `masked` is the masked_hash() of the chunk
+    when volatile fields are masked. Translations are kept in the store per
+    option set, so a chunk already translated anywhere is not parsed again.
+    """
+    volatile = options.get('volatile')
+    render_key = content_key(json.dumps([RENDER_VERSION, key, header, options],
+                                        sort_keys=True).encode('utf-8'))
+    record = store.resolve('translations', render_key)
+    if record is not None:
+        try:
+            files = [(rel_path, None if blob is None else store.get_blob(blob))
+                     for rel_path, blob in record['files']]
+            sidecar = store.get_blob(record['sidecar']) if record['sidecar'] else None
+            return files, sidecar, record.get('masked')
+        except OSError:
+            pass
+
+    if raw is None:
+        raw = store.get_chunk(key)
+    with metrics.stage('parse'):
+        nbt_data = nbtlib.File.parse(io.BytesIO(raw), byteorder='big')
+    metrics.count_tags(nbt_data)
+    header = dict(header)
+    timestamp = header['timestamp']
+    sidecar = None
+    masked = None
+    if volatile is not None:
+        nbt_data, values = mask_volatile(nbt_data, volatile)
+        sidecar = render_volatile(values, {'timestamp': header.pop('timestamp')})
+        mark_masked(header)
+        masked = masked_hash(nbt_data)
+    files = [(os.path.relpath(path, 'chunk').replace(os.sep, '/') if path != 'chunk' else '', data)
+             for path, data in render_chunk(nbt_data, 'chunk', header, options['array_mode'],
+                                            options['output_format'], options['layout'])]
+    store.link('translations', render_key, {
+        'chunk': key,
+        'files': [(rel_path, None if data is None else store.put_blob(data)) for rel_path, data in files],
+        'sidecar': store.put_blob(sidecar) if sidecar is not None else None,
+        'masked': masked,
+    })
+    output_format = 'typed' if options['layout'] == 'canonical' else options['output_format']
+    if get_serializer(output_format).lossless:
+        # Building this translation back gives the stored chunk without parsing it. Lossy
+        # formats are left out: different chunks can translate to the same files.
+        built = [(rel_path, data) for rel_path, data in files if data is not None]
+        if sidecar is not None:
+            built.append((VOLATILE_SUFFIX, sidecar))
+        store.link('builds', translation_key(built), {'chunk': key, 'compression': header['compression'],
+                                                      'timestamp': timestamp, 'format': output_format})
+    return files, sidecar, masked
+
+
+def translate_region_stored(filepath, output_dir=None, indices=None, verbose=True, array_mode='list',
+                            output_format='json', layout='file', volatile=None, rendered=None,
+                            store=None, written=None, hashes=None):
+    """
+    translate_region() through a ChunkStore: every chunk is stored, and a
+    chunk whose translation with these options is already in the store is
+    written from there without being decompressed or parsed.
+    """
+    store = open_store(store)
+    if output_dir is None:
+        output_dir = chunk_output_dir(filepath)
+    if rendered is None or volatile is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    options = {'array_mode': array_mode, 'output_format': output_format, 'layout': layout,
+               'volatile': list(volatile) if volatile is not None else None}
+
+    count = 0
+    for chunk_x, chunk_z, timestamp, compression, key, raw in iter_stored_chunks(store, filepath, indices):
+        output_path = os.path.join(output_dir, chunk_output_name(chunk_x, chunk_z, layout, output_format))
+        header = {'timestamp': timestamp, 'compression': compression}
+        try:
+            files, sidecar, masked = _render_stored(store, key, raw, header, options)
+            if volatile is not None:
+                write_sidecar(output_path, sidecar)
+            files = [(os.path.join(output_path, *rel_path.split('/')) if rel_path else output_path, data)
+                     for rel_path, data in files]
+            if rendered is not None:
+                rendered.extend(files)
+            else:
+                write_rendered(files)
+        except Exception as e:
+            print(f"Failed to translate chunk ({chunk_x}, {chunk_z}): {e}")
+            continue
+        if verbose and rendered is None:
+            print(f"Parsed data saved to {output_path}")
+        count += 1
+        if written is not None:
+            written.append(chunk_index(chunk_x, chunk_z))
+        if hashes is not None and masked is not None:
+            hashes[chunk_index(chunk_x, chunk_z)] = masked
+    return count
+
+
+def write_rendered(files):
+    """
+    Write the (path, bytes) of one render_chunk() result. A canonical chunk
+    folder, given as (folder, None), loses the files not written this time.
+    """
+    from Core.canonicalLayout import remove_stale
+    folder = None
+    written = set()
+    for path, data in files:
+        if data is None:
+            folder = path
+            os.makedirs(folder, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_if_changed(path, data)
+        if folder is not None:
+            written.add(os.path.relpath(path, folder).replace(os.sep, '/'))
+    if folder is not None:
+        remove_stale(folder, written)
+
+
+class BackupStats:
+    """
+    Counters for one backup.
+    """
+    def __init__(self):
+        self.files = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.stored = 0
+        self.errors = 0
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def dedupe_ratio(self):
+        return self.bytes / self.stored if self.stored else float('inf')
+
+    def summary(self):
+        saved = max(self.bytes - self.stored, 0)
+        ratio = f"{self.dedupe_ratio:.1f}x" if self.stored else "all data already stored"
+        return (f"{self.files} files, {self.chunks} chunks, {self.bytes / 1e6:.1f} MB; "
+                f"{self.stored / 1e6:.1f} MB new, dedupe {ratio}, {saved / 1e6:.1f} MB saved, "
+                f"{self.errors} errors in {self.elapsed:.2f}s")
+
+
+def save_key(save_dir):
+    """
+    Return the key of a world folder in the store: a hash of its absolute
+    path, so two worlds with the same folder name keep separate snapshots.
+    """
+    path = os.path.normcase(os.path.abspath(save_dir))
+    return hashlib.blake2b(path.encode('utf-8', errors='surrogateescape'), digest_size=8).hexdigest()
+
+
+def snapshot_dir(store_root, save_dir):
+    """
+    Return the folder of a world's snapshots, named after the world folder
+    for display and keyed on its path.
+    """
+    name = os.path.basename(os.path.abspath(save_dir))
+    return os.path.join(store_root, SNAPSHOTS_DIR, f"{name}-{save_key(save_dir)}")
+
+
+def backup_save(save_dir, store=None, name=None, progress=None, cancel=None):
+    """
+    Record every file of a world folder in the store and write a snapshot
+    listing them. Region files are stored chunk by chunk, so chunks and
+    sections shared with other saves and earlier backups take no space.
+    A file or chunk that cannot be read fails the backup: no snapshot is
+    written, since it could not restore the world.
+    Returns (BackupStats, snapshot path, or None when cancelled or failed).
+    """
+    store = open_store(store or default_store_dir())
+    stats = BackupStats()
+    files = {}
+    for root, dirs, names in os.walk(save_dir):
+        dirs.sort()
+        for file_name in sorted(names):
+            if cancel is not None and cancel.is_set():
+                stats.cancelled = True
+                stats.elapsed = time.perf_counter() - stats.started
+                return stats, None
+            if file_name in SKIPPED_FILES:
+                continue
+            path = os.path.join(root, file_name)
+            rel_path = os.path.relpath(path, save_dir).replace(os.sep, '/')
+            written = store.written
+            try:
+                if file_name.endswith('.mca'):
+                    chunks = {}
+                    failed = []
+                    for chunk_x, chunk_z, timestamp, compression, key, raw in iter_stored_chunks(
+                            store, path, failed=failed):
+                        chunks[str((chunk_x & 31) + (chunk_z & 31) * 32)] = [timestamp, compression, key]
+                        stats.bytes += len(raw) if raw is not None else store.chunk_record(key)['size']
+                    stats.chunks += len(chunks)
+                    if failed:
+                        print(f"Failed to back up {path}: {len(failed)} unreadable chunks")
+                        stats.errors += len(failed)
+                        continue
+                    files[rel_path] = {'chunks': chunks}
+                else:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    files[rel_path] = {'blob': store.put_blob(data), 'size': len(data)}
+                    stats.bytes += len(data)
+            except OSError as e:
+                print(f"Failed to back up {path}: {e}")
+                stats.errors += 1
+                continue
+            stats.stored += store.written - written
+            stats.files += 1
+            stats.elapsed = time.perf_counter() - stats.started
+            if progress:
+                progress(stats)
+
+    stats.elapsed = time.perf_counter() - stats.started
+    if stats.errors:
+        return stats, None
+    folder = snapshot_dir(store.root, save_dir)
+    os.makedirs(folder, exist_ok=True)
+    snapshot = os.path.join(folder, (name or time.strftime('%Y%m%d-%H%M%S')) + '.json')
+    with open(snapshot + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'save': os.path.abspath(save_dir), 'created': time.time(), 'files': files}, f)
+    os.replace(snapshot + '.tmp', snapshot)
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats, snapshot
+
+
+def restore_backup(snapshot, output_dir, store=None):
+    """
+    Recreate the world folder recorded in a snapshot. Returns the number of
+    files written.
+    """
+    from Core.saveBuilder import compress_chunk, write_region_file
+    store = open_store(store or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(snapshot)))))
+    with open(snapshot, 'r', encoding='utf-8') as f:
+        files = json.load(f)['files']
+    for rel_path, entry in files.items():
+        path = os.path.join(output_dir, *rel_path.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if 'blob' in entry:
+            write_if_changed(path, store.get_blob(entry['blob']))
+            continue
+        chunks = []
+        for index, (timestamp, compression, key) in entry['chunks'].items():
+            index = int(index)
+            chunk_x, chunk_z = chunk_coords(path, index)
+            compression, payload = compress_chunk(compression, store.get_chunk(key))
+            chunks.append((index, chunk_x, chunk_z, timestamp, compression, payload))
+        write_region_file(path, chunks)
+    return len(files)
+
+
+def iter_snapshots(store_root):
+    """
+    Yield (path, snapshot) for every snapshot of a store.
+    """
+    for root, dirs, names in os.walk(os.path.join(store_root, SNAPSHOTS_DIR)):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith('.json'):
+                path = os.path.join(root, name)
+                with open(path, 'r', encoding='utf-8') as f:
+                    yield path, json.load(f)
+
+
+def store_report(store_root):
+    """
+    Return (logical bytes referenced by all snapshots, bytes on disk) of a store.
+    """
+    store = open_store(store_root)
+    physical = 0
+    for namespace in ('objects', 'chunks'):
+        for root, dirs, names in os.walk(os.path.join(store.root, namespace)):
+            physical += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+    sizes = {}
+    logical = 0
+    for path, snapshot in iter_snapshots(store.root):
+        for entry in snapshot['files'].values():
+            if 'blob' in entry:
+                logical += entry['size']
+                continue
+            for timestamp, compression, key in entry['chunks'].values():
+                if key not in sizes:
+                    sizes[key] = store.chunk_record(key)['size']
+                logical += sizes[key]
+    return logical, physical
+
+
+class PruneStats:
+    """
+    Counters for one prune of a store.
+    """
+    def __init__(self):
+        self.files = 0
+        self.removed = 0
+        self.freed = 0
+        self.snapshots = 0
+        self.removed_snapshots = 0
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.snapshots} snapshots kept, {self.removed_snapshots} removed; "
+                f"{self.removed} of {self.files} stored files removed, {self.freed / 1e6:.1f} MB freed "
+                f"in {self.elapsed:.2f}s")
+
+
+def _stored_files(root):
+    """
+    Yield (key, path) for the files of one store namespace, skipping the
+    temporary files of writes in progress.
+    """
+    for folder, dirs, names in os.walk(root):
+        for name in names:
+            if not name.endswith('.tmp'):
+                yield os.path.basename(folder) + name, os.path.join(folder, name)
+
+
+def _remove_empty_dirs(root):
+    for folder, dirs, names in os.walk(root, topdown=False):
+        if folder != root and not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def prune_store(store=None, keep=None, progress=None, cancel=None):
+    """
+    Remove everything no snapshot needs from a store.
+
+    With `keep` set, only the newest `keep` snapshots of each save are kept.
+    Chunks and objects the remaining snapshots do not reference are then
+    removed, together with the links and cached translations of removed
+    chunks; translating those chunks again stores them anew. Run it while
+    nothing else uses the store, since a backup or translation running at
+    the same time may reuse an object that is being removed.
+    Returns PruneStats.
+    """
+    store = open_store(store or default_store_dir())
+    stats = PruneStats()
+    by_save = {}
+    for path, snapshot in iter_snapshots(store.root):
+        # Snapshots are grouped by the world they record, not by folder:
+        # older stores named the folders after the world folder alone
+        save = save_key(snapshot['save']) if 'save' in snapshot else os.path.dirname(path)
+        by_save.setdefault(save, []).append((snapshot.get('created', 0), path, snapshot))
+    chunks = set()
+    blobs = set()
+    for snapshots in by_save.values():
+        snapshots.sort(key=lambda item: (item[0], item[1]))
+        if keep is not None and len(snapshots) > keep:
+            for _, path, _ in snapshots[:len(snapshots) - keep]:
+                os.remove(path)
+                stats.removed_snapshots += 1
+            snapshots = snapshots[len(snapshots) - keep:]
+        for _, _, snapshot in snapshots:
+            stats.snapshots += 1
+            for entry in snapshot['files'].values():
+                if 'blob' in entry:
+                    blobs.add(entry['blob'])
+                else:
+                    chunks.update(key for timestamp, compression, key in entry['chunks'].values())
+    for key in chunks:
+        try:
+            record = store.chunk_record(key)
+        except (OSError, ValueError):
+            continue
+        blobs.update(part for part in [record['skeleton']] + record['sections'] if not isinstance(part, dict))
+
+    unused = []
+    links_root = os.path.join(store.root, 'links')
+    for namespace in sorted(os.listdir(links_root)) if os.path.isdir(links_root) else ():
+        for key, path in _stored_files(os.path.join(links_root, namespace)):
+            stats.files += 1
+            value = store.resolve(namespace, key)
+            # payloads links hold a chunk key, the others a record naming their chunk
+            chunk = value.get('chunk') if isinstance(value, dict) else value
+            if chunk not in chunks:
+                unused.append(path)
+            elif namespace == 'translations':
+                blobs.update(blob for rel_path, blob in value['files'] if blob is not None)
+                if value['sidecar']:
+                    blobs.add(value['sidecar'])
+    for namespace, live in (('chunks', chunks), ('objects', blobs)):
+        for key, path in _stored_files(os.path.join(store.root, namespace)):
+            stats.files += 1
+            if key not in live:
+                unused.append(path)
+
+    for path in unused:
+        if cancel is not None and cancel.is_set():
+            stats.cancelled = True
+            break
+        try:
+            stats.freed += os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        stats.removed += 1
+        stats.elapsed = time.perf_counter() - stats.started
+        if progress:
+            progress(stats)
+    for namespace in ('links', 'chunks', 'objects'):
+        _remove_empty_dirs(os.path.join(store.root, namespace))
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+def backup_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='backup',
+        description="Back up a world folder into the deduplicating chunk store.")
+    parser.add_argument('save_dir', help="world folder to back up")
+    parser.add_argument('--store', default=None,
+                        help=f"store folder (default: {default_store_dir()})")
+    parser.add_argument('--name', default=None, help="snapshot name (default: the current time)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    stats, snapshot = backup_save(args.save_dir, args.store, args.name)
+    print("Backed up", stats.summary())
+    if snapshot is None:
+        print("No snapshot written: the backup is incomplete")
+        return 1
+    print(f"Snapshot written to {snapshot}")
+    return 0
+
+
+def restore_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='restore',
+        description="Recreate a world folder from a backup snapshot.")
+    parser.add_argument('snapshot', help="snapshot file written by backup")
+    parser.add_argument('output_dir', help="world folder to write")
+    parser.add_argument('--store', default=None,
+                        help="store folder (default: the one holding the snapshot)")
+    args = parser.parse_args(argv)
+
+    try:
+        count = restore_backup(args.snapshot, args.output_dir, args.store)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Restore failed: {e}")
+        return 1
+    print(f"Restored {count} files to {args.output_dir}")
+    return 0
+
+
+def store_stats_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='store-stats',
+        description="Show how much space the chunk store saves through deduplication.")
+    parser.add_argument('--store', default=None,
+                        help=f"store folder (default: {default_store_dir()})")
+    args = parser.parse_args(argv)
+
+    logical, physical = store_report(args.store or default_store_dir())
+    if not logical:
+        print(f"No snapshots; {physical / 1e6:.1f} MB of chunks and translations stored")
+        return 0
+    ratio = logical / physical if physical else 0.0
+    print(f"Snapshots reference {logical / 1e6:.1f} MB stored in {physical / 1e6:.1f} MB: "
+          f"dedupe ratio {ratio:.1f}x, {max(logical - physical, 0) / 1e6:.1f} MB saved")
+    return 0
+
+
+def store_prune_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='store-prune',
+        description="Remove the chunks, objects and cached translations of the chunk store that "
+                    "no snapshot references, after dropping snapshots beyond --keep.")
+    parser.add_argument('--store', default=None,
+                        help=f"store folder (default: {default_store_dir()})")
+    parser.add_argument('--keep', type=int, default=None,
+                        help="snapshots to keep per save, the newest ones (default: all)")
+    args = parser.parse_args(argv)
+
+    if args.keep is not None and args.keep < 0:
+        print("--keep cannot be negative")
+        return 1
+    store = args.store or default_store_dir()
+    if not os.path.isdir(store):
+        print(f"Store does not exist: {store}")
+        return 1
+    stats = prune_store(store, args.keep)
+    print("Pruned", stats.summary())
+    return 0
@@ -2,8 +2,21 @@
 import sys
 import os
 import json
+import time
+import filecmp
+import base64
+import argparse
+import functools
+import importlib
 import nbtlib
 
+# Allow running this file directly as a script while still importing sibling
+# modules through the Core package.
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Core import metrics
+
 def read_nbt_file(filepath, little_endian):
     """
     Load an NBT file using nbtlib with the given endianness.
@@ -16,7 +29,59 @@ def read_nbt_file(filepath, little_endian):
     except Exception as e:
         raise e
 
-def nbt_to_json_serializable(nbt_data):
+# How ByteArray/IntArray/LongArray tags are written:
+#   list   - a JSON list with one number per line (the original format)
+#   base64 - {"type": ..., "base64": ...} on a single line
+#   hex    - {"type": ..., "hex": ...} on a single line
+# The compact modes hold the big-endian bytes of the array and can be turned
+# back into the exact tag with decode_array().
+ARRAY_MODES = ('list', 'base64', 'hex')
+
+# 'json' is the plain readable output; 'typed' keeps every tag type so the
+# translation can be compiled back into NBT (see Core/typedNbt.py).
+# 'compact-json' and 'snbt' are single-line JSON and Minecraft's own text
+# format, and 'binary' a snapshot that is small and fast to write, for
+# outputs nobody reads. Each is implemented in Core/serializers.py.
+OUTPUT_FORMATS = ('json', 'typed', 'compact-json', 'snbt', 'binary')
+
+_ARRAY_TYPES = {
+    nbtlib.tag.ByteArray: ('byte_array', '>i1'),
+    nbtlib.tag.IntArray: ('int_array', '>i4'),
+    nbtlib.tag.LongArray: ('long_array', '>i8'),
+}
+_ARRAY_CLASSES = {name: (cls, dtype) for cls, (name, dtype) in _ARRAY_TYPES.items()}
+
+def encode_array(nbt_array, array_mode='list'):
+    """
+    Convert an array tag in bulk through its underlying buffer.
+    """
+    if array_mode == 'list':
+        return nbt_array.tolist()
+    # Only the compact modes need numpy itself
+    import numpy
+    name, dtype = _ARRAY_TYPES[type(nbt_array)]
+    data = numpy.asarray(nbt_array, dtype=dtype).tobytes()
+    if array_mode == 'base64':
+        return {'type': name, 'base64': base64.b64encode(data).decode('ascii')}
+    if array_mode == 'hex':
+        return {'type': name, 'hex': data.hex()}
+    raise ValueError(f"Unknown array mode: {array_mode}")
+
+def decode_array(data):
+    """
+    Rebuild an array tag from the output of encode_array().
+    """
+    import numpy
+    cls, dtype = _ARRAY_CLASSES[data['type']]
+    if 'value' in data:
+        return cls(numpy.array(data['value'], dtype=dtype))
+    if 'base64' in data:
+        raw = base64.b64decode(data['base64'])
+    else:
+        raw = bytes.fromhex(data['hex'])
+    return cls(numpy.frombuffer(raw, dtype=dtype))
+
+def nbt_to_json_serializable(nbt_data, array_mode='list'):
     """
     Convert NBT data to JSON serializable Python objects.
     """
@@ -25,91 +90,343 @@ def nbt_to_json_serializable(nbt_data):
         return nbt_data.real
     elif isinstance(nbt_data, nbtlib.tag.String):
         return str(nbt_data)
-    elif isinstance(nbt_data, nbtlib.tag.IntArray):
-        return [i for i in nbt_data]
-    elif isinstance(nbt_data, nbtlib.tag.ByteArray):
-        return [b for b in nbt_data]
-    elif isinstance(nbt_data, nbtlib.tag.LongArray):
-        return [l for l in nbt_data]
+    elif isinstance(nbt_data, (nbtlib.tag.IntArray, nbtlib.tag.ByteArray, nbtlib.tag.LongArray)):
+        return encode_array(nbt_data, array_mode)
     elif isinstance(nbt_data, nbtlib.tag.List):
-        return [nbt_to_json_serializable(item) for item in nbt_data]
+        return [nbt_to_json_serializable(item, array_mode) for item in nbt_data]
     elif isinstance(nbt_data, nbtlib.tag.Compound):
-        return {k: nbt_to_json_serializable(v) for k, v in nbt_data.items()}
+        return {k: nbt_to_json_serializable(v, array_mode) for k, v in nbt_data.items()}
     elif isinstance(nbt_data, dict):
-        return {k: nbt_to_json_serializable(v) for k, v in nbt_data.items()}
+        return {k: nbt_to_json_serializable(v, array_mode) for k, v in nbt_data.items()}
     elif isinstance(nbt_data, list):
-        return [nbt_to_json_serializable(item) for item in nbt_data]
+        return [nbt_to_json_serializable(item, array_mode) for item in nbt_data]
     else:
         return nbt_data
 
-def save_nbt_to_text(nbt_data, output_path):
+# Flush the streaming encoder's output once this many characters are pending
+WRITE_BUFFER_SIZE = 64 * 1024
+
+_NUMERIC_TAGS = (nbtlib.tag.Int, nbtlib.tag.Float, nbtlib.tag.Double,
+                 nbtlib.tag.Short, nbtlib.tag.Byte, nbtlib.tag.Long)
+_ARRAY_TAGS = (nbtlib.tag.IntArray, nbtlib.tag.ByteArray, nbtlib.tag.LongArray)
+_END = object()
+
+def _json_array(nbt_array, array_mode, width, indent):
+    """
+    Encode a whole array tag in one piece.
+    """
+    if array_mode != 'list':
+        return json.dumps(encode_array(nbt_array, array_mode))
+    if len(nbt_array) == 0:
+        return '[]'
+    pad = '\n' + ' ' * (width + indent)
+    return '[' + pad + (',' + pad).join(map(str, nbt_array.tolist())) + '\n' + ' ' * width + ']'
+
+def _json_scalar(value):
+    """
+    Encode a scalar exactly like json.dumps does.
+    """
+    if isinstance(value, _NUMERIC_TAGS):
+        value = value.real
+    if isinstance(value, str):
+        return json.encoder.encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return int.__repr__(value)
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if value == float('inf'):
+            return 'Infinity'
+        if value == -float('inf'):
+            return '-Infinity'
+        return float.__repr__(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _plain_expand(value, width, indent, array_mode='list', sort_keys=False):
+    """
+    Expand a value for iter_json_pieces() the way nbt_to_json_serializable
+    would convert it.
+    """
+    if isinstance(value, (nbtlib.tag.Compound, dict)):
+        return True, iter(sorted(value.items()) if sort_keys else value.items())
+    if isinstance(value, (nbtlib.tag.List, list)):
+        return False, iter(value)
+    if isinstance(value, _ARRAY_TAGS):
+        return _json_array(value, array_mode, width, indent)
+    return _json_scalar(value)
+
+def iter_json_pieces(value, expand, indent=2):
+    """
+    Yield JSON text piece by piece, formatted like json.dumps(indent=indent).
+
+    `expand(value, width, indent)` returns either the finished text of a value
+    or (is_dict, iterator) for objects and arrays, whose iterator yields
+    (key, value) pairs or items. The tree is walked with an explicit stack
+    instead of recursion.
+    """
+    stack = []
+    while True:
+        expanded = expand(value, indent * len(stack), indent)
+        if isinstance(expanded, str):
+            yield expanded
+        else:
+            is_dict, iterator = expanded
+            item = next(iterator, _END)
+            if item is _END:
+                yield '{}' if is_dict else '[]'
+            else:
+                stack.append((is_dict, iterator))
+                yield '{' if is_dict else '['
+                value = yield from _json_item(item, is_dict, indent * len(stack))
+                continue
+
+        # The current value is complete: close finished containers and move
+        # on to the next sibling.
+        while stack:
+            is_dict, iterator = stack[-1]
+            item = next(iterator, _END)
+            if item is not _END:
+                yield ','
+                value = yield from _json_item(item, is_dict, indent * len(stack))
+                break
+            stack.pop()
+            yield '\n' + ' ' * (indent * len(stack)) + ('}' if is_dict else ']')
+        else:
+            return
+
+def iter_json_text(nbt_data, indent=2, array_mode='list', sort_keys=False):
+    """
+    Yield the JSON text of an NBT tree piece by piece.
+
+    No intermediate copy of the data is built and array tags are converted in
+    bulk rather than element by element. With array_mode='list' the output is
+    identical to json.dumps(nbt_to_json_serializable(nbt_data, array_mode),
+    indent=indent, sort_keys=sort_keys). In the 'base64' and 'hex' modes the
+    values are the same, but each encoded array object is written on a single
+    line instead of being indented key by key, so the text only compares equal
+    after parsing.
+    """
+    expand = functools.partial(_plain_expand, array_mode=array_mode, sort_keys=sort_keys)
+    return iter_json_pieces(nbt_data, expand, indent)
+
+def _json_item(item, is_dict, width):
+    """
+    Yield the line prefix of a container item and return the value to encode.
+    """
+    if is_dict:
+        key, value = item
+        yield '\n' + ' ' * width + json.encoder.encode_basestring_ascii(key) + ': '
+        return value
+    yield '\n' + ' ' * width
+    return item
+
+def write_json_pieces(pieces, f):
+    """
+    Write JSON text pieces to an open text file in buffered blocks.
+    """
+    pending = []
+    size = 0
+    for piece in pieces:
+        pending.append(piece)
+        size += len(piece)
+        if size >= WRITE_BUFFER_SIZE:
+            f.write(''.join(pending))
+            pending = []
+            size = 0
+    if pending:
+        f.write(''.join(pending))
+
+def write_nbt_json(nbt_data, f, indent=2, array_mode='list', sort_keys=False):
+    """
+    Stream the JSON text of an NBT tree to an open text file.
+    """
+    write_json_pieces(iter_json_text(nbt_data, indent, array_mode, sort_keys), f)
+
+def iter_nbt_text(nbt_data, array_mode='list', output_format='json', header=None, sort_keys=False):
+    """
+    Yield the text of a translation piece by piece, or return None for
+    output formats that are only written whole.
+    """
+    from Core.serializers import get_serializer
+    return get_serializer(output_format).iter_text(nbt_data, header, array_mode, sort_keys)
+
+def render_nbt_text(nbt_data, array_mode='list', output_format='json', header=None, sort_keys=False):
+    """
+    Return the bytes save_nbt_to_text() would write, without touching the disk.
+    """
+    from Core.serializers import get_serializer
+    with metrics.stage('serialize'):
+        data = get_serializer(output_format).encode(nbt_data, header, array_mode, sort_keys)
+    metrics.count('bytes_out', len(data))
+    return data
+
+def output_extension(output_format='json'):
+    """
+    Return the file extension of translations in an output format.
+    """
+    from Core.serializers import get_serializer
+    return get_serializer(output_format).extension
+
+def replace_if_changed(tmp_path, output_path):
+    """
+    Move a freshly written file over `output_path` unless both are identical,
+    so unchanged translations keep their mtime and are not rewritten.
+    Returns True if `output_path` was replaced.
+    """
+    with metrics.stage('write'):
+        if os.path.isfile(output_path) and filecmp.cmp(tmp_path, output_path, shallow=False):
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, output_path)
+        return True
+
+def write_if_changed(output_path, data):
+    """
+    Write bytes to `output_path` unless it already holds exactly them.
+    Returns True if the file was written.
+    """
+    tmp_path = output_path + '.tmp'
+    with metrics.stage('write'):
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+    return replace_if_changed(tmp_path, output_path)
+
+def save_nbt_to_text(nbt_data, output_path, verbose=True, array_mode='list',
+                     output_format='json', header=None, sort_keys=False):
     """
     Save the parsed NBT data to a text file in a readable format.
+
+    The JSON is streamed to disk as the tree is walked, so memory use stays
+    close to the size of the tree itself. With output_format='typed' the
+    lossless typed format is written instead, with `header` as extra
+    top-level fields; the other OUTPUT_FORMATS are encoded whole.
+    `sort_keys` writes compound keys in sorted order. Returns True if the
+    file was written.
     """
+    tmp_path = output_path + '.tmp'
     try:
-        # Convert NBT data to JSON-serializable format
-        json_compatible_data = nbt_to_json_serializable(nbt_data)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Convert to JSON with proper indentation
-            json_data = json.dumps(json_compatible_data, indent=2)
-            f.write(json_data)
-        print(f"Parsed data saved to {output_path}")
+        pieces = iter_nbt_text(nbt_data, array_mode, output_format, header, sort_keys)
+        if pieces is None:
+            data = render_nbt_text(nbt_data, array_mode, output_format, header, sort_keys)
+            with metrics.stage('write'):
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+        else:
+            with metrics.stage('serialize'):
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    write_json_pieces(pieces, f)
+            if metrics.enabled():
+                metrics.count('bytes_out', os.path.getsize(tmp_path))
+        replace_if_changed(tmp_path, output_path)
+        if verbose:
+            print(f"Parsed data saved to {output_path}")
+        return True
     except Exception as e:
         print(f"Failed to save parsed data: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+def load_nbt_file(filepath, nbt_format=None):
+    """
+    Load a standalone NBT file, parsing it exactly once.
+
+    The compression and byte order are detected from the first bytes of the
+    file unless `nbt_format` is given. Returns (nbt_file, little_endian).
+    """
+    from Core.nbtFormat import get_format, parse_nbt
+    if nbt_format is None:
+        nbt_format = get_format(filepath)
+    nbt_file = parse_nbt(filepath, nbt_format)
+    return nbt_file, nbt_format.byteorder == 'little'
+
+# Subcommands dispatched by main(); their modules are only imported when used.
+COMMANDS = {
+    'translate-save': ('Core.savePipeline', 'translate_save_command'),
+    'build-save': ('Core.saveBuilder', 'build_save_command'),
+    'commit-save': ('Core.gitFastImport', 'commit_save_command'),
+    'watch': ('Core.saveWatcher', 'watch_command'),
+    'status': ('Core.changeDetector', 'status_command'),
+    'query': ('Core.lazyNbt', 'query_command'),
+    'diff': ('Core.nbtDiff', 'diff_command'),
+    'backup': ('Core.chunkStore', 'backup_command'),
+    'restore': ('Core.chunkStore', 'restore_command'),
+    'store-stats': ('Core.chunkStore', 'store_stats_command'),
+    'store-prune': ('Core.chunkStore', 'store_prune_command'),
+    'index': ('Core.entityIndex', 'index_save_command'),
+    'search': ('Core.entityIndex', 'search_index_command'),
+    'history': ('Core.gitHistory', 'history_command'),
+}
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: {} <nbt_file>".format(sys.argv[0]))
+        print("       {} <command> [options]".format(sys.argv[0]))
+        print("Commands:", ", ".join(COMMANDS))
         sys.exit(1)
 
-    filepath = sys.argv[1]
+    if sys.argv[1] in COMMANDS:
+        module_name, function_name = COMMANDS[sys.argv[1]]
+        command = getattr(importlib.import_module(module_name), function_name)
+        sys.exit(command(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description="Translate an NBT or region file to JSON.")
+    parser.add_argument('nbt_file')
+    parser.add_argument('--arrays', choices=ARRAY_MODES, default='list',
+                        help="how byte/int/long arrays are written (default: list)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='json', dest='output_format',
+                        help="output format (default: json)")
+    metrics.add_metrics_arguments(parser)
+    args = parser.parse_args()
+    filepath = args.nbt_file
     
     if not os.path.isfile(filepath):
         print(f"File does not exist: {filepath}")
         sys.exit(1)
-    
-    # Skip region files which are handled differently.
+
+    with metrics.command_metrics(args) as recorder:
+        started = time.perf_counter()
+        translate_file(filepath, args)
+        if recorder is not None:
+            recorder.add_counted_file(filepath, time.perf_counter() - started)
+
+def translate_file(filepath, args):
+    """
+    Translate the single file given to main().
+    """
+    # Region files hold many chunks and are translated one output file per chunk.
     if filepath.endswith('.mca'):
-        print("Region files (.mca) are not handled by this script.")
-        sys.exit(1)
-    
-    # For files like level.dat (and any non-.mcstructure), little_endian defaults to False,
-    # meaning Big Endian parsing is used.
-    little_endian = filepath.endswith('.mcstructure')
+        from Core.regionParser import translate_region, chunk_output_dir
+        count = translate_region(filepath, array_mode=args.arrays, output_format=args.output_format)
+        print(f"Translated {count} chunks to {chunk_output_dir(filepath)}")
+        return
     
     try:
-        nbt_file = read_nbt_file(filepath, little_endian)
-        # If initial read is in Big Endian mode (little_endian=False) and the root appears empty,
-        # try reading again with little_endian set to True.
-        if not little_endian and len(nbt_file) == 0:
-            try:
-                new_file = read_nbt_file(filepath, True)
-                if len(new_file) > 0:
-                    little_endian = True
-                    nbt_file = new_file
-                    print("Re-read with byteorder='little' because the initial read returned an empty root.")
-            except Exception as inner_err:
-                print("Retry with byteorder='little' failed:", inner_err)
+        from Core.nbtFormat import get_format, format_to_dict
+        nbt_format = get_format(filepath)
+        nbt_file, little_endian = load_nbt_file(filepath, nbt_format)
     except Exception as e:
-        # If an error occurred, try with the opposite endianness.
-        print("Initial parse error:", e)
-        try:
-            little_endian = not little_endian
-            nbt_file = read_nbt_file(filepath, little_endian)
-            print("Parsed successfully after switching endianness.")
-        except Exception as e2:
-            print("Failed to parse the NBT file:", e2)
-            sys.exit(1)
+        print("Failed to parse the NBT file:", e)
+        sys.exit(1)
+    metrics.count_tags(nbt_file)
     
     print("Parsed NBT file successfully with byteorder =", 'little' if little_endian else 'big')
     print("Root Compound Keys:", list(nbt_file.keys()))
     
     # Generate output filename by appending .txt to the original filename
-    output_path = filepath + '.json'
+    output_path = filepath + output_extension(args.output_format)
     
     # Save the parsed data to the output file
-    save_nbt_to_text(nbt_file, output_path)
+    save_nbt_to_text(nbt_file, output_path, array_mode=args.arrays, output_format=args.output_format,
+                     header={'format': format_to_dict(nbt_format)})
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
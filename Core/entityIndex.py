@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import sqlite3
+import argparse
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+from Core.lazyNbt import LazyNbt, TAG_LIST, TAG_COMPOUND, iter_region_lazy
+from Core.manifest import manifest_key, fingerprint, changed_chunks
+from Core.regionParser import region_timestamps, chunk_coords
+from Core.savePipeline import REGION_EXTENSIONS, CHUNK_BATCH, iter_save_stats
+
+# Name of the index inside a save's workspace folder
+INDEX_NAME = 'index.sqlite'
+
+INDEX_KINDS = ('entity', 'block_entity', 'player')
+
+# The lists of a chunk that hold each kind of object, at its root or, before
+# 1.18, in its Level compound
+OBJECT_LISTS = {b'Entities': 'entity', b'block_entities': 'block_entity',
+                b'TileEntities': 'block_entity'}
+
+_DIMENSION_FOLDERS = {'DIM-1': 'minecraft:the_nether', 'DIM1': 'minecraft:the_end'}
+_DIMENSION_IDS = {-1: 'minecraft:the_nether', 0: 'minecraft:overworld', 1: 'minecraft:the_end'}
+
+# Fields read from an entity, block entity or player compound
+_FIELDS = (b'id', b'UUID', b'UUIDMost', b'UUIDLeast', b'CustomName', b'Pos', b'x', b'y', b'z',
+           b'Dimension', b'Passengers', b'bukkit')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revisions (
+    id INTEGER PRIMARY KEY,
+    commit_id TEXT,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    chunk_x INTEGER,
+    chunk_z INTEGER,
+    kind TEXT NOT NULL,
+    type TEXT,
+    uuid TEXT,
+    name TEXT,
+    dimension TEXT,
+    x REAL,
+    y REAL,
+    z REAL,
+    added INTEGER NOT NULL REFERENCES revisions(id),
+    removed INTEGER REFERENCES revisions(id)
+);
+CREATE INDEX IF NOT EXISTS records_source ON records(source) WHERE removed IS NULL;
+CREATE INDEX IF NOT EXISTS records_type ON records(type);
+CREATE INDEX IF NOT EXISTS records_uuid ON records(uuid);
+CREATE INDEX IF NOT EXISTS records_position ON records(x, z);
+"""
+
+# The columns stored for each object
+RECORD_COLUMNS = ('kind', 'type', 'uuid', 'name', 'dimension', 'x', 'y', 'z')
+
+# One search result. `added` and `removed` are commit ids, or the time of
+# the update for indexes written without a commit; `removed` is None for
+# objects still present.
+Record = collections.namedtuple('Record', RECORD_COLUMNS + ('source', 'chunk_x', 'chunk_z',
+                                                            'added', 'removed'))
+
+# Counts of one update_index() run; `updated` counts objects that moved or changed in place
+IndexUpdate = collections.namedtuple('IndexUpdate', 'documents added removed updated elapsed')
+
+
+def open_index(index_path):
+    """
+    Open (and create if needed) an index database.
+    """
+    directory = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(index_path, timeout=30)
+    # Readers such as the GUI search do not block an update that is running
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def format_uuid(value):
+    """
+    Return the usual hyphenated form of a UUID stored as 16 bytes.
+    """
+    text = value.hex()
+    return f"{text[:8]}-{text[8:12]}-{text[12:16]}-{text[16:20]}-{text[20:]}"
+
+
+def plain_name(value):
+    """
+    Return the text of a CustomName, which is JSON text in most versions.
+    """
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        # Text components stored as NBT compounds
+        value = json.dumps(value)
+    try:
+        component = json.loads(value)
+    except ValueError:
+        return value
+
+    def text(part):
+        if isinstance(part, str):
+            return part
+        if isinstance(part, list):
+            return ''.join(text(item) for item in part)
+        if isinstance(part, dict):
+            return str(part.get('text', part.get('translate', ''))) + text(part.get('extra', []))
+        return str(part)
+    return text(component)
+
+
+def dimension_of(rel_path):
+    """
+    Return the dimension a region file of a world folder belongs to.
+    """
+    parts = manifest_key(rel_path).split('/')
+    if parts[0] in _DIMENSION_FOLDERS:
+        return _DIMENSION_FOLDERS[parts[0]]
+    if parts[0] == 'dimensions' and len(parts) > 3:
+        return f"{parts[1]}:{'/'.join(parts[2:-2])}"
+    return 'minecraft:overworld'
+
+
+def is_player_file(rel_path):
+    parts = manifest_key(rel_path).split('/')
+    return parts == ['level.dat'] or (len(parts) == 2 and parts[0] == 'playerdata'
+                                      and parts[1].endswith('.dat'))
+
+
+def _read_object(lazy, offset):
+    """
+    Decode the fields of one compound that go into the index.
+    """
+    fields = {}
+    for name, tag_id, child_offset in lazy.iter_compound(offset):
+        if name in _FIELDS:
+            fields[name] = (tag_id, child_offset)
+    return fields
+
+
+def _value(lazy, fields, name):
+    if name not in fields:
+        return None
+    return lazy.decode(*fields[name])
+
+
+def _object_uuid(lazy, fields):
+    uuid = _value(lazy, fields, b'UUID')
+    if uuid is not None and len(uuid) == 4:
+        return format_uuid(b''.join(int(part).to_bytes(4, 'big', signed=True) for part in uuid))
+    most, least = _value(lazy, fields, b'UUIDMost'), _value(lazy, fields, b'UUIDLeast')
+    if most is not None and least is not None:
+        return format_uuid(int(most).to_bytes(8, 'big', signed=True)
+                           + int(least).to_bytes(8, 'big', signed=True))
+    return None
+
+
+def _object_name(lazy, fields):
+    name = _value(lazy, fields, b'CustomName')
+    return plain_name(name if name is None or isinstance(name, str) else name.unpack())
+
+
+def _position(lazy, fields):
+    pos = _value(lazy, fields, b'Pos')
+    if pos is not None and len(pos) == 3:
+        return tuple(float(value) for value in pos)
+    coords = [_value(lazy, fields, name) for name in (b'x', b'y', b'z')]
+    if None in coords:
+        return None, None, None
+    return tuple(float(value) for value in coords)
+
+
+def _iter_object_lists(lazy, offset):
+    """
+    Yield (kind, list offset) for the object lists of a chunk compound. The
+    chunk is walked once, stepping over its sections.
+    """
+    for name, tag_id, child_offset in lazy.iter_compound(offset):
+        if name == b'Level' and tag_id == TAG_COMPOUND:
+            yield from _iter_object_lists(lazy, child_offset)
+        elif name in OBJECT_LISTS and tag_id == TAG_LIST and lazy.data[child_offset] == TAG_COMPOUND:
+            yield OBJECT_LISTS[name], child_offset
+
+
+def _entity_records(lazy, offset, dimension, records):
+    fields = _read_object(lazy, offset)
+    entity_id = _value(lazy, fields, b'id')
+    records.append(('entity', str(entity_id) if entity_id is not None else None,
+                    _object_uuid(lazy, fields), _object_name(lazy, fields), dimension)
+                   + _position(lazy, fields))
+    if b'Passengers' in fields and fields[b'Passengers'][0] == TAG_LIST:
+        for _, item_id, item_offset in lazy.iter_list(fields[b'Passengers'][1]):
+            if item_id == TAG_COMPOUND:
+                _entity_records(lazy, item_offset, dimension, records)
+
+
+def chunk_records(lazy, dimension):
+    """
+    Return the index records of one chunk: its entities (with their
+    passengers) and block entities.
+    """
+    records = []
+    for kind, list_offset in _iter_object_lists(lazy, lazy.root[1]):
+        for _, _, offset in lazy.iter_list(list_offset):
+            if kind == 'entity':
+                _entity_records(lazy, offset, dimension, records)
+                continue
+            fields = _read_object(lazy, offset)
+            block_id = _value(lazy, fields, b'id')
+            records.append(('block_entity', str(block_id) if block_id is not None else None, None,
+                            _object_name(lazy, fields), dimension) + _position(lazy, fields))
+    return records
+
+
+def player_records(lazy, rel_path):
+    """
+    Return the index record of a playerdata file, or of the singleplayer
+    player stored in level.dat.
+    """
+    if manifest_key(rel_path) == 'level.dat':
+        found = next(lazy.find('Data.Player'), None)
+        if found is None or found[1] != TAG_COMPOUND:
+            return []
+        offset = found[2]
+    else:
+        offset = lazy.root[1]
+    fields = _read_object(lazy, offset)
+    uuid = _object_uuid(lazy, fields)
+    if uuid is None and manifest_key(rel_path) != 'level.dat':
+        uuid = os.path.splitext(os.path.basename(rel_path))[0]
+    dimension = _value(lazy, fields, b'Dimension')
+    if dimension is not None:
+        dimension = str(dimension) if isinstance(dimension, str) else _DIMENSION_IDS.get(int(dimension))
+    name = None
+    if b'bukkit' in fields and fields[b'bukkit'][0] == TAG_COMPOUND:
+        # Servers remember the last known name of each player
+        for key, tag_id, child_offset in lazy.iter_compound(fields[b'bukkit'][1]):
+            if key == b'lastKnownName':
+                name = str(lazy.decode(tag_id, child_offset))
+    return [('player', 'minecraft:player', uuid, name, dimension) + _position(lazy, fields)]
+
+
+def record_identity(record):
+    """
+    Return what identifies the object of a record from one update to the
+    next. Objects with a UUID keep it wherever they go; block entities and
+    other objects without one are identified by their type and position.
+    """
+    kind, type, uuid, name, dimension, x, y, z = record
+    if uuid is not None:
+        return kind, uuid
+    return kind, type, dimension, x, y, z
+
+
+def _extract(task):
+    """
+    Read the records of some chunks of a region or of a player file inside a
+    worker. Returns (rel_path, {(chunk_x, chunk_z): records}, error); chunks
+    that could not be read are left out.
+    """
+    save_dir, rel_path, indices = task
+    filepath = os.path.join(save_dir, rel_path)
+    documents = {}
+    try:
+        if rel_path.endswith(REGION_EXTENSIONS):
+            dimension = dimension_of(rel_path)
+            for chunk_x, chunk_z, lazy in iter_region_lazy(filepath, indices):
+                documents[chunk_x, chunk_z] = chunk_records(lazy, dimension)
+        else:
+            documents[None, None] = player_records(LazyNbt.open(filepath), rel_path)
+    except Exception as e:
+        return rel_path, documents, str(e)
+    return rel_path, documents, None
+
+
+class IndexWriter:
+    """
+    Applies the records read from a save to the index as one revision.
+
+    An object keeps its record while it moves or is renamed, including to
+    another chunk or file: objects with a UUID that left one chunk and
+    appeared in another are matched in finish(). The revision row is only
+    created once something is added or removed.
+    """
+    def __init__(self, connection, commit=None):
+        self.connection = connection
+        self.commit = commit
+        self.revision = None
+        self.added = 0
+        self.removed = 0
+        self.updated = 0
+        # identity -> row ids / (source, chunk, record), for objects with a UUID
+        self.left = collections.defaultdict(list)
+        self.arrived = collections.defaultdict(list)
+
+    def _revision(self):
+        if self.revision is None:
+            cursor = self.connection.execute('INSERT INTO revisions (commit_id, created) VALUES (?, ?)',
+                                             (self.commit, time.time()))
+            self.revision = cursor.lastrowid
+        return self.revision
+
+    def live_records(self, source):
+        """
+        Return {(chunk_x, chunk_z): [(row id, record)]} for the objects of a
+        source that are present in the latest revision.
+        """
+        documents = collections.defaultdict(list)
+        for row in self.connection.execute(
+                f"SELECT id, chunk_x, chunk_z, {', '.join(RECORD_COLUMNS)} FROM records "
+                "WHERE source = ? AND removed IS NULL", (source,)):
+            documents[row[1], row[2]].append((row[0], row[3:]))
+        return documents
+
+    def _update(self, row_id, source, chunk, record):
+        self.connection.execute(
+            f"UPDATE records SET source = ?, chunk_x = ?, chunk_z = ?, "
+            f"{', '.join(column + ' = ?' for column in RECORD_COLUMNS)} WHERE id = ?",
+            (source,) + chunk + record + (row_id,))
+        self.updated += 1
+
+    def _remove(self, row_ids):
+        if row_ids:
+            revision = self._revision()
+            self.connection.executemany('UPDATE records SET removed = ? WHERE id = ?',
+                                        [(revision, row_id) for row_id in row_ids])
+            self.removed += len(row_ids)
+
+    def _add(self, rows):
+        if rows:
+            revision = self._revision()
+            self.connection.executemany(
+                f"INSERT INTO records (source, chunk_x, chunk_z, {', '.join(RECORD_COLUMNS)}, added) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(RECORD_COLUMNS))}, ?)",
+                [(source,) + chunk + record + (revision,) for source, chunk, record in rows])
+            self.added += len(rows)
+
+    def replace(self, source, live, chunk, records):
+        """
+        Make `records` the content of one chunk (or (None, None) for a
+        player file), given the live records of its source. Objects with a
+        UUID that are new to the chunk or gone from it are only added or
+        removed by finish().
+        """
+        remaining = collections.defaultdict(list)
+        for row_id, record in live.get(chunk, ()):
+            remaining[record_identity(record)].append((row_id, record))
+        added = []
+        for record in records:
+            identity = record_identity(record)
+            found = remaining.get(identity)
+            if found:
+                # Prefer a row that did not change at all
+                index = next((i for i, (_, previous) in enumerate(found) if previous == record), -1)
+                row_id, previous = found.pop(index)
+                if previous != record:
+                    self._update(row_id, source, chunk, record)
+            elif record[2] is not None:
+                self.arrived[identity].append((source, chunk, record))
+            else:
+                added.append((source, chunk, record))
+        gone = []
+        for identity, rows in remaining.items():
+            for row_id, record in rows:
+                if record[2] is not None:
+                    self.left[identity].append(row_id)
+                else:
+                    gone.append(row_id)
+        self._remove(gone)
+        self._add(added)
+
+    def finish(self):
+        """
+        Move the objects with a UUID that left a chunk to where they
+        appeared, then remove and add the rest.
+        """
+        added = []
+        for identity, arrivals in self.arrived.items():
+            rows = self.left.get(identity, [])
+            for source, chunk, record in arrivals:
+                if rows:
+                    self._update(rows.pop(), source, chunk, record)
+                else:
+                    added.append((source, chunk, record))
+        self._remove([row_id for rows in self.left.values() for row_id in rows])
+        self._add(added)
+        self.left.clear()
+        self.arrived.clear()
+
+    def drop(self, source, chunks=None):
+        """
+        Mark the records of a deleted source, or of some of its chunks, as removed.
+        """
+        live = self.live_records(source)
+        for chunk in (chunks if chunks is not None else list(live)):
+            self.replace(source, live, chunk, [])
+
+
+def update_index(save_dir, index_path, commit=None, jobs=None):
+    """
+    Bring the index at `index_path` up to date with a world folder.
+
+    Like the translation manifest, the index remembers the fingerprint and
+    chunk timestamps of every region and player file, so only the chunks
+    that changed since the last update are read, through the lazy reader.
+    Objects that appeared are recorded as added by this update and those
+    that disappeared as removed by it, while objects that only moved or
+    changed keep their record; `commit` is the commit the update belongs
+    to, if any. Returns an IndexUpdate.
+    """
+    started = time.perf_counter()
+    connection = open_index(index_path)
+    try:
+        sources = {}
+        for path, entry in connection.execute('SELECT path, entry FROM sources'):
+            entry = json.loads(entry)
+            if 'chunks' in entry:
+                entry['chunks'] = {int(k): v for k, v in entry['chunks'].items()}
+            sources[path] = entry
+        writer = IndexWriter(connection, commit)
+        entries = {}
+        work = []
+        removed_chunks = {}
+        for rel_path, stat in iter_save_stats(save_dir):
+            is_region = rel_path.endswith(REGION_EXTENSIONS)
+            if not is_region and not is_player_file(rel_path):
+                continue
+            key = manifest_key(rel_path)
+            previous = sources.get(key)
+            source = os.path.join(save_dir, rel_path)
+            try:
+                entry, changed = fingerprint(source, previous, stat)
+                if is_region and changed:
+                    entry['chunks'] = region_timestamps(source)
+            except OSError as e:
+                print(f"Failed to read {source}: {e}")
+                if previous is not None:
+                    entries[key] = previous
+                continue
+            entries[key] = entry
+            if not changed and previous is not None:
+                continue
+            if not is_region:
+                work.append((save_dir, key, None))
+                continue
+            chunks = entry['chunks']
+            indices, removed = changed_chunks((previous or {}).get('chunks'), chunks)
+            if previous is not None and not indices and not removed:
+                # The content changed but no timestamp moved, so trust nothing
+                indices = sorted(chunks)
+            removed_chunks[key] = [chunk_coords(source, index) for index in removed]
+            for start in range(0, len(indices), CHUNK_BATCH):
+                work.append((save_dir, key, indices[start:start + CHUNK_BATCH]))
+
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(work) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(jobs, len(work)))
+            results = pool.map(_extract, work)
+        else:
+            pool = None
+            results = map(_extract, work)
+        documents = 0
+        live = {}
+        try:
+            for key, found, error in results:
+                if error:
+                    print(f"Failed to index {os.path.join(save_dir, key)}: {error}")
+                    # Read it again next time
+                    entries.pop(key, None)
+                    sources.pop(key, None)
+                if key not in live:
+                    live[key] = writer.live_records(key)
+                for chunk, records in found.items():
+                    writer.replace(key, live[key], chunk, records)
+                documents += len(found)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for key, chunks in removed_chunks.items():
+            writer.drop(key, chunks)
+            documents += len(chunks)
+        for key in sources:
+            if key not in entries:
+                writer.drop(key)
+        writer.finish()
+        connection.execute('DELETE FROM sources')
+        connection.executemany('INSERT INTO sources (path, entry) VALUES (?, ?)',
+                               [(key, json.dumps(entry)) for key, entry in entries.items()])
+        connection.commit()
+    finally:
+        connection.close()
+    return IndexUpdate(documents, writer.added, writer.removed, writer.updated,
+                       time.perf_counter() - started)
+
+
+def _revision_label(commit_id, created):
+    if commit_id:
+        return commit_id
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))
+
+
+def search_index(index_path, kind=None, type=None, name=None, uuid=None, near=None, radius=16.0,
+                 dimension=None, history=False, limit=None):
+    """
+    Return the Records of an index matching every given filter.
+
+    `type` matches ids with or without the minecraft: namespace, `name` is a
+    case-insensitive substring of custom or player names and `uuid` a UUID
+    prefix. `near` is an (x, y, z) position matched within `radius` blocks;
+    use a radius of 0 for the exact block. Only objects present in the
+    latest update are returned unless `history` is set, in which case
+    removed objects come too, newest revision first.
+    """
+    if not os.path.isfile(index_path):
+        raise FileNotFoundError(f"Index does not exist: {index_path}")
+    conditions = []
+    params = []
+    if kind:
+        conditions.append('r.kind = ?')
+        params.append(kind)
+    if type:
+        conditions.append('r.type = ?')
+        params.append(type if ':' in type else 'minecraft:' + type)
+    if name:
+        conditions.append("r.name LIKE ? ESCAPE '\\'")
+        params.append('%' + name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+    if uuid:
+        conditions.append('r.uuid LIKE ?')
+        params.append(uuid.lower().replace('%', '').replace('_', '') + '%')
+    if dimension:
+        conditions.append('r.dimension = ?')
+        params.append(dimension if ':' in dimension else 'minecraft:' + dimension)
+    if near is not None:
+        x, y, z = near
+        if radius <= 0:
+            # The block itself: entities stand anywhere inside it, block entities on its corner
+            low, high = (x, y, z), (x + 1, y + 1, z + 1)
+        else:
+            low, high = (x - radius, y - radius, z - radius), (x + radius, y + radius, z + radius)
+        conditions.append('r.x >= ? AND r.x < ? AND r.z >= ? AND r.z < ? AND r.y >= ? AND r.y < ?')
+        params += [low[0], high[0], low[2], high[2], low[1], high[1]]
+    if not history:
+        conditions.append('r.removed IS NULL')
+    query = ("SELECT " + ', '.join('r.' + column for column in RECORD_COLUMNS)
+             + ", r.source, r.chunk_x, r.chunk_z, a.commit_id, a.created, d.commit_id, d.created "
+             "FROM records r JOIN revisions a ON a.id = r.added "
+             "LEFT JOIN revisions d ON d.id = r.removed"
+             + (" WHERE " + ' AND '.join(conditions) if conditions else '')
+             + " ORDER BY COALESCE(r.removed, r.added) DESC, r.id")
+    # The box selected above holds more than the sphere within `radius`, so
+    # a search near a position is only limited once the corners are left out
+    in_sphere = near is not None and radius > 0
+    if limit and not in_sphere:
+        query += f" LIMIT {int(limit)}"
+    records = []
+    connection = sqlite3.connect(index_path, timeout=30)
+    try:
+        for row in connection.execute(query, params):
+            added = _revision_label(row[-4], row[-3])
+            removed = _revision_label(row[-2], row[-1]) if row[-1] is not None else None
+            record = Record(*row[:-4], added, removed)
+            if in_sphere and ((record.x - near[0]) ** 2 + (record.y - near[1]) ** 2
+                              + (record.z - near[2]) ** 2 > radius ** 2):
+                continue
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+    finally:
+        connection.close()
+    return records
+
+
+def short_revision(label):
+    # Abbreviate commit ids; updates without a commit are labelled with their time
+    return label if ' ' in label else label[:12]
+
+
+def format_position(record):
+    if record.x is None:
+        return "unknown position"
+    if record.kind == 'block_entity':
+        return f"{record.x:.0f} {record.y:.0f} {record.z:.0f}"
+    return f"{record.x:.1f} {record.y:.1f} {record.z:.1f}"
+
+
+def describe_record(record):
+    """
+    Format a Record on one line the way the search command prints it.
+    """
+    label = record.type or record.kind
+    if record.name:
+        label += f" {json.dumps(record.name, ensure_ascii=False)}"
+    if record.uuid:
+        label += f" {record.uuid}"
+    where = f"{format_position(record)} in {record.dimension or 'unknown dimension'}"
+    if record.chunk_x is not None:
+        where += f", chunk {record.chunk_x} {record.chunk_z}"
+    text = f"{label} at {where} ({record.source}), added {short_revision(record.added)}"
+    if record.removed:
+        text += f", removed {short_revision(record.removed)}"
+    return text
+
+
+def index_save_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='index',
+        description="Record the entities, block entities and players of a world folder in a "
+                    "SQLite index; only chunks changed since the last update are read.")
+    parser.add_argument('save_dir', help="world folder to index")
+    parser.add_argument('index', help="index database (created if missing)")
+    parser.add_argument('--commit', default=None,
+                        help="commit id the current state of the save belongs to")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    try:
+        update = update_index(args.save_dir, args.index, args.commit, args.jobs)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Indexing failed: {e}")
+        return 1
+    print(f"Indexed {update.documents} chunks and files in {update.elapsed:.2f}s: "
+          f"{update.added} added, {update.removed} removed, {update.updated} moved or changed")
+    return 0
+
+
+def search_index_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='search',
+        description="Search an index written by the index command or by --index.")
+    parser.add_argument('index', help="index database")
+    parser.add_argument('--kind', choices=INDEX_KINDS, default=None)
+    parser.add_argument('--type', default=None, help="object id, such as villager or minecraft:chest")
+    parser.add_argument('--name', default=None, help="part of a custom or player name")
+    parser.add_argument('--uuid', default=None, help="UUID or UUID prefix")
+    parser.add_argument('--dimension', default=None, help="dimension, such as the_nether")
+    parser.add_argument('--near', nargs=3, type=float, metavar=('X', 'Y', 'Z'), default=None,
+                        help="only objects around this position")
+    parser.add_argument('--radius', type=float, default=16.0,
+                        help="distance from --near in blocks; 0 for the exact block (default: 16)")
+    parser.add_argument('--history', action='store_true',
+                        help="include removed objects and show which revision removed them")
+    parser.add_argument('-n', '--limit', type=int, default=None, help="maximum number of results")
+    args = parser.parse_args(argv)
+
+    try:
+        records = search_index(args.index, args.kind, args.type, args.name, args.uuid, args.near,
+                               args.radius, args.dimension, args.history, args.limit)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Search failed: {e}")
+        return 1
+    for record in records:
+        print(describe_record(record))
+    return 0 if records else 1
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from Core import metrics
+from Core.manifest import Manifest
+from Core.volatileFields import VOLATILE_SUFFIX
+from Core.savePipeline import (plan_tasks, run_tasks, translation_options, task_options,
+                               reset_manifest, record_masked, forget_failed, add_translate_arguments,
+                               translate_arguments, refresh_index)
+
+DEFAULT_REF = 'refs/heads/master'
+FALLBACK_IDENT = 'pyGitMC <pygitmc@localhost>'
+
+# The escapes of git's C-style quoting; other control and non-ASCII bytes are written in octal
+_C_ESCAPES = {0x07: b'\\a', 0x08: b'\\b', 0x09: b'\\t', 0x0a: b'\\n', 0x0b: b'\\v', 0x0c: b'\\f',
+              0x0d: b'\\r', 0x22: b'\\"', 0x5c: b'\\\\'}
+
+
+def git(repo, *args, check=True):
+    """
+    Run a git command in `repo` and return its stripped stdout, or None if
+    it failed and `check` is False.
+    """
+    result = subprocess.run(['git', '-C', repo] + list(args), stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    if result.returncode:
+        if check:
+            raise RuntimeError(f"git {args[0]} failed: {result.stderr.decode(errors='replace').strip()}")
+        return None
+    return result.stdout.decode('utf-8', errors='replace').strip()
+
+
+def _quote_path(path):
+    """
+    Encode a path for a fast-import command, C-style quoted the way git
+    quotes it: paths with control characters, non-ASCII bytes, a double
+    quote or a backslash.
+    """
+    raw = path.encode('utf-8')
+    if not any(byte < 0x20 or byte >= 0x7f or byte in _C_ESCAPES for byte in raw):
+        return raw
+    quoted = bytearray(b'"')
+    for byte in raw:
+        if byte in _C_ESCAPES:
+            quoted += _C_ESCAPES[byte]
+        elif byte < 0x20 or byte >= 0x7f:
+            quoted += b'\\%03o' % byte
+        else:
+            quoted.append(byte)
+    return bytes(quoted + b'"')
+
+
+def committer_ident(repo):
+    """
+    Return "Name <email> timestamp tz" for the configured git identity.
+    """
+    ident = git(repo, 'var', 'GIT_COMMITTER_IDENT', check=False)
+    if not ident:
+        # No identity configured
+        ident = f"{FALLBACK_IDENT} {int(time.time())} +0000"
+    return ident
+
+
+class FastImport:
+    """
+    One commit streamed into a `git fast-import` process.
+
+    Files are sent inline as they are produced, on top of the tree of
+    `parent`, so neither a working tree nor the index is involved. The commit
+    header is only written once the first change arrives.
+    """
+    def __init__(self, repo, ref, message, parent=None):
+        self.repo = repo
+        self.ref = ref
+        self.message = message
+        self.parent = parent
+        self.started = False
+        self.changes = 0
+        # A file rather than a pipe: nothing reads stderr until finish(), and a
+        # full pipe would stall git while this process waits on its stdin
+        self.errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(['git', '-C', repo, 'fast-import', '--quiet', '--done'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                        stderr=self.errors)
+        self.stream = self.process.stdin
+
+    def _start(self):
+        if self.started:
+            return
+        self.started = True
+        message = self.message.encode('utf-8')
+        header = (b'commit ' + self.ref.encode('utf-8') + b'\n'
+                  + b'committer ' + committer_ident(self.repo).encode('utf-8') + b'\n'
+                  + b'data %d\n' % len(message) + message + b'\n')
+        if self.parent:
+            header += b'from ' + self.parent.encode('ascii') + b'\n'
+        self.stream.write(header)
+
+    def modify(self, path, data):
+        """
+        Set the content of `path` (relative, with forward slashes).
+        """
+        self._start()
+        self.stream.write(b'M 100644 inline ' + _quote_path(path) + b'\n'
+                          + b'data %d\n' % len(data) + data + b'\n')
+        self.changes += 1
+
+    def delete(self, path):
+        """
+        Remove a file or a whole folder from the tree.
+        """
+        self._start()
+        self.stream.write(b'D ' + _quote_path(path) + b'\n')
+        self.changes += 1
+
+    def finish(self):
+        """
+        Close the stream and wait for git. Returns the new commit id, or None
+        if nothing changed; a commit whose tree equals its parent's is
+        dropped again.
+        """
+        try:
+            self.stream.write(b'done\n')
+            self.stream.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        self.errors.seek(0)
+        error = self.errors.read().decode('utf-8', errors='replace').strip()
+        self.errors.close()
+        if returncode:
+            raise RuntimeError(f"git fast-import failed: {error}")
+        if not self.started:
+            return None
+        commit = git(self.repo, 'rev-parse', self.ref)
+        if self.parent and (git(self.repo, 'rev-parse', commit + '^{tree}')
+                            == git(self.repo, 'rev-parse', self.parent + '^{tree}')):
+            git(self.repo, 'update-ref', self.ref, self.parent, commit)
+            return None
+        return commit
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
+        self.errors.close()
+
+
+def open_repository(repo):
+    """
+    Make sure `repo` is a git repository. Returns its git directory.
+    """
+    if shutil.which('git') is None:
+        raise RuntimeError("git was not found on PATH")
+    os.makedirs(repo, exist_ok=True)
+    git_dir = git(repo, 'rev-parse', '--absolute-git-dir', check=False)
+    if git_dir is None:
+        git(repo, 'init', '-q')
+        git_dir = git(repo, 'rev-parse', '--absolute-git-dir')
+    return git_dir
+
+
+def resolve_ref(repo, branch=None):
+    if branch:
+        return branch if branch.startswith('refs/') else 'refs/heads/' + branch
+    return git(repo, 'symbolic-ref', '-q', 'HEAD', check=False) or DEFAULT_REF
+
+
+def commit_save(save_dir, repo, message, branch=None, jobs=None, max_pending=None, progress=None,
+                incremental=True, array_mode='list', output_format='json', layout='file',
+                volatile=None, cancel=None, store=None, index=None):
+    """
+    Translate a world folder and commit the result to a branch of `repo`
+    through git fast-import.
+
+    Only the files and chunks that changed since the last commit are
+    translated (the manifest lives in the git directory) and their
+    translations go straight from the workers into git. The working tree and
+    index of `repo` are left alone, except for volatile sidecar files.
+    A cancelled run commits nothing. `store` is passed on as in
+    translate_save(). The entity index at `index`, if given, records the
+    changes under the new commit (or the branch head when nothing changed).
+    Returns (TranslateStats, new commit id or None).
+    """
+    git_dir = open_repository(repo)
+    ref = resolve_ref(repo, branch)
+    parent = git(repo, 'rev-parse', '-q', '--verify', ref + '^{commit}', check=False)
+
+    manifest = Manifest.load(git_dir)
+    if parent is None:
+        manifest.files = {}
+    options = translation_options(array_mode, output_format, layout, volatile)
+    output_dir = os.path.abspath(repo)
+
+    importer = FastImport(repo, ref, message, parent)
+    try:
+        def tree_path(path):
+            return os.path.relpath(path, output_dir).replace(os.sep, '/')
+
+        def remove(path):
+            importer.delete(tree_path(path))
+
+        def consume(rendered):
+            with metrics.stage('git'):
+                for path, data in rendered:
+                    if data is None:
+                        importer.delete(tree_path(path))
+                    else:
+                        importer.modify(tree_path(path), data)
+
+        if volatile is not None:
+            ignored = git(repo, 'cat-file', 'blob', ref + ':.gitignore', check=False) if parent else None
+            pattern = '*' + VOLATILE_SUFFIX
+            if ignored is None or pattern not in ignored.splitlines():
+                importer.modify('.gitignore', ((ignored + '\n') if ignored else '').encode('utf-8')
+                                + pattern.encode('utf-8') + b'\n')
+
+        reset_manifest(manifest, output_dir, options, incremental, remove)
+        # Every path in the manifest was committed on the branch by an earlier run
+        tasks = plan_tasks(save_dir, output_dir, manifest, task_options(options, store),
+                           exists=lambda path: True, remove=remove)
+        stats = run_tasks(tasks, jobs, max_pending, progress, consume=consume, cancel=cancel)
+        if stats.cancelled:
+            # The manifest is left as it was, so the next run redoes this one
+            importer.abort()
+            return stats, None
+        with metrics.stage('git'):
+            commit = importer.finish()
+    except BaseException:
+        importer.abort()
+        raise
+
+    record_masked(manifest, save_dir, stats)
+    forget_failed(manifest, save_dir, stats)
+    manifest.save()
+    if index is not None:
+        refresh_index(save_dir, index, commit or parent, jobs)
+    return stats, commit
+
+
+def commit_save_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='commit-save',
+        description="Translate a world folder and commit it to a git repository with "
+                    "git fast-import, without writing a working tree.")
+    parser.add_argument('save_dir', help="world folder to translate")
+    parser.add_argument('repo', help="git repository to commit to (created if missing)")
+    parser.add_argument('-m', '--message', default=None, help="commit message")
+    parser.add_argument('-b', '--branch', default=None,
+                        help="branch to commit to (default: the checked out branch)")
+    add_translate_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    kwargs = translate_arguments(args)
+    if kwargs is None:
+        return 1
+    message = args.message or f"Translate {os.path.basename(os.path.abspath(args.save_dir))}"
+
+    with metrics.command_metrics(args):
+        try:
+            stats, commit = commit_save(args.save_dir, args.repo, message, args.branch, **kwargs)
+        except (OSError, RuntimeError) as e:
+            print(f"Commit failed: {e}")
+            return 1
+        print("Translated", stats.summary())
+        print(f"Committed {commit}" if commit else "Nothing to commit")
+    return 1 if stats.errors else 0
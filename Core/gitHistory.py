@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+import re
+import time
+import argparse
+import threading
+import subprocess
+import collections
+
+from Core.lruCache import LruCache
+from Core.serializers import EXTENSIONS
+from Core.volatileFields import VOLATILE_SUFFIX
+from Core.gitFastImport import git, resolve_ref
+
+# Commits read from `git log` at a time
+PAGE_SIZE = 200
+
+# Change summaries kept in memory
+SUMMARY_CACHE_SIZE = 1024
+
+# One commit of the history; `parents` is a tuple of commit ids and
+# `timestamp` the author time.
+Commit = collections.namedtuple('Commit', 'id parents author timestamp subject')
+
+# What a commit changed against its first parent, in paths of the save
+# rather than of the translation: `files` is [(status, path)] for standalone
+# files and `chunks` is {region path: [(status, chunk_x, chunk_z)]}. Statuses
+# are git's: A(dded), M(odified) and D(eleted).
+ChangeSummary = collections.namedtuple('ChangeSummary', 'files chunks')
+
+_LOG_FORMAT = '%H%x1f%P%x1f%an%x1f%at%x1f%s'
+_CHUNK_PATH = re.compile(r'^(.+)\.chunks/c\.(-?\d+)\.(-?\d+)(?:/|\.[^/]+$)')
+# Not an object name, so git diff-tree --stdin echoes it after each diff
+_END = b'--end--\n'
+
+
+def source_path(path):
+    """
+    Return the save path a translated file was written for, or None for the
+    files of the repository that are not translations.
+    """
+    if path.endswith(VOLATILE_SUFFIX):
+        return None
+    for extension in EXTENSIONS:
+        if path.endswith(extension):
+            return path[:-len(extension)]
+    return None
+
+
+def summarize(changes):
+    """
+    Turn [(status, path)] listed by git diff-tree into a ChangeSummary. A
+    canonical chunk folder counts as added or deleted only if all its files were.
+    """
+    files = []
+    chunk_status = {}
+    for status, path in changes:
+        status = status if status in ('A', 'D') else 'M'
+        match = _CHUNK_PATH.match(path)
+        if match:
+            key = (match.group(1), int(match.group(2)), int(match.group(3)))
+            previous = chunk_status.get(key)
+            chunk_status[key] = status if previous in (None, status) else 'M'
+            continue
+        source = source_path(path)
+        if source is not None:
+            files.append((status, source))
+    chunks = {}
+    for (region, chunk_x, chunk_z), status in sorted(chunk_status.items()):
+        chunks.setdefault(region, []).append((status, chunk_x, chunk_z))
+    return ChangeSummary(files, chunks)
+
+
+def describe_summary(summary):
+    """
+    Return a one-line count of a ChangeSummary, such as "2 files, 14 chunks in 3 regions".
+    """
+    parts = []
+    if summary.files:
+        parts.append(f"{len(summary.files)} file{'s' if len(summary.files) != 1 else ''}")
+    if summary.chunks:
+        chunks = sum(len(entries) for entries in summary.chunks.values())
+        regions = len(summary.chunks)
+        parts.append(f"{chunks} chunk{'s' if chunks != 1 else ''} in "
+                     f"{regions} region{'s' if regions != 1 else ''}")
+    return ', '.join(parts) or "no changes"
+
+
+class _GitProcess:
+    """
+    A long-lived git process answering one request at a time on its stdin.
+    """
+    def __init__(self, repo, *args):
+        self.process = subprocess.Popen(['git', '-C', repo] + list(args), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.lock = threading.Lock()
+
+    def request(self, line):
+        if self.process.poll() is not None:
+            raise RuntimeError(f"git {self.process.args[3]} exited with status {self.process.returncode}")
+        self.process.stdin.write(line)
+        self.process.stdin.flush()
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class CatFile(_GitProcess):
+    """
+    A `git cat-file --batch` process, reading objects without a process per read.
+    """
+    def __init__(self, repo):
+        super().__init__(repo, 'cat-file', '--batch')
+
+    def read(self, name):
+        """
+        Return (type, bytes) of an object name such as a commit id or
+        "revision:path", or None if it does not exist.
+        """
+        with self.lock:
+            self.request(name.encode('utf-8') + b'\n')
+            header = self.process.stdout.readline()
+            if not header:
+                raise RuntimeError("git cat-file exited")
+            fields = header.split()
+            if fields[-1] in (b'missing', b'ambiguous'):
+                return None
+            kind, size = fields[1].decode('ascii'), int(fields[2])
+            data = self.process.stdout.read(size)
+            self.process.stdout.read(1)
+            return kind, data
+
+
+class DiffTree(_GitProcess):
+    """
+    A `git diff-tree --stdin` process listing the files changed by commits.
+    """
+    def __init__(self, repo):
+        super().__init__(repo, 'diff-tree', '--stdin', '-r', '--root', '--no-renames',
+                         '--name-status', '-z')
+
+    def changes(self, commit_id, parent=None):
+        """
+        Return [(status, path)] changed by a commit against `parent`, or
+        against nothing for a root commit.
+        """
+        line = f"{commit_id} {parent}" if parent else commit_id
+        with self.lock:
+            self.request(line.encode('ascii') + b'\n' + _END)
+            output = b''
+            while not (output == _END or output.endswith(b'\0' + _END)):
+                chunk = self.process.stdout.readline()
+                if not chunk:
+                    raise RuntimeError("git diff-tree exited")
+                output += chunk
+        fields = output[:-len(_END)].split(b'\0')
+        # The output starts with the commit id, then alternates status and path
+        fields = [field.decode('utf-8', errors='replace') for field in fields[1:-1]]
+        return list(zip(fields[0::2], fields[1::2]))
+
+
+class GitHistory:
+    """
+    The commits of a repository written by commit-save, newest first.
+
+    The log is read by one `git log` process a page at a time as commits are
+    asked for, so opening a history of any length costs two git commands.
+    Change summaries come from one `git diff-tree --stdin` process and are
+    cached by commit id; objects are read through one `git cat-file --batch`.
+    Safe to share between threads. commit() and refresh() wait for git, so
+    a UI thread asks loaded() and leaves the reading to a worker thread.
+    """
+    def __init__(self, repo, branch=None, page_size=PAGE_SIZE, cache_size=SUMMARY_CACHE_SIZE):
+        self.repo = repo
+        self.ref = resolve_ref(repo, branch)
+        self.page_size = page_size
+        self.summaries = LruCache(cache_size)
+        self.head = None
+        self.total = 0
+        self._commits = []
+        self._log = None
+        self._log_done = True
+        self._cat_file = None
+        self._diff_tree = None
+        self._closed = False
+        # Guards the fields above; git is never waited for while holding it
+        self._lock = threading.Lock()
+        # Taken by the one thread reading a page of the log
+        self._read_lock = threading.Lock()
+        # Changes with every new head, so a page read for the previous one is dropped
+        self._generation = 0
+        self.refresh()
+
+    def __len__(self):
+        return self.total
+
+    def refresh(self):
+        """
+        Follow the branch to its current commit. Returns True if it moved,
+        in which case the commits are read again; cached summaries stay.
+        """
+        head = git(self.repo, 'rev-parse', '-q', '--verify', self.ref + '^{commit}', check=False) or None
+        if head == self.head or self._closed:
+            return False
+        total = int(git(self.repo, 'rev-list', '--count', head)) if head else 0
+        with self._lock:
+            if head == self.head or self._closed:
+                return False
+            self._stop_log()
+            self.head = head
+            self.total = total
+            self._commits = []
+            self._log_done = head is None
+            self._generation += 1
+        return True
+
+    def loaded(self, index):
+        """
+        Return the commit `index` places before the head if it was already
+        read from the log, without waiting for git; None otherwise.
+        """
+        with self._lock:
+            return self._commits[index] if index < len(self._commits) else None
+
+    def commit(self, index):
+        """
+        Return the commit `index` places before the head, or None past the end.
+        """
+        found = self.commits(index, 1)
+        return found[0] if found else None
+
+    def commits(self, start, count):
+        """
+        Return up to `count` commits from `start` on.
+        """
+        while True:
+            with self._lock:
+                if start + count <= len(self._commits) or self._log_done:
+                    return self._commits[start:start + count]
+            self._read_page()
+
+    def _read_page(self):
+        with self._read_lock:
+            with self._lock:
+                if self._log_done:
+                    return
+                if self._log is None:
+                    self._log = subprocess.Popen(['git', '-C', self.repo, 'log', '--format=' + _LOG_FORMAT,
+                                                  self.head, '--'],
+                                                 stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                log, generation = self._log, self._generation
+            lines = []
+            try:
+                while len(lines) < self.page_size:
+                    line = log.stdout.readline()
+                    if not line:
+                        break
+                    lines.append(line)
+            except (OSError, ValueError):
+                # refresh() or close() stopped the log meanwhile
+                pass
+            with self._lock:
+                if generation != self._generation or self._closed:
+                    return
+                for line in lines:
+                    commit_id, parents, author, timestamp, subject = (
+                        line.decode('utf-8', errors='replace').rstrip('\n').split('\x1f', 4))
+                    self._commits.append(Commit(commit_id, tuple(parents.split()), author, int(timestamp),
+                                                subject))
+                if len(lines) < self.page_size:
+                    self._log_done = True
+                    self._stop_log()
+
+    def _stop_log(self):
+        if self._log is not None:
+            self._log.kill()
+            self._log.wait()
+            self._log.stdout.close()
+            self._log = None
+
+    def changes(self, commit):
+        """
+        Return the ChangeSummary of a Commit against its first parent.
+        """
+        summary = self.summaries.get(commit.id)
+        if summary is None:
+            diff_tree = self._process('_diff_tree', DiffTree)
+            summary = summarize(diff_tree.changes(commit.id, commit.parents[0] if commit.parents else None))
+            self.summaries.put(commit.id, summary)
+        return summary
+
+    def read(self, name):
+        """
+        Return (type, bytes) of an object, such as "<commit>:level.dat.json",
+        or None if it does not exist.
+        """
+        return self._process('_cat_file', CatFile).read(name)
+
+    def _process(self, attribute, factory):
+        # Processes start with their first request
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("the history was closed")
+            if getattr(self, attribute) is None:
+                setattr(self, attribute, factory(self.repo))
+            return getattr(self, attribute)
+
+    def message(self, commit):
+        """
+        Return the full message of a Commit.
+        """
+        found = self.read(commit.id)
+        if found is None:
+            return commit.subject
+        raw = found[1].decode('utf-8', errors='replace')
+        return raw.split('\n\n', 1)[1].rstrip('\n') if '\n\n' in raw else ''
+
+    def close(self):
+        with self._lock:
+            self._closed = self._log_done = True
+            self._stop_log()
+            for process in (self._cat_file, self._diff_tree):
+                if process is not None:
+                    process.close()
+            self._cat_file = self._diff_tree = None
+
+
+def describe_commit(commit):
+    return (f"{commit.id[:12]}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(commit.timestamp))}  "
+            f"{commit.author}  {commit.subject}")
+
+
+def history_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='history',
+        description="List the commits of a repository written by commit-save, newest first, "
+                    "with the files and chunks each of them changed.")
+    parser.add_argument('repo', help="git repository written by commit-save")
+    parser.add_argument('--branch', default=None, help="branch to list (default: the current one)")
+    parser.add_argument('--skip', type=int, default=0, help="newest commits to leave out")
+    parser.add_argument('-n', '--limit', type=int, default=20, help="commits to list (default: 20)")
+    parser.add_argument('--chunks', action='store_true', help="list every changed file and chunk")
+    args = parser.parse_args(argv)
+
+    try:
+        history = GitHistory(args.repo, args.branch)
+    except (OSError, RuntimeError) as e:
+        print(f"Cannot read the history: {e}")
+        return 1
+    if not len(history):
+        print(f"No commits found in {args.repo}")
+        history.close()
+        return 1
+    try:
+        commits = history.commits(args.skip, args.limit)
+        for commit in commits:
+            summary = history.changes(commit)
+            print(f"{describe_commit(commit)}  ({describe_summary(summary)})")
+            if args.chunks:
+                for status, path in summary.files:
+                    print(f"    {status} {path}")
+                for region, chunks in summary.chunks.items():
+                    for status, chunk_x, chunk_z in chunks:
+                        print(f"    {status} {region} chunk ({chunk_x}, {chunk_z})")
+        if args.skip + len(commits) < len(history):
+            print(f"... {len(history) - args.skip - len(commits)} older commits")
+    except (OSError, RuntimeError) as e:
+        print(f"Cannot read the history: {e}")
+        return 1
+    finally:
+        history.close()
+    return 0
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import time
+import threading
+import contextlib
+import collections
+
+# Minimum time between two progress notifications of a job, so a fast run
+# does not flood the GUI event queue.
+PROGRESS_INTERVAL = 0.2
+
+
+class Job:
+    """
+    One queued operation, such as translating or building a save.
+
+    `function` is called on the worker thread as
+    function(*args, progress=..., cancel=..., **kwargs): it reports its
+    running statistics through `progress` and stops early once the `cancel`
+    event is set.
+    """
+    def __init__(self, key, label, function, args=(), kwargs=None):
+        self.key = key
+        self.label = label
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cancel_event = threading.Event()
+        self.state = 'queued'
+        self.stats = None
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+        self.metrics = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+
+class JobQueue:
+    """
+    Run jobs one after another on a background thread.
+
+    The callbacks `on_start(job)`, `on_progress(job, stats)` and
+    `on_finish(job)` are handed to `post`, which defaults to calling them
+    directly; the GUI passes wx.CallAfter so they run on the main thread.
+    Submitting a job whose key is already queued or running returns the
+    existing job instead of adding a second one. While `collect_metrics` is
+    set each job records a Metrics (see Core/metrics.py) in job.metrics.
+    """
+    def __init__(self, post=None, on_start=None, on_progress=None, on_finish=None):
+        self.post = post or (lambda callback, *args: callback(*args))
+        self.on_start = on_start
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.queue = collections.deque()
+        self.current = None
+        self.condition = threading.Condition()
+        self.closed = False
+        self.thread = None
+        self.collect_metrics = False
+
+    def submit(self, key, label, function, *args, **kwargs):
+        """
+        Queue function(*args, **kwargs). Returns (job, queued), where
+        `queued` is False if an equal job was already pending.
+        """
+        with self.condition:
+            for job in self.jobs():
+                if job.key == key and not job.cancelled:
+                    return job, False
+            job = Job(key, label, function, args, kwargs)
+            self.queue.append(job)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='JobQueue', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return job, True
+
+    def jobs(self):
+        """
+        Return the running job, if any, followed by the queued ones.
+        """
+        with self.condition:
+            return ([self.current] if self.current else []) + list(self.queue)
+
+    def pending(self):
+        with self.condition:
+            return len(self.queue) + (self.current is not None)
+
+    def cancel(self, job=None):
+        """
+        Cancel one job, or every queued and running job when `job` is None.
+        """
+        with self.condition:
+            targets = [job] if job is not None else self.jobs()
+            for target in targets:
+                target.cancel()
+                if target in self.queue:
+                    self.queue.remove(target)
+                    target.state = 'cancelled'
+                    self._notify(self.on_finish, target)
+
+    def shutdown(self, wait=True):
+        """
+        Cancel everything and stop the worker thread.
+        """
+        self.cancel()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if wait and self.thread is not None:
+            self.thread.join()
+
+    def _notify(self, callback, *args):
+        if callback is not None:
+            self.post(callback, *args)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                job = self.current = self.queue.popleft()
+            self._execute(job)
+            with self.condition:
+                self.current = None
+
+    def _execute(self, job):
+        job.state = 'running'
+        self._notify(self.on_start, job)
+        started = time.perf_counter()
+        last_report = [0.0]
+
+        def progress(stats):
+            job.stats = stats
+            now = time.perf_counter()
+            if now - last_report[0] >= PROGRESS_INTERVAL:
+                last_report[0] = now
+                self._notify(self.on_progress, job, stats)
+
+        if self.collect_metrics:
+            from Core import metrics
+            recording = metrics.recording()
+        else:
+            recording = contextlib.nullcontext()
+        try:
+            with recording as recorder:
+                job.result = job.function(*job.args, progress=progress, cancel=job.cancel_event,
+                                          **job.kwargs)
+            job.metrics = recorder
+            job.state = 'cancelled' if job.cancelled else 'done'
+        except Exception as e:
+            job.error = e
+            job.state = 'failed'
+        job.elapsed = time.perf_counter() - started
+        self._notify(self.on_finish, job)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+import io
+import os
+import re
+import json
+import mmap
+import struct
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import nbtlib
+
+from Core.defaultNbtParser import nbt_to_json_serializable, ARRAY_MODES
+from Core.nbtFormat import get_format, read_nbt_bytes
+from Core.savePipeline import REGION_EXTENSIONS, iter_save_files
+
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+
+# Payload sizes of the numeric tags
+_FIXED_SIZES = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+# Element sizes of the array tags, whose payload is a count then the elements
+_ARRAY_ITEM_SIZES = {7: 1, 11: 4, 12: 8}
+
+# One path step: [index], [*], a quoted key or a bare key
+_PATH_STEP = re.compile(r'\[(\*|-?\d+)\]|"((?:[^"\\]|\\.)*)"|([^.\[\]"]+)')
+
+WILDCARD = None
+
+
+def parse_path(path):
+    """
+    Split a query such as 'Data.Player.Inventory[0].id' into steps.
+
+    Keys become ('key', bytes) and list indices ('index', int); '*' and '[*]'
+    match every key or element and use WILDCARD as their value. Keys holding
+    dots or brackets can be quoted: 'Data."odd.key"'.
+    """
+    steps = []
+    position = 0
+    while position < len(path):
+        if path[position] == '.':
+            position += 1
+            continue
+        match = _PATH_STEP.match(path, position)
+        if not match:
+            raise ValueError(f"Invalid query path at {path[position:]!r}")
+        index, quoted, key = match.groups()
+        if index is not None:
+            steps.append(('index', WILDCARD if index == '*' else int(index)))
+        elif key == '*':
+            steps.append(('key', WILDCARD))
+        else:
+            name = key if quoted is None else re.sub(r'\\(.)', r'\1', quoted)
+            steps.append(('key', name.encode('utf-8')))
+        position = match.end()
+    return steps
+
+
+def join_path(path, step):
+    """
+    Append one parsed step to a query path, quoting keys where needed.
+    """
+    kind, value = step
+    if kind == 'index':
+        return f"{path}[{value}]"
+    name = value.decode('utf-8', 'replace')
+    if re.search(r'[.\[\]"]', name) or not name:
+        name = '"' + name.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return f"{path}.{name}" if path else name
+
+
+class LazyNbt:
+    """
+    Random access to an uncompressed NBT payload without parsing it.
+
+    Only tag headers are walked: strings, arrays and lists of numbers are
+    stepped over using their length prefix, so finding a field costs the
+    number of tags before it rather than the size of the file. The subtree a
+    query ends at is the only part handed to nbtlib for decoding.
+    """
+    def __init__(self, data, byteorder='big'):
+        if not data or data[0] != TAG_COMPOUND:
+            raise ValueError("Data does not start with a compound tag")
+        prefix = '>' if byteorder == 'big' else '<'
+        self.data = data
+        self.byteorder = byteorder
+        self._u16 = struct.Struct(prefix + 'H').unpack_from
+        self._i32 = struct.Struct(prefix + 'i').unpack_from
+        name_length, = self._u16(data, 1)
+        self.root_name = bytes(data[3:3 + name_length]).decode('utf-8', 'replace')
+        self.root = (TAG_COMPOUND, 3 + name_length)
+
+    @classmethod
+    def open(cls, filepath, nbt_format=None):
+        """
+        Read a standalone NBT file. Decompressing it is the only full pass.
+        """
+        if nbt_format is None:
+            nbt_format = get_format(filepath)
+        return cls(read_nbt_bytes(filepath, nbt_format), nbt_format.byteorder)
+
+    def skip(self, tag_id, offset):
+        """
+        Return the offset just past the payload of a tag starting at `offset`.
+        """
+        size = _FIXED_SIZES.get(tag_id)
+        if size is not None:
+            return offset + size
+        if tag_id == TAG_STRING:
+            return offset + 2 + self._u16(self.data, offset)[0]
+        size = _ARRAY_ITEM_SIZES.get(tag_id)
+        if size is not None:
+            return offset + 4 + self._i32(self.data, offset)[0] * size
+        if tag_id == TAG_LIST:
+            item_id = self.data[offset]
+            count, = self._i32(self.data, offset + 1)
+            offset += 5
+            size = _FIXED_SIZES.get(item_id)
+            if size is not None:
+                return offset + max(count, 0) * size
+            for _ in range(count):
+                offset = self.skip(item_id, offset)
+            return offset
+        if tag_id == TAG_COMPOUND:
+            data = self.data
+            while True:
+                child_id = data[offset]
+                if child_id == 0:
+                    return offset + 1
+                offset += 3 + self._u16(data, offset + 1)[0]
+                offset = self.skip(child_id, offset)
+        raise ValueError(f"Unknown tag id {tag_id} at offset {offset}")
+
+    def iter_compound(self, offset):
+        """
+        Yield (name, tag_id, payload_offset) for each entry of a compound,
+        with the name as raw UTF-8 bytes.
+        """
+        data = self.data
+        while True:
+            child_id = data[offset]
+            if child_id == 0:
+                return
+            name_length, = self._u16(data, offset + 1)
+            start = offset + 3
+            offset = start + name_length
+            yield bytes(data[start:offset]), child_id, offset
+            offset = self.skip(child_id, offset)
+
+    def list_info(self, offset):
+        """
+        Return (item_id, count, first_item_offset) of a list payload.
+        """
+        return self.data[offset], max(self._i32(self.data, offset + 1)[0], 0), offset + 5
+
+    def iter_list(self, offset):
+        """
+        Yield (index, item_id, item_offset) for each element of a list.
+        """
+        item_id, count, offset = self.list_info(offset)
+        for index in range(count):
+            yield index, item_id, offset
+            if index + 1 < count:
+                offset = self.skip(item_id, offset)
+
+    def list_item(self, offset, index):
+        """
+        Return (item_id, item_offset) of one list element, or None.
+        """
+        item_id, count, offset = self.list_info(offset)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            return None
+        size = _FIXED_SIZES.get(item_id)
+        if size is not None:
+            return item_id, offset + index * size
+        for _ in range(index):
+            offset = self.skip(item_id, offset)
+        return item_id, offset
+
+    def _children(self, tag_id, offset, step):
+        kind, value = step
+        if kind == 'key' and tag_id == TAG_COMPOUND:
+            for name, child_id, child_offset in self.iter_compound(offset):
+                if value is WILDCARD:
+                    yield ('key', name), child_id, child_offset
+                elif name == value:
+                    yield step, child_id, child_offset
+                    return
+        elif kind == 'index' and tag_id == TAG_LIST:
+            if value is WILDCARD:
+                for index, item_id, item_offset in self.iter_list(offset):
+                    yield ('index', index), item_id, item_offset
+            else:
+                item = self.list_item(offset, value)
+                if item is not None:
+                    count = self.list_info(offset)[1]
+                    yield ('index', value % count if value < 0 else value), item[0], item[1]
+
+    def find(self, path):
+        """
+        Yield (path, tag_id, payload_offset) for every tag matching a query,
+        without decoding anything.
+        """
+        steps = parse_path(path) if isinstance(path, str) else path
+        matches = [('', self.root[0], self.root[1])]
+        for step in steps:
+            matches = [(join_path(found, child_step), child_id, child_offset)
+                       for found, tag_id, offset in matches
+                       for child_step, child_id, child_offset in self._children(tag_id, offset, step)]
+            if not matches:
+                break
+        return iter(matches)
+
+    def decode(self, tag_id, offset):
+        """
+        Parse the single tag whose payload starts at `offset` into nbtlib.
+        """
+        end = self.skip(tag_id, offset)
+        tag_class = nbtlib.tag.Base.all_tags[tag_id]
+        return tag_class.parse(io.BytesIO(self.data[offset:end]), self.byteorder)
+
+    def query(self, path):
+        """
+        Yield (path, tag) for every tag matching a query.
+        """
+        for found, tag_id, offset in self.find(path):
+            yield found, self.decode(tag_id, offset)
+
+    def get(self, path, default=None):
+        """
+        Return the first tag matching a query, or `default`.
+        """
+        for found, tag_id, offset in self.find(path):
+            return self.decode(tag_id, offset)
+        return default
+
+    def keys(self, path=''):
+        """
+        Return the names of a compound without decoding its values.
+        """
+        for found, tag_id, offset in self.find(path):
+            if tag_id == TAG_COMPOUND:
+                return [name.decode('utf-8', 'replace') for name, _, _ in self.iter_compound(offset)]
+        return []
+
+
+def iter_region_lazy(filepath, indices=None):
+    """
+    Yield (chunk_x, chunk_z, LazyNbt) for each chunk of a region file.
+    Unreadable chunks are reported and skipped.
+    """
+    from Core.regionParser import HEADER_SIZE, iter_chunk_data, chunk_coords, decompress_chunk
+    if os.path.getsize(filepath) < HEADER_SIZE:
+        return
+    directory = os.path.dirname(filepath)
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as region:
+            chunks = iter_chunk_data(region, indices=indices)
+            try:
+                for index, timestamp, compression, payload in chunks:
+                    chunk_x, chunk_z = chunk_coords(filepath, index)
+                    external_path = os.path.join(directory, f"c.{chunk_x}.{chunk_z}.mcc")
+                    try:
+                        lazy = LazyNbt(decompress_chunk(compression, payload, external_path))
+                    except Exception as e:
+                        print(f"Failed to read chunk ({chunk_x}, {chunk_z}): {e}")
+                        continue
+                    finally:
+                        payload.release()
+                    yield chunk_x, chunk_z, lazy
+            finally:
+                chunks.close()
+
+
+def query_file(filepath, paths, indices=None, array_mode='list'):
+    """
+    Run queries against one NBT or region file. Returns a list of
+    (label, path, json_text), where `label` names the chunk for regions.
+    """
+    results = []
+    steps = [parse_path(path) for path in paths]
+    if filepath.endswith(REGION_EXTENSIONS):
+        documents = ((f"{chunk_x},{chunk_z}", lazy)
+                     for chunk_x, chunk_z, lazy in iter_region_lazy(filepath, indices))
+    else:
+        documents = [('', LazyNbt.open(filepath))]
+    for label, lazy in documents:
+        for query in steps:
+            for found, tag in lazy.query(query):
+                results.append((label, found, json.dumps(nbt_to_json_serializable(tag, array_mode))))
+    return results
+
+
+def _query_one(args):
+    filepath, paths, indices, array_mode = args
+    try:
+        return filepath, query_file(filepath, paths, indices, array_mode), None
+    except Exception as e:
+        return filepath, [], str(e)
+
+
+def _iter_query_files(targets):
+    for target in targets:
+        if os.path.isdir(target):
+            for rel_path in iter_save_files(target):
+                yield os.path.join(target, rel_path)
+        else:
+            yield target
+
+
+def query_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='query',
+        description="Print selected fields of NBT and region files, decoding only the "
+                    "requested tags. Paths look like Data.Player.Pos, Inventory[0].id, "
+                    "Inventory[*].id or sections[*].Y.")
+    parser.add_argument('files', nargs='+', help="NBT or region files, or folders to search")
+    parser.add_argument('-p', '--path', action='append', required=True, dest='paths',
+                        help="tag path to print (repeatable)")
+    parser.add_argument('--chunk', nargs=2, type=int, metavar=('X', 'Z'),
+                        help="only query this chunk of region files")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument('--arrays', choices=ARRAY_MODES, default='list',
+                        help="how byte/int/long arrays are printed (default: list)")
+    args = parser.parse_args(argv)
+
+    try:
+        for path in args.paths:
+            parse_path(path)
+    except ValueError as e:
+        print(e)
+        return 1
+    indices = None
+    if args.chunk:
+        from Core.regionParser import chunk_index
+        indices = [chunk_index(*args.chunk)]
+
+    files = list(_iter_query_files(args.files))
+    work = [(path, args.paths, indices, args.arrays) for path in files]
+    show_file = len(files) > 1
+    failed = 0
+    if args.jobs > 1:
+        pool = ProcessPoolExecutor(max_workers=args.jobs)
+        results = pool.map(_query_one, work, chunksize=64)
+    else:
+        pool = None
+        results = map(_query_one, work)
+    try:
+        for filepath, found, error in results:
+            if error:
+                print(f"Failed to query {filepath}: {error}")
+                failed += 1
+                continue
+            for label, path, text in found:
+                prefix = filepath if show_file else ''
+                if label:
+                    prefix += f"[{label}]"
+                print(f"{prefix}:{path} = {text}" if prefix else f"{path} = {text}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return 1 if failed else 0
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import threading
+import collections
+
+
+class LruCache:
+    """
+    A mapping that keeps its most recently used entries, up to a total size.
+
+    Every entry weighs sizeof(value), or 1 without `sizeof`, and the least
+    recently used entries are dropped once the weights add up to more than
+    `capacity`. A value heavier than the whole cache is not kept. Safe to
+    share between threads.
+    """
+    def __init__(self, capacity, sizeof=None):
+        self.capacity = capacity
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # key -> (value, weight)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        weight = self.sizeof(value) if self.sizeof else 1
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            if weight > self.capacity:
+                return
+            self._entries[key] = (value, weight)
+            self.size += weight
+            while self.size > self.capacity:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.size -= dropped
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.size -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
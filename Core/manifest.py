@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = '.pygitmc-manifest.json'
+MANIFEST_VERSION = 1
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(filepath):
+    """
+    Return the SHA-1 hex digest of a file's content.
+    """
+    digest = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Fingerprints of the source files behind a translated output folder.
+
+    Each entry is keyed by the source path relative to the save folder (with
+    forward slashes) and records its size, mtime and content hash. Region
+    entries also record the per-chunk timestamps from the region header.
+    With volatile fields masked, 'masked' holds the masked_hash() of a file,
+    or of each chunk of a region by header slot. `options` holds the output
+    options the files were translated with.
+    """
+    def __init__(self, path, files=None, options=None):
+        self.path = path
+        self.files = files if files is not None else {}
+        self.options = options if options is not None else {}
+
+    @classmethod
+    def load(cls, output_dir):
+        path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {path}: {e}")
+            return cls(path)
+        if data.get('version') != MANIFEST_VERSION:
+            return cls(path)
+        files = data.get('files', {})
+        for entry in files.values():
+            if 'chunks' in entry:
+                entry['chunks'] = {int(k): v for k, v in entry['chunks'].items()}
+            if isinstance(entry.get('masked'), dict):
+                entry['masked'] = {int(k): v for k, v in entry['masked'].items()}
+        return cls(path, files, data.get('options'))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'options': self.options, 'files': self.files},
+                      f, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, rel_path):
+        return self.files.get(manifest_key(rel_path))
+
+    def set(self, rel_path, entry):
+        self.files[manifest_key(rel_path)] = entry
+
+    def discard(self, rel_path):
+        self.files.pop(manifest_key(rel_path), None)
+
+    def keys(self):
+        return self.files.keys()
+
+    def summary(self):
+        """
+        Return (files, chunks): the source files tracked and the chunks of
+        the region files among them.
+        """
+        return len(self.files), sum(len(entry.get('chunks', ())) for entry in self.files.values())
+
+
+def find_manifest(output_dir):
+    """
+    Load the manifest of a translated folder, or of a git repository written
+    by commit-save, which keeps it in the .git folder.
+    """
+    git_dir = os.path.join(output_dir, '.git')
+    if os.path.isfile(os.path.join(git_dir, MANIFEST_NAME)):
+        return Manifest.load(git_dir)
+    return Manifest.load(output_dir)
+
+
+def manifest_key(rel_path):
+    return rel_path.replace(os.sep, '/')
+
+
+def fingerprint(filepath, previous=None, stat=None):
+    """
+    Build the manifest entry of a source file.
+
+    Returns (entry, changed). The content hash is only recomputed when size or
+    mtime differ from `previous`, so an untouched file costs a single stat.
+    """
+    if stat is None:
+        stat = os.stat(filepath)
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime_ns:
+        return previous, False
+
+    entry = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': file_hash(filepath)}
+    if previous and previous.get('hash') == entry['hash']:
+        # Same content under a new mtime: keep everything else we knew about it
+        return dict(previous, **entry), False
+    return entry, True
+
+
+def changed_chunks(previous_chunks, current_chunks):
+    """
+    Compare two {slot: timestamp} maps.
+
+    Returns (changed, removed): slots that are new or have a different
+    timestamp, and slots that no longer hold a chunk.
+    """
+    previous_chunks = previous_chunks or {}
+    changed = [index for index, timestamp in current_chunks.items()
+               if previous_chunks.get(index) != timestamp]
+    removed = [index for index in previous_chunks if index not in current_chunks]
+    return sorted(changed), sorted(removed)
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+
+import nbtlib
+
+# Stages timed by the translate, commit and build paths, in pipeline order.
+# Standalone gzip files are decompressed while they are parsed, so that
+# counts as 'parse'; the streaming JSON writers convert, serialize and write
+# in one pass, which counts as 'serialize'.
+STAGES = ('detect', 'decompress', 'parse', 'convert', 'serialize', 'compress', 'write', 'git', 'index')
+
+# Number of files listed by Metrics.slowest_files()
+SLOWEST_FILES = 10
+
+# Functions listed by Metrics.profile_rows()
+PROFILE_ROWS = 25
+
+# The Metrics being recorded by each thread, as `_recording.metrics`.
+# Recording is per thread: only the thread that started a recording adds
+# to it, so work other threads do meanwhile (the NBT browser parsing a file
+# while a job is measured) does not end up in its stage times.
+_recording = threading.local()
+
+_NOT_RECORDING = contextlib.nullcontext()
+
+
+class _Stage:
+    """
+    Times one stage. Time spent in stages nested inside it is only counted
+    for the inner stage, so the stage times of a run add up.
+    """
+    __slots__ = ('metrics', 'name', 'started', 'nested')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.metrics._open().append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        stack = self.metrics._open()
+        stack.pop()
+        if stack:
+            stack[-1].nested += elapsed
+        self.metrics.add_time(self.name, elapsed - self.nested)
+        return False
+
+
+class _RecordedProfile:
+    """
+    cProfile results sent back by a worker, in the form pstats.Stats.add() takes.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class Metrics:
+    """
+    Stage timers, counters and per-file costs of one run.
+
+    Stage times are summed over the worker processes, so with several jobs
+    they add up to more than the wall-clock `elapsed`. Counters include
+    'bytes_in' (compressed bytes read), 'bytes_out' (bytes of translation
+    produced) and 'tags'.
+    """
+    def __init__(self, profile=False):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.counters = {}
+        self.files = {}  # path -> [seconds, bytes_in, bytes_out, tags]
+        self.profile = profile
+        self.profile_stats = None
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._stages = threading.local()
+
+    def _open(self):
+        """
+        Return the stages open on the calling thread, innermost last.
+        """
+        try:
+            return self._stages.open
+        except AttributeError:
+            self._stages.open = []
+            return self._stages.open
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds, calls=1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_file(self, path, seconds, bytes_in=0, bytes_out=0, tags=0):
+        """
+        Record the cost of one file; region files translated in several
+        batches add up.
+        """
+        entry = self.files.setdefault(path, [0.0, 0, 0, 0])
+        entry[0] += seconds
+        entry[1] += bytes_in
+        entry[2] += bytes_out
+        entry[3] += tags
+
+    def add_counted_file(self, path, seconds):
+        """
+        Record a recorder that measured a single file as that file's cost,
+        taking its sizes and tags from the counters.
+        """
+        self.add_file(path, seconds, self.counters.get('bytes_in', 0),
+                      self.counters.get('bytes_out', 0), self.counters.get('tags', 0))
+
+    def add_profile(self, stats):
+        """
+        Add a cProfile.Profile or the stats dict of one sent by a worker.
+        """
+        if isinstance(stats, dict):
+            stats = _RecordedProfile(stats)
+        if self.profile_stats is None:
+            self.profile_stats = pstats.Stats(stats)
+        else:
+            self.profile_stats.add(stats)
+
+    def merge(self, recorded):
+        """
+        Add the to_dict(files=True) result of a worker's Metrics.
+        """
+        for name, stage in recorded['stages'].items():
+            self.add_time(name, stage['seconds'], stage['calls'])
+        for name, amount in recorded['counters'].items():
+            self.count(name, amount)
+        for path, entry in recorded.get('files', {}).items():
+            self.add_file(path, *entry)
+        if recorded.get('profile_stats'):
+            self.add_profile(recorded['profile_stats'])
+
+    def slowest_files(self, limit=SLOWEST_FILES):
+        """
+        Return [(path, seconds, bytes_in, bytes_out, tags)], slowest first.
+        """
+        ranked = sorted(self.files.items(), key=lambda item: item[1][0], reverse=True)
+        return [(path,) + tuple(entry) for path, entry in ranked[:limit]]
+
+    def profile_rows(self, limit=PROFILE_ROWS):
+        """
+        Return the functions with the most cumulative time as
+        [(function, calls, total seconds, cumulative seconds)].
+        """
+        if self.profile_stats is None:
+            return []
+        rows = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in self.profile_stats.stats.items():
+            rows.append((f"{os.path.basename(filename)}:{line}({name})", calls, total, cumulative))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows[:limit]
+
+    def to_dict(self, files=False):
+        """
+        Return the metrics as JSON-serializable values. With `files` every
+        file is included, as a worker sends them to merge(); otherwise only
+        the slowest ones.
+        """
+        result = {
+            'elapsed': self.elapsed,
+            'stages': {name: {'seconds': self.seconds[name], 'calls': self.calls[name]}
+                       for name in self.seconds if self.calls[name]},
+            'counters': dict(self.counters),
+        }
+        if files:
+            result['files'] = self.files
+            return result
+        result['slowest_files'] = [
+            {'path': path, 'seconds': seconds, 'bytes_in': bytes_in, 'bytes_out': bytes_out, 'tags': tags}
+            for path, seconds, bytes_in, bytes_out, tags in self.slowest_files()]
+        if self.profile_stats is not None:
+            result['profile'] = [
+                {'function': function, 'calls': calls, 'total': total, 'cumulative': cumulative}
+                for function, calls, total, cumulative in self.profile_rows()]
+        return result
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def summary(self):
+        """
+        Return a table of the stages, the totals and the slowest files.
+        """
+        measured = sum(self.seconds.values()) or 1.0
+        lines = [f"{'stage':11} {'seconds':>9} {'calls':>8} {'share':>7}"]
+        for name, seconds in self.seconds.items():
+            if self.calls[name]:
+                lines.append(f"{name:11} {seconds:9.3f} {self.calls[name]:8d} {100 * seconds / measured:6.1f}%")
+        lines.append(f"Read {self.counters.get('bytes_in', 0) / 1e6:.1f} MB, produced "
+                     f"{self.counters.get('bytes_out', 0) / 1e6:.1f} MB and "
+                     f"{self.counters.get('tags', 0)} tags in {self.elapsed:.2f}s")
+        slowest = self.slowest_files()
+        if slowest:
+            lines.append("Slowest files:")
+            for path, seconds, bytes_in, bytes_out, tags in slowest:
+                lines.append(f"  {seconds:8.3f}s  {path} ({bytes_in / 1e6:.2f} MB in, "
+                             f"{bytes_out / 1e6:.2f} MB out, {tags} tags)")
+        return '\n'.join(lines)
+
+    def profile_summary(self):
+        lines = [f"{'cumulative':>10} {'total':>9} {'calls':>9}  function"]
+        for function, calls, total, cumulative in self.profile_rows():
+            lines.append(f"{cumulative:10.3f} {total:9.3f} {calls:9d}  {function}")
+        return '\n'.join(lines)
+
+
+def current():
+    """
+    Return the Metrics this thread is recording, or None.
+    """
+    return getattr(_recording, 'metrics', None)
+
+
+def enabled():
+    return current() is not None
+
+
+def stage(name):
+    """
+    Return a context manager timing one stage, which does nothing when no
+    metrics are being recorded.
+    """
+    recorder = current()
+    if recorder is None:
+        return _NOT_RECORDING
+    return _Stage(recorder, name)
+
+
+def count(name, amount=1):
+    recorder = current()
+    if recorder is not None:
+        recorder.count(name, amount)
+
+
+def tag_count(nbt_data):
+    """
+    Return the number of tags in a tree; array tags count as one.
+    """
+    total = 0
+    stack = [nbt_data]
+    while stack:
+        tag = stack.pop()
+        total += 1
+        if isinstance(tag, nbtlib.tag.Compound):
+            stack.extend(tag.values())
+        elif isinstance(tag, nbtlib.tag.List):
+            if tag.subtype in (nbtlib.tag.Compound, nbtlib.tag.List):
+                stack.extend(tag)
+            else:
+                total += len(tag)
+    return total
+
+
+def count_tags(nbt_data):
+    """
+    Count the tags of a parsed tree, only when recording since it walks the
+    whole tree.
+    """
+    recorder = current()
+    if recorder is not None:
+        recorder.count('tags', tag_count(nbt_data))
+
+
+@contextlib.contextmanager
+def recording(profile=False):
+    """
+    Record metrics on this thread until the block ends, and in the worker
+    tasks started through run_measured() meanwhile. Yields the Metrics.
+    With `profile` the block and the worker tasks also run under cProfile.
+    """
+    previous = current()
+    recorder = _recording.metrics = Metrics(profile)
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield recorder
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            recorder.add_profile(profiler)
+        recorder.elapsed = time.perf_counter() - recorder.started
+        _recording.metrics = previous
+
+
+def run_measured(function, task, profile=False):
+    """
+    Run function(task) in a worker process with a recorder of its own.
+    Returns (result, recorded) where `recorded` goes to Metrics.merge();
+    the whole task is recorded as a cost of the file task[1].
+    """
+    with recording(profile) as recorder:
+        started = time.perf_counter()
+        result = function(task)
+        elapsed = time.perf_counter() - started
+    recorder.add_counted_file(task[1], elapsed)
+    recorded = recorder.to_dict(files=True)
+    if recorder.profile_stats is not None:
+        recorded['profile_stats'] = recorder.profile_stats.stats
+    return result, recorded
+
+
+def submit(pool, function, task):
+    """
+    Submit function(task) to a process pool, through run_measured() when
+    metrics are being recorded. Pass the future's result to task_result().
+    """
+    recorder = current()
+    if recorder is None:
+        return pool.submit(function, task)
+    return pool.submit(run_measured, function, task, recorder.profile)
+
+
+def task_result(result):
+    """
+    Return the result of a task submitted with submit(), merging what the
+    worker recorded into the current metrics.
+    """
+    recorder = current()
+    if recorder is None:
+        return result
+    result, recorded = result
+    recorder.merge(recorded)
+    return result
+
+
+def add_metrics_arguments(parser):
+    """
+    Add --profile and --metrics-json to a command.
+    """
+    parser.add_argument('--profile', metavar='FILE', nargs='?', const='', default=None,
+                        help="run under cProfile and print the slowest functions; with FILE the "
+                             "profile is also saved for pstats or snakeviz")
+    parser.add_argument('--metrics-json', metavar='FILE', default=None,
+                        help="write the stage timings, counters and slowest files as JSON")
+
+
+@contextlib.contextmanager
+def command_metrics(args):
+    """
+    Record a command's run if add_metrics_arguments() options ask for it,
+    then print the summary and write the requested files.
+    """
+    if args.profile is None and args.metrics_json is None:
+        yield None
+        return
+    with recording(args.profile is not None) as recorder:
+        yield recorder
+    print(recorder.summary())
+    if args.profile is not None:
+        print(recorder.profile_summary())
+        if args.profile:
+            recorder.profile_stats.dump_stats(args.profile)
+    if args.metrics_json:
+        try:
+            recorder.save(args.metrics_json)
+        except OSError as e:
+            print(f"Failed to write metrics to {args.metrics_json}: {e}")
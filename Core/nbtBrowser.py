@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+import io
+import os
+import time
+import struct
+import itertools
+
+import nbtlib
+
+from Core.lruCache import LruCache
+from Core.typedNbt import tag_name
+from Core.nbtFormat import get_format, parse_nbt, format_to_dict
+from Core.saveBuilder import encode_file, serialize_nbt, compress_chunk, write_chunk
+from Core.regionParser import (SECTOR_SIZE, HEADER_SIZE, COMPRESSION_EXTERNAL, read_region_header,
+                               region_timestamps, chunk_coords, chunk_index, decompress_chunk)
+
+# Files the browser opens; region files are opened one chunk at a time
+BROWSABLE_EXTENSIONS = ('.dat', '.dat_old', '.nbt', '.mcstructure', '.mca', '.mcr')
+REGION_EXTENSIONS = ('.mca', '.mcr')
+
+# Estimated memory of the parsed documents kept in a DocumentCache
+CACHE_BYTES = 256 * 1024 * 1024
+
+# Rough memory of one parsed tag besides its string or array contents,
+# measured on chunk trees
+TAG_BYTES = 200
+
+# Children listed at a time under one node
+CHILD_PAGE = 500
+
+# Minecraft keeps this file of a world folder locked while the world is open
+SESSION_LOCK = 'session.lock'
+
+
+def is_browsable(path):
+    return path.lower().endswith(BROWSABLE_EXTENSIONS)
+
+
+def is_region(path):
+    return path.lower().endswith(REGION_EXTENSIONS)
+
+
+def tree_size(root):
+    """
+    Estimate the memory taken by a parsed tree.
+    """
+    size = 0
+    stack = [root]
+    while stack:
+        tag = stack.pop()
+        size += TAG_BYTES
+        if isinstance(tag, nbtlib.tag.Compound):
+            stack.extend(tag.values())
+        elif isinstance(tag, nbtlib.tag.List):
+            stack.extend(tag)
+        elif isinstance(tag, nbtlib.tag.Array):
+            size += tag.nbytes
+        elif isinstance(tag, str):
+            size += len(tag)
+    return size
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def chunk_stamp(region_path, chunk_x, chunk_z):
+    """
+    Return the header slot of a chunk, which changes whenever the chunk is
+    rewritten, while the region file also changes for every other chunk.
+    """
+    with open(region_path, 'rb') as f:
+        return read_region_header(f.read(HEADER_SIZE))[chunk_index(chunk_x, chunk_z)]
+
+
+def world_folder(path):
+    """
+    Return the world folder a file belongs to (the nearest folder above it
+    with a level.dat), or None.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    while True:
+        if os.path.isfile(os.path.join(folder, 'level.dat')):
+            return folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+def world_in_use(world_dir):
+    """
+    Tell whether a game has the world open, by trying to take the lock it
+    holds on session.lock.
+    """
+    lock_path = os.path.join(world_dir, SESSION_LOCK)
+    if not os.path.isfile(lock_path):
+        return False
+    try:
+        f = open(lock_path, 'r+b')
+    except PermissionError:
+        # Windows refuses to open a file another process holds locked
+        return True
+    with f:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.lockf(f, fcntl.LOCK_UN)
+        except OSError:
+            return True
+    return False
+
+
+class DocumentChanged(ValueError):
+    """
+    The file or chunk of a document with unsaved edits changed on disk.
+    """
+    def __init__(self, document):
+        super().__init__(f"{document.label} changed on disk since it was opened")
+        self.document = document
+
+
+def region_chunk_list(region_path):
+    """
+    Return the sorted (chunk_x, chunk_z) of the chunks in a region file.
+    """
+    return sorted((chunk_coords(region_path, index) for index in region_timestamps(region_path)),
+                  key=lambda coords: (coords[1], coords[0]))
+
+
+class NbtDocument:
+    """
+    A standalone NBT file, or one chunk of a region file, parsed for browsing
+    and editing.
+
+    `chunk` is (chunk_x, chunk_z) for a chunk and None for a file; `stamp`
+    tells whether the source changed since it was parsed. Edits change
+    `root` in place and count in `edits`; the document is dirty until an
+    encode() taken after the last edit has been written.
+    """
+    def __init__(self, path, chunk, root, stamp, nbt_format=None, compression=None):
+        self.path = path
+        self.chunk = chunk
+        self.root = root
+        self.stamp = stamp
+        self.nbt_format = nbt_format
+        self.compression = compression
+        self.size = tree_size(root)
+        self.edits = 0
+        self.saved_edits = 0
+
+    @property
+    def key(self):
+        return self.path, self.chunk
+
+    @property
+    def label(self):
+        name = os.path.basename(self.path)
+        return f"{name} chunk ({self.chunk[0]}, {self.chunk[1]})" if self.chunk else name
+
+    @property
+    def dirty(self):
+        return self.edits != self.saved_edits
+
+    def current_stamp(self):
+        return chunk_stamp(self.path, *self.chunk) if self.chunk else file_stamp(self.path)
+
+    def set_value(self, path, text):
+        """
+        Replace the value at a tag path with one parsed from `text`, keeping
+        its type. Returns the new tag; raises ValueError for a bad value.
+        """
+        parent = resolve(self.root, path[:-1])
+        tag = parse_value(parent[path[-1]], text)
+        if isinstance(parent, nbtlib.tag.Array):
+            if not parent.flags.writeable:
+                # Parsed arrays are views of the file's bytes
+                parent = parent.copy()
+                resolve(self.root, path[:-2])[path[-2]] = parent
+            parent[path[-1]] = int(tag)
+        else:
+            parent[path[-1]] = tag
+        self.edits += 1
+        return tag
+
+    def encode(self):
+        """
+        Return what write() stores, taken on the thread that edits the tree.
+        """
+        if self.chunk is None:
+            return self.edits, encode_file({'format': format_to_dict(self.nbt_format)}, self.root)
+        return (self.edits,) + compress_chunk(self.compression, serialize_nbt(self.root))
+
+    def write(self, encoded):
+        """
+        Write an encode() result over the file, or over this chunk only.
+        Raises DocumentChanged if the source changed since it was parsed,
+        and RuntimeError while the game has the world open, since it would
+        overwrite the edit with its own copy.
+        """
+        world = world_folder(self.path)
+        if world is not None and world_in_use(world):
+            raise RuntimeError(f"{os.path.basename(world)} is open in the game; close the world first")
+        if self.current_stamp() != self.stamp:
+            raise DocumentChanged(self)
+        if self.chunk is None:
+            edits, data = encoded
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+            self.stamp = file_stamp(self.path)
+        else:
+            edits, compression, data = encoded
+            write_chunk(self.path, *self.chunk, compression, data)
+            self.compression = compression
+            self.stamp = chunk_stamp(self.path, *self.chunk)
+        self.saved_edits = edits
+        return len(data)
+
+
+def load_file_document(path):
+    nbt_format = get_format(path)
+    stamp = file_stamp(path)
+    return NbtDocument(path, None, parse_nbt(path, nbt_format), stamp, nbt_format=nbt_format)
+
+
+def load_chunk_document(region_path, chunk_x, chunk_z):
+    with open(region_path, 'rb') as f:
+        stamp = read_region_header(f.read(HEADER_SIZE))[chunk_index(chunk_x, chunk_z)]
+        offset, sectors, timestamp = stamp
+        if offset < 2 or sectors == 0:
+            raise ValueError(f"Chunk ({chunk_x}, {chunk_z}) is not in {os.path.basename(region_path)}")
+        f.seek(offset * SECTOR_SIZE)
+        data = f.read(sectors * SECTOR_SIZE)
+    length, compression = struct.unpack_from('>IB', data)
+    external_path = os.path.join(os.path.dirname(region_path), f"c.{chunk_x}.{chunk_z}.mcc")
+    raw = decompress_chunk(compression, data[5:4 + length], external_path)
+    root = nbtlib.File.parse(io.BytesIO(raw), byteorder='big')
+    return NbtDocument(region_path, (chunk_x, chunk_z), root, stamp,
+                       compression=compression & ~COMPRESSION_EXTERNAL)
+
+
+class DocumentCache:
+    """
+    Parsed documents by (path, chunk), dropping the least recently used once
+    their estimated memory exceeds `capacity` bytes. A cached document is
+    reused while its source is unchanged; one with unsaved edits whose source
+    changed raises DocumentChanged, to be discarded or kept by the caller.
+    """
+    def __init__(self, capacity=CACHE_BYTES):
+        self.documents = LruCache(capacity, sizeof=lambda document: document.size)
+
+    def open(self, path, chunk=None):
+        path = os.path.abspath(path)
+        document = self.documents.get((path, chunk))
+        if document is not None:
+            if document.stamp == document.current_stamp():
+                return document
+            if document.dirty:
+                raise DocumentChanged(document)
+        document = load_chunk_document(path, *chunk) if chunk else load_file_document(path)
+        self.documents.put(document.key, document)
+        return document
+
+    def discard(self, document):
+        """
+        Forget a document, with its unsaved edits.
+        """
+        self.documents.pop(document.key)
+
+
+class WriteStats:
+    """
+    Result of writing an edited document back.
+    """
+    def __init__(self, label, written, elapsed):
+        self.label = label
+        self.written = written
+        self.elapsed = elapsed
+
+    def summary(self):
+        return f"{self.label} written ({self.written / 1024:.1f} KiB) in {self.elapsed:.2f}s"
+
+
+def write_document(document, encoded, progress=None, cancel=None):
+    """
+    Write an encoded document back, as a job of Core/jobQueue.py.
+    """
+    started = time.perf_counter()
+    written = document.write(encoded)
+    return WriteStats(document.label, written, time.perf_counter() - started)
+
+
+def resolve(root, path):
+    """
+    Return the tag at a path of compound keys and list or array indices.
+    """
+    tag = root
+    for step in path:
+        tag = tag[step]
+    return tag
+
+
+def is_container(tag):
+    return isinstance(tag, (nbtlib.tag.Compound, nbtlib.tag.List, nbtlib.tag.Array))
+
+
+def iter_children(tag, start=0, count=CHILD_PAGE):
+    """
+    Yield (step, child) for `count` children of a container from `start` on.
+    """
+    if isinstance(tag, nbtlib.tag.Compound):
+        yield from itertools.islice(tag.items(), start, start + count)
+    else:
+        for index in range(start, min(start + count, len(tag))):
+            yield index, tag[index]
+
+
+def describe_tag(step, tag, limit=120):
+    """
+    Return the one-line label of a node: its name and type, or its value.
+    """
+    name = f"[{step}]" if isinstance(step, int) else step
+    if isinstance(tag, nbtlib.tag.Compound):
+        return f"{name}: {{{len(tag)} entries}}"
+    if isinstance(tag, nbtlib.tag.List):
+        return f"{name}: {tag_name(tag.subtype)} list, {len(tag)} items"
+    if isinstance(tag, nbtlib.tag.Array):
+        return f"{name}: {tag_name(type(tag))}, {len(tag)} values"
+    value = tag.snbt()
+    if len(value) > limit:
+        value = value[:limit - 3] + '...'
+    return f"{name}: {value}"
+
+
+def edit_text(tag):
+    """
+    Return a value as parse_value() reads it back: strings as they are,
+    numbers without their SNBT suffix.
+    """
+    if isinstance(tag, str):
+        return str(tag)
+    if isinstance(tag, float):
+        return repr(float(tag))
+    return str(int(tag))
+
+
+def parse_value(old, text):
+    """
+    Return a tag of the same type as `old` with a value typed by the user.
+    """
+    if isinstance(old, str):
+        return nbtlib.tag.String(text)
+    text = text.strip()
+    if isinstance(old, float):
+        return type(old)(float(text))
+    # SNBT suffixes are accepted but not needed: 1b, 20s, 5L
+    if text[-1:].lower() in ('b', 's', 'l'):
+        text = text[:-1]
+    return type(old)(int(text))
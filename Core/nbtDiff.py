@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+import io
+import os
+import mmap
+import hashlib
+import tarfile
+import argparse
+import tempfile
+import subprocess
+import collections
+
+import nbtlib
+
+from Core.lazyNbt import join_path
+from Core.manifest import file_hash
+from Core.nbtFormat import get_format, parse_nbt
+from Core.savePipeline import REGION_EXTENSIONS
+from Core.saveBuilder import CHUNK_FILE_PATTERN, iter_chunk_files
+from Core.gitFastImport import git
+from Core.gitHistory import source_path
+from Core.volatileFields import restore_volatile, sidecar_path
+from Core.serializers import EXTENSIONS
+from Core.canonicalLayout import CHUNK_MAIN_FILE, load_chunk_translation
+from Core.regionParser import HEADER_SIZE, iter_chunk_data, chunk_coords, load_chunk
+
+# One difference between two trees. `kind` is 'added', 'removed' or
+# 'changed'; `old` is None for added tags and `new` for removed ones.
+Difference = collections.namedtuple('Difference', 'path kind old new')
+
+# One document of a diff source: `fingerprint` is compared before anything
+# is parsed and `load()` returns the nbtlib tree.
+Document = collections.namedtuple('Document', 'fingerprint load')
+
+_KIND_SIGNS = {'added': '+', 'removed': '-', 'changed': '~'}
+
+
+class TreeHasher:
+    """
+    Merkle digests of nbtlib subtrees.
+
+    A compound or list digest is built from its children's digests, and each
+    node is hashed once per hasher: diffing descends only where the digests
+    of both sides differ. Compound keys are hashed in sorted order, since
+    NBT does not give their order a meaning.
+    """
+    def __init__(self):
+        self._digests = {}
+
+    def clear(self):
+        """
+        Forget the digests, with the references that keep their trees alive.
+        """
+        self._digests.clear()
+
+    def digest(self, tag):
+        cached = self._digests.get(id(tag))
+        if cached is not None and cached[0] is tag:
+            return cached[1]
+        h = hashlib.blake2b(digest_size=16)
+        h.update(bytes((tag.tag_id,)))
+        if isinstance(tag, nbtlib.Compound):
+            for key in sorted(tag):
+                h.update(key.encode('utf-8'))
+                h.update(b'\0')
+                h.update(self.digest(tag[key]))
+        elif isinstance(tag, nbtlib.List):
+            h.update(bytes((tag.subtype.tag_id,)))
+            for item in tag:
+                h.update(self.digest(item))
+        elif isinstance(tag, nbtlib.tag.Array):
+            h.update(tag.tobytes())
+        else:
+            h.update(str(tag).encode('utf-8'))
+        digest = h.digest()
+        # Keep a reference so the id cannot be reused by another tag
+        self._digests[id(tag)] = (tag, digest)
+        return digest
+
+
+def _identity(tag):
+    """
+    Return what identifies a list element across versions: the UUID of
+    entities, the position of block entities, the slot of items and the Y
+    of chunk sections. Returns None for anything else.
+    """
+    if not isinstance(tag, nbtlib.Compound):
+        return None
+    if 'UUID' in tag:
+        uuid = tag['UUID']
+        return 'UUID', tuple(uuid.tolist()) if isinstance(uuid, nbtlib.tag.Array) else str(uuid)
+    if 'x' in tag and 'y' in tag and 'z' in tag:
+        return 'pos', int(tag['x']), int(tag['y']), int(tag['z'])
+    if 'Slot' in tag:
+        return 'Slot', int(tag['Slot'])
+    if 'Y' in tag:
+        return 'Y', int(tag['Y'])
+    return None
+
+
+def _keyed(items):
+    keys = {}
+    for index, item in enumerate(items):
+        key = _identity(item)
+        if key is None or key in keys:
+            return None
+        keys[key] = index
+    return keys
+
+
+def _match_items(old, new):
+    """
+    Return [(old_index, new_index)] pairing the elements of two lists, with
+    None on the side an element is missing from. Elements are paired by
+    identity when every element has a distinct one, by position otherwise.
+    """
+    old_keys = _keyed(old)
+    new_keys = _keyed(new)
+    if old_keys is not None and new_keys is not None and (old or new):
+        pairs = [(old_keys.get(key), index) for key, index in new_keys.items()]
+        pairs.extend((index, None) for key, index in old_keys.items() if key not in new_keys)
+        return pairs
+    pairs = [(index, index) for index in range(min(len(old), len(new)))]
+    pairs.extend((index, None) for index in range(len(new), len(old)))
+    pairs.extend((None, index) for index in range(len(old), len(new)))
+    return pairs
+
+
+def _same_type(old, new):
+    if type(old) is not type(new):
+        return False
+    return not isinstance(old, nbtlib.List) or old.subtype is new.subtype or not old or not new
+
+
+def _diff(old, new, path, hasher, differences):
+    if not _same_type(old, new):
+        differences.append(Difference(path, 'changed', old, new))
+        return
+    if hasher.digest(old) == hasher.digest(new):
+        return
+    if isinstance(old, nbtlib.Compound):
+        for key, value in old.items():
+            child_path = join_path(path, ('key', key.encode('utf-8')))
+            if key in new:
+                _diff(value, new[key], child_path, hasher, differences)
+            else:
+                differences.append(Difference(child_path, 'removed', value, None))
+        for key, value in new.items():
+            if key not in old:
+                differences.append(Difference(join_path(path, ('key', key.encode('utf-8'))),
+                                              'added', None, value))
+    elif isinstance(old, nbtlib.List):
+        for old_index, new_index in _match_items(old, new):
+            if new_index is None:
+                differences.append(Difference(f"{path}[{old_index}]", 'removed', old[old_index], None))
+            elif old_index is None:
+                differences.append(Difference(f"{path}[{new_index}]", 'added', None, new[new_index]))
+            else:
+                _diff(old[old_index], new[new_index], f"{path}[{new_index}]", hasher, differences)
+    else:
+        differences.append(Difference(path, 'changed', old, new))
+
+
+def diff_tags(old, new, hasher=None):
+    """
+    Return the Differences between two nbtlib trees, as query paths in the
+    new tree (the old one for removed tags).
+    """
+    differences = []
+    _diff(old, new, '', hasher or TreeHasher(), differences)
+    return differences
+
+
+def _region_documents(filepath):
+    """
+    Return {"x,z": Document} for a region file. Fingerprints hash the stored
+    chunk bytes, so unchanged chunks are never decompressed.
+    """
+    documents = {}
+    if os.path.getsize(filepath) < HEADER_SIZE:
+        return documents
+    directory = os.path.dirname(filepath)
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as region:
+            chunks = iter_chunk_data(region)
+            try:
+                for index, timestamp, compression, payload in chunks:
+                    chunk_x, chunk_z = chunk_coords(filepath, index)
+                    digest = hashlib.blake2b(payload, digest_size=16).digest()
+                    payload.release()
+                    documents[f"{chunk_x},{chunk_z}"] = Document(
+                        ('raw', compression, digest),
+                        lambda index=index, chunk_x=chunk_x, chunk_z=chunk_z: _load_region_chunk(
+                            filepath, index, os.path.join(directory, f"c.{chunk_x}.{chunk_z}.mcc")))
+            finally:
+                chunks.close()
+    return documents
+
+
+def _load_region_chunk(filepath, index, external_path):
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as region:
+            chunks = iter_chunk_data(region, indices=[index])
+            try:
+                for _, _, compression, payload in chunks:
+                    try:
+                        return load_chunk(compression, payload, external_path)
+                    finally:
+                        payload.release()
+            finally:
+                chunks.close()
+    raise ValueError(f"Chunk slot {index} of {filepath} is empty")
+
+
+def _tree_hash(path):
+    """
+    Hash a translated file, or every file of a canonical chunk folder.
+    """
+    if not os.path.isdir(path):
+        return file_hash(path)
+    h = hashlib.blake2b(digest_size=16)
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            h.update(os.path.relpath(file_path, path).encode('utf-8'))
+            h.update(file_hash(file_path).encode('ascii'))
+    return h.hexdigest()
+
+
+def _load_translation(path):
+    header, nbt_file = load_chunk_translation(path)
+    restore_volatile(nbt_file, header, path, required=False)
+    return nbt_file
+
+
+def _translation_documents(chunks_dir):
+    return {f"{chunk_x},{chunk_z}": Document(('text', _tree_hash(path)),
+                                             lambda path=path: _load_translation(path))
+            for chunk_x, chunk_z, path in iter_chunk_files(chunks_dir)}
+
+
+def open_documents(path):
+    """
+    Return {label: Document} for a save file or a translation of one.
+
+    Region files and the .chunks folders translate_save() writes for them
+    hold one document per chunk, labelled "x,z"; anything else is a single
+    document labelled ''.
+    """
+    if path.endswith(REGION_EXTENSIONS) and os.path.isfile(path):
+        return _region_documents(path)
+    if os.path.isdir(path):
+        if os.path.isfile(os.path.join(path, CHUNK_MAIN_FILE)):
+            return {'': Document(('text', _tree_hash(path)), lambda: _load_translation(path))}
+        return _translation_documents(path)
+    if path.endswith(EXTENSIONS):
+        return {'': Document(('text', file_hash(path)), lambda: _load_translation(path))}
+    return {'': Document(('raw', file_hash(path)), lambda: parse_nbt(path, get_format(path)))}
+
+
+def _split_revision(spec, repo):
+    """
+    Return (revision, path) for a "revision:path" spec, or None for a plain path.
+    """
+    if repo is None or os.path.exists(spec) or ':' not in spec:
+        return None
+    revision, path = spec.split(':', 1)
+    return revision or 'HEAD', path.strip('/')
+
+
+def _ls_tree(repo, revision, path):
+    """
+    Return [(type, object, name)] listed by git ls-tree for `path`.
+    """
+    entries = []
+    for line in git(repo, 'ls-tree', '-z', revision, '--', path).split('\0'):
+        if line:
+            info, name = line.split('\t', 1)
+            mode, kind, obj = info.split()
+            entries.append((kind, obj, name.rsplit('/', 1)[-1]))
+    return entries
+
+
+def _load_revision(repo, revision, rel_path):
+    """
+    Load a translated file or chunk folder as stored in a commit, with the
+    masked values of its sidecar if the commit has one.
+    """
+    paths = [rel_path]
+    if _ls_tree(repo, revision, sidecar_path(rel_path)):
+        paths.append(sidecar_path(rel_path))
+    result = subprocess.run(['git', '-C', repo, 'archive', '--format=tar', revision, '--'] + paths,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode:
+        raise ValueError(f"Cannot read {revision}:{rel_path}: "
+                         f"{result.stderr.decode(errors='replace').strip()}")
+    with tempfile.TemporaryDirectory() as checkout:
+        with tarfile.open(fileobj=io.BytesIO(result.stdout)) as archive:
+            archive.extractall(checkout, filter='data')
+        path = os.path.join(checkout, *rel_path.split('/'))
+        header, nbt_file = load_chunk_translation(path)
+        restore_volatile(nbt_file, header, path, required=False)
+    return nbt_file
+
+
+def revision_documents(repo, revision, rel_path):
+    """
+    Return {label: Document} for a translation stored in a commit. The git
+    object ids are the fingerprints, so only documents whose blob or tree
+    changed between two revisions are ever extracted.
+    """
+    entries = _ls_tree(repo, revision, rel_path)
+    if not entries:
+        raise ValueError(f"{rel_path} does not exist in {revision}")
+    kind, obj, name = entries[0]
+    if kind == 'blob':
+        return {'': Document(('git', obj), lambda: _load_revision(repo, revision, rel_path))}
+    children = _ls_tree(repo, revision, rel_path + '/')
+    if any(child_name == CHUNK_MAIN_FILE for _, _, child_name in children):
+        return {'': Document(('git', obj), lambda: _load_revision(repo, revision, rel_path))}
+    documents = {}
+    for kind, obj, name in children:
+        match = CHUNK_FILE_PATTERN.match(name)
+        if match and (match.group(3) is None) == (kind == 'tree'):
+            documents[f"{match.group(1)},{match.group(2)}"] = Document(
+                ('git', obj), lambda name=name: _load_revision(repo, revision, f"{rel_path}/{name}"))
+    return documents
+
+
+def open_source(spec, repo=None):
+    """
+    Return the documents of a diff source: a path, or "revision:path" read
+    from the git repository `repo` written by commit-save.
+    """
+    revision = _split_revision(spec, repo)
+    if revision is None:
+        return open_documents(spec)
+    return revision_documents(repo, *revision)
+
+
+def _translated_path(repo, revisions, path):
+    """
+    Return the repository path of the translation of save file `path`: the
+    .chunks folder of a region, or the file of the first of `revisions`
+    holding one. Returns None if none does.
+    """
+    if path.endswith(REGION_EXTENSIONS):
+        return path + '.chunks'
+    directory, _, name = path.rpartition('/')
+    for revision in revisions:
+        if revision is None:
+            continue
+        for kind, obj, entry in _ls_tree(repo, revision, directory + '/' if directory else '.'):
+            if source_path(entry) == name:
+                return f"{directory}/{entry}" if directory else entry
+    return None
+
+
+def commit_documents(repo, revision, parent, path):
+    """
+    Return (old, new) {label: Document} of a save file or region as
+    translated in `parent` and in `revision`. A side the file is missing
+    from, like the missing parent of a root commit, has no documents.
+    """
+    rel_path = _translated_path(repo, (revision, parent), path)
+    sides = []
+    for side in (parent, revision):
+        try:
+            sides.append(revision_documents(repo, side, rel_path) if side and rel_path else {})
+        except ValueError:
+            sides.append({})
+    return sides[0], sides[1]
+
+
+def diff_documents(old, new, hasher=None):
+    """
+    Yield (label, [Difference]) for each document that differs between two
+    {label: Document} maps. Documents with equal fingerprints are skipped
+    without being loaded; one missing on a side is reported as a whole.
+    The hasher is cleared after each document, so only the trees of the
+    pair being compared are held.
+    """
+    hasher = hasher or TreeHasher()
+    for label in sorted(old.keys() | new.keys(), key=_label_order):
+        before = old.get(label)
+        after = new.get(label)
+        if before is not None and after is not None and before.fingerprint == after.fingerprint:
+            continue
+        if after is None:
+            yield label, [Difference('', 'removed', before.load(), None)]
+        elif before is None:
+            yield label, [Difference('', 'added', None, after.load())]
+        else:
+            differences = diff_tags(before.load(), after.load(), hasher)
+            hasher.clear()
+            if differences:
+                yield label, differences
+
+
+def _label_order(label):
+    if not label:
+        return ()
+    return tuple(int(part) for part in label.split(','))
+
+
+def format_value(tag, limit=80):
+    """
+    Return a short SNBT rendering of a tag for diff listings.
+    """
+    if tag is None:
+        return ''
+    if isinstance(tag, nbtlib.tag.Array) and len(tag) > 8:
+        return f"{type(tag).__name__}[{len(tag)}]"
+    text = tag.snbt()
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def describe_difference(difference, limit=80):
+    """
+    Return a one-line summary such as "~ Health: 20.0f -> 18.5f".
+    """
+    path = difference.path or '<root>'
+    sign = _KIND_SIGNS[difference.kind]
+    if difference.kind == 'added':
+        return f"{sign} {path}: {format_value(difference.new, limit)}"
+    if difference.kind == 'removed':
+        return f"{sign} {path}: {format_value(difference.old, limit)}"
+    old, new = difference.old, difference.new
+    text = f"{sign} {path}: {format_value(old, limit)} -> {format_value(new, limit)}"
+    if isinstance(old, nbtlib.tag.Array) and type(old) is type(new) and len(old) == len(new):
+        changed = int((old != new).sum())
+        text += f" ({changed} element{'s' if changed != 1 else ''} changed)"
+    return text
+
+
+def diff_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='diff',
+        description="Show the tags that differ between two versions of an NBT file, region "
+                    "or translation. With --repo, either side can be revision:path, such as "
+                    "HEAD~1:region/r.0.0.mca.chunks.")
+    parser.add_argument('old', help="old file, folder or revision:path")
+    parser.add_argument('new', help="new file, folder or revision:path")
+    parser.add_argument('--repo', help="git repository written by commit-save")
+    parser.add_argument('--width', type=int, default=80, help="maximum width of printed values")
+    args = parser.parse_args(argv)
+
+    try:
+        old = open_source(args.old, args.repo)
+        new = open_source(args.new, args.repo)
+        changed = 0
+        for label, differences in diff_documents(old, new):
+            changed += 1
+            if label:
+                print(f"chunk {label}:")
+            for difference in differences:
+                print(('  ' if label else '') + describe_difference(difference, args.width))
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Diff failed: {e}")
+        return 2
+    return 1 if changed else 0
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import io
+import os
+import gzip
+import zlib
+import struct
+from collections import namedtuple
+
+import nbtlib
+
+from Core import metrics
+
+# Number of bytes read from the start of a file to detect its format
+SNIFF_SIZE = 512
+# Number of decompressed bytes needed to look at the first tag headers
+PEEK_SIZE = 64
+
+TAG_END = 0
+TAG_COMPOUND = 10
+MAX_TAG_ID = 12
+
+NbtFormat = namedtuple('NbtFormat', ['compression', 'byteorder', 'bedrock_header'])
+NbtFormat.__doc__ = """
+How a standalone NBT file is stored.
+
+compression is 'gzip', 'zlib' or 'none', byteorder is 'big' (Java) or
+'little' (Bedrock), and bedrock_header is the storage version of a Bedrock
+level.dat header (None when the file has no such header).
+"""
+
+# Detected formats, keyed by absolute path and validated against size and mtime
+_format_cache = {}
+
+
+def _is_gzip(head):
+    return head[:2] == b'\x1f\x8b'
+
+
+def _is_zlib(head):
+    return len(head) >= 2 and head[0] & 0x0F == 8 and (head[0] << 8 | head[1]) % 31 == 0
+
+
+def _bedrock_header(head, size):
+    """
+    Return the version of a Bedrock level.dat header, or None.
+
+    The header is a little-endian storage version followed by the length of
+    the NBT payload that follows it.
+    """
+    if len(head) < 9:
+        return None
+    version, length = struct.unpack_from('<ii', head, 0)
+    if length == size - 8 and head[8] == TAG_COMPOUND:
+        return version
+    return None
+
+
+def _name_score(data, offset, byteorder):
+    """
+    Score how plausible it is that a tag name starts at `offset` with the
+    given byte order. Returns (score, offset after the name).
+    """
+    if offset + 2 > len(data):
+        return 0, None
+    length = int.from_bytes(data[offset:offset + 2], byteorder)
+    end = offset + 2 + length
+    if end > len(data):
+        # The name runs past the peeked bytes; only plausible if still short
+        return (1 if length <= 256 else 0), None
+    try:
+        name = data[offset + 2:end].decode('utf-8')
+    except UnicodeDecodeError:
+        return 0, None
+    if not name.isprintable():
+        return 0, None
+    return 2, end
+
+
+def _byteorder_score(data, byteorder):
+    """
+    Score a byte order by walking the root name and the first child's header.
+    """
+    score, offset = _name_score(data, 1, byteorder)
+    if not score or offset is None:
+        return score
+    if offset >= len(data):
+        return score
+    child = data[offset]
+    if child == TAG_END:
+        return score
+    if child > MAX_TAG_ID:
+        return 0
+    child_score, _ = _name_score(data, offset + 1, byteorder)
+    return score + child_score if child_score else 0
+
+
+def sniff_byteorder(data):
+    """
+    Guess the byte order of uncompressed NBT data from its first bytes.
+
+    Returns 'big', 'little', or None if the bytes do not decide it.
+    """
+    if not data or data[0] != TAG_COMPOUND:
+        return None
+    big = _byteorder_score(data, 'big')
+    little = _byteorder_score(data, 'little')
+    if big > little:
+        return 'big'
+    if little > big:
+        return 'little'
+    return None
+
+
+def sniff_format(head, size, default_byteorder='big'):
+    """
+    Detect the format of an NBT file from its first bytes and total size.
+
+    Raises ValueError if the bytes do not look like NBT at all.
+    """
+    if _is_gzip(head):
+        compression = 'gzip'
+        data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head, PEEK_SIZE)
+    elif _is_zlib(head):
+        compression = 'zlib'
+        data = zlib.decompressobj().decompress(head, PEEK_SIZE)
+    else:
+        compression = 'none'
+        version = _bedrock_header(head, size)
+        if version is not None:
+            return NbtFormat(compression, 'little', version)
+        data = head
+
+    if not data or data[0] != TAG_COMPOUND:
+        raise ValueError("Data does not start with a compound tag")
+    byteorder = sniff_byteorder(data) or default_byteorder
+    return NbtFormat(compression, byteorder, None)
+
+
+def detect_format(filepath):
+    """
+    Detect the format of an NBT file by reading only its first bytes.
+    """
+    with metrics.stage('detect'):
+        size = os.path.getsize(filepath)
+        with open(filepath, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+        # Bedrock structures are the only little-endian files without a header,
+        # so use the extension when the bytes themselves are ambiguous.
+        default_byteorder = 'little' if filepath.endswith('.mcstructure') else 'big'
+        return sniff_format(head, size, default_byteorder)
+
+
+def get_format(filepath):
+    """
+    Return the detected format of a file, reusing the cached result while the
+    file's size and mtime are unchanged.
+    """
+    path = os.path.abspath(filepath)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _format_cache.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    nbt_format = detect_format(path)
+    _format_cache[path] = (key, nbt_format)
+    return nbt_format
+
+
+def parse_nbt(filepath, nbt_format):
+    """
+    Parse an NBT file exactly once using an already detected format.
+    """
+    with open(filepath, 'rb') as f, metrics.stage('parse'):
+        if metrics.enabled():
+            metrics.count('bytes_in', os.fstat(f.fileno()).st_size)
+        if nbt_format.compression == 'gzip':
+            fileobj = gzip.GzipFile(fileobj=f)
+        elif nbt_format.compression == 'zlib':
+            with metrics.stage('decompress'):
+                fileobj = io.BytesIO(zlib.decompress(f.read()))
+        else:
+            if nbt_format.bedrock_header is not None:
+                f.seek(8)
+            fileobj = f
+        nbt_file = nbtlib.File.from_fileobj(fileobj, nbt_format.byteorder)
+    nbt_file.filename = filepath
+    return nbt_file
+
+
+def read_nbt_bytes(filepath, nbt_format):
+    """
+    Return the decompressed NBT payload of a file, without parsing it.
+    """
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    if nbt_format.compression == 'gzip':
+        return gzip.decompress(data)
+    if nbt_format.compression == 'zlib':
+        return zlib.decompress(data)
+    if nbt_format.bedrock_header is not None:
+        return data[8:]
+    return data
+
+
+def format_to_dict(nbt_format):
+    return dict(nbt_format._asdict())
+
+
+def format_from_dict(data):
+    return NbtFormat(data['compression'], data['byteorder'], data.get('bedrock_header'))
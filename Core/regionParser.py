@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+import io
+import os
+import re
+import mmap
+import zlib
+import gzip
+import struct
+import nbtlib
+
+from Core import metrics
+from Core.defaultNbtParser import save_nbt_to_text, render_nbt_text, output_extension
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+CHUNKS_PER_REGION = 1024
+
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+# Flag set on the compression byte when the chunk lives in an external .mcc file
+COMPRESSION_EXTERNAL = 128
+
+_REGION_NAME = re.compile(r'^r\.(-?\d+)\.(-?\d+)\.mc[ar]$')
+
+
+def region_coords(filepath):
+    """
+    Return the (region_x, region_z) encoded in a region file name, or (0, 0).
+    """
+    match = _REGION_NAME.match(os.path.basename(filepath))
+    if not match:
+        return 0, 0
+    return int(match.group(1)), int(match.group(2))
+
+
+def chunk_index(x, z):
+    """
+    Return the header slot of a chunk from its (region-local or absolute) coordinates.
+    """
+    return (x & 31) + (z & 31) * 32
+
+
+def chunk_coords(filepath, index):
+    """
+    Return the absolute (chunk_x, chunk_z) of a header slot in a region file.
+    """
+    region_x, region_z = region_coords(filepath)
+    return region_x * 32 + index % 32, region_z * 32 + index // 32
+
+
+def read_region_header(region):
+    """
+    Parse the 8 KiB location/timestamp table of a region file.
+
+    Returns a list of 1024 (sector_offset, sector_count, timestamp) tuples,
+    one per chunk slot. Slots without a chunk have an offset of 0.
+    """
+    if len(region) < HEADER_SIZE:
+        return [(0, 0, 0)] * CHUNKS_PER_REGION
+    locations = struct.unpack_from('>1024I', region, 0)
+    timestamps = struct.unpack_from('>1024i', region, SECTOR_SIZE)
+    return [(loc >> 8, loc & 0xFF, ts) for loc, ts in zip(locations, timestamps)]
+
+
+def iter_chunk_data(region, header=None, indices=None):
+    """
+    Yield (index, timestamp, compression, payload) for every chunk present in
+    a memory-mapped region, without decompressing anything.
+
+    `payload` is a memoryview into the region, so nothing is copied until the
+    chunk is actually decompressed. `indices` restricts the scan to the given
+    header slots.
+    """
+    if header is None:
+        header = read_region_header(region)
+    if indices is None:
+        indices = range(CHUNKS_PER_REGION)
+    view = memoryview(region)
+    try:
+        for index in indices:
+            offset, sectors, timestamp = header[index]
+            if offset < 2 or sectors == 0:
+                continue
+            start = offset * SECTOR_SIZE
+            if start + 5 > len(region):
+                continue
+            length, compression = struct.unpack_from('>IB', region, start)
+            if length == 0:
+                continue
+            yield index, timestamp, compression, view[start + 5:start + 4 + length]
+    finally:
+        view.release()
+
+
+def decompress_chunk(compression, payload, external_path=None):
+    """
+    Return the raw NBT bytes of a chunk payload.
+    """
+    if compression & COMPRESSION_EXTERNAL:
+        if external_path is None or not os.path.isfile(external_path):
+            raise FileNotFoundError(f"External chunk file not found: {external_path}")
+        with open(external_path, 'rb') as f:
+            payload = f.read()
+        compression &= ~COMPRESSION_EXTERNAL
+
+    metrics.count('bytes_in', len(payload))
+    with metrics.stage('decompress'):
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        if compression == COMPRESSION_GZIP:
+            return gzip.decompress(payload)
+        if compression == COMPRESSION_NONE:
+            return bytes(payload)
+    if compression == COMPRESSION_LZ4:
+        raise ValueError("LZ4 compressed chunks are not supported")
+    raise ValueError(f"Unknown chunk compression type: {compression}")
+
+
+def load_chunk(compression, payload, external_path=None):
+    """
+    Decompress and parse a single chunk payload into an nbtlib tree.
+    """
+    raw = decompress_chunk(compression, payload, external_path)
+    with metrics.stage('parse'):
+        nbt_data = nbtlib.File.parse(io.BytesIO(raw), byteorder='big')
+    metrics.count_tags(nbt_data)
+    return nbt_data
+
+
+def iter_region_chunks(filepath, indices=None):
+    """
+    Lazily yield (chunk_x, chunk_z, timestamp, compression, nbt_data) for each
+    chunk in a region file.
+
+    The file is memory-mapped and only the chunks listed in the header are
+    decompressed, one at a time, so only a single chunk tree is alive at once.
+    Chunk coordinates are absolute. Unreadable chunks are reported and skipped.
+    """
+    if os.path.getsize(filepath) < HEADER_SIZE:
+        return
+
+    directory = os.path.dirname(filepath)
+
+    with open(filepath, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as region:
+            chunks = iter_chunk_data(region, indices=indices)
+            try:
+                for index, timestamp, compression, payload in chunks:
+                    chunk_x, chunk_z = chunk_coords(filepath, index)
+                    external_path = os.path.join(directory, f"c.{chunk_x}.{chunk_z}.mcc")
+                    try:
+                        nbt_data = load_chunk(compression, payload, external_path)
+                    except Exception as e:
+                        print(f"Failed to read chunk ({chunk_x}, {chunk_z}): {e}")
+                        continue
+                    finally:
+                        payload.release()
+                    yield chunk_x, chunk_z, timestamp, compression, nbt_data
+            finally:
+                # Release every view into the map before it is closed
+                chunks.close()
+
+
+def chunk_output_dir(filepath):
+    """
+    Return the directory that holds the per-chunk output of a region file.
+    """
+    return filepath + '.chunks'
+
+
+def chunk_output_name(chunk_x, chunk_z, layout='file', output_format='json'):
+    """
+    Return the name of a chunk's output: a file with the extension of the
+    output format, or a folder in the canonical layout.
+    """
+    if layout == 'canonical':
+        return f"c.{chunk_x}.{chunk_z}"
+    return f"c.{chunk_x}.{chunk_z}" + output_extension(output_format)
+
+
+def region_timestamps(filepath):
+    """
+    Return {slot: timestamp} for every chunk present in a region file.
+
+    Only the 8 KiB header is read.
+    """
+    with open(filepath, 'rb') as f:
+        header = read_region_header(f.read(HEADER_SIZE))
+    return {index: timestamp for index, (offset, sectors, timestamp) in enumerate(header)
+            if offset >= 2 and sectors}
+
+
+def render_chunk(nbt_data, output_path, header, array_mode='list', output_format='json',
+                 layout='file'):
+    """
+    Return the [(path, bytes)] translate_region() would write for one chunk.
+    """
+    if layout != 'canonical':
+        return [(output_path, render_nbt_text(nbt_data, array_mode, output_format, header))]
+    from Core.canonicalLayout import iter_canonical_files
+    files = [(output_path, None)]
+    with metrics.stage('serialize'):
+        for rel_path, pieces in iter_canonical_files(nbt_data, header, array_mode):
+            data = ''.join(pieces).encode('utf-8')
+            metrics.count('bytes_out', len(data))
+            files.append((os.path.join(output_path, *rel_path.split('/')), data))
+    return files
+
+
+def translate_region(filepath, output_dir=None, indices=None, verbose=True, array_mode='list',
+                     output_format='json', layout='file', volatile=None, rendered=None, store=None,
+                     written=None, hashes=None):
+    """
+    Translate every chunk of a region file into its own output file.
+
+    `indices` limits the work to the given header slots. With
+    layout='canonical' each chunk becomes a folder of typed files with sorted
+    keys (see Core/canonicalLayout.py). `volatile` is a list of rules whose
+    fields, along with the chunk timestamp, are moved to a sidecar file (see
+    Core/volatileFields.py). Returns the number of chunks written.
+
+    If `rendered` is a list, translations are appended to it as (path, bytes)
+    instead of being written to disk. A canonical chunk folder is preceded by
+    (folder, None), meaning its previous content is to be replaced.
+
+    `store` is the folder of a ChunkStore that chunks and their translations
+    are reused from and added to, see Core/chunkStore.py. The header slot of
+    each chunk written is appended to `written` if given. With `volatile`
+    set, `hashes` (a dict) receives the masked_hash() of each chunk written
+    by header slot.
+    """
+    if store is not None:
+        from Core.chunkStore import translate_region_stored
+        return translate_region_stored(filepath, output_dir, indices, verbose, array_mode,
+                                       output_format, layout, volatile, rendered, store, written, hashes)
+    if output_dir is None:
+        output_dir = chunk_output_dir(filepath)
+    if rendered is None or volatile is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    count = 0
+    for chunk_x, chunk_z, timestamp, compression, nbt_data in iter_region_chunks(filepath, indices):
+        output_path = os.path.join(output_dir, chunk_output_name(chunk_x, chunk_z, layout, output_format))
+        header = {'timestamp': timestamp, 'compression': compression}
+        if volatile is not None:
+            from Core.volatileFields import mask_volatile, save_volatile, mark_masked, masked_hash
+            nbt_data, values = mask_volatile(nbt_data, volatile)
+            try:
+                save_volatile(values, output_path, {'timestamp': header.pop('timestamp')})
+            except OSError as e:
+                print(f"Failed to save volatile fields of chunk ({chunk_x}, {chunk_z}): {e}")
+                continue
+            mark_masked(header)
+        if rendered is not None:
+            try:
+                rendered.extend(render_chunk(nbt_data, output_path, header, array_mode,
+                                             output_format, layout))
+            except Exception as e:
+                print(f"Failed to translate chunk ({chunk_x}, {chunk_z}): {e}")
+                continue
+        elif layout == 'canonical':
+            from Core.canonicalLayout import save_canonical_chunk
+            try:
+                save_canonical_chunk(nbt_data, output_path, header, array_mode)
+            except Exception as e:
+                print(f"Failed to save chunk ({chunk_x}, {chunk_z}): {e}")
+                continue
+            if verbose:
+                print(f"Parsed data saved to {output_path}")
+        elif not save_nbt_to_text(nbt_data, output_path, verbose=verbose, array_mode=array_mode,
+                                  output_format=output_format, header=header):
+            continue
+        count += 1
+        if written is not None:
+            written.append(chunk_index(chunk_x, chunk_z))
+        if hashes is not None and volatile is not None:
+            hashes[chunk_index(chunk_x, chunk_z)] = masked_hash(nbt_data)
+    return count
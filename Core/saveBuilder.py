@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+import io
+import os
+import re
+import gzip
+import zlib
+import time
+import shutil
+import struct
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from Core import metrics
+from Core.serializers import EXTENSIONS, get_serializer, load_translation
+from Core.volatileFields import restore_volatile
+from Core.canonicalLayout import load_chunk_translation
+from Core.nbtFormat import format_from_dict
+from Core.manifest import MANIFEST_NAME
+from Core.chunkStore import open_store, read_translation_files, translation_key
+from Core.regionParser import (SECTOR_SIZE, HEADER_SIZE, COMPRESSION_GZIP, COMPRESSION_ZLIB,
+                               COMPRESSION_NONE, COMPRESSION_EXTERNAL, chunk_index)
+
+# Chunk translations in any output format, so the ones that cannot be built
+# back are reported rather than skipped
+CHUNK_FILE_PATTERN = re.compile(r'^c\.(-?\d+)\.(-?\d+)(%s)?$' % '|'.join(map(re.escape, EXTENSIONS)))
+
+# The header stores a chunk's size in sectors in a single byte; larger
+# chunks are written to an external c.<x>.<z>.mcc file.
+MAX_CHUNK_SECTORS = 255
+
+DEFAULT_FORMAT = {'compression': 'gzip', 'byteorder': 'big', 'bedrock_header': None}
+
+
+class BuildStats:
+    """
+    Counters for one Build Save run.
+    """
+    def __init__(self):
+        self.built = 0
+        self.reused = 0
+        self.errors = 0
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def files(self):
+        return self.built + self.reused
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.built} built, {self.reused} reused from cache, {self.errors} errors "
+                f"in {self.elapsed:.2f}s")
+
+
+def serialize_nbt(nbt_file, byteorder='big'):
+    """
+    Return the uncompressed binary NBT of a root compound.
+    """
+    with metrics.stage('serialize'):
+        buffer = io.BytesIO()
+        nbt_file.write(buffer, byteorder)
+        return buffer.getvalue()
+
+
+def encode_file(header, nbt_file):
+    """
+    Encode a standalone NBT file in the format recorded in its typed header.
+    """
+    nbt_format = format_from_dict(header.get('format') or DEFAULT_FORMAT)
+    data = serialize_nbt(nbt_file, nbt_format.byteorder)
+    if nbt_format.bedrock_header is not None:
+        data = struct.pack('<ii', nbt_format.bedrock_header, len(data)) + data
+    with metrics.stage('compress'):
+        if nbt_format.compression == 'gzip':
+            # A fixed mtime keeps rebuilt files byte-for-byte reproducible
+            return gzip.compress(data, mtime=0)
+        if nbt_format.compression == 'zlib':
+            return zlib.compress(data)
+    return data
+
+
+def compress_chunk(compression, data):
+    """
+    Compress chunk NBT for a region file. Returns (compression, payload).
+
+    Compression types that cannot be produced here fall back to zlib, which
+    every Minecraft version reads.
+    """
+    if compression == COMPRESSION_NONE:
+        return compression, data
+    with metrics.stage('compress'):
+        if compression == COMPRESSION_GZIP:
+            return compression, gzip.compress(data, mtime=0)
+        return COMPRESSION_ZLIB, zlib.compress(data)
+
+
+def _write_atomic(output_path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    with metrics.stage('write'):
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+    metrics.count('bytes_out', len(data))
+
+
+def build_file(translated_path, output_path, require_volatile=True):
+    """
+    Compile a typed or binary translation back into a standalone NBT file.
+    Without `require_volatile` a missing sidecar leaves masked values at
+    their defaults, see restore_volatile().
+    """
+    with metrics.stage('parse'):
+        header, nbt_file = load_translation(translated_path)
+    metrics.count_tags(nbt_file)
+    restore_volatile(nbt_file, header, translated_path, require_volatile)
+    _write_atomic(output_path, encode_file(header, nbt_file))
+
+
+def iter_chunk_files(chunks_dir):
+    """
+    Yield (chunk_x, chunk_z, path) for the chunk translations of a region,
+    both c.<x>.<z> files with the extension of an output format and
+    canonical c.<x>.<z> folders.
+    """
+    for name in sorted(os.listdir(chunks_dir)):
+        match = CHUNK_FILE_PATTERN.match(name)
+        if match and (match.group(3) is None) == os.path.isdir(os.path.join(chunks_dir, name)):
+            yield int(match.group(1)), int(match.group(2)), os.path.join(chunks_dir, name)
+
+
+def build_chunk(path, store=None, require_volatile=True):
+    """
+    Return (compression, timestamp, uncompressed NBT) for one chunk translation.
+
+    With a ChunkStore, a translation the store has seen (or written itself)
+    is looked up by the hash of its files instead of being parsed.
+    `require_volatile` is as in build_file().
+    """
+    source_key = None
+    if store is not None:
+        source_key = translation_key(read_translation_files(path))
+        found = store.resolve('builds', source_key)
+        # Only links recorded for a lossless translation name a single chunk
+        if (found is not None and found.get('format') and get_serializer(found['format']).lossless
+                and store.has_chunk(found['chunk'])):
+            return found['compression'], found['timestamp'], store.get_chunk(found['chunk'])
+    with metrics.stage('parse'):
+        header, nbt_file = load_chunk_translation(path)
+    metrics.count_tags(nbt_file)
+    restore_volatile(nbt_file, header, path, require_volatile)
+    compression = header.get('compression', COMPRESSION_ZLIB) & ~COMPRESSION_EXTERNAL
+    raw = serialize_nbt(nbt_file)
+    if store is not None:
+        store.link('builds', source_key, {'chunk': store.put_chunk(raw), 'compression': compression,
+                                          'timestamp': header.get('timestamp', 0)})
+    return compression, header.get('timestamp', 0), raw
+
+
+def build_region(chunks_dir, output_path, store=None, require_volatile=True, failed=None):
+    """
+    Repack the typed or binary chunk translations in `chunks_dir` into a region file.
+    `store` is an optional ChunkStore (or its folder) and `require_volatile`
+    as in build_file(), see build_chunk(). Returns the number of chunks that
+    had to be stored in external .mcc files.
+
+    Chunks that cannot be built are reported and their (chunk_x, chunk_z)
+    appended to `failed` if given; the region is then not written, and None
+    is returned. A folder with files but no chunk translation among them
+    raises ValueError rather than giving an empty region.
+    """
+    store = open_store(store) if store is not None else None
+    chunks = []
+    errors = 0
+    for chunk_x, chunk_z, path in iter_chunk_files(chunks_dir):
+        try:
+            compression, timestamp, raw = build_chunk(path, store, require_volatile)
+            compression, payload = compress_chunk(compression, raw)
+        except Exception as e:
+            print(f"Failed to build chunk ({chunk_x}, {chunk_z}) of {output_path}: {e}")
+            errors += 1
+            if failed is not None:
+                failed.append((chunk_x, chunk_z))
+            continue
+        chunks.append((chunk_index(chunk_x, chunk_z), chunk_x, chunk_z, timestamp, compression, payload))
+    if errors:
+        return None
+    if not chunks and os.listdir(chunks_dir):
+        raise ValueError(f"{chunks_dir} holds no chunk translations")
+    return write_region_file(output_path, chunks)
+
+
+def write_region_file(output_path, chunks):
+    """
+    Write [(slot, chunk_x, chunk_z, timestamp, compression, payload)] as a
+    region file.
+
+    Chunks are laid out back to back from the first sector after the header,
+    each padded to a whole 4 KiB sector. Returns the number of chunks that
+    had to be stored in external .mcc files.
+    """
+    chunks = sorted(chunks)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    directory = os.path.dirname(os.path.abspath(output_path))
+    table = bytearray(HEADER_SIZE)
+    externals = 0
+    tmp_path = output_path + '.tmp'
+    with metrics.stage('write'):
+        with open(tmp_path, 'wb') as f:
+            f.write(table)
+            sector = HEADER_SIZE // SECTOR_SIZE
+            for index, chunk_x, chunk_z, timestamp, compression, payload in chunks:
+                blob = struct.pack('>IB', len(payload) + 1, compression) + payload
+                count = -(-len(blob) // SECTOR_SIZE)
+                if count > MAX_CHUNK_SECTORS:
+                    _write_atomic(os.path.join(directory, f"c.{chunk_x}.{chunk_z}.mcc"), payload)
+                    blob = struct.pack('>IB', 1, compression | COMPRESSION_EXTERNAL)
+                    count = 1
+                    externals += 1
+                f.write(blob)
+                f.write(b'\0' * (count * SECTOR_SIZE - len(blob)))
+                struct.pack_into('>I', table, index * 4, sector << 8 | count)
+                struct.pack_into('>i', table, SECTOR_SIZE + index * 4, timestamp)
+                sector += count
+            f.seek(0)
+            f.write(table)
+        os.replace(tmp_path, output_path)
+    metrics.count('bytes_out', sector * SECTOR_SIZE)
+    return externals
+
+
+def write_chunk(region_path, chunk_x, chunk_z, compression, payload, timestamp=None):
+    """
+    Replace one chunk of an existing region file, leaving the others untouched.
+
+    The chunk goes over its old sectors when it still fits in them and after
+    the end of the file otherwise. The region is rewritten to a temporary
+    file that replaces it, so a failed write leaves the old region whole.
+    Chunks too large for the header go to an external .mcc file, as in
+    write_region_file(). `timestamp` defaults to now.
+    """
+    index = chunk_index(chunk_x, chunk_z)
+    external_path = os.path.join(os.path.dirname(os.path.abspath(region_path)), f"c.{chunk_x}.{chunk_z}.mcc")
+    blob = struct.pack('>IB', len(payload) + 1, compression) + payload
+    count = -(-len(blob) // SECTOR_SIZE)
+    external = count > MAX_CHUNK_SECTORS
+    if external:
+        _write_atomic(external_path, payload)
+        blob = struct.pack('>IB', 1, compression | COMPRESSION_EXTERNAL)
+        count = 1
+    with open(region_path, 'rb') as f:
+        region = bytearray(f.read())
+    if len(region) < HEADER_SIZE:
+        raise ValueError(f"{region_path} is not a region file")
+    location, = struct.unpack_from('>I', region, index * 4)
+    offset, sectors = location >> 8, location & 0xFF
+    if offset < 2 or count > sectors:
+        offset = -(-len(region) // SECTOR_SIZE)
+    end = (offset + count) * SECTOR_SIZE
+    if len(region) < end:
+        region.extend(b'\0' * (end - len(region)))
+    region[offset * SECTOR_SIZE:end] = blob + b'\0' * (count * SECTOR_SIZE - len(blob))
+    struct.pack_into('>I', region, index * 4, offset << 8 | count)
+    struct.pack_into('>i', region, SECTOR_SIZE + index * 4,
+                     int(time.time()) if timestamp is None else timestamp)
+    _write_atomic(region_path, region)
+    # Only once the region no longer points to it
+    if not external and os.path.exists(external_path):
+        os.remove(external_path)
+
+
+def region_source_hash(chunks_dir):
+    """
+    Hash the chunk translations of a region, used as its build cache key.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(chunks_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, chunks_dir).replace(os.sep, '/').encode('utf-8') + b'\0')
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def default_cache_dir(translated_dir):
+    return os.path.abspath(translated_dir).rstrip(os.sep) + '.build-cache'
+
+
+def plan_build(translated_dir, output_dir):
+    """
+    Yield ('file' | 'region', source, target) for everything in a translation.
+    Files of the formats that cannot be built back are listed too, so that
+    building them fails instead of leaving them out.
+    """
+    for root, dirs, files in os.walk(translated_dir):
+        # Skip hidden folders such as .git
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        rel_root = os.path.relpath(root, translated_dir)
+        for name in list(dirs):
+            if name.endswith('.mca.chunks'):
+                dirs.remove(name)
+                yield ('region', os.path.join(root, name),
+                       os.path.normpath(os.path.join(output_dir, rel_root, name[:-len('.chunks')])))
+        for name in sorted(files):
+            extension = next((extension for extension in EXTENSIONS if name.endswith(extension)), None)
+            if extension and name != MANIFEST_NAME:
+                yield ('file', os.path.join(root, name),
+                       os.path.normpath(os.path.join(output_dir, rel_root, name[:-len(extension)])))
+
+
+def run_build_task(task):
+    """
+    Build one file or region inside a worker process. Returns the number of
+    errors: 0 on success, or the number of chunks of a region that failed.
+    """
+    kind, source, target, cache_path, store, require_volatile = task
+    try:
+        if kind == 'region':
+            failed = []
+            externals = build_region(source, target, store, require_volatile, failed)
+            if failed:
+                print(f"Failed to build {target}: {len(failed)} chunks could not be built")
+                return len(failed)
+            if cache_path and not externals:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                shutil.copyfile(target, cache_path + '.tmp')
+                os.replace(cache_path + '.tmp', cache_path)
+        else:
+            build_file(source, target, require_volatile)
+        return 0
+    except Exception as e:
+        print(f"Failed to build {target}: {e}")
+        return 1
+
+
+def build_save(translated_dir, output_dir, jobs=None, cache_dir=None, use_cache=True,
+               progress=None, cancel=None, store=None, require_volatile=True):
+    """
+    Compile a typed or binary translation folder back into a playable world folder.
+
+    Regions whose chunk translations hash to a region built before are copied
+    from the build cache; everything else is rebuilt on a process pool.
+    `progress` is called with the running BuildStats after each file, and
+    setting `cancel` (a threading.Event) stops before the next file.
+    `store` is the folder of a ChunkStore that chunks are looked up in and
+    added to, see build_chunk(). A file or region whose masked volatile
+    values have no sidecar fails unless `require_volatile` is False.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    cache_dir = cache_dir or default_cache_dir(translated_dir)
+    stats = BuildStats()
+
+    def collect(done):
+        for future in done:
+            try:
+                errors = metrics.task_result(future.result())
+            except Exception as e:
+                print(f"Build task failed: {e}")
+                errors = 1
+            if errors:
+                stats.errors += errors
+            else:
+                stats.built += 1
+            stats.elapsed = time.perf_counter() - stats.started
+            if progress:
+                progress(stats)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = set()
+        for kind, source, target in plan_build(translated_dir, output_dir):
+            if cancel is not None and cancel.is_set():
+                stats.cancelled = True
+                break
+            cache_path = None
+            if kind == 'region' and use_cache:
+                cache_path = os.path.join(cache_dir, region_source_hash(source) + '.mca')
+                if os.path.isfile(cache_path):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(cache_path, target)
+                    stats.reused += 1
+                    if progress:
+                        progress(stats)
+                    continue
+            if len(pending) >= jobs * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(metrics.submit(pool, run_build_task,
+                                       (kind, source, target, cache_path, store, require_volatile)))
+        if stats.cancelled:
+            pending = {future for future in pending if not future.cancel()}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+def build_save_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='build-save',
+        description="Compile a typed or binary translation back into a world folder.")
+    parser.add_argument('translated_dir', help="folder written by translate-save --format typed or binary")
+    parser.add_argument('output_dir', help="world folder to write")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="where built regions are cached (default: <translated_dir>.build-cache)")
+    parser.add_argument('--no-cache', action='store_true', help="rebuild every region")
+    parser.add_argument('--store', metavar='DIR', default=None,
+                        help="chunk store to reuse already compiled chunks from")
+    parser.add_argument('--allow-missing-volatile', action='store_true',
+                        help="build translations whose .volatile files are missing, as in a clone "
+                             "of a commit-save repository, with default values for the masked fields")
+    metrics.add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.translated_dir):
+        print(f"Translated directory does not exist: {args.translated_dir}")
+        return 1
+
+    with metrics.command_metrics(args):
+        stats = build_save(args.translated_dir, args.output_dir, args.jobs, args.cache_dir,
+                           use_cache=not args.no_cache, store=args.store,
+                           require_volatile=not args.allow_missing_volatile)
+        print("Build finished:", stats.summary())
+    return 1 if stats.errors else 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import collections
+
+# A world folder found in a saves directory
+SaveInfo = collections.namedtuple('SaveInfo', 'name path last_modified')
+
+# One entry below a world in the saves tree
+SaveEntry = collections.namedtuple('SaveEntry', 'label path is_dir')
+
+# Friendlier names for the dimension folders of a Java world
+DIMENSION_LABELS = {
+    'region': 'Overworld (region)',
+    'DIM-1': 'Nether',
+    'DIM1': 'The End',
+    'dimensions': 'Custom Dimensions',
+    'playerdata': 'Player Data',
+}
+
+LEVEL_FILES = ('level.dat', 'level.dat_old')
+
+
+def default_minecraft_dir():
+    """
+    Return the usual location of the .minecraft folder on this platform.
+    """
+    if sys.platform.startswith('win'):
+        return os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), '.minecraft')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Application Support/minecraft')
+    return os.path.expanduser('~/.minecraft')
+
+
+def save_info(path):
+    """
+    Return the SaveInfo of a world folder, or None if it holds no level.dat.
+
+    The last modification time is that of level.dat, which the game rewrites
+    on every save, so the folder itself is never walked.
+    """
+    path = os.path.normpath(path)
+    for name in LEVEL_FILES:
+        try:
+            stat = os.stat(os.path.join(path, name))
+        except OSError:
+            continue
+        return SaveInfo(os.path.basename(path), path, stat.st_mtime)
+    return None
+
+
+def scan_saves(saves_dir):
+    """
+    Return the SaveInfo of every world in a saves folder, newest first.
+    """
+    saves = []
+    try:
+        entries = list(os.scandir(saves_dir))
+    except OSError as e:
+        print(f"Failed to list {saves_dir}: {e}")
+        return saves
+    for entry in entries:
+        if entry.is_dir():
+            info = save_info(entry.path)
+            if info:
+                saves.append(info)
+    saves.sort(key=lambda info: -info.last_modified)
+    return saves
+
+
+def list_entries(path):
+    """
+    Return the SaveEntry children of a folder below a world: sub-folders
+    first, then translatable files, each sorted by name.
+    """
+    # Imported here: the GUI loads this module at startup, the pipeline only once needed
+    from Core.savePipeline import NBT_EXTENSIONS, REGION_EXTENSIONS
+    folders = []
+    files = []
+    for entry in os.scandir(path):
+        if entry.is_dir():
+            folders.append(SaveEntry(DIMENSION_LABELS.get(entry.name, entry.name), entry.path, True))
+        elif entry.name.endswith(NBT_EXTENSIONS) or entry.name.endswith(REGION_EXTENSIONS):
+            files.append(SaveEntry(entry.name, entry.path, False))
+    folders.sort(key=lambda entry: entry.label.lower())
+    files.sort(key=lambda entry: entry.label.lower())
+    return folders + files
+
+
+def describe_time(timestamp, now=None):
+    """
+    Format a modification time the way the Overview tab shows it.
+    """
+    now = now or time.time()
+    moment = time.localtime(timestamp)
+    if time.strftime('%Y%m%d', moment) == time.strftime('%Y%m%d', time.localtime(now)):
+        return time.strftime('Today at %H:%M', moment)
+    if time.strftime('%Y%m%d', moment) == time.strftime('%Y%m%d', time.localtime(now - 86400)):
+        return time.strftime('Yesterday at %H:%M', moment)
+    return time.strftime('%Y-%m-%d %H:%M', moment)
@@ -0,0 +1,583 @@
+#!/usr/bin/env python3
+import os
+import time
+import shutil
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from Core import metrics
+from Core.defaultNbtParser import (load_nbt_file, save_nbt_to_text, render_nbt_text, output_extension,
+                                   ARRAY_MODES, OUTPUT_FORMATS)
+from Core.regionParser import (translate_region, region_timestamps, chunk_output_dir,
+                               chunk_output_name, chunk_coords)
+from Core.manifest import Manifest, manifest_key, fingerprint, changed_chunks
+from Core.nbtFormat import get_format, format_to_dict, format_from_dict
+from Core.serializers import get_serializer
+from Core.volatileFields import (VOLATILE_SUFFIX, load_rules, mask_volatile, save_volatile,
+                                 mark_masked, masked_hash, ensure_ignored)
+
+# Standalone NBT files found in Java and Bedrock saves
+NBT_EXTENSIONS = ('.dat', '.dat_old', '.nbt', '.mcstructure')
+REGION_EXTENSIONS = ('.mca',)
+
+# Number of chunks handed to a worker at once. Large regions are split into
+# several tasks so that a single huge region does not serialize the run.
+CHUNK_BATCH = 128
+
+
+class TranslateStats:
+    """
+    Counters for one translation run.
+    """
+    def __init__(self):
+        self.files = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.errors = 0
+        # Files to translate again, and {region file: header slots} of chunks to
+        self.failed = set()
+        self.failed_chunks = {}
+        # masked_hash() of each file, or {slot: digest} of each region's chunks
+        self.masked = {}
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, result):
+        files, chunks, nbytes, errors, source, failed_slots, masked = result
+        self.files += files
+        self.chunks += chunks
+        self.bytes += nbytes
+        self.errors += errors
+        if errors and source:
+            if failed_slots is not None:
+                self.failed_chunks.setdefault(source, set()).update(failed_slots)
+            else:
+                self.failed.add(source)
+        if masked:
+            self.masked[source] = masked
+        self.elapsed = time.perf_counter() - self.started
+
+    def fail(self, task):
+        """
+        Record a task that did not run, so the next run does its work again.
+        """
+        if task[0] == 'region' and task[3]:
+            self.failed_chunks.setdefault(task[1], set()).update(task[3])
+        else:
+            self.failed.add(task[1])
+
+    @property
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"{self.files} files, {self.chunks} chunks, {self.bytes / (1024 * 1024):.1f} MB "
+                f"in {self.elapsed:.2f}s ({self.files_per_second:.1f} files/s, "
+                f"{self.mb_per_second:.1f} MB/s, {self.errors} errors)")
+
+
+def iter_save_stats(save_dir):
+    """
+    Yield (path relative to `save_dir`, stat result) for every translatable
+    file in a world folder, in sorted order.
+
+    The folder is walked with os.scandir so the stat data comes with the
+    directory listing where the platform provides it. Symbolic links are
+    skipped: they may lead outside the world or back into it.
+    """
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = sorted(os.scandir(os.path.join(save_dir, rel_dir)), key=lambda entry: entry.name)
+        except OSError as e:
+            print(f"Failed to list {os.path.join(save_dir, rel_dir)}: {e}")
+            continue
+        sub_dirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            try:
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    sub_dirs.append(rel_path)
+                elif entry.name.endswith(NBT_EXTENSIONS) or entry.name.endswith(REGION_EXTENSIONS):
+                    yield rel_path, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+        stack.extend(reversed(sub_dirs))
+
+
+def iter_save_files(save_dir):
+    """
+    Yield the paths (relative to `save_dir`) of every translatable file in a world folder.
+    """
+    for rel_path, _ in iter_save_stats(save_dir):
+        yield rel_path
+
+
+def output_path_for(output_dir, rel_path, output_format='json'):
+    """
+    Return where the translation of a standalone NBT file is written.
+    """
+    return os.path.join(output_dir, rel_path + output_extension(output_format))
+
+
+def region_tasks(source, target, indices, options):
+    """
+    Split the given chunk slots of a region file into worker tasks.
+    """
+    if not indices:
+        yield ('region', source, target, [], True, options)
+        return
+    for start in range(0, len(indices), CHUNK_BATCH):
+        yield ('region', source, target, indices[start:start + CHUNK_BATCH], start == 0, options)
+
+
+def remove_path(path):
+    """
+    Delete a file or folder if it exists.
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_outputs(output_dir, rel_path, remove=remove_path, output_format='json'):
+    """
+    Delete the translated output of a source file that no longer exists.
+    """
+    if rel_path.endswith(REGION_EXTENSIONS):
+        remove(chunk_output_dir(os.path.join(output_dir, rel_path)))
+    else:
+        target = output_path_for(output_dir, rel_path, output_format)
+        remove(target)
+        remove_path(target + VOLATILE_SUFFIX)
+
+
+def remove_chunk_outputs(source, target, indices, remove=remove_path, output_format='json'):
+    for index in indices:
+        chunk_x, chunk_z = chunk_coords(source, index)
+        chunk_path = os.path.join(target, chunk_output_name(chunk_x, chunk_z, 'file', output_format))
+        chunk_dir = os.path.join(target, chunk_output_name(chunk_x, chunk_z, 'canonical'))
+        remove(chunk_path)
+        remove(chunk_dir)
+        remove_path(chunk_path + VOLATILE_SUFFIX)
+        remove_path(chunk_dir + VOLATILE_SUFFIX)
+
+
+def plan_tasks(save_dir, output_dir, manifest, options=None, exists=os.path.exists,
+               remove=remove_path):
+    """
+    Yield translation tasks for the parts of a world folder that changed since
+    `manifest` was written, updating `manifest` as files are examined.
+
+    Standalone files become one task each; only the chunks of a region file
+    whose header timestamp moved are translated, split into batches of at
+    most CHUNK_BATCH chunks. Outputs of deleted files and chunks are removed.
+    `options` are passed on to the output writers. `exists` and `remove` let
+    the outputs live somewhere other than `output_dir`, such as a git branch.
+    """
+    options = options or {}
+    output_format = options.get('output_format', 'json')
+    seen = set()
+    for rel_path, stat in iter_save_stats(save_dir):
+        source = os.path.join(save_dir, rel_path)
+        seen.add(manifest_key(rel_path))
+        previous = manifest.get(rel_path)
+        try:
+            entry, changed = fingerprint(source, previous, stat)
+        except OSError as e:
+            print(f"Failed to read {source}: {e}")
+            continue
+
+        if rel_path.endswith(REGION_EXTENSIONS):
+            target = chunk_output_dir(os.path.join(output_dir, rel_path))
+            has_output = previous is not None and exists(target)
+            if not changed and has_output and not previous.get('failed'):
+                manifest.set(rel_path, entry)
+                continue
+            try:
+                chunks = region_timestamps(source)
+            except OSError as e:
+                print(f"Failed to read region header {source}: {e}")
+                # Without an entry the next run translates it whatever its fingerprint
+                manifest.discard(rel_path)
+                continue
+            if has_output:
+                indices, removed = changed_chunks(previous.get('chunks'), chunks)
+                remove_chunk_outputs(source, target, removed, remove, output_format)
+                if not indices and not removed:
+                    # The content changed but no timestamp moved, so trust nothing
+                    indices = sorted(chunks)
+            else:
+                indices = sorted(chunks)
+            entry = {key: value for key, value in entry.items() if key != 'failed'}
+            entry['chunks'] = chunks
+            if previous and 'masked' in previous:
+                # Digests of the chunks translated now are recorded after the run
+                retranslated = set(indices)
+                entry['masked'] = {index: digest for index, digest in previous['masked'].items()
+                                   if index in chunks and index not in retranslated}
+            manifest.set(rel_path, entry)
+            yield from region_tasks(source, target, indices, options)
+        else:
+            target = output_path_for(output_dir, rel_path, output_format)
+            if changed or 'format' not in entry:
+                # Only the first bytes are read; the worker then parses the file once
+                try:
+                    entry['format'] = format_to_dict(get_format(source))
+                except (OSError, ValueError) as e:
+                    print(f"Failed to detect the format of {source}: {e}")
+                    manifest.discard(rel_path)
+                    continue
+            manifest.set(rel_path, entry)
+            if changed or not exists(target):
+                yield ('file', source, target, entry['format'], options)
+
+    for key in list(manifest.keys()):
+        if key not in seen:
+            remove_outputs(output_dir, key.replace('/', os.sep), remove, output_format)
+            manifest.discard(key)
+
+
+def run_task(task, rendered=None):
+    """
+    Translate one task inside a worker process.
+
+    Returns (files, chunks, bytes, errors, source, failed slots, masked),
+    where the failed slots are the header slots of the chunks of a region
+    that could not be translated, and None for a standalone file. With
+    volatile fields masked, `masked` is the masked_hash() of a file or
+    {slot: digest} of the chunks translated, and None otherwise. If
+    `rendered` is a list, the translations are appended to it as
+    (path, bytes) instead of being written, see translate_region().
+    """
+    kind, source = task[0], task[1]
+    if kind == 'region':
+        _, _, target, indices, counts_file, options = task
+        nbytes = os.path.getsize(source) if counts_file else 0
+        if not indices:
+            if rendered is None:
+                os.makedirs(target, exist_ok=True)
+            return int(counts_file), 0, nbytes, 0, source, [], None
+        written = []
+        hashes = {} if options.get('volatile') is not None else None
+        chunks = translate_region(source, target, indices=indices, verbose=False,
+                                  rendered=rendered, written=written, hashes=hashes, **options)
+        failed = sorted(set(indices) - set(written))
+        return int(counts_file), chunks, nbytes, len(failed), source, failed, hashes
+
+    _, _, target, nbt_format, options = task
+    options = dict(options)
+    options['sort_keys'] = options.pop('layout', 'file') == 'canonical'
+    volatile = options.pop('volatile', None)
+    options.pop('store', None)
+    nbytes = os.path.getsize(source)
+    try:
+        nbt_file, _ = load_nbt_file(source, format_from_dict(nbt_format))
+    except Exception as e:
+        print(f"Failed to parse {source}: {e}")
+        return 1, 0, nbytes, 1, source, None, None
+    metrics.count_tags(nbt_file)
+    if rendered is None or volatile is not None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    header = {'format': nbt_format}
+    masked = None
+    if volatile is not None:
+        nbt_file, values = mask_volatile(nbt_file, volatile)
+        try:
+            save_volatile(values, target)
+        except OSError as e:
+            print(f"Failed to save volatile fields of {source}: {e}")
+            return 1, 0, nbytes, 1, source, None, None
+        if values:
+            mark_masked(header)
+        masked = masked_hash(nbt_file)
+    if rendered is not None:
+        try:
+            rendered.append((target, render_nbt_text(nbt_file, header=header, **options)))
+        except Exception as e:
+            print(f"Failed to translate {source}: {e}")
+            return 1, 0, nbytes, 1, source, None, None
+        return 1, 0, nbytes, 0, source, None, masked
+    written = save_nbt_to_text(nbt_file, target, verbose=False, header=header, **options)
+    return 1, 0, nbytes, int(not written), source, None, masked if written else None
+
+
+def render_task(task):
+    """
+    Translate one task in memory. Returns (run_task() result, [(path, bytes)]).
+    """
+    rendered = []
+    return run_task(task, rendered), rendered
+
+
+def run_tasks(tasks, jobs=None, max_pending=None, progress=None, consume=None, cancel=None):
+    """
+    Run translation tasks on a process pool.
+
+    At most `max_pending` tasks are queued at any time so planning a huge save
+    never builds an unbounded backlog. `progress` is called with the running
+    TranslateStats after each finished task. With `consume` set the tasks are
+    translated in memory by render_task() and `consume` receives each batch
+    of (path, bytes) in the calling process. While metrics are recorded (see
+    Core/metrics.py) the workers' are merged into them.
+
+    Once `cancel` (a threading.Event) is set no new task is started; tasks
+    that did not run are recorded as failed so that the next run picks them
+    up again, see TranslateStats.fail().
+    """
+    jobs = jobs or os.cpu_count() or 1
+    max_pending = max_pending or jobs * 4
+    stats = TranslateStats()
+    worker = run_task if consume is None else render_task
+
+    def collect(done):
+        for future in done:
+            task = pending.pop(future)
+            try:
+                result = metrics.task_result(future.result())
+                if consume is not None:
+                    result, rendered = result
+                    consume(rendered)
+                stats.add(result)
+            except Exception as e:
+                print(f"Translation task failed: {e}")
+                stats.errors += 1
+                stats.fail(task)
+            if progress:
+                progress(stats)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = {}
+        for task in tasks:
+            while len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            if cancel is not None and cancel.is_set():
+                stats.cancelled = True
+                stats.fail(task)
+                break
+            pending[metrics.submit(pool, worker, task)] = task
+        if stats.cancelled:
+            for future, task in list(pending.items()):
+                if future.cancel():
+                    del pending[future]
+                    stats.fail(task)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+def task_options(options, store=None):
+    """
+    Return the options handed to the workers: the manifest options plus the
+    chunk store, which changes how chunks are translated but not the output.
+    """
+    return dict(options, store=store) if store is not None else options
+
+
+def translation_options(array_mode='list', output_format='json', layout='file', volatile=None):
+    """
+    Return the output options recorded in the manifest. The canonical layout
+    always writes the typed format. Raises ValueError for volatile rules with
+    a format that cannot be built back, which would lose the masked values.
+    """
+    if layout == 'canonical':
+        output_format = 'typed'
+    if volatile is not None and not get_serializer(output_format).lossless:
+        raise ValueError(f"Volatile fields cannot be masked in the {output_format} format, "
+                         f"which build-save cannot read back")
+    return {'array_mode': array_mode, 'output_format': output_format, 'layout': layout,
+            'volatile': list(volatile) if volatile is not None else None}
+
+
+def reset_manifest(manifest, output_dir, options, incremental=True, remove=remove_path):
+    """
+    Forget the manifest entries that cannot be reused with `options`, or
+    all of them for a full run, removing their outputs.
+    """
+    if manifest.options != options or not incremental:
+        # Outputs written with other options may live under other names, and
+        # a full run would not know which files and chunks were deleted since
+        for key in manifest.keys():
+            remove_outputs(output_dir, key.replace('/', os.sep), remove,
+                           manifest.options.get('output_format', 'json'))
+        manifest.files = {}
+    manifest.options = options
+
+
+def record_masked(manifest, save_dir, stats):
+    """
+    Keep the masked_hash() digests of the files and chunks translated, so
+    the change detector can tell a chunk that was only ticked from an edit.
+    """
+    for source, masked in stats.masked.items():
+        entry = manifest.get(os.path.relpath(source, save_dir))
+        if entry is None:
+            continue
+        if isinstance(masked, dict):
+            digests = dict(entry.get('masked', {}))
+            digests.update(masked)
+            entry['masked'] = digests
+        else:
+            entry['masked'] = masked
+
+
+def forget_failed(manifest, save_dir, stats):
+    """
+    Make the next run try the failed files and chunks again: failed files
+    are forgotten, while a region keeps its fingerprint but forgets the
+    timestamps of its failed chunks and lists them under 'failed', so that
+    the next run reads its header and translates only those chunks.
+    """
+    for source in stats.failed:
+        manifest.discard(os.path.relpath(source, save_dir))
+    for source, slots in stats.failed_chunks.items():
+        rel_path = os.path.relpath(source, save_dir)
+        entry = manifest.get(rel_path)
+        if entry is None or source in stats.failed:
+            continue
+        chunks = {index: timestamp for index, timestamp in entry.get('chunks', {}).items()
+                  if index not in slots}
+        failed = sorted(set(entry.get('failed', ())) | slots)
+        manifest.set(rel_path, dict(entry, chunks=chunks, failed=failed))
+
+
+def translate_save(save_dir, output_dir, jobs=None, max_pending=None, progress=None,
+                   incremental=True, array_mode='list', output_format='json', layout='file',
+                   volatile=None, cancel=None, store=None, index=None):
+    """
+    Translate a world folder into `output_dir`, mirroring its layout.
+
+    With `incremental` set only files and chunks that changed since the last
+    run (according to the manifest in `output_dir`) are translated. The
+    canonical layout always writes the typed format. `volatile` is a list of
+    field rules (see Core/volatileFields.py) kept out of the translation, so
+    that chunks which were only ticked translate to unchanged files.
+    Setting `cancel` stops the run early, see run_tasks(). `store` is the
+    folder of a ChunkStore shared between saves (see Core/chunkStore.py).
+    `index` is the path of an entity index updated after the translation,
+    see refresh_index().
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest.load(output_dir)
+    options = translation_options(array_mode, output_format, layout, volatile)
+    if volatile is not None:
+        ensure_ignored(output_dir)
+    reset_manifest(manifest, output_dir, options, incremental)
+    stats = run_tasks(plan_tasks(save_dir, output_dir, manifest, task_options(options, store)), jobs,
+                      max_pending, progress, cancel=cancel)
+    record_masked(manifest, save_dir, stats)
+    forget_failed(manifest, save_dir, stats)
+    manifest.save()
+    if index is not None and not stats.cancelled:
+        refresh_index(save_dir, index, jobs=jobs)
+    return stats
+
+
+def refresh_index(save_dir, index, commit=None, jobs=None):
+    """
+    Update the entity index of a save (see Core/entityIndex.py). A failure is
+    reported but does not fail the translation it follows.
+    """
+    from Core.entityIndex import update_index
+    try:
+        with metrics.stage('index'):
+            return update_index(save_dir, index, commit, jobs)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Failed to update the index {index}: {e}")
+        return None
+
+
+def add_translate_arguments(parser):
+    """
+    Add the options shared by the commands that translate a world folder.
+    """
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="maximum number of queued tasks (default: 4 per worker)")
+    parser.add_argument('--full', action='store_true',
+                        help="ignore the manifest and translate everything again")
+    parser.add_argument('--arrays', choices=ARRAY_MODES, default='list',
+                        help="how byte/int/long arrays are written (default: list)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='json', dest='output_format',
+                        help="output format; 'typed' can be rebuilt with build-save, 'binary' "
+                             "writes compact snapshots (default: json)")
+    parser.add_argument('--canonical', action='store_true',
+                        help="deterministic git-friendly layout: typed, sorted keys and one file "
+                             "per chunk section and entity list")
+    parser.add_argument('--volatile', action='store_true',
+                        help="keep fields that change every tick (times, LastUpdate, ...) in "
+                             "untracked .volatile files; build-save restores them (only with the "
+                             "formats build-save reads back)")
+    parser.add_argument('--volatile-rules', metavar='FILE', default=None,
+                        help="JSON list of field paths to treat as volatile (implies --volatile)")
+    parser.add_argument('--store', metavar='DIR', default=None,
+                        help="chunk store to share chunks and their translations through, so "
+                             "chunks seen in any save are not parsed again")
+    parser.add_argument('--index', metavar='FILE', default=None,
+                        help="SQLite index of entities, block entities and players to update "
+                             "with the changed chunks, see the search command")
+    metrics.add_metrics_arguments(parser)
+
+
+def translate_arguments(args):
+    """
+    Return the translate_save() keyword arguments for parsed
+    add_translate_arguments() options, or None if they are invalid.
+    """
+    volatile = None
+    layout = 'canonical' if args.canonical else 'file'
+    if args.volatile or args.volatile_rules:
+        try:
+            volatile = load_rules(args.volatile_rules)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read volatile rules: {e}")
+            return None
+        try:
+            translation_options(args.arrays, args.output_format, layout, volatile)
+        except ValueError as e:
+            print(e)
+            return None
+    return {'jobs': args.jobs, 'max_pending': args.max_pending, 'incremental': not args.full,
+            'array_mode': args.arrays, 'output_format': args.output_format,
+            'layout': layout, 'volatile': volatile,
+            'store': args.store, 'index': args.index}
+
+
+def translate_save_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='translate-save',
+        description="Translate every NBT and region file of a world folder.")
+    parser.add_argument('save_dir', help="world folder to translate")
+    parser.add_argument('output_dir', help="folder that receives the translated files")
+    add_translate_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    kwargs = translate_arguments(args)
+    if kwargs is None:
+        return 1
+
+    with metrics.command_metrics(args):
+        stats = translate_save(args.save_dir, args.output_dir, **kwargs)
+        print("Translated", stats.summary())
+    return 1 if stats.errors else 0
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import select
+import struct
+import argparse
+import threading
+
+from Core import metrics
+from Core.regionParser import region_timestamps
+from Core.savePipeline import (NBT_EXTENSIONS, REGION_EXTENSIONS, add_translate_arguments,
+                               translate_arguments)
+
+# Seconds without file activity before a batch of changes is committed
+DEFAULT_DEBOUNCE = 10.0
+# Minimum seconds between two commits
+DEFAULT_MIN_INTERVAL = 60.0
+# Seconds between two scans when inotify is not available
+DEFAULT_POLL_INTERVAL = 2.0
+
+# inotify(7) constants
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT = struct.Struct('iIII')
+
+# Returned by a watcher that lost track of events and needs a full rescan
+RESCAN = None
+
+
+def is_save_file(path):
+    return path.endswith(NBT_EXTENSIONS) or path.endswith(REGION_EXTENSIONS)
+
+
+def _iter_dirs(root):
+    yield root
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False):
+            yield from _iter_dirs(entry.path)
+
+
+class InotifyWatcher:
+    """
+    Report changed files below a folder through Linux inotify, called via
+    ctypes so no extra package is needed.
+    """
+    def __init__(self, root):
+        import ctypes
+        import ctypes.util
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        for path in _iter_dirs(root):
+            self._add(path)
+
+    def _add(self, path):
+        import ctypes
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {path}")
+        self.dirs[wd] = path
+
+    def wait(self, timeout):
+        """
+        Wait up to `timeout` seconds for activity. Returns the set of changed
+        paths relative to the root (empty on timeout), or RESCAN.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return RESCAN
+                directory = self.dirs.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                        # Files may already have been written into the new folder
+                        for sub_dir in _iter_dirs(path):
+                            self._add(sub_dir)
+                        return RESCAN
+                    continue
+                changed.add(os.path.relpath(path, self.root))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Report changed files below a folder by comparing size and mtime scans.
+    """
+    def __init__(self, root, interval=DEFAULT_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        stack = [self.root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        stat = entry.stat(follow_symlinks=False)
+                        snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    continue
+        return snapshot
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            changed = {os.path.relpath(path, self.root)
+                       for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or time.monotonic() >= deadline:
+                return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Return an inotify watcher when available, a polling one otherwise.
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling every {poll_interval}s instead")
+    return PollingWatcher(root, poll_interval)
+
+
+class SaveWatcher:
+    """
+    Watch a world folder and call `callback(changed)` once per quiet period.
+
+    File activity is collected until nothing happened for `debounce` seconds,
+    and batches are at least `min_interval` seconds apart. Region files are
+    only counted as changed when a chunk timestamp in their header moved, so
+    an autosave that rewrites a region without touching its chunks is
+    ignored. `changed` is the sorted list of changed paths relative to the
+    save folder.
+    """
+    def __init__(self, save_dir, callback, debounce=DEFAULT_DEBOUNCE,
+                 min_interval=DEFAULT_MIN_INTERVAL, polling=False,
+                 poll_interval=DEFAULT_POLL_INTERVAL):
+        self.save_dir = save_dir
+        self.callback = callback
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self.polling = polling
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.timestamps = {}
+        self.last_batch = None
+
+    def _remember_regions(self):
+        for root, dirs, files in os.walk(self.save_dir):
+            for name in files:
+                if name.endswith(REGION_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    self.timestamps[path] = self._read_timestamps(path)
+
+    @staticmethod
+    def _read_timestamps(path):
+        try:
+            return region_timestamps(path)
+        except (OSError, ValueError):
+            return None
+
+    def _is_dirty(self, rel_path):
+        path = os.path.join(self.save_dir, rel_path)
+        if not rel_path.endswith(REGION_EXTENSIONS):
+            return True
+        timestamps = self._read_timestamps(path)
+        if timestamps is not None and timestamps == self.timestamps.get(path):
+            return False
+        self.timestamps[path] = timestamps
+        return True
+
+    def _collect(self, watcher, dirty):
+        """
+        Add the save files reported by one wait to `dirty`. Returns True if
+        there was any activity.
+        """
+        timeout = self.debounce if dirty else 1.0
+        changed = watcher.wait(timeout)
+        if changed is RESCAN:
+            changed = {os.path.relpath(os.path.join(root, name), self.save_dir)
+                       for root, dirs, files in os.walk(self.save_dir) for name in files}
+        if not changed:
+            return False
+        for rel_path in changed:
+            if is_save_file(rel_path):
+                dirty.add(rel_path)
+        return True
+
+    def run(self):
+        """
+        Watch until stop() is called.
+        """
+        self._remember_regions()
+        watcher = open_watcher(self.save_dir, self.polling, self.poll_interval)
+        dirty = set()
+        try:
+            while not self.stop_event.is_set():
+                if self._collect(watcher, dirty) or not dirty:
+                    continue
+                # Quiet period over; hold the batch back if the last one was too recent
+                if self.last_batch is not None:
+                    if time.monotonic() - self.last_batch < self.min_interval:
+                        continue
+                changed = sorted(path for path in dirty if self._is_dirty(path))
+                dirty.clear()
+                if changed:
+                    self.last_batch = time.monotonic()
+                    self.callback(changed)
+        finally:
+            watcher.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='SaveWatcher', daemon=True)
+        self.thread.start()
+
+    def stop(self, wait=True):
+        self.stop_event.set()
+        if wait and self.thread is not None:
+            self.thread.join()
+
+
+def watch_command(argv):
+    parser = argparse.ArgumentParser(
+        prog='watch',
+        description="Watch a world folder and commit its changes after every quiet period.")
+    parser.add_argument('save_dir', help="world folder to watch")
+    parser.add_argument('repo', help="git repository to commit to (created if missing)")
+    parser.add_argument('-b', '--branch', default=None,
+                        help="branch to commit to (default: the checked out branch)")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"seconds without changes before committing (default: {DEFAULT_DEBOUNCE:g})")
+    parser.add_argument('--min-interval', type=float, default=DEFAULT_MIN_INTERVAL,
+                        help=f"minimum seconds between commits (default: {DEFAULT_MIN_INTERVAL:g})")
+    parser.add_argument('--poll', action='store_true', help="poll instead of using inotify")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds between scans when polling (default: {DEFAULT_POLL_INTERVAL:g})")
+    add_translate_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.save_dir):
+        print(f"Save directory does not exist: {args.save_dir}")
+        return 1
+    kwargs = translate_arguments(args)
+    if kwargs is None:
+        return 1
+
+    from Core.gitFastImport import commit_save
+
+    def commit(message):
+        # Each commit is measured on its own; --metrics-json keeps the latest
+        with metrics.command_metrics(args):
+            try:
+                stats, commit_id = commit_save(args.save_dir, args.repo, message, args.branch, **kwargs)
+            except (OSError, RuntimeError) as e:
+                print(f"Commit failed: {e}")
+                return
+            print(time.strftime('%H:%M:%S'), "Translated", stats.summary())
+            print(f"Committed {commit_id}" if commit_id else "Nothing to commit")
+
+    def commit_changes(changed):
+        message = f"Autosave: {len(changed)} changed file{'s' if len(changed) != 1 else ''}\n\n"
+        commit(message + '\n'.join(changed[:50]) + ('\n...' if len(changed) > 50 else ''))
+
+    # Bring the repository up to date before waiting for changes
+    commit("Autosave: initial state")
+    watcher = SaveWatcher(args.save_dir, commit_changes, args.debounce, args.min_interval, args.poll,
+                          args.poll_interval)
+    print(f"Watching {args.save_dir}; press Ctrl+C to stop")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
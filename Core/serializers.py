@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+import io
+import os
+import json
+import mmap
+import struct
+
+import nbtlib
+
+from Core import metrics
+from Core.defaultNbtParser import iter_json_text, nbt_to_json_serializable
+
+# Binary snapshots start with this magic, then a one byte version, the
+# big-endian length of a JSON header and the header itself. The rest of the
+# file is the uncompressed big-endian NBT of the tree, so a snapshot can be
+# memory-mapped and read in place with Core/lazyNbt.py.
+SNAPSHOT_MAGIC = b'PGMCSNAP'
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_PREFIX = struct.Struct('>8sBI')
+
+
+class Serializer:
+    """
+    One output format of a translation.
+
+    encode() returns the bytes of a whole tree. Text formats that can be
+    produced piece by piece also implement iter_text(), which
+    save_nbt_to_text() streams to disk. decode() reads encoded bytes back,
+    into nbtlib tags for the lossless formats and plain Python values for
+    the others. `header` holds extra fields, such as the source format or
+    chunk timestamp, that only the lossless formats keep; build-save
+    compiles those back, see load_translation().
+    """
+    name = None
+    extension = '.json'
+    binary = False
+    lossless = False
+
+    def iter_text(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        return None
+
+    def encode(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        return ''.join(self.iter_text(nbt_data, header, array_mode, sort_keys)).encode('utf-8')
+
+    def decode(self, data):
+        """
+        Return (header, tree) for bytes written by encode().
+        """
+        raise ValueError(f"The {self.name} format cannot be read back")
+
+
+class PrettyJsonSerializer(Serializer):
+    """
+    The readable indented JSON, streamed as the tree is walked.
+    """
+    name = 'json'
+
+    def iter_text(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        return iter_json_text(nbt_data, array_mode=array_mode, sort_keys=sort_keys)
+
+    def decode(self, data):
+        return {}, json.loads(data)
+
+
+class CompactJsonSerializer(Serializer):
+    """
+    The same values as 'json' on a single line, encoded by the C encoder.
+    """
+    name = 'compact-json'
+
+    def encode(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        with metrics.stage('convert'):
+            values = nbt_to_json_serializable(nbt_data, array_mode)
+        return json.dumps(values, separators=(',', ':'), sort_keys=sort_keys).encode('utf-8')
+
+    def decode(self, data):
+        return {}, json.loads(data)
+
+
+class TypedSerializer(Serializer):
+    """
+    The typed JSON build-save compiles back, see Core/typedNbt.py.
+    """
+    name = 'typed'
+    lossless = True
+
+    def iter_text(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        from Core.typedNbt import iter_typed_text
+        return iter_typed_text(nbt_data, header, array_mode=array_mode, sort_keys=sort_keys)
+
+    def decode(self, data):
+        from Core.typedNbt import document_to_nbt
+        return document_to_nbt(json.loads(data))
+
+
+def _writable(tag):
+    """
+    Return a tree nbtlib can write: values masked by Core/volatileFields.py
+    become the default of their type, their real value being in the sidecar.
+    Only containers holding a masked value are copied.
+    """
+    if isinstance(tag, nbtlib.tag.Compound):
+        changed = None
+        for key, child in tag.items():
+            if isinstance(child, (nbtlib.tag.Compound, nbtlib.tag.List)):
+                new = _writable(child)
+            elif isinstance(child, dict):
+                from Core.typedNbt import TAG_CLASSES
+                new = TAG_CLASSES[child['type']]()
+            else:
+                continue
+            if new is not child:
+                if changed is None:
+                    changed = type(tag)(tag)
+                    if isinstance(tag, nbtlib.File):
+                        changed.root_name = tag.root_name
+                changed[key] = new
+        return tag if changed is None else changed
+    if isinstance(tag, nbtlib.tag.List) and tag.subtype in (nbtlib.tag.Compound, nbtlib.tag.List):
+        items = [_writable(item) for item in tag]
+        if any(new is not old for new, old in zip(items, tag)):
+            return nbtlib.tag.List[tag.subtype](items)
+    return tag
+
+
+class SnbtSerializer(Serializer):
+    """
+    Minecraft's own stringified NBT, as used by commands and data packs.
+    decode() gives the tags back, but SNBT has no room for the header, so
+    the source format and chunk timestamps are lost and build-save cannot
+    compile it back.
+    """
+    name = 'snbt'
+    extension = '.snbt'
+
+    def encode(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        tag = _writable(nbt_data)
+        if sort_keys:
+            tag = _sorted(tag)
+        return nbtlib.serialize_tag(tag, indent=2).encode('utf-8')
+
+    def decode(self, data):
+        return {}, nbtlib.parse_nbt(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+
+def _sorted(tag):
+    if isinstance(tag, nbtlib.tag.Compound):
+        return nbtlib.tag.Compound({key: _sorted(tag[key]) for key in sorted(tag)})
+    if isinstance(tag, nbtlib.tag.List) and tag.subtype in (nbtlib.tag.Compound, nbtlib.tag.List):
+        return nbtlib.tag.List[tag.subtype]([_sorted(item) for item in tag])
+    return tag
+
+
+class BinarySerializer(Serializer):
+    """
+    A compact snapshot: a small JSON header then uncompressed NBT, whose
+    strings and arrays are length-prefixed and can be skipped without being
+    read. See open_snapshot() for reading one without parsing it.
+    """
+    name = 'binary'
+    extension = '.nbtsnap'
+    binary = True
+    lossless = True
+
+    def encode(self, nbt_data, header=None, array_mode='list', sort_keys=False):
+        tag = _writable(nbt_data)
+        if sort_keys:
+            tag = _sorted(tag)
+        if not isinstance(tag, nbtlib.File):
+            tag = nbtlib.File(tag, root_name=getattr(nbt_data, 'root_name', ''))
+        header_bytes = json.dumps(header or {}, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        buffer = io.BytesIO()
+        buffer.write(_SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        buffer.write(header_bytes)
+        tag.write(buffer)
+        return buffer.getvalue()
+
+    def decode(self, data):
+        header, offset = read_snapshot_header(data)
+        nbt_file = nbtlib.File.parse(io.BytesIO(memoryview(data)[offset:]))
+        return header, nbt_file
+
+
+def read_snapshot_header(data):
+    """
+    Return (header, payload offset) of binary snapshot bytes.
+    """
+    if len(data) < _SNAPSHOT_PREFIX.size:
+        raise ValueError("Not a binary snapshot: file too short")
+    magic, version, length = _SNAPSHOT_PREFIX.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a binary snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+    start = _SNAPSHOT_PREFIX.size
+    return json.loads(bytes(data[start:start + length])), start + length
+
+
+def open_snapshot(filepath):
+    """
+    Memory-map a binary snapshot. Returns (header, LazyNbt); nothing but the
+    header is read until fields are looked up. The map stays open as long as
+    the reader is alive.
+    """
+    from Core.lazyNbt import LazyNbt
+    with open(filepath, 'rb') as f:
+        region = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header, offset = read_snapshot_header(region)
+    return header, LazyNbt(memoryview(region)[offset:])
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in (
+    PrettyJsonSerializer(), CompactJsonSerializer(), TypedSerializer(), SnbtSerializer(),
+    BinarySerializer())}
+
+
+# Extensions of every translated file, and of the ones build-save reads back
+EXTENSIONS = tuple(sorted({serializer.extension for serializer in SERIALIZERS.values()}))
+LOSSLESS_EXTENSIONS = tuple(sorted({serializer.extension for serializer in SERIALIZERS.values()
+                                    if serializer.lossless}))
+
+
+def get_serializer(output_format):
+    try:
+        return SERIALIZERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {output_format}") from None
+
+
+def translation_serializer(path):
+    """
+    Return the lossless serializer a translated file is read back with:
+    typed for .json files, binary for snapshots. Raises ValueError for the
+    other formats, whose files cannot be compiled back.
+    """
+    for serializer in SERIALIZERS.values():
+        if serializer.lossless and path.endswith(serializer.extension):
+            return serializer
+    raise ValueError(f"{os.path.basename(path)} is not in a format that can be read back; "
+                     f"translate the save with --format typed or binary")
+
+
+def load_translation(path):
+    """
+    Load a translated file written in a lossless format. Returns (header, nbtlib.File).
+    """
+    serializer = translation_serializer(path)
+    with open(path, 'rb') as f:
+        return serializer.decode(f.read())
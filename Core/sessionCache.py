@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+
+SESSION_NAME = 'session.json'
+SESSION_VERSION = 1
+
+# Overrides the folder of the session, for portable installs and benchmarks
+CONFIG_DIR_VARIABLE = 'PYGITMC_CONFIG_DIR'
+
+
+def default_config_dir():
+    """
+    Return the per-user folder of the GUI's session.
+    """
+    if os.environ.get(CONFIG_DIR_VARIABLE):
+        return os.environ[CONFIG_DIR_VARIABLE]
+    if sys.platform.startswith('win'):
+        base = os.environ.get('APPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Application Support')
+    else:
+        base = os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, 'pygitmc')
+
+
+class Session:
+    """
+    What the GUI showed when it was last closed, so the next start can show
+    it at once and check it in the background.
+
+    `saves` holds the [name, path, last_modified] of the worlds found in the
+    saves folder and `added_saves` the paths of those added by hand.
+    `details` maps a save path to what was last read about its repository:
+    'last_commit' ([subject, timestamp]), 'commits' and 'tracked' (the
+    manifest's [files, chunks]).
+    """
+    def __init__(self, path, data=None):
+        data = data or {}
+        self.path = path
+        self.minecraft_dir = data.get('minecraft_dir')
+        self.current_save = data.get('current_save')
+        self.saves = data.get('saves', [])
+        self.added_saves = data.get('added_saves', [])
+        self.details = data.get('details', {})
+
+    @classmethod
+    def load(cls, config_dir=None):
+        path = os.path.join(config_dir or default_config_dir(), SESSION_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable session {path}: {e}")
+            return cls(path)
+        if not isinstance(data, dict) or data.get('version') != SESSION_VERSION:
+            return cls(path)
+        return cls(path, data)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SESSION_VERSION, 'minecraft_dir': self.minecraft_dir,
+                       'current_save': self.current_save, 'saves': self.saves,
+                       'added_saves': self.added_saves, 'details': self.details}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def save_details(self, save_dir):
+        return self.details.setdefault(save_dir, {})
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic world folders for benchmarks and tests.
+
+Writes a level.dat, playerdata files, region files with block entities,
+entity region files and Bedrock .mcstructure files. The output only depends
+on the seed, so two runs with the same options produce byte-identical worlds.
+"""
+import io
+import os
+import zlib
+import random
+import struct
+
+import nbtlib
+
+ENTITY_TYPES = ('minecraft:villager', 'minecraft:zombie', 'minecraft:cow', 'minecraft:item',
+                'minecraft:armor_stand')
+BLOCK_ENTITY_TYPES = ('minecraft:chest', 'minecraft:furnace', 'minecraft:sign', 'minecraft:hopper')
+VILLAGER_NAMES = ('Alice', 'Bob', 'Carol', 'Dave', 'Eve')
+
+
+def build_chunk(x, z, rng, sections=24, block_entities=1):
+    """
+    Return a chunk compound. The first block entity is a chest at the chunk
+    corner; further ones are placed at random.
+    """
+    chunk = nbtlib.File({
+        'xPos': nbtlib.Int(x),
+        'zPos': nbtlib.Int(z),
+        'LastUpdate': nbtlib.Long(0),
+        'sections': nbtlib.List[nbtlib.Compound]([
+            nbtlib.Compound({
+                'Y': nbtlib.Byte(y),
+                'block_states': nbtlib.Compound({
+                    'palette': nbtlib.List[nbtlib.Compound]([
+                        nbtlib.Compound({'Name': nbtlib.String(name)})
+                        for name in ('minecraft:stone', 'minecraft:dirt', 'minecraft:air')
+                    ]),
+                    'data': nbtlib.LongArray([rng.getrandbits(63) for _ in range(64)]),
+                }),
+            })
+            for y in range(-4, sections - 4)
+        ]),
+        'block_entities': nbtlib.List[nbtlib.Compound]([
+            nbtlib.Compound({'id': nbtlib.String('minecraft:chest'), 'x': nbtlib.Int(x * 16),
+                             'y': nbtlib.Int(64), 'z': nbtlib.Int(z * 16)})
+        ][:block_entities]),
+    })
+    for _ in range(block_entities - 1):
+        chunk['block_entities'].append(build_block_entity(rng, x, z))
+    return chunk
+
+
+def build_block_entity(rng, chunk_x, chunk_z):
+    block_id = rng.choice(BLOCK_ENTITY_TYPES)
+    block_entity = nbtlib.Compound({
+        'id': nbtlib.String(block_id),
+        'x': nbtlib.Int(chunk_x * 16 + rng.randrange(16)),
+        'y': nbtlib.Int(rng.randrange(-64, 320)),
+        'z': nbtlib.Int(chunk_z * 16 + rng.randrange(16)),
+    })
+    if block_id in ('minecraft:chest', 'minecraft:hopper'):
+        block_entity['Items'] = build_items(rng, rng.randrange(28))
+    return block_entity
+
+
+def build_items(rng, count):
+    return nbtlib.List[nbtlib.Compound]([
+        nbtlib.Compound({
+            'Slot': nbtlib.Byte(slot),
+            'id': nbtlib.String(f"minecraft:item_{rng.randrange(1000)}"),
+            'Count': nbtlib.Byte(rng.randrange(1, 65)),
+        })
+        for slot in range(count)
+    ])
+
+
+def build_uuid(rng):
+    return nbtlib.IntArray([rng.getrandbits(32) - 2 ** 31 for _ in range(4)])
+
+
+def build_entity(rng, chunk_x, chunk_z):
+    entity_id = rng.choice(ENTITY_TYPES)
+    entity = nbtlib.Compound({
+        'id': nbtlib.String(entity_id),
+        'UUID': build_uuid(rng),
+        'Pos': nbtlib.List[nbtlib.Double]([chunk_x * 16 + rng.uniform(0, 16), rng.uniform(-64, 320),
+                                           chunk_z * 16 + rng.uniform(0, 16)]),
+        'Motion': nbtlib.List[nbtlib.Double]([0.0, -0.0784, 0.0]),
+        'Rotation': nbtlib.List[nbtlib.Float]([rng.uniform(0, 360), 0.0]),
+        'Health': nbtlib.Float(rng.uniform(1, 20)),
+        'OnGround': nbtlib.Byte(1),
+    })
+    if entity_id == 'minecraft:villager':
+        entity['CustomName'] = nbtlib.String('{"text":"%s"}' % rng.choice(VILLAGER_NAMES))
+        entity['Inventory'] = build_items(rng, rng.randrange(8))
+    elif entity_id == 'minecraft:item':
+        entity['Item'] = build_items(rng, 1)[0]
+    return entity
+
+
+def build_entity_chunk(x, z, rng, count):
+    return nbtlib.File({
+        'Position': nbtlib.IntArray([x, z]),
+        'Entities': nbtlib.List[nbtlib.Compound]([build_entity(rng, x, z) for _ in range(count)]),
+    })
+
+
+def build_player(rng, inventory=36):
+    """
+    Return a player compound, as stored in a playerdata file or as the
+    singleplayer player in level.dat.
+    """
+    return nbtlib.Compound({
+        'UUID': build_uuid(rng),
+        'Pos': nbtlib.List[nbtlib.Double]([rng.uniform(-1e4, 1e4), rng.uniform(-64, 320),
+                                           rng.uniform(-1e4, 1e4)]),
+        'Dimension': nbtlib.String('minecraft:overworld'),
+        'Health': nbtlib.Float(rng.uniform(0, 20)),
+        'Inventory': build_items(rng, inventory),
+        'EnderItems': build_items(rng, 27),
+        'recipeBook': nbtlib.Compound({
+            'recipes': nbtlib.List[nbtlib.String]([f"minecraft:recipe_{i}" for i in range(400)]),
+        }),
+    })
+
+
+def build_structure(rng, size=16):
+    """
+    Return a Bedrock structure of size**3 blocks, with one entity.
+    """
+    volume = size ** 3
+    return nbtlib.File({
+        'format_version': nbtlib.Int(1),
+        'size': nbtlib.List[nbtlib.Int]([size, size, size]),
+        'structure': nbtlib.Compound({
+            'block_indices': nbtlib.List[nbtlib.List[nbtlib.Int]]([
+                nbtlib.List[nbtlib.Int]([rng.randrange(4) for _ in range(volume)]),
+                nbtlib.List[nbtlib.Int]([-1] * volume),
+            ]),
+            'entities': nbtlib.List[nbtlib.Compound]([build_entity(rng, 0, 0)]),
+            'palette': nbtlib.Compound({'default': nbtlib.Compound({
+                'block_palette': nbtlib.List[nbtlib.Compound]([
+                    nbtlib.Compound({'name': nbtlib.String(name), 'version': nbtlib.Int(17959425)})
+                    for name in ('minecraft:stone', 'minecraft:dirt', 'minecraft:air', 'minecraft:glass')
+                ]),
+                'block_position_data': nbtlib.Compound(),
+            })}),
+        }),
+        'structure_world_origin': nbtlib.List[nbtlib.Int]([0, 64, 0]),
+    })
+
+
+def write_region(path, chunks):
+    """
+    Write {(x, z): (timestamp, nbt)} as a region file.
+    """
+    table = bytearray(8192)
+    body = bytearray()
+    sector = 2
+    for (x, z), (timestamp, chunk) in sorted(chunks.items()):
+        buffer = io.BytesIO()
+        chunk.write(buffer)
+        payload = zlib.compress(buffer.getvalue())
+        blob = struct.pack('>IB', len(payload) + 1, 2) + payload
+        count = -(-len(blob) // 4096)
+        blob += b'\0' * (count * 4096 - len(blob))
+        index = (x & 31) + (z & 31) * 32
+        struct.pack_into('>I', table, index * 4, sector << 8 | count)
+        struct.pack_into('>i', table, 4096 + index * 4, timestamp)
+        body += blob
+        sector += count
+    with open(path, 'wb') as f:
+        f.write(table + body)
+
+
+def write_level(path, tick, player=None):
+    data = nbtlib.Compound({
+        'LevelName': nbtlib.String('bench'),
+        'Time': nbtlib.Long(tick),
+        'DayTime': nbtlib.Long(tick % 24000),
+    })
+    if player is not None:
+        data['Player'] = player
+    nbtlib.File({'Data': data}, gzipped=True).save(path)
+
+
+def region_chunks(regions, chunks):
+    """
+    Return {(region_x, 0): [(chunk_x, chunk_z)]}, filling each region in
+    header order with `chunks` chunks.
+    """
+    layout = {}
+    for region_x in range(regions):
+        layout[region_x, 0] = [(region_x * 32 + index % 32, index // 32) for index in range(chunks)]
+    return layout
+
+
+def generate_world(path, regions=1, chunks=1024, sections=24, entities=2.0, block_entities=1,
+                   players=4, structures=2, structure_size=16, seed=0):
+    """
+    Write a synthetic world folder. `entities` is the average number of
+    entities per chunk. Returns {kind: (files, bytes)} of what was written.
+    """
+    rng = random.Random(seed)
+    chunks = max(0, min(chunks, 1024))
+    written = {}
+
+    def count(kind, filepath):
+        files, size = written.get(kind, (0, 0))
+        written[kind] = (files + 1, size + os.path.getsize(filepath))
+
+    for folder in ('region', 'entities', 'playerdata', 'structures'):
+        os.makedirs(os.path.join(path, folder), exist_ok=True)
+    write_level(os.path.join(path, 'level.dat'), rng.randrange(10 ** 6), build_player(rng))
+    count('level', os.path.join(path, 'level.dat'))
+
+    for (region_x, region_z), coords in region_chunks(regions, chunks).items():
+        name = f"r.{region_x}.{region_z}.mca"
+        terrain = {(x, z): (1, build_chunk(x, z, rng, sections, block_entities)) for x, z in coords}
+        write_region(os.path.join(path, 'region', name), terrain)
+        count('region', os.path.join(path, 'region', name))
+        whole, fraction = int(entities), entities - int(entities)
+        mobs = {(x, z): (1, build_entity_chunk(x, z, rng, whole + (rng.random() < fraction)))
+                for x, z in coords}
+        write_region(os.path.join(path, 'entities', name), mobs)
+        count('entities', os.path.join(path, 'entities', name))
+
+    for _ in range(players):
+        player = build_player(rng)
+        uuid = b''.join(int(part).to_bytes(4, 'big', signed=True) for part in player['UUID']).hex()
+        filepath = os.path.join(path, 'playerdata',
+                                f"{uuid[:8]}-{uuid[8:12]}-{uuid[12:16]}-{uuid[16:20]}-{uuid[20:]}.dat")
+        nbtlib.File(player).save(filepath, gzipped=True)
+        count('playerdata', filepath)
+
+    for index in range(structures):
+        filepath = os.path.join(path, 'structures', f"structure_{index}.mcstructure")
+        build_structure(rng, structure_size).save(filepath, gzipped=False, byteorder='little')
+        count('structures', filepath)
+    return written
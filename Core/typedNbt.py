@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import json
+import functools
+
+import nbtlib
+
+from Core.defaultNbtParser import (iter_json_pieces, encode_array, decode_array,
+                                   _json_scalar, _ARRAY_TAGS)
+
+# Version of the typed document layout written by iter_typed_text()
+TYPED_VERSION = 1
+
+TAG_NAMES = {
+    nbtlib.tag.End.tag_id: 'end',
+    nbtlib.tag.Byte.tag_id: 'byte',
+    nbtlib.tag.Short.tag_id: 'short',
+    nbtlib.tag.Int.tag_id: 'int',
+    nbtlib.tag.Long.tag_id: 'long',
+    nbtlib.tag.Float.tag_id: 'float',
+    nbtlib.tag.Double.tag_id: 'double',
+    nbtlib.tag.ByteArray.tag_id: 'byte_array',
+    nbtlib.tag.String.tag_id: 'string',
+    nbtlib.tag.List.tag_id: 'list',
+    nbtlib.tag.Compound.tag_id: 'compound',
+    nbtlib.tag.IntArray.tag_id: 'int_array',
+    nbtlib.tag.LongArray.tag_id: 'long_array',
+}
+
+TAG_CLASSES = {
+    'end': nbtlib.tag.End,
+    'byte': nbtlib.tag.Byte,
+    'short': nbtlib.tag.Short,
+    'int': nbtlib.tag.Int,
+    'long': nbtlib.tag.Long,
+    'float': nbtlib.tag.Float,
+    'double': nbtlib.tag.Double,
+    'byte_array': nbtlib.tag.ByteArray,
+    'string': nbtlib.tag.String,
+    'list': nbtlib.tag.List,
+    'compound': nbtlib.tag.Compound,
+    'int_array': nbtlib.tag.IntArray,
+    'long_array': nbtlib.tag.LongArray,
+}
+
+_ARRAY_NAMES = ('byte_array', 'int_array', 'long_array')
+
+_COMPOUND_ID = nbtlib.tag.Compound.tag_id
+_LIST_ID = nbtlib.tag.List.tag_id
+
+# The typed format keeps every tag type so a translated file can be compiled
+# back into the exact NBT it came from:
+#
+#   node     {"type": "int", "value": 5}                      (one line)
+#            {"type": "long_array", "base64": "..."}          (one line)
+#            {"type": "compound", "value": {key: node, ...}}
+#            {"type": "list", "items": "double", "value": [element, ...]}
+#            {"type": "long", "masked": true}                 (value kept elsewhere)
+#   element  the bare value of a list item, whose type is given by "items":
+#            a number or string, an array node, {key: node, ...} for
+#            compounds and {"items": ..., "value": [...]} for nested lists
+#
+# A document is {"version": 1, ...header..., "root": {key: node, ...}}.
+
+
+def tag_name(tag_class):
+    return TAG_NAMES[tag_class.tag_id]
+
+
+def _array_node(tag, array_mode):
+    if array_mode == 'list':
+        return {'type': tag_name(type(tag)), 'value': tag.tolist()}
+    return encode_array(tag, array_mode)
+
+
+def _leaf_node(tag, array_mode):
+    """
+    Encode a scalar or array node on a single line.
+    """
+    if isinstance(tag, _ARRAY_TAGS):
+        return json.dumps(_array_node(tag, array_mode))
+    return '{"type": "' + TAG_NAMES[tag.tag_id] + '", "value": ' + _json_scalar(tag) + '}'
+
+
+class RawNode(dict):
+    """
+    An already encoded node placed in a tree in place of a tag, written out
+    as is. The canonical layout uses it for references to split-out files.
+    """
+    tag_id = None
+
+
+def _compound_items(tag, sort_keys):
+    items = sorted(tag.items()) if sort_keys else tag.items()
+    return ((key, ('node', child)) for key, child in items)
+
+
+def _typed_expand(value, width, indent, array_mode='base64', sort_keys=False):
+    """
+    Expand values for iter_json_pieces() into the typed format.
+
+    Tags are wrapped in (kind, tag) tuples telling whether they are written as
+    a node, as the payload of a compound/list node, or as a list element.
+    """
+    if isinstance(value, dict):
+        return True, iter(value.items())
+    if isinstance(value, list):
+        return False, iter(value)
+    if not isinstance(value, tuple):
+        return _json_scalar(value)
+
+    kind, tag = value
+    tag_id = tag.tag_id
+    if isinstance(tag, RawNode):
+        return True, iter(tag.items())
+    if kind == 'node':
+        if tag_id == _COMPOUND_ID:
+            return True, iter((('type', 'compound'), ('value', ('payload', tag))))
+        if tag_id == _LIST_ID:
+            return True, iter((('type', 'list'), ('items', tag_name(tag.subtype)),
+                               ('value', ('payload', tag))))
+        return _leaf_node(tag, array_mode)
+
+    if kind == 'payload':
+        if tag_id == _COMPOUND_ID:
+            return True, _compound_items(tag, sort_keys)
+        return False, (('element', item) for item in tag)
+
+    # List element: its type is already known from the list's "items"
+    if tag_id == _COMPOUND_ID:
+        return True, _compound_items(tag, sort_keys)
+    if tag_id == _LIST_ID:
+        return True, iter((('items', tag_name(tag.subtype)), ('value', ('payload', tag))))
+    if isinstance(tag, _ARRAY_TAGS):
+        return json.dumps(_array_node(tag, array_mode))
+    return _json_scalar(tag)
+
+
+def iter_typed_text(nbt_data, header=None, indent=2, array_mode='base64', sort_keys=False):
+    """
+    Yield the typed JSON document of an NBT tree piece by piece.
+
+    `header` holds extra top-level fields, such as the file format or the
+    chunk timestamp, that are needed to rebuild the original file.
+    """
+    document = {'version': TYPED_VERSION, 'name': getattr(nbt_data, 'root_name', '')}
+    document.update(header or {})
+    document['root'] = ('payload', nbt_data)
+    expand = functools.partial(_typed_expand, array_mode=array_mode, sort_keys=sort_keys)
+    return iter_json_pieces(document, expand, indent)
+
+
+def iter_typed_node_text(tag, indent=2, array_mode='base64', sort_keys=False):
+    """
+    Yield the typed JSON of a single node, without a document header.
+    """
+    expand = functools.partial(_typed_expand, array_mode=array_mode, sort_keys=sort_keys)
+    return iter_json_pieces(('node', tag), expand, indent)
+
+
+def _list_from_values(items, values):
+    if items == 'end':
+        return nbtlib.tag.List([])
+    return nbtlib.tag.List[TAG_CLASSES[items]]([element_to_tag(items, value) for value in values])
+
+
+def _compound_from_payload(payload):
+    return nbtlib.tag.Compound({key: node_to_tag(node) for key, node in payload.items()})
+
+
+def node_to_tag(node):
+    """
+    Rebuild the tag described by a typed node.
+    """
+    name = node['type']
+    if node.get('masked'):
+        # Volatile field left out of the translation; see Core.volatileFields
+        if name == 'list':
+            return _list_from_values(node['items'], [])
+        return TAG_CLASSES[name]()
+    if name == 'compound':
+        return _compound_from_payload(node['value'])
+    if name == 'list':
+        return _list_from_values(node['items'], node['value'])
+    if name in _ARRAY_NAMES:
+        return decode_array(node)
+    return TAG_CLASSES[name](node['value'])
+
+
+def element_to_tag(name, value):
+    """
+    Rebuild a list element whose type is `name`.
+    """
+    if name == 'compound':
+        return _compound_from_payload(value)
+    if name == 'list':
+        return _list_from_values(value['items'], value['value'])
+    if name in _ARRAY_NAMES:
+        return decode_array(value)
+    return TAG_CLASSES[name](value)
+
+
+def is_typed_document(document):
+    return isinstance(document, dict) and 'version' in document and 'root' in document
+
+
+def document_to_nbt(document):
+    """
+    Split a typed document into (header, nbtlib.File).
+    """
+    if not is_typed_document(document):
+        raise ValueError("Not a typed translation; translate the save with --format typed")
+    if document['version'] != TYPED_VERSION:
+        raise ValueError(f"Unsupported typed format version: {document['version']}")
+    header = {key: value for key, value in document.items() if key not in ('version', 'name', 'root')}
+    nbt_file = nbtlib.File(_compound_from_payload(document['root']), root_name=document.get('name', ''))
+    return header, nbt_file
+
+
+def load_typed(filepath):
+    """
+    Load a typed translation file. Returns (header, nbtlib.File).
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return document_to_nbt(json.load(f))
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+
+import nbtlib
+
+from Core import metrics
+from Core.defaultNbtParser import write_if_changed
+from Core.typedNbt import RawNode, tag_name, iter_typed_text, load_typed
+
+# Fields that change on every tick or save without any player action. Rules
+# are dotted paths of compound keys; `*` matches any single key or list
+# index and `**` any number of levels.
+DEFAULT_RULES = (
+    'Data.Time',
+    'Data.DayTime',
+    'Data.LastPlayed',
+    'Data.WanderingTraderSpawnDelay',
+    'Data.WanderingTraderSpawnChance',
+    'LastUpdate',
+    'InhabitedTime',
+    'Level.LastUpdate',
+    'Level.InhabitedTime',
+    'Entities.*.Brain.memories',
+    'Level.Entities.*.Brain.memories',
+    'LastPlayed',
+    'currentTick',
+)
+
+# Masked values are kept out of the translation in a sidecar file next to it,
+# which the translated repository ignores.
+VOLATILE_SUFFIX = '.volatile'
+
+# Header field set on a translation whose masked values are in a sidecar, so
+# a build without the sidecar (from a clone, say) is refused rather than
+# silently writing default values
+MASKED_FIELD = 'volatile'
+
+
+def load_rules(path=None):
+    """
+    Return the masking rules from a JSON file holding a list of paths, or the
+    defaults when no file is given.
+    """
+    if path is None:
+        return list(DEFAULT_RULES)
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    if isinstance(rules, dict):
+        rules = rules.get('rules', [])
+    return [str(rule) for rule in rules]
+
+
+def compile_rules(rules):
+    return [tuple(rule.split('.')) for rule in rules]
+
+
+def _advance(states, rules, key):
+    """
+    Step every (rule, position) state over one path segment. Returns
+    (next states, whether a rule matched completely).
+    """
+    next_states = set()
+    matched = False
+    for index, position in states:
+        rule = rules[index]
+        candidates = [position]
+        # `**` may also match zero levels
+        while candidates:
+            position = candidates.pop()
+            if position >= len(rule):
+                continue
+            segment = rule[position]
+            if segment == '**':
+                next_states.add((index, position))
+                candidates.append(position + 1)
+            elif segment == '*' or segment == key:
+                if position + 1 == len(rule):
+                    matched = True
+                else:
+                    next_states.add((index, position + 1))
+    return next_states, matched
+
+
+def find_volatile(nbt_data, rules):
+    """
+    Return the paths (lists of keys and list indices) of every compound
+    value matched by the compiled `rules`.
+
+    Only the branches some rule can still match are visited.
+    """
+    found = []
+    stack = [(nbt_data, [], {(index, 0) for index in range(len(rules))})]
+    while stack:
+        node, path, states = stack.pop()
+        if isinstance(node, nbtlib.tag.Compound):
+            children = node.items()
+        elif isinstance(node, nbtlib.tag.List) and node.subtype in (nbtlib.tag.Compound, nbtlib.tag.List):
+            children = enumerate(node)
+        else:
+            continue
+        for key, child in children:
+            child_states, matched = _advance(states, rules, str(key))
+            if matched and isinstance(node, nbtlib.tag.Compound):
+                found.append(path + [key])
+            elif child_states:
+                stack.append((child, path + [key], child_states))
+    return found
+
+
+def _masked_node(tag):
+    node = RawNode(type=tag_name(type(tag)), masked=True)
+    if isinstance(tag, nbtlib.tag.List):
+        node['items'] = tag_name(tag.subtype)
+    return node
+
+
+def mask_volatile(nbt_data, rules):
+    """
+    Replace the values matched by `rules` with masked placeholder nodes.
+
+    Returns (masked tree, [(path, original tag)]). The original tree is not
+    modified; only the containers along masked paths are copied.
+    """
+    with metrics.stage('convert'):
+        paths = find_volatile(nbt_data, compile_rules(rules))
+        if not paths:
+            return nbt_data, []
+
+        copies = {}
+
+        def copy_of(container):
+            copied = copies.get(id(container))
+            if copied is None:
+                if isinstance(container, nbtlib.File):
+                    copied = nbtlib.File(container, root_name=container.root_name)
+                else:
+                    copied = type(container)(container)
+                copies[id(container)] = copied
+                copies[id(copied)] = copied
+            return copied
+
+        root = copy_of(nbt_data)
+        values = []
+        for path in paths:
+            node = root
+            for key in path[:-1]:
+                child = copy_of(node[key])
+                node[key] = child
+                node = child
+            values.append((path, node[path[-1]]))
+            node[path[-1]] = _masked_node(node[path[-1]])
+        return root, values
+
+
+def masked_hash(nbt_data):
+    """
+    Return the digest of a tree whose volatile values were masked by
+    mask_volatile(). A chunk or file that was only ticked hashes the same
+    as before, which lets the change detector skip it.
+    """
+    digest = hashlib.sha1()
+    for piece in iter_typed_text(nbt_data):
+        digest.update(piece.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def sidecar_path(output_path):
+    return output_path + VOLATILE_SUFFIX
+
+
+def render_volatile(values, header=None):
+    """
+    Return the sidecar bytes holding masked values and header fields such as
+    the chunk timestamp, or None when there is nothing to keep.
+    """
+    if not values and not header:
+        return None
+    store = nbtlib.tag.Compound({json.dumps(keys): tag for keys, tag in values})
+    return ''.join(iter_typed_text(store, header)).encode('utf-8')
+
+
+def write_sidecar(output_path, data):
+    """
+    Write rendered sidecar bytes next to `output_path`, removing a stale
+    sidecar when `data` is None.
+    """
+    path = sidecar_path(output_path)
+    if data is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    write_if_changed(path, data)
+
+
+def save_volatile(values, output_path, header=None):
+    """
+    Write masked values, and header fields such as the chunk timestamp, to
+    the sidecar of `output_path`. A stale sidecar is removed when there is
+    nothing to keep.
+    """
+    write_sidecar(output_path, render_volatile(values, header))
+
+
+def mark_masked(header):
+    """
+    Record in a translation's header that its masked values are in a sidecar.
+    """
+    header[MASKED_FIELD] = True
+    return header
+
+
+def restore_volatile(nbt_data, header, output_path, required=True):
+    """
+    Put the values saved by save_volatile() back into a rebuilt tree and its
+    header. Masked fields without a saved value keep the default the decoder
+    gave them. Returns the number of values restored.
+
+    A translation marked by mark_masked() whose sidecar is missing raises
+    ValueError, unless `required` is False.
+    """
+    masked = header.pop(MASKED_FIELD, False)
+    path = sidecar_path(output_path)
+    if not os.path.isfile(path):
+        if masked and required:
+            raise ValueError(f"{os.path.basename(path)} is missing, so the masked values of "
+                             f"{os.path.basename(output_path)} cannot be restored")
+        return 0
+    saved_header, store = load_typed(path)
+    header.update(saved_header)
+    restored = 0
+    for key, tag in store.items():
+        keys = json.loads(key)
+        node = nbt_data
+        try:
+            for part in keys[:-1]:
+                node = node[part]
+            if keys[-1] in node:
+                node[keys[-1]] = tag
+                restored += 1
+        except (KeyError, IndexError, TypeError):
+            continue
+    return restored
+
+
+def ensure_ignored(output_dir):
+    """
+    Make sure the translated repository does not track volatile sidecars.
+    """
+    path = os.path.join(output_dir, '.gitignore')
+    pattern = '*' + VOLATILE_SUFFIX
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if pattern in f.read().splitlines():
+                return
+    except FileNotFoundError:
+        pass
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(pattern + '\n')
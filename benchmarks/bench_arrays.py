@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare the ways array tags can be written to JSON.
+
+Builds a chunk-like tree dominated by block-state and heightmap LongArrays and
+times the original per-element conversion against the bulk list path and the
+compact base64/hex modes.
+
+Usage: python benchmarks/bench_arrays.py [--sections N] [--repeat N]
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbtlib
+from Core.defaultNbtParser import write_nbt_json, decode_array, ARRAY_MODES
+
+
+def build_chunk(sections, seed=0):
+    rng = random.Random(seed)
+    return nbtlib.Compound({
+        'Heightmaps': nbtlib.Compound({
+            name: nbtlib.LongArray([rng.getrandbits(63) for _ in range(37)])
+            for name in ('MOTION_BLOCKING', 'OCEAN_FLOOR', 'WORLD_SURFACE')
+        }),
+        'sections': nbtlib.List[nbtlib.Compound]([
+            nbtlib.Compound({
+                'Y': nbtlib.Byte(y - 4),
+                'block_states': nbtlib.Compound({
+                    'data': nbtlib.LongArray([rng.getrandbits(63) for _ in range(256)]),
+                }),
+                'BlockLight': nbtlib.ByteArray([rng.randrange(-128, 128) for _ in range(2048)]),
+            })
+            for y in range(sections)
+        ]),
+    })
+
+
+def per_element(nbt_data):
+    """
+    The conversion used before arrays were encoded in bulk.
+    """
+    if isinstance(nbt_data, (nbtlib.tag.IntArray, nbtlib.tag.ByteArray, nbtlib.tag.LongArray)):
+        return [i for i in nbt_data]
+    if isinstance(nbt_data, nbtlib.tag.List):
+        return [per_element(item) for item in nbt_data]
+    if isinstance(nbt_data, nbtlib.tag.Compound):
+        return {k: per_element(v) for k, v in nbt_data.items()}
+    return nbt_data.real if isinstance(nbt_data, (int, float)) else nbt_data
+
+
+def best_of(repeat, function):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sections', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    chunk = build_chunk(args.sections)
+
+    elapsed, baseline = best_of(args.repeat, lambda: json.dumps(per_element(chunk), indent=2))
+    print(f"{'per-element':12} {elapsed * 1000:8.1f} ms {len(baseline):10d} chars")
+
+    for mode in ARRAY_MODES:
+        def encode():
+            out = io.StringIO()
+            write_nbt_json(chunk, out, array_mode=mode)
+            return out.getvalue()
+        elapsed, text = best_of(args.repeat, encode)
+        print(f"{mode:12} {elapsed * 1000:8.1f} ms {len(text):10d} chars")
+        if mode == 'list':
+            assert text == baseline, "bulk list output differs from the per-element output"
+        else:
+            data = json.loads(text)
+            original = chunk['sections'][0]['block_states']['data']
+            restored = decode_array(data['sections'][0]['block_states']['data'])
+            assert type(restored) is type(original) and restored.tolist() == original.tolist()
+
+
+if __name__ == '__main__':
+    main()
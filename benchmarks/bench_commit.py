@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare the two ways of committing a translated world.
+
+"worktree" translates into the repository's working tree and runs
+`git add -A` and `git commit`; "fast-import" streams the translations into
+`git fast-import` with commit-save. Both start with a full commit of a
+synthetic world and then commit a series of small edits.
+
+Usage: python benchmarks/bench_commit.py [--chunks N] [--edits N] [--canonical] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbtlib
+from Core.savePipeline import translate_save
+from Core.gitFastImport import commit_save
+from synthetic import build_chunk, write_region, write_level
+from bench_git_layout import git, commit_all
+
+
+def commit_worktree(world, repo, options, message):
+    translate_save(world, repo, **options)
+    if not os.path.isdir(os.path.join(repo, '.git')):
+        git(repo, 'init', '-q')
+    commit_all(repo, message)
+
+
+def commit_fast_import(world, repo, options, message):
+    commit_save(world, repo, message, **options)
+
+
+METHODS = {
+    'worktree': commit_worktree,
+    'fast-import': commit_fast_import,
+}
+
+
+def run_method(name, commit, world, repo, chunks, edits, options, rng):
+    start = time.perf_counter()
+    commit(world, repo, options, 'initial')
+    initial = time.perf_counter() - start
+
+    times = []
+    for step in range(edits):
+        key = rng.choice(sorted(chunks))
+        timestamp, chunk = chunks[key]
+        data = chunk['sections'][rng.randrange(len(chunk['sections']))]['block_states']['data']
+        data[rng.randrange(len(data))] = nbtlib.Long(rng.getrandbits(63))
+        chunks[key] = (timestamp + 1, chunk)
+        write_region(os.path.join(world, 'region', 'r.0.0.mca'), chunks)
+        write_level(os.path.join(world, 'level.dat'), 1000 + step)
+        start = time.perf_counter()
+        commit(world, repo, options, f'edit {step}')
+        times.append(time.perf_counter() - start)
+
+    return {
+        'method': name,
+        'initial_ms': 1000 * initial,
+        'edit_ms': 1000 * sum(times) / len(times) if times else 0.0,
+        'commits': int(git(repo, 'rev-list', '--count', 'HEAD')),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=256)
+    parser.add_argument('--edits', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--canonical', action='store_true', help="use the canonical layout")
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    if shutil.which('git') is None:
+        print("git is required for this benchmark")
+        return 1
+
+    options = {'jobs': args.jobs, 'output_format': 'typed', 'array_mode': 'base64',
+               'layout': 'canonical' if args.canonical else 'file'}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, commit in METHODS.items():
+            rng = random.Random(args.seed)
+            world = os.path.join(tmp, name, 'world')
+            repo = os.path.join(tmp, name, 'repo')
+            os.makedirs(os.path.join(world, 'region'))
+            os.makedirs(repo)
+            side = max(1, int(args.chunks ** 0.5))
+            chunks = {(i % side, i // side): (1, build_chunk(i % side, i // side, rng))
+                      for i in range(args.chunks)}
+            write_region(os.path.join(world, 'region', 'r.0.0.mca'), chunks)
+            write_level(os.path.join(world, 'level.dat'), 0)
+            results.append(run_method(name, commit, world, repo, chunks, args.edits, options, rng))
+
+    print(f"{'method':12} {'initial ms':>11} {'edit ms':>10} {'commits':>8}")
+    for result in results:
+        print(f"{result['method']:12} {result['initial_ms']:11.1f} {result['edit_ms']:10.1f} "
+              f"{result['commits']:8d}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Measure how translation layouts behave under git.
+
+Generates a synthetic world, translates it with each layout into its own git
+repository and then applies a scripted series of small world edits (one
+changed block and a ticking level.dat per step). For every layout it reports
+the commit time, `git diff` time and the final `.git` pack size.
+
+Usage: python benchmarks/bench_git_layout.py [--chunks N] [--edits N] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbtlib
+from Core.savePipeline import translate_save
+from synthetic import build_chunk, write_region, write_level
+
+LAYOUTS = {
+    'json': {'output_format': 'json', 'layout': 'file'},
+    'typed': {'output_format': 'typed', 'layout': 'file', 'array_mode': 'base64'},
+    'canonical': {'layout': 'canonical', 'array_mode': 'base64'},
+}
+
+
+def git(repo, *args):
+    return subprocess.run(['git', '-C', repo] + list(args), check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def commit_all(repo, message):
+    git(repo, 'add', '-A')
+    git(repo, '-c', 'user.name=bench', '-c', 'user.email=bench@localhost',
+        'commit', '-q', '--no-gpg-sign', '-m', message)
+
+
+def pack_size(repo):
+    git(repo, 'gc', '-q')
+    for line in git(repo, 'count-objects', '-v').decode().splitlines():
+        key, _, value = line.partition(': ')
+        if key == 'size-pack':
+            return int(value) * 1024
+    return 0
+
+
+def run_layout(name, options, world, repo, chunks, edits, rng):
+    translate_save(world, repo, jobs=1, **options)
+    git(repo, 'init', '-q')
+    commit_all(repo, 'initial')
+
+    commit_times = []
+    diff_times = []
+    for step in range(edits):
+        # Flip one long in one section of one chunk, as placing a block would
+        key = rng.choice(sorted(chunks))
+        timestamp, chunk = chunks[key]
+        data = chunk['sections'][rng.randrange(len(chunk['sections']))]['block_states']['data']
+        data[rng.randrange(len(data))] = nbtlib.Long(rng.getrandbits(63))
+        chunks[key] = (timestamp + 1, chunk)
+        write_region(os.path.join(world, 'region', 'r.0.0.mca'), chunks)
+        write_level(os.path.join(world, 'level.dat'), 1000 + step)
+
+        translate_save(world, repo, jobs=1, **options)
+        commit_times.append(timed(lambda: commit_all(repo, f'edit {step}')))
+        diff_times.append(timed(lambda: git(repo, 'diff', 'HEAD~1', 'HEAD')))
+
+    return {
+        'layout': name,
+        'commit_ms': 1000 * sum(commit_times) / len(commit_times),
+        'diff_ms': 1000 * sum(diff_times) / len(diff_times),
+        'diff_lines': len(git(repo, 'diff', 'HEAD~1', 'HEAD').splitlines()),
+        'pack_bytes': pack_size(repo),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=64)
+    parser.add_argument('--edits', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    if shutil.which('git') is None:
+        print("git is required for this benchmark")
+        return 1
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, options in LAYOUTS.items():
+            rng = random.Random(args.seed)
+            world = os.path.join(tmp, name, 'world')
+            repo = os.path.join(tmp, name, 'repo')
+            os.makedirs(os.path.join(world, 'region'))
+            side = max(1, int(args.chunks ** 0.5))
+            chunks = {(i % side, i // side): (1, build_chunk(i % side, i // side, rng))
+                      for i in range(args.chunks)}
+            write_region(os.path.join(world, 'region', 'r.0.0.mca'), chunks)
+            write_level(os.path.join(world, 'level.dat'), 0)
+            results.append(run_layout(name, options, world, repo, chunks, args.edits, rng))
+
+    print(f"{'layout':10} {'commit ms':>10} {'diff ms':>10} {'diff lines':>11} {'pack KiB':>10}")
+    for result in results:
+        print(f"{result['layout']:10} {result['commit_ms']:10.1f} {result['diff_ms']:10.1f} "
+              f"{result['diff_lines']:11d} {result['pack_bytes'] / 1024:10.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compare pulling a few fields out of many player files with a full parse and
+with the lazy reader.
+
+Writes a folder of gzipped playerdata-like files, each with a large
+inventory and ender chest, then reads Pos, Health and the selected item of
+every file through nbtlib and through LazyNbt. The time to only read and
+decompress the files is printed as the I/O floor.
+
+Usage: python benchmarks/bench_query.py [--players N] [--repeat N]
+"""
+import os
+import sys
+import gzip
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nbtlib
+from Core.nbtFormat import get_format, parse_nbt, read_nbt_bytes
+from Core.lazyNbt import LazyNbt, parse_path
+
+QUERIES = ['Pos', 'Health', 'Inventory[0].id']
+
+
+def build_player(rng):
+    def items(count):
+        return nbtlib.List[nbtlib.Compound]([
+            nbtlib.Compound({
+                'Slot': nbtlib.Byte(slot),
+                'id': nbtlib.String(f"minecraft:item_{rng.randrange(1000)}"),
+                'Count': nbtlib.Byte(rng.randrange(1, 65)),
+                'tag': nbtlib.Compound({
+                    'display': nbtlib.Compound({'Name': nbtlib.String('x' * rng.randrange(10, 60))}),
+                    'Damage': nbtlib.Int(rng.randrange(100)),
+                }),
+            })
+            for slot in range(count)
+        ])
+    return nbtlib.File({
+        'Pos': nbtlib.List[nbtlib.Double]([rng.uniform(-1e4, 1e4) for _ in range(3)]),
+        'Health': nbtlib.Float(rng.uniform(0, 20)),
+        'Inventory': items(36),
+        'EnderItems': items(27),
+        'recipeBook': nbtlib.Compound({
+            'recipes': nbtlib.List[nbtlib.String]([f"minecraft:recipe_{i}" for i in range(400)]),
+        }),
+    })
+
+
+def best_of(repeat, function):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(args.players):
+            path = os.path.join(folder, f"{i:08x}.dat")
+            build_player(rng).save(path, gzipped=True)
+            paths.append(path)
+        size = sum(os.path.getsize(path) for path in paths)
+        steps = [parse_path(query) for query in QUERIES]
+        formats = {path: get_format(path) for path in paths}
+
+        def read_only():
+            for path in paths:
+                with open(path, 'rb') as f:
+                    gzip.decompress(f.read())
+
+        def full_parse():
+            results = []
+            for path in paths:
+                nbt = parse_nbt(path, formats[path])
+                results.append([nbt['Pos'], nbt['Health'], nbt['Inventory'][0]['id']])
+            return results
+
+        def lazy():
+            results = []
+            for path in paths:
+                reader = LazyNbt(read_nbt_bytes(path, formats[path]), formats[path].byteorder)
+                results.append([reader.get(query) for query in steps])
+            return results
+
+        print(f"{args.players} files, {size / 1e6:.1f} MB compressed")
+        elapsed, _ = best_of(args.repeat, read_only)
+        print(f"{'read+gunzip':12} {elapsed * 1000:8.1f} ms")
+        elapsed, expected = best_of(args.repeat, full_parse)
+        print(f"{'full parse':12} {elapsed * 1000:8.1f} ms")
+        elapsed, found = best_of(args.repeat, lazy)
+        print(f"{'lazy':12} {elapsed * 1000:8.1f} ms")
+        assert found == expected, "lazy reader returned different values"
+
+
+if __name__ == '__main__':
+    main()
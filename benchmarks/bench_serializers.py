@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Compare the output formats of a translation on encode speed, decode speed and size.
+
+Builds chunk trees like the ones of the git layout benchmark and encodes
+every one with each serializer of Core/serializers.py, then decodes the
+results again. The lossless formats are checked to give back the original
+tree. For binary snapshots the time to open one and read a single field
+through the lazy reader is printed as well, which is what a cache lookup
+costs. Sizes are given raw and zlib-compressed, as git would store them.
+
+Usage: python benchmarks/bench_serializers.py [--chunks N] [--repeat N] [--arrays MODE]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy
+import nbtlib
+from Core.defaultNbtParser import ARRAY_MODES
+from Core.serializers import SERIALIZERS, read_snapshot_header
+from Core.lazyNbt import LazyNbt, parse_path
+from synthetic import build_chunk
+
+
+def best_of(repeat, function):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def same_tags(a, b):
+    """
+    Compare two trees, tag types included: nbtlib's == holds for Int(1) and Byte(1).
+    """
+    if isinstance(a, nbtlib.tag.Compound) and isinstance(b, nbtlib.tag.Compound):
+        return a.keys() == b.keys() and all(same_tags(a[key], b[key]) for key in a)
+    if isinstance(a, nbtlib.tag.List) and isinstance(b, nbtlib.tag.List):
+        return (a.subtype is b.subtype and len(a) == len(b)
+                and all(same_tags(x, y) for x, y in zip(a, b)))
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, nbtlib.tag.Array):
+        return numpy.array_equal(a, b)
+    return a == b
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--arrays', choices=ARRAY_MODES, default='base64',
+                        help="array mode of the JSON formats (default: base64)")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chunks = [build_chunk(i % 32, i // 32, rng) for i in range(args.chunks)]
+    header = {'timestamp': 1, 'compression': 2}
+    results = []
+    for name, serializer in SERIALIZERS.items():
+        encode_time, encoded = best_of(args.repeat, lambda: [
+            serializer.encode(chunk, header, args.arrays) for chunk in chunks])
+        decode_time, decoded = best_of(args.repeat, lambda: [
+            serializer.decode(data)[1] for data in encoded])
+        if serializer.lossless:
+            for original, tree in zip(chunks, decoded):
+                assert same_tags(tree, original), f"{name} changed the data"
+        result = {
+            'serializer': name,
+            'encode_ms': 1000 * encode_time,
+            'decode_ms': 1000 * decode_time,
+            'bytes': sum(len(data) for data in encoded),
+            'zlib_bytes': sum(len(zlib.compress(data)) for data in encoded),
+        }
+        if name == 'binary':
+            steps = parse_path('xPos')
+
+            def lookup():
+                values = []
+                for data in encoded:
+                    _, offset = read_snapshot_header(data)
+                    values.append(LazyNbt(memoryview(data)[offset:]).get(steps))
+                return values
+            lookup_time, values = best_of(args.repeat, lookup)
+            assert values == [chunk['xPos'] for chunk in chunks]
+            result['lookup_ms'] = 1000 * lookup_time
+        results.append(result)
+
+    print(f"{args.chunks} chunks")
+    print(f"{'serializer':13} {'encode ms':>10} {'decode ms':>10} {'MB':>8} {'zlib MB':>8}")
+    for result in results:
+        print(f"{result['serializer']:13} {result['encode_ms']:10.1f} {result['decode_ms']:10.1f} "
+              f"{result['bytes'] / 1e6:8.2f} {result['zlib_bytes'] / 1e6:8.2f}")
+        if 'lookup_ms' in result:
+            print(f"{'  lazy field':13} {result['lookup_ms']:21.1f}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Time every stage of a translation separately on a synthetic world.
+
+Generates a world with benchmarks/synthetic.py and times the single file
+path (read_nbt_file, the old big-then-little endianness fallback against
+format detection, nbt_to_json_serializable and JSON writing), the region
+path (header, decompression, parsing and translate_region) and the whole
+save paths: translate-save, commit-save, build-save and the entity index.
+Each stage is the best of --repeat runs.
+
+The results can be written as JSON with --json, together with the version
+of the tree and the generator options. --compare reads such a file from an
+earlier run and exits with status 1 if any stage got slower by more than
+--tolerance, so two versions can be checked against each other on the same
+machine.
+
+Usage: python benchmarks/bench_stages.py [--chunks N] [--repeat N] [--json FILE]
+                                         [--compare OLD.json] [--tolerance 0.2]
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import nbtlib
+from Core.defaultNbtParser import read_nbt_file, nbt_to_json_serializable, write_nbt_json
+from Core.nbtFormat import detect_format, parse_nbt
+from Core.regionParser import read_region_header, iter_chunk_data, decompress_chunk, translate_region
+from Core.savePipeline import translate_save
+from synthetic import generate_world, add_generator_arguments, generator_options, write_level
+
+
+def best_of(repeat, function):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def tree_version():
+    try:
+        return subprocess.run(['git', '-C', ROOT, 'describe', '--always', '--dirty'], check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def files_in(world, folder, extension):
+    path = os.path.join(world, folder)
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(extension))
+
+
+def total_size(paths):
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def read_with_fallback(filepath):
+    """
+    The original way of opening a file: big-endian first, little-endian if
+    that fails. A little-endian structure often parses as a wrong big-endian
+    tree without failing, so this is as fast as it is wrong.
+    """
+    try:
+        return read_nbt_file(filepath, False)
+    except Exception:
+        return read_nbt_file(filepath, True)
+
+
+def read_detected(filepath):
+    return parse_nbt(filepath, detect_format(filepath))
+
+
+def read_region(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read()
+
+
+def region_payloads(region):
+    return [(compression, bytes(payload)) for _, _, compression, payload in iter_chunk_data(region)]
+
+
+def commit_available():
+    return shutil.which('git') is not None
+
+
+class StageTimer:
+    """
+    Runs and records the stages, printing each as it finishes.
+    """
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.stages = {}
+
+    def run(self, name, function, items=0, nbytes=0, repeat=None):
+        """
+        `items` may be a function of the result, for stages that only know
+        how much they did once they ran.
+        """
+        seconds, result = best_of(repeat or self.repeat, function)
+        if callable(items):
+            items = items(result)
+        self.stages[name] = {'seconds': seconds, 'items': items, 'bytes': nbytes}
+        rate = f"{nbytes / 1e6 / seconds:8.1f} MB/s" if nbytes and seconds else ''
+        print(f"{name:32} {1000 * seconds:10.1f} ms {items:8d} items {rate}", flush=True)
+        return result
+
+
+def run_stages(world, scratch, args):
+    timer = StageTimer(args.repeat)
+    singles = ([os.path.join(world, 'level.dat')] + files_in(world, 'playerdata', '.dat'))
+    structures = files_in(world, 'structures', '.mcstructure')
+    regions = files_in(world, 'region', '.mca')
+
+    # Single files
+    trees = timer.run('read_nbt_file', lambda: [read_nbt_file(path, False) for path in singles],
+                      len(singles), total_size(singles))
+    timer.run('endianness_fallback', lambda: [read_with_fallback(path) for path in structures],
+              len(structures), total_size(structures))
+    timer.run('detect_format', lambda: [read_detected(path) for path in structures],
+              len(structures), total_size(structures))
+    trees += [read_nbt_file(path, True) for path in structures]
+    timer.run('nbt_to_json_serializable',
+              lambda: [nbt_to_json_serializable(tree, args.arrays) for tree in trees], len(trees))
+
+    def write_json():
+        written = 0
+        for tree in trees:
+            buffer = io.StringIO()
+            write_nbt_json(tree, buffer, array_mode=args.arrays)
+            written += buffer.tell()
+        return written
+    written = write_json()
+    timer.run('write_nbt_json', write_json, len(trees), written)
+
+    # Region files
+    data = [read_region(path) for path in regions]
+    region_bytes = sum(len(region) for region in data)
+    timer.run('region_header', lambda: [read_region_header(region) for region in data],
+              len(data), len(data) * 8192)
+    payloads = [payload for region in data for payload in region_payloads(region)]
+    raw = timer.run('region_decompress',
+                    lambda: [decompress_chunk(compression, payload) for compression, payload in payloads],
+                    len(payloads), region_bytes)
+    timer.run('region_parse', lambda: [nbtlib.File.parse(io.BytesIO(chunk), byteorder='big')
+                                       for chunk in raw],
+              len(raw), sum(len(chunk) for chunk in raw))
+    output = os.path.join(scratch, 'regions')
+    timer.run('translate_region', lambda: sum(
+        translate_region(path, os.path.join(output, os.path.basename(path)), verbose=False,
+                         array_mode=args.arrays, output_format=args.format) for path in regions),
+              len(payloads), region_bytes)
+
+    # Whole saves
+    world_bytes = sum(total_size(os.path.join(root, name) for name in names)
+                      for root, _, names in os.walk(world))
+    translated = os.path.join(scratch, 'translated')
+    timer.run('translate_save', lambda: translate_save(
+        world, translated, jobs=args.jobs, incremental=False, array_mode=args.arrays,
+        output_format=args.format), lambda stats: stats.files, world_bytes)
+    timer.run('translate_save_unchanged', lambda: translate_save(
+        world, translated, jobs=args.jobs, array_mode=args.arrays, output_format=args.format))
+
+    typed = os.path.join(scratch, 'typed')
+    translate_save(world, typed, jobs=args.jobs, array_mode='base64', output_format='typed')
+    from Core.saveBuilder import build_save
+    built = os.path.join(scratch, 'built')
+    timer.run('build_save', lambda: build_save(typed, built, jobs=args.jobs, use_cache=False),
+              lambda stats: stats.built, world_bytes)
+
+    from Core.entityIndex import update_index
+    index = os.path.join(scratch, 'index.sqlite')
+
+    def fresh_index():
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(index + suffix):
+                os.remove(index + suffix)
+        return update_index(world, index, jobs=args.jobs)
+    timer.run('update_index', fresh_index, lambda update: update.added)
+
+    if commit_available():
+        from Core.gitFastImport import commit_save
+        repos = []
+
+        def initial_commit():
+            repo = os.path.join(scratch, f"repo{len(repos)}")
+            repos.append(repo)
+            return commit_save(world, repo, 'initial', jobs=args.jobs, array_mode=args.arrays,
+                               output_format=args.format)
+        timer.run('commit_save', initial_commit, lambda result: result[0].files, world_bytes)
+        ticks = iter(range(1, 1 << 30))
+
+        def edit_commit():
+            write_level(os.path.join(world, 'level.dat'), next(ticks))
+            return commit_save(world, repos[-1], 'tick', jobs=args.jobs, array_mode=args.arrays,
+                               output_format=args.format)
+        timer.run('commit_save_edit', edit_commit, 1)
+    else:
+        print("git not found, skipping commit-save")
+    return timer.stages
+
+
+def compare(stages, previous, tolerance):
+    """
+    Print the change of every stage against an earlier result and return the
+    names of the stages that got slower by more than `tolerance`.
+    """
+    slower = []
+    print(f"\nagainst {previous.get('version') or 'unknown version'}")
+    for name, stage in stages.items():
+        old = previous.get('stages', {}).get(name)
+        if old is None or not old['seconds']:
+            continue
+        ratio = stage['seconds'] / old['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            slower.append(name)
+        print(f"{name:32} {1000 * old['seconds']:10.1f} -> {1000 * stage['seconds']:10.1f} ms "
+              f"{ratio:6.2f}x{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_generator_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="worker processes of the save stages (default: 1)")
+    parser.add_argument('--arrays', choices=('list', 'base64', 'hex'), default='list')
+    parser.add_argument('--format', default='json', help="output format (default: json)")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--compare', metavar='OLD', help="results of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="slowdown counted as a regression by --compare (default: 0.2)")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='bench-stages-')
+    try:
+        world = os.path.join(scratch, 'world')
+        options = generator_options(args)
+        start = time.perf_counter()
+        written = generate_world(world, **options)
+        print(f"{'generate':32} {1000 * (time.perf_counter() - start):10.1f} ms", flush=True)
+        stages = run_stages(world, scratch, args)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    results = {
+        'version': tree_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': dict(options, repeat=args.repeat, jobs=args.jobs, arrays=args.arrays,
+                       format=args.format),
+        'world': {kind: {'files': files, 'bytes': size} for kind, (files, size) in written.items()},
+        'stages': stages,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('config') != results['config']:
+            print("Warning: the earlier run used different options")
+        if compare(stages, previous, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
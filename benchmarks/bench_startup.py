@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Time how long the GUI takes to show its window and the list of saves.
+
+Generates a few small worlds with benchmarks/synthetic.py in a scratch
+Minecraft folder, then starts the GUI in fresh processes with its session
+kept in a scratch folder (PYGITMC_CONFIG_DIR): a cold start with no saved
+session, then --repeat warm starts that find the saves and the selected
+save as the previous run left them. Each process reports the time from
+its launch to importing wx and gui, building the window, the first idle
+event after Show() (the first paint) and the saves appearing in the tree,
+and which heavy modules were already loaded at the first paint. Warm
+starts are the best of --repeat.
+
+Needs wxPython and a display.
+
+Usage: python benchmarks/bench_startup.py [--worlds N] [--chunks N] [--repeat N] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Core.sessionCache import CONFIG_DIR_VARIABLE, Session
+from synthetic import generate_world
+
+# Modules the GUI should only load once something needs them
+HEAVY_MODULES = ('numpy', 'nbtlib', 'Core.savePipeline', 'Core.gitFastImport', 'Core.gitHistory',
+                 'Core.nbtBrowser', 'Core.entityIndex')
+
+# Started by the parent as `bench_startup.py --child RESULT`; the launch time comes in this variable
+LAUNCHED_VARIABLE = 'PYGITMC_BENCH_LAUNCHED'
+
+# Seconds a child waits for the saves to be listed before giving up
+SETTLE_TIMEOUT = 30
+
+
+def child(result_path, worlds):
+    """
+    Start the GUI, write the timings of its startup to `result_path` and close it.
+    """
+    launched = float(os.environ[LAUNCHED_VARIABLE])
+    marks = {'interpreter': time.time() - launched}
+    import wx
+    marks['import_wx'] = time.time() - launched
+    import gui
+    marks['import_gui'] = time.time() - launched
+    app = wx.App(False)
+    frame = gui.MainFrame(None)
+    marks['frame'] = time.time() - launched
+    loaded = {}
+    deadline = time.time() + SETTLE_TIMEOUT
+
+    def finish():
+        with open(result_path, 'w', encoding='utf-8') as f:
+            json.dump({'marks': marks, 'loaded_at_paint': loaded,
+                       'saves': len(frame.save_infos)}, f)
+        frame.Close()
+
+    def wait_for_saves():
+        if len(frame.save_infos) >= worlds:
+            marks['saves_listed'] = time.time() - launched
+            finish()
+        elif time.time() > deadline:
+            finish()
+        else:
+            wx.CallLater(5, wait_for_saves)
+
+    def on_idle(event):
+        frame.Unbind(wx.EVT_IDLE, handler=on_idle)
+        marks['first_paint'] = time.time() - launched
+        loaded.update({name: name in sys.modules for name in HEAVY_MODULES})
+        if len(frame.save_infos) >= worlds:
+            marks['saves_listed'] = marks['first_paint']
+        wait_for_saves()
+        event.Skip()
+
+    frame.Bind(wx.EVT_IDLE, on_idle)
+    frame.Show()
+    app.MainLoop()
+    return 0
+
+
+def launch(scratch, config_dir, worlds):
+    """
+    Run one GUI startup in a new process and return what it reported.
+    """
+    result_path = os.path.join(scratch, 'result.json')
+    if os.path.exists(result_path):
+        os.remove(result_path)
+    env = dict(os.environ, **{CONFIG_DIR_VARIABLE: config_dir, LAUNCHED_VARIABLE: repr(time.time())})
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--child', result_path,
+                    '--worlds', str(worlds)], cwd=ROOT, env=env, check=True)
+    with open(result_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def report(name, result):
+    marks = result['marks']
+    print(f"{name:6} " + '  '.join(f"{mark} {1000 * value:7.1f} ms" for mark, value in marks.items()))
+    loaded = [module for module, present in result['loaded_at_paint'].items() if present]
+    print(f"{'':6} {result['saves']} saves; loaded at first paint: {', '.join(loaded) or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--worlds', type=int, default=8)
+    parser.add_argument('--chunks', type=int, default=16, help="chunks per world (default: 16)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--child', metavar='RESULT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.worlds)
+
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    try:
+        minecraft_dir = os.path.join(scratch, 'minecraft')
+        for number in range(args.worlds):
+            generate_world(os.path.join(minecraft_dir, 'saves', f"World {number + 1}"),
+                           chunks=args.chunks, seed=number)
+        config_dir = os.path.join(scratch, 'config')
+        cold = Session.load(config_dir)
+        cold.minecraft_dir = minecraft_dir
+        cold.save()
+
+        cold = launch(scratch, config_dir, args.worlds)
+        report('cold', cold)
+        # Selected in the warm runs, so their first paint includes restoring a save
+        session = Session.load(config_dir)
+        session.current_save = sorted(path for _, path, _ in session.saves)[0] if session.saves else None
+        session.save()
+        warm_runs = [launch(scratch, config_dir, args.worlds) for _ in range(args.repeat)]
+        warm = {'marks': {mark: min(run['marks'][mark] for run in warm_runs if mark in run['marks'])
+                          for mark in warm_runs[0]['marks']},
+                'loaded_at_paint': warm_runs[-1]['loaded_at_paint'], 'saves': warm_runs[-1]['saves']}
+        report('warm', warm)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(),
+                       'config': {'worlds': args.worlds, 'chunks': args.chunks, 'repeat': args.repeat},
+                       'cold': cold, 'warm': warm}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic world folder for benchmarks.
+
+Writes a level.dat, playerdata files, region files with block entities,
+entity region files and Bedrock .mcstructure files. Sizes and densities are
+configurable and the output only depends on the seed, so two runs with the
+same options produce byte-identical worlds. The worlds are built by
+Core/syntheticWorld.py, which the tests use as well.
+
+Usage: python benchmarks/synthetic.py OUTPUT [--regions N] [--chunks N] [--entities N]
+                                             [--players N] [--structures N] [--seed N]
+"""
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Core.syntheticWorld import (build_chunk, build_block_entity, build_items, build_entity,
+                                 build_player, build_structure, write_region, write_level,
+                                 generate_world)
+
+
+def add_generator_arguments(parser):
+    parser.add_argument('--regions', type=int, default=1, help="number of region files (default: 1)")
+    parser.add_argument('--chunks', type=int, default=256,
+                        help="chunks per region, at most 1024 (default: 256)")
+    parser.add_argument('--sections', type=int, default=24, help="sections per chunk (default: 24)")
+    parser.add_argument('--entities', type=float, default=2.0,
+                        help="average entities per chunk (default: 2)")
+    parser.add_argument('--block-entities', type=int, default=1,
+                        help="block entities per chunk (default: 1)")
+    parser.add_argument('--players', type=int, default=4, help="playerdata files (default: 4)")
+    parser.add_argument('--structures', type=int, default=2, help=".mcstructure files (default: 2)")
+    parser.add_argument('--structure-size', type=int, default=16,
+                        help="edge length of the structures in blocks (default: 16)")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generator_options(args):
+    return {'regions': args.regions, 'chunks': args.chunks, 'sections': args.sections,
+            'entities': args.entities, 'block_entities': args.block_entities,
+            'players': args.players, 'structures': args.structures,
+            'structure_size': args.structure_size, 'seed': args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help="world folder to write")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    written = generate_world(args.output, **generator_options(args))
+    for kind, (files, size) in written.items():
+        print(f"{kind:12} {files:6d} files {size / 1e6:8.2f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,181 @@
 import ctypes
 import wx
 import os  # Add import
+import threading
+
+# Only what the window needs to appear is imported here. nbtlib, the
+# translation pipeline and the git layers load on first use, mostly on
+# background threads, so they do not delay the first paint.
+from Core.jobQueue import JobQueue
+from Core.sessionCache import Session
+from Core.saveIndex import (SaveInfo, default_minecraft_dir, save_info, scan_saves, list_entries,
+                            describe_time)
 
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
 except Exception:
     pass
 
-app = wx.App(False)
-
 # Add constant ID
 ID_SELECT_SAVE_DIR = wx.NewId()
+ID_TRANSLATE_SAVE = wx.NewId()
+ID_COMMIT_CHANGES = wx.NewId()
+ID_COMMIT_AND_TRANSLATE = wx.NewId()
+ID_BUILD_SAVE = wx.NewId()
+ID_CANCEL_JOBS = wx.NewId()
+ID_WATCH_SAVE = wx.NewId()
+ID_BACKUP_SAVE = wx.NewId()
+ID_PRUNE_STORE = wx.NewId()
+ID_VIEW_HISTORY = wx.NewId()
+
+def translate_options():
+    """
+    Translation options used by the GUI: the git-friendly canonical layout,
+    which build-save can compile back, with tick counters kept out of commits.
+    Every save shares one chunk store, so chunks common to several worlds and
+    their backups are parsed and stored once.
+    """
+    from Core.chunkStore import default_store_dir
+    from Core.volatileFields import DEFAULT_RULES
+    return {'layout': 'canonical', 'array_mode': 'base64', 'volatile': DEFAULT_RULES,
+            'store': default_store_dir()}
+
+# Everything generated for a save lives in a folder next to it
+WORKSPACE_SUFFIX = '.pygitmc'
+
+# Rows shown in the Modified Files list; the rest is summarized in one line
+MAX_MODIFIED_ROWS = 1000
+
+# Rows shown for an index search in the Translation tab
+MAX_SEARCH_ROWS = 1000
+SEARCH_KIND_LABELS = ("Everything", "Entities", "Block Entities", "Players")
+
+# Changed files and chunks listed for the selected commit
+MAX_CHANGE_ROWS = 500
+
+# Lines of tag differences shown for the selected commit or change
+MAX_DIFF_ROWS = 2000
+
+def describe_tracked(files, chunks):
+    if not files:
+        return "Not committed yet"
+    return f"{files} file{'s' if files != 1 else ''}, {chunks} chunk{'s' if chunks != 1 else ''}"
+
+class CommitList(wx.ListCtrl):
+    """
+    Virtual list of a GitHistory: commits are read from the log only when their
+    rows are drawn, and the log pages and change summaries are read on
+    background threads; rows show "..." until they arrive.
+    """
+    COLUMNS = (("Commit", 90), ("Date", 130), ("Author", 110), ("Message", 280), ("Changes", 200))
+
+    def __init__(self, parent):
+        super(CommitList, self).__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        for column, (label, width) in enumerate(self.COLUMNS):
+            self.InsertColumn(column, label, width=width)
+        self.history = None
+        self.wanted = []  # rows whose summaries are not cached yet, most recently drawn last
+        self.summarizing = False
+        self.load_until = -1  # last row drawn before the log was read that far
+        self.loading = False
+
+    def SetHistory(self, history):
+        self.history = history
+        self.wanted = []
+        self.load_until = -1
+        self.SetItemCount(len(history) if history else 0)
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        if not self.history:
+            return ""
+        commit = self.history.loaded(item)
+        if commit is None:
+            self.LoadRows(item)
+            return "..." if column == 0 else ""
+        if column == 0:
+            return commit.id[:10]
+        if column == 1:
+            return describe_time(commit.timestamp)
+        if column == 2:
+            return commit.author
+        if column == 3:
+            return commit.subject
+        summary = self.history.summaries.get(commit.id)
+        if summary is None:
+            self.Summarize(item)
+            return "..."
+        from Core.gitHistory import describe_summary
+        return describe_summary(summary)
+
+    def LoadRows(self, item):
+        """Read the log up to a row on a background thread, then draw the rows again"""
+        self.load_until = max(self.load_until, item)
+        if self.loading:
+            return
+        self.loading = True
+        history = self.history
+
+        def load():
+            until = -1
+            try:
+                while self.load_until > until:
+                    until = self.load_until
+                    history.commit(until)
+            except (OSError, RuntimeError, ValueError):
+                pass
+            wx.CallAfter(self.RowsLoaded, history)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def RowsLoaded(self, history):
+        if not self:
+            return
+        self.loading = False
+        if history is not self.history:
+            # Rows of the new history were drawn while the old one was read
+            if self.history and self.load_until >= 0:
+                self.LoadRows(self.load_until)
+            return
+        self.Refresh()
+
+    def Summarize(self, item):
+        """Queue a row's summary; one thread works through the rows most recently drawn first"""
+        if item not in self.wanted:
+            self.wanted.append(item)
+        if not self.summarizing:
+            self.StartSummaries()
+
+    def StartSummaries(self):
+        self.summarizing = True
+        history, wanted = self.history, self.wanted
+
+        def summarize():
+            while wanted:
+                item = wanted.pop()
+                commit = history.commit(item)
+                try:
+                    if commit is not None:
+                        history.changes(commit)
+                except (OSError, RuntimeError):
+                    del wanted[:]
+                    break
+                wx.CallAfter(self.ShowSummary, history, item)
+            wx.CallAfter(self.SummariesDone)
+
+        threading.Thread(target=summarize, daemon=True).start()
+
+    def SummariesDone(self):
+        # Rows drawn after a new history was set are waiting for their own thread
+        if not self:
+            return
+        self.summarizing = False
+        if self.wanted:
+            self.StartSummaries()
+
+    def ShowSummary(self, history, item):
+        if self and history is self.history and item < self.GetItemCount():
+            self.RefreshItem(item)
 
 class MainFrame(wx.Frame):
     def __init__(self, *args, **kwargs):
@@ -23,8 +188,55 @@ class MainFrame(wx.Frame):
         self.current_save_dir = ""
         self.current_save_label = None  # Reference to the current save name label
         self.save_path_label = None     # Reference to the save path label
+        self.modified_list = None       # Reference to the Modified Files list
+        self.last_modified_label = None # Reference to the Last Modified label
+        self.minecraft_dir_text = None  # Reference to the Minecraft directory field
+        # The saves and details shown last time, displayed before anything is scanned
+        self.session = Session.load()
+        self.minecraft_dir = self.session.minecraft_dir or default_minecraft_dir()
+        self.tracked_label = None       # Reference to the Tracked Files label
+
+        # Saves tree index: path -> tree item for every node, and path -> SaveInfo for the
+        # worlds themselves. Folder contents are only listed when a node is expanded.
+        self.tree_index = {}
+        self.save_infos = {}
+        self.loaded_paths = set()
+
+        # Long operations run on a background thread; results come back through wx.CallAfter
+        self.jobs = JobQueue(post=wx.CallAfter, on_start=self.OnJobStarted,
+                             on_progress=self.OnJobProgress, on_finish=self.OnJobFinished)
+        self.watchers = {}  # save directory -> SaveWatcher
+        self.backup_check = None  # Reference to the "Create backup before changes" checkbox
+        self.search_type_text = None    # Index search fields of the Translation tab
+        self.search_name_text = None
+        self.search_kind_choice = None
+        self.search_history_check = None
+        self.search_results = None
+        self.metrics_check = None  # "Collect performance statistics" checkbox
+        self.stats_pane = None     # Statistics of the last measured job, above the status bar
+        self.stats_text = None
+        self.notebook = None
+        self.history_page = None         # Index of the Commit History tab
+        self.history = None              # GitHistory of the current save's repository
+        self.commit_list = None
+        self.commit_details = None
+        self.commit_changes_list = None  # Changed files and chunks of the selected commit
+        self.commit_changes = []         # (commit, [(save path, chunk label or None)]) diffed by each row
+        self.commit_diff = None          # Tag differences of the selected commit or change
+        self.history_label = None
+        self.last_commit_label = None    # Reference to the Last Commit label
+        self.nbt_documents = None        # DocumentCache of the NBT browser, created on first use
+        self.nbt_document = None         # Document shown in the NBT browser
+        self.nbt_wanted = None           # (path, chunk) being opened
+        self.nbt_chunks = []             # Chunks of the region open in the browser
+        self.nbt_region = None
+        self.nbt_tree = None
+        self.nbt_path_label = None
+        self.nbt_chunk_choice = None
+        self.nbt_save_button = None
         
         self.InitUI()
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
 
     def InitUI(self):
         # Menu Bar
@@ -39,11 +251,16 @@ class MainFrame(wx.Frame):
         menuBar.Append(fileMenu, "File")
 
         repoMenu = wx.Menu()
-        repoMenu.Append(wx.ID_ANY, "Translate Save")
-        repoMenu.Append(wx.ID_ANY, "Commit Changes")
-        repoMenu.Append(wx.ID_ANY, "Commit and Translate")
-        repoMenu.Append(wx.ID_ANY, "Build Save")
-        repoMenu.Append(wx.ID_ANY, "View History")
+        repoMenu.Append(ID_TRANSLATE_SAVE, "Translate Save")
+        repoMenu.Append(ID_COMMIT_CHANGES, "Commit Changes")
+        repoMenu.Append(ID_COMMIT_AND_TRANSLATE, "Commit and Translate")
+        repoMenu.Append(ID_BUILD_SAVE, "Build Save")
+        repoMenu.Append(ID_BACKUP_SAVE, "Back Up Save")
+        repoMenu.Append(ID_PRUNE_STORE, "Prune Backup Store")
+        repoMenu.Append(ID_VIEW_HISTORY, "View History")
+        repoMenu.AppendCheckItem(ID_WATCH_SAVE, "Watch Save and Auto-Commit")
+        repoMenu.AppendSeparator()
+        repoMenu.Append(ID_CANCEL_JOBS, "Cancel Running Jobs")
         menuBar.Append(repoMenu, "Repository")
 
         helpMenu = wx.Menu()
@@ -56,13 +273,23 @@ class MainFrame(wx.Frame):
         # Toolbar
         toolbar = self.CreateToolBar(style=wx.TB_HORIZONTAL | wx.TB_TEXT | wx.NO_BORDER)
         toolbar.AddTool(wx.ID_ADD, "Add Save", wx.ArtProvider.GetBitmap(wx.ART_PLUS, wx.ART_TOOLBAR))
-        toolbar.AddTool(wx.ID_ANY, "Translate", wx.ArtProvider.GetBitmap(wx.ART_TICK_MARK, wx.ART_TOOLBAR))
-        toolbar.AddTool(wx.ID_ANY, "Build", wx.ArtProvider.GetBitmap(wx.ART_LIST_VIEW, wx.ART_TOOLBAR))
+        toolbar.AddTool(ID_TRANSLATE_SAVE, "Translate", wx.ArtProvider.GetBitmap(wx.ART_TICK_MARK, wx.ART_TOOLBAR))
+        toolbar.AddTool(ID_BUILD_SAVE, "Build", wx.ArtProvider.GetBitmap(wx.ART_LIST_VIEW, wx.ART_TOOLBAR))
+        toolbar.AddTool(ID_CANCEL_JOBS, "Cancel", wx.ArtProvider.GetBitmap(wx.ART_CROSS_MARK, wx.ART_TOOLBAR))
         toolbar.Realize()
 
         # Bind event handlers
         self.Bind(wx.EVT_MENU, self.OnSelectSaveDirectory, id=ID_SELECT_SAVE_DIR)
         self.Bind(wx.EVT_TOOL, self.OnSelectSaveDirectory, id=wx.ID_ADD)
+        self.Bind(wx.EVT_MENU, self.OnTranslateSave, id=ID_TRANSLATE_SAVE)
+        self.Bind(wx.EVT_MENU, self.OnCommitChanges, id=ID_COMMIT_CHANGES)
+        self.Bind(wx.EVT_MENU, self.OnCommitAndTranslate, id=ID_COMMIT_AND_TRANSLATE)
+        self.Bind(wx.EVT_MENU, self.OnBuildSave, id=ID_BUILD_SAVE)
+        self.Bind(wx.EVT_MENU, self.OnCancelJobs, id=ID_CANCEL_JOBS)
+        self.Bind(wx.EVT_MENU, self.OnWatchSave, id=ID_WATCH_SAVE)
+        self.Bind(wx.EVT_MENU, self.OnBackupSave, id=ID_BACKUP_SAVE)
+        self.Bind(wx.EVT_MENU, self.OnPruneStore, id=ID_PRUNE_STORE)
+        self.Bind(wx.EVT_MENU, self.OnViewHistory, id=ID_VIEW_HISTORY)
         
         # Splitter window for left and right panels
         splitter = wx.SplitterWindow(self)
@@ -89,18 +316,18 @@ class MainFrame(wx.Frame):
 
         # Bind remove button event
         btnRemove.Bind(wx.EVT_BUTTON, self.OnRemoveSave)
+        btnRefresh.Bind(wx.EVT_BUTTON, self.OnRefreshSaves)
         # Bind tree selection event
         self.savesTree.Bind(wx.EVT_TREE_SEL_CHANGED, self.OnSaveSelected)
+        self.savesTree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.OnTreeExpanding)
 
-        # Populate Saves Tree
+        # Populate Saves Tree from the saves folder in the background
         rootItem = self.savesTree.AddRoot("Saves")
-        self.savesTree.AppendItem(rootItem, "MyWorld1")
-        self.savesTree.AppendItem(rootItem, "Survival Server")
-        self.savesTree.AppendItem(rootItem, "Creative Build")
         self.savesTree.Expand(rootItem)
 
         # Right Panel: Notebook Tabs
         notebook = wx.Notebook(rightPanel)
+        self.notebook = notebook
         self.CreateOverviewTab(notebook)
         self.CreateTranslationTab(notebook)
         self.CreateHistoryTab(notebook)
@@ -111,14 +338,28 @@ class MainFrame(wx.Frame):
 
         splitter.SplitVertically(leftPanel, rightPanel, 250)
 
+        # Performance statistics of the last job, shown while collecting them is enabled
+        self.stats_pane = wx.CollapsiblePane(self, label="Performance Statistics",
+                                             style=wx.CP_DEFAULT_STYLE | wx.CP_NO_TLW_RESIZE)
+        statsSizer = wx.BoxSizer(wx.VERTICAL)
+        self.stats_text = wx.TextCtrl(self.stats_pane.GetPane(), size=(-1, 160),
+                                      style=wx.TE_MULTILINE | wx.TE_READONLY | wx.HSCROLL)
+        self.stats_text.SetFont(wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        statsSizer.Add(self.stats_text, 1, wx.EXPAND | wx.ALL, 5)
+        self.stats_pane.GetPane().SetSizer(statsSizer)
+        self.stats_pane.Bind(wx.EVT_COLLAPSIBLEPANE_CHANGED, lambda event: self.Layout())
+        self.stats_pane.Hide()
+
         # Main Sizer
         mainSizer = wx.BoxSizer(wx.VERTICAL)
         mainSizer.Add(splitter, 1, wx.EXPAND)
+        mainSizer.Add(self.stats_pane, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
         self.SetSizer(mainSizer)
 
         # Status Bar
         self.CreateStatusBar()
         self.SetStatusText("Ready")
+        self.RestoreSession()
 
     def CreateOverviewTab(self, notebook):
         panel = wx.Panel(notebook)
@@ -139,6 +380,9 @@ class MainFrame(wx.Frame):
         btnSizer.Add(btnCommit, flag=wx.ALL, border=5)
         btnSizer.Add(btnHistory, flag=wx.ALL, border=5)
         sizer.Add(btnSizer, flag=wx.LEFT, border=10)
+        btnBuild.Bind(wx.EVT_BUTTON, self.OnBuildSave)
+        btnCommit.Bind(wx.EVT_BUTTON, self.OnCommitChanges)
+        btnHistory.Bind(wx.EVT_BUTTON, self.OnViewHistory)
 
         # Split area for Modified Files and Save Information
         gridSizer = wx.GridSizer(1, 2, 10, 10)
@@ -146,8 +390,8 @@ class MainFrame(wx.Frame):
         # Modified Files group
         modBox = wx.StaticBox(panel, label="Modified Files")
         modSizer = wx.StaticBoxSizer(modBox, wx.VERTICAL)
-        modList = wx.ListBox(panel)
-        modSizer.Add(modList, 1, wx.EXPAND | wx.ALL, 5)
+        self.modified_list = wx.ListBox(panel)
+        modSizer.Add(self.modified_list, 1, wx.EXPAND | wx.ALL, 5)
         gridSizer.Add(modSizer, 1, wx.EXPAND)
 
         # Save Information group
@@ -160,12 +404,16 @@ class MainFrame(wx.Frame):
         infoSizer.Add(self.save_path_label, flag=wx.LEFT | wx.BOTTOM, border=5)
         lblModified = wx.StaticText(panel, label="Last Modified:")
         infoSizer.Add(lblModified, flag=wx.LEFT, border=5)
-        lblModifiedVal = wx.StaticText(panel, label="Today at 14:32")
-        infoSizer.Add(lblModifiedVal, flag=wx.LEFT | wx.BOTTOM, border=5)
+        self.last_modified_label = wx.StaticText(panel, label="Unknown")
+        infoSizer.Add(self.last_modified_label, flag=wx.LEFT | wx.BOTTOM, border=5)
         lblCommit = wx.StaticText(panel, label="Last Commit:")
         infoSizer.Add(lblCommit, flag=wx.LEFT, border=5)
-        lblCommitVal = wx.StaticText(panel, label="Added new farm area (12 hours ago)")
-        infoSizer.Add(lblCommitVal, flag=wx.LEFT | wx.BOTTOM, border=5)
+        self.last_commit_label = wx.StaticText(panel, label="Unknown")
+        infoSizer.Add(self.last_commit_label, flag=wx.LEFT | wx.BOTTOM, border=5)
+        lblTracked = wx.StaticText(panel, label="Tracked Files:")
+        infoSizer.Add(lblTracked, flag=wx.LEFT, border=5)
+        self.tracked_label = wx.StaticText(panel, label="Unknown")
+        infoSizer.Add(self.tracked_label, flag=wx.LEFT | wx.BOTTOM, border=5)
         gridSizer.Add(infoSizer, 1, wx.EXPAND)
 
         sizer.Add(gridSizer, 1, wx.EXPAND | wx.ALL, 10)
@@ -175,17 +423,93 @@ class MainFrame(wx.Frame):
     def CreateTranslationTab(self, notebook):
         panel = wx.Panel(notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
-        lbl = wx.StaticText(panel, label="Manual translation tools will be here")
-        sizer.Add(lbl, flag=wx.ALL, border=10)
+
+        # Search the entity index that every commit of the save updates
+        searchBox = wx.StaticBox(panel, label="Find Entities, Block Entities and Players")
+        searchSizer = wx.StaticBoxSizer(searchBox, wx.VERTICAL)
+        fieldSizer = wx.BoxSizer(wx.HORIZONTAL)
+        fieldSizer.Add(wx.StaticText(panel, label="Type:"), flag=wx.ALIGN_CENTER_VERTICAL | wx.ALL, border=5)
+        self.search_type_text = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER)
+        self.search_type_text.SetHint("villager, minecraft:chest")
+        fieldSizer.Add(self.search_type_text, 1, wx.ALL, 5)
+        fieldSizer.Add(wx.StaticText(panel, label="Name:"), flag=wx.ALIGN_CENTER_VERTICAL | wx.ALL, border=5)
+        self.search_name_text = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER)
+        fieldSizer.Add(self.search_name_text, 1, wx.ALL, 5)
+        self.search_kind_choice = wx.Choice(panel, choices=list(SEARCH_KIND_LABELS))
+        self.search_kind_choice.SetSelection(0)
+        fieldSizer.Add(self.search_kind_choice, 0, wx.ALL, 5)
+        self.search_history_check = wx.CheckBox(panel, label="Include removed")
+        fieldSizer.Add(self.search_history_check, flag=wx.ALIGN_CENTER_VERTICAL | wx.ALL, border=5)
+        btnSearch = wx.Button(panel, label="Search")
+        fieldSizer.Add(btnSearch, 0, wx.ALL, 5)
+        searchSizer.Add(fieldSizer, flag=wx.EXPAND)
+
+        self.search_results = wx.ListCtrl(panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        for column, (label, width) in enumerate((("Type", 160), ("Name", 120), ("Position", 150),
+                                                  ("Dimension", 130), ("Added", 110), ("Removed", 110))):
+            self.search_results.InsertColumn(column, label, width=width)
+        searchSizer.Add(self.search_results, 1, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(searchSizer, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, 10)
+
+        btnSearch.Bind(wx.EVT_BUTTON, self.OnSearchIndex)
+        self.search_type_text.Bind(wx.EVT_TEXT_ENTER, self.OnSearchIndex)
+        self.search_name_text.Bind(wx.EVT_TEXT_ENTER, self.OnSearchIndex)
+
+        # Browse and edit an NBT file or region chunk; nodes are filled in as they are expanded
+        browserBox = wx.StaticBox(panel, label="NBT Browser")
+        browserSizer = wx.StaticBoxSizer(browserBox, wx.VERTICAL)
+        openSizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.nbt_path_label = wx.StaticText(panel, label="Select a file in the saves tree or open one",
+                                            style=wx.ST_ELLIPSIZE_START)
+        openSizer.Add(self.nbt_path_label, 1, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        self.nbt_chunk_choice = wx.Choice(panel)
+        self.nbt_chunk_choice.Hide()
+        openSizer.Add(self.nbt_chunk_choice, 0, wx.ALL, 5)
+        btnOpen = wx.Button(panel, label="Open...")
+        openSizer.Add(btnOpen, 0, wx.ALL, 5)
+        self.nbt_save_button = wx.Button(panel, label="Save Changes")
+        self.nbt_save_button.Disable()
+        openSizer.Add(self.nbt_save_button, 0, wx.ALL, 5)
+        browserSizer.Add(openSizer, flag=wx.EXPAND)
+        self.nbt_tree = wx.TreeCtrl(panel, style=wx.TR_DEFAULT_STYLE | wx.TR_HIDE_ROOT)
+        browserSizer.Add(self.nbt_tree, 1, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(browserSizer, 2, wx.EXPAND | wx.ALL, 10)
+
+        btnOpen.Bind(wx.EVT_BUTTON, self.OnOpenNbtFile)
+        self.nbt_save_button.Bind(wx.EVT_BUTTON, self.OnSaveNbt)
+        self.nbt_chunk_choice.Bind(wx.EVT_CHOICE, self.OnNbtChunkChosen)
+        self.nbt_tree.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.OnNbtExpanding)
+        self.nbt_tree.Bind(wx.EVT_TREE_ITEM_ACTIVATED, self.OnNbtActivated)
         panel.SetSizer(sizer)
         notebook.AddPage(panel, "Translation")
 
     def CreateHistoryTab(self, notebook):
         panel = wx.Panel(notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
-        lbl = wx.StaticText(panel, label="Commit history will be displayed here")
-        sizer.Add(lbl, flag=wx.ALL, border=10)
+        headerSizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.history_label = wx.StaticText(panel, label="No save selected")
+        headerSizer.Add(self.history_label, 1, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 5)
+        btnRefresh = wx.Button(panel, label="Refresh")
+        headerSizer.Add(btnRefresh, 0, wx.ALL, 5)
+        sizer.Add(headerSizer, flag=wx.EXPAND | wx.LEFT | wx.RIGHT | wx.TOP, border=5)
+
+        self.commit_list = CommitList(panel)
+        sizer.Add(self.commit_list, 2, wx.EXPAND | wx.ALL, 10)
+        detailsSizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.commit_details = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.HSCROLL)
+        detailsSizer.Add(self.commit_details, 1, wx.EXPAND | wx.RIGHT, 5)
+        self.commit_changes_list = wx.ListBox(panel)
+        detailsSizer.Add(self.commit_changes_list, 1, wx.EXPAND)
+        sizer.Add(detailsSizer, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.commit_diff = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_DONTWRAP)
+        self.commit_diff.SetFont(wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        sizer.Add(self.commit_diff, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+
+        btnRefresh.Bind(wx.EVT_BUTTON, lambda event: self.RefreshHistory())
+        self.commit_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.OnCommitSelected)
+        self.commit_changes_list.Bind(wx.EVT_LISTBOX, self.OnCommitChangeSelected)
         panel.SetSizer(sizer)
+        self.history_page = notebook.GetPageCount()
         notebook.AddPage(panel, "Commit History")
 
     def CreateSettingsTab(self, notebook):
@@ -198,16 +522,20 @@ class MainFrame(wx.Frame):
         sizer.Add(lblDir, flag=wx.ALL, border=10)
 
         dirSizer = wx.BoxSizer(wx.HORIZONTAL)
-        txtDir = wx.TextCtrl(panel, value=r"C:\Users\Username\AppData\Roaming\.minecraft", style=wx.TE_READONLY)
+        self.minecraft_dir_text = wx.TextCtrl(panel, value=self.minecraft_dir, style=wx.TE_READONLY)
         btnBrowse = wx.Button(panel, label="Browse...")
-        dirSizer.Add(txtDir, 1, wx.EXPAND | wx.ALL, 5)
+        btnBrowse.Bind(wx.EVT_BUTTON, self.OnBrowseMinecraftDir)
+        dirSizer.Add(self.minecraft_dir_text, 1, wx.EXPAND | wx.ALL, 5)
         dirSizer.Add(btnBrowse, 0, wx.ALL, 5)
         sizer.Add(dirSizer, flag=wx.EXPAND)
 
         chkAuto = wx.CheckBox(panel, label="Auto-build save on commit")
         sizer.Add(chkAuto, flag=wx.LEFT | wx.TOP, border=10)
-        chkBackup = wx.CheckBox(panel, label="Create backup before changes")
-        sizer.Add(chkBackup, flag=wx.LEFT | wx.TOP, border=10)
+        self.backup_check = wx.CheckBox(panel, label="Create backup before changes")
+        sizer.Add(self.backup_check, flag=wx.LEFT | wx.TOP, border=10)
+        self.metrics_check = wx.CheckBox(panel, label="Collect performance statistics")
+        self.metrics_check.Bind(wx.EVT_CHECKBOX, self.OnCollectMetrics)
+        sizer.Add(self.metrics_check, flag=wx.LEFT | wx.TOP, border=10)
 
         panel.SetSizer(sizer)
         notebook.AddPage(panel, "Settings")
@@ -237,24 +565,15 @@ class MainFrame(wx.Frame):
         
         # Check if directory is valid
         if os.path.exists(directory) and os.path.isdir(directory):
+            directory = os.path.normpath(directory)
             # Get directory name as save name
             save_name = os.path.basename(directory)
             
-            # Check if it already exists
-            existing = False
-            child, cookie = self.savesTree.GetFirstChild(rootItem)
-            while child.IsOk():
-                if self.savesTree.GetItemText(child) == save_name:
-                    existing = True
-                    selected_item = child
-                    break
-                child, cookie = self.savesTree.GetNextChild(rootItem, cookie)
-            
-            # If it doesn't exist, add it to the tree
-            if not existing:
-                new_item = self.savesTree.AppendItem(rootItem, save_name)
-                self.savesTree.SetItemData(new_item, directory)
-                selected_item = new_item
+            # Look the save up in the index; add it to the tree if it is new
+            selected_item = self.tree_index.get(directory)
+            if selected_item is None or directory not in self.save_infos:
+                info = save_info(directory) or SaveInfo(save_name, directory, None)
+                selected_item = self.AddSaveItem(info)
                 self.SetStatusText(f"Added save: {save_name}")
             else:
                 self.SetStatusText(f"Save already exists: {save_name}")
@@ -267,6 +586,176 @@ class MainFrame(wx.Frame):
         
         # Ensure root node is expanded
         self.savesTree.Expand(rootItem)
+
+    def AddSaveItem(self, info):
+        """Append a world to the tree; its contents are listed when it is first expanded"""
+        item = self.savesTree.AppendItem(self.savesTree.GetRootItem(), info.name)
+        self.savesTree.SetItemData(item, info.path)
+        self.savesTree.SetItemHasChildren(item, True)
+        self.tree_index[info.path] = item
+        self.save_infos[info.path] = info
+        return item
+
+    def ForgetTreePath(self, path):
+        """Drop a removed node and everything below it from the index"""
+        prefix = path.rstrip(os.sep) + os.sep
+        for known in [known for known in self.tree_index if known == path or known.startswith(prefix)]:
+            del self.tree_index[known]
+            self.loaded_paths.discard(known)
+        self.save_infos.pop(path, None)
+
+    def RestoreSession(self):
+        """Show the saves and the selected save as they were last time; rescan once the window is up"""
+        saves_dir = os.path.join(self.minecraft_dir, 'saves')
+        saves = [SaveInfo(*entry) for entry in self.session.saves
+                 if os.path.dirname(entry[1]) == os.path.normpath(saves_dir)]
+        self.savesTree.Freeze()
+        try:
+            for info in saves:
+                self.AddSaveItem(info)
+            for path in self.session.added_saves:
+                if path not in self.save_infos:
+                    self.AddSaveItem(SaveInfo(os.path.basename(path), path, None))
+        finally:
+            self.savesTree.Thaw()
+        self.savesTree.Expand(self.savesTree.GetRootItem())
+        current = self.session.current_save
+        if current in self.save_infos:
+            self.savesTree.SelectItem(self.tree_index[current])
+            # Not every platform reports a selection made by the program
+            if self.current_save_dir != current:
+                self.UpdateSaveDisplay(os.path.basename(current), current)
+        wx.CallAfter(self.RefreshSaves)
+
+    def StoreSession(self):
+        """Remember the saves and the selected save for the next start"""
+        saves_dir = os.path.normpath(os.path.join(self.minecraft_dir, 'saves'))
+        session = self.session
+        session.minecraft_dir = self.minecraft_dir
+        session.current_save = self.current_save_dir or None
+        session.saves = [list(info) for path, info in self.save_infos.items()
+                         if os.path.dirname(path) == saves_dir]
+        session.added_saves = [path for path in self.save_infos if os.path.dirname(path) != saves_dir]
+        session.details = {path: details for path, details in session.details.items()
+                           if path in self.save_infos}
+        try:
+            session.save()
+        except OSError as e:
+            print(f"Failed to save the session: {e}")
+
+    def ShowCachedDetails(self, directory):
+        """Fill the Overview labels from the session until the save has been checked again"""
+        details = self.session.details.get(directory, {})
+        last_commit = details.get('last_commit')
+        if last_commit:
+            self.last_commit_label.SetLabel(f"{last_commit[0]} ({describe_time(last_commit[1])})")
+        else:
+            self.last_commit_label.SetLabel("Never" if details.get('commits') == 0 else "Unknown")
+        tracked = details.get('tracked')
+        self.tracked_label.SetLabel(describe_tracked(*tracked) if tracked else "Unknown")
+
+    def RefreshSaves(self):
+        """Rescan the saves folder on a background thread"""
+        saves_dir = os.path.join(self.minecraft_dir, 'saves')
+        self.SetStatusText(f"Scanning {saves_dir}...")
+
+        def scan():
+            wx.CallAfter(self.ShowSaves, saves_dir, scan_saves(saves_dir))
+
+        threading.Thread(target=scan, daemon=True).start()
+
+    def ShowSaves(self, saves_dir, saves):
+        if not self:
+            return
+        found = {info.path for info in saves}
+        self.savesTree.Freeze()
+        try:
+            # Worlds that disappeared from the saves folder; saves added by hand stay
+            for path in [path for path in self.save_infos
+                         if os.path.dirname(path) == os.path.normpath(saves_dir) and path not in found]:
+                self.savesTree.Delete(self.tree_index[path])
+                self.ForgetTreePath(path)
+                if path == self.current_save_dir:
+                    watcher = self.watchers.pop(path, None)
+                    if watcher:
+                        watcher.stop(wait=False)
+                    self.ClearSaveDisplay()
+            for info in saves:
+                if info.path in self.save_infos:
+                    self.save_infos[info.path] = info
+                else:
+                    self.AddSaveItem(info)
+        finally:
+            self.savesTree.Thaw()
+        self.savesTree.Expand(self.savesTree.GetRootItem())
+        if self.current_save_dir in self.save_infos:
+            self.UpdateLastModified(self.current_save_dir)
+        elif not self.current_save_dir:
+            # The selected world was deleted; follow whatever the tree selected instead
+            selected = self.savesTree.GetSelection()
+            directory = self.savesTree.GetItemData(selected) if selected.IsOk() else None
+            if directory in self.save_infos:
+                self.UpdateSaveDisplay(os.path.basename(directory), directory)
+        self.SetStatusText(f"Found {len(saves)} saves in {saves_dir}")
+
+    def OnRefreshSaves(self, event):
+        self.RefreshSaves()
+
+    def OnBrowseMinecraftDir(self, event):
+        dlg = wx.DirDialog(self, "Select the Minecraft directory:", defaultPath=self.minecraft_dir,
+                           style=wx.DD_DEFAULT_STYLE | wx.DD_DIR_MUST_EXIST)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.minecraft_dir = dlg.GetPath()
+            self.minecraft_dir_text.SetValue(self.minecraft_dir)
+            self.RefreshSaves()
+        dlg.Destroy()
+
+    def OnTreeExpanding(self, event):
+        """List a folder the first time its node is expanded"""
+        item = event.GetItem()
+        path = self.savesTree.GetItemData(item)
+        if not path or path in self.loaded_paths:
+            return
+        self.loaded_paths.add(path)
+        self.savesTree.DeleteChildren(item)
+        self.savesTree.AppendItem(item, "Loading...")
+
+        def load():
+            try:
+                entries = list_entries(path)
+            except OSError as e:
+                entries = e
+            wx.CallAfter(self.ShowEntries, path, entries)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def ShowEntries(self, path, entries):
+        item = self.tree_index.get(path)
+        if not self or item is None:
+            return
+        self.savesTree.DeleteChildren(item)
+        if isinstance(entries, OSError):
+            self.savesTree.AppendItem(item, f"Failed to list: {entries}")
+            self.loaded_paths.discard(path)
+            return
+        self.savesTree.Freeze()
+        try:
+            for entry in entries:
+                child = self.savesTree.AppendItem(item, entry.label)
+                self.savesTree.SetItemData(child, entry.path)
+                self.tree_index[entry.path] = child
+                if entry.is_dir:
+                    self.savesTree.SetItemHasChildren(child, True)
+        finally:
+            self.savesTree.Thaw()
+        if not entries:
+            self.savesTree.SetItemHasChildren(item, False)
+
+    def UpdateLastModified(self, directory):
+        info = self.save_infos.get(directory)
+        if self.last_modified_label:
+            self.last_modified_label.SetLabel(describe_time(info.last_modified)
+                                              if info and info.last_modified else "Unknown")
     
     def UpdateSavePathDisplay(self, directory):
         # Get directory name as save name
@@ -284,10 +773,255 @@ class MainFrame(wx.Frame):
         
         # Update current directory
         self.current_save_dir = directory
+        self.UpdateLastModified(directory)
+        self.ShowCachedDetails(directory)
+        if self.GetMenuBar():
+            self.GetMenuBar().Check(ID_WATCH_SAVE, directory in self.watchers)
+        # Checked once pending events are handled, so a save restored at startup does not delay the first paint
+        wx.CallAfter(self.RevalidateSave, directory)
+
+    def ClearSaveDisplay(self):
+        """Show that no save is selected, so nothing acts on a save that is gone"""
+        if self.current_save_label:
+            self.current_save_label.SetLabel("Current Save: None")
+        if self.save_path_label:
+            self.save_path_label.SetLabel("Not selected")
+        self.current_save_dir = ""
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        self.commit_list.SetHistory(None)
+        self.commit_details.SetValue("")
+        self.commit_changes = []
+        self.commit_changes_list.Set([])
+        self.commit_diff.SetValue("")
+        self.history_label.SetLabel("No save selected")
+        self.modified_list.Set([])
+        self.last_commit_label.SetLabel("Unknown")
+        self.tracked_label.SetLabel("Unknown")
+        if self.last_modified_label:
+            self.last_modified_label.SetLabel("Unknown")
+        if self.GetMenuBar():
+            self.GetMenuBar().Check(ID_WATCH_SAVE, False)
+
+    def RevalidateSave(self, directory):
+        if self and directory == self.current_save_dir:
+            self.LoadHistory(directory)
+            self.RefreshModifiedFiles(directory)
+
+    def RefreshModifiedFiles(self, save_dir):
+        """Compare the save with its last commit on a background thread and list what changed"""
+        if not self.modified_list or not os.path.isdir(save_dir):
+            return
+        manifest_dir = self.GetWorkspaceDir(save_dir, 'repository')
+
+        def detect():
+            from Core.manifest import find_manifest
+            from Core.changeDetector import detect_changes
+            tracked = None
+            try:
+                manifest = find_manifest(manifest_dir)
+                tracked = manifest.summary()
+                changes = detect_changes(save_dir, manifest)
+            except OSError as e:
+                changes = e
+            wx.CallAfter(self.ShowModifiedFiles, save_dir, changes, tracked)
+
+        threading.Thread(target=detect, daemon=True).start()
+
+    def ShowModifiedFiles(self, save_dir, changes, tracked=None):
+        # Ignore results for a save that is no longer selected
+        if not self or save_dir != self.current_save_dir:
+            return
+        if tracked is not None:
+            self.session.save_details(save_dir)['tracked'] = list(tracked)
+            self.tracked_label.SetLabel(describe_tracked(*tracked))
+        if isinstance(changes, OSError):
+            self.modified_list.Set([f"Failed to scan the save: {changes}"])
+            return
+        from Core.changeDetector import describe_change
+        rows = [describe_change(change) for change in changes[:MAX_MODIFIED_ROWS]]
+        if len(changes) > MAX_MODIFIED_ROWS:
+            rows.append(f"... and {len(changes) - MAX_MODIFIED_ROWS} more")
+        self.modified_list.Set(rows or ["No changes since the last commit"])
+
+    def LoadHistory(self, save_dir):
+        """Open the history of a save's repository on a background thread"""
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        self.commit_list.SetHistory(None)
+        self.commit_details.SetValue("")
+        self.commit_changes = []
+        self.commit_changes_list.Set([])
+        self.commit_diff.SetValue("")
+        self.history_label.SetLabel("Loading history...")
+        repo = self.GetWorkspaceDir(save_dir, 'repository')
+
+        def load():
+            from Core.gitHistory import GitHistory
+            history = None
+            try:
+                if os.path.isdir(repo):
+                    history = GitHistory(repo)
+                    history.commit(0)
+            except (OSError, RuntimeError, ValueError) as e:
+                history = e
+            wx.CallAfter(self.ShowHistory, save_dir, history)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def RefreshHistory(self):
+        """Pick up new commits; summaries of the commits already seen stay cached"""
+        history, save_dir = self.history, self.current_save_dir
+        if history is None:
+            if save_dir:
+                self.LoadHistory(save_dir)
+            return
+
+        def refresh():
+            try:
+                history.refresh()
+                history.commit(0)
+            except (OSError, RuntimeError, ValueError):
+                pass
+            wx.CallAfter(self.ShowHistory, save_dir, history)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def ShowHistory(self, save_dir, history):
+        if not self or save_dir != self.current_save_dir:
+            if history is not None and not isinstance(history, Exception):
+                history.close()
+            return
+        if isinstance(history, Exception):
+            self.history_label.SetLabel(f"Failed to read the history: {history}")
+            self.last_commit_label.SetLabel("Unknown")
+            return
+        details = self.session.save_details(save_dir)
+        if history is not self.history and self.history is not None:
+            self.history.close()
+        self.history = history
+        self.commit_list.SetHistory(history)
+        head = history.loaded(0) if history else None
+        if head is None:
+            details.update(last_commit=None, commits=0)
+            self.history_label.SetLabel("No commits yet")
+            self.last_commit_label.SetLabel("Never")
+            return
+        details.update(last_commit=[head.subject, head.timestamp], commits=len(history))
+        self.history_label.SetLabel(f"{len(history)} commit{'s' if len(history) != 1 else ''} on "
+                                    f"{history.ref.rsplit('/', 1)[-1]}")
+        self.last_commit_label.SetLabel(f"{head.subject} ({describe_time(head.timestamp)})")
+
+    def OnCommitSelected(self, event):
+        """Show the full message and the changed files and chunks of a commit"""
+        history = self.history
+        commit = history.loaded(event.GetIndex()) if history else None
+        if commit is None:
+            return
+        self.commit_details.SetValue(f"{commit.id}\n{commit.author}, {describe_time(commit.timestamp)}\n")
+        self.commit_changes = []
+        self.commit_changes_list.Set([])
+        self.commit_diff.SetValue("")
+
+        def load():
+            try:
+                details = (history.message(commit), history.changes(commit))
+            except (OSError, RuntimeError) as e:
+                details = e
+            wx.CallAfter(self.ShowCommitDetails, history, commit, details)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def ShowCommitDetails(self, history, commit, details):
+        if not self or history is not self.history:
+            return
+        selected = self.commit_list.GetFirstSelected()
+        if selected < 0 or history.loaded(selected) != commit:
+            return
+        from Core.gitHistory import describe_summary
+        lines = [commit.id, f"{commit.author}, {describe_time(commit.timestamp)}", ""]
+        if isinstance(details, Exception):
+            lines.append(f"Failed to read the commit: {details}")
+            self.commit_details.SetValue('\n'.join(lines))
+            return
+        message, summary = details
+        lines += [message, "", f"Changes: {describe_summary(summary)}"]
+        self.commit_details.SetValue('\n'.join(lines))
+
+        # The first row diffs the whole commit, the others one file or chunk
+        rows = ["All changes"]
+        changes = [(commit, [(path, None) for status, path in summary.files] +
+                    [(region, None) for region in summary.chunks])]
+        for status, path in summary.files:
+            rows.append(f"{status} {path}")
+            changes.append((commit, [(path, None)]))
+        for region, chunks in summary.chunks.items():
+            for status, chunk_x, chunk_z in chunks:
+                rows.append(f"{status} {region} chunk ({chunk_x}, {chunk_z})")
+                changes.append((commit, [(region, f"{chunk_x},{chunk_z}")]))
+        if len(rows) > MAX_CHANGE_ROWS + 1:
+            more = len(rows) - MAX_CHANGE_ROWS - 1
+            rows, changes = rows[:MAX_CHANGE_ROWS + 1], changes[:MAX_CHANGE_ROWS + 1]
+            rows.append(f"... and {more} more")
+        self.commit_changes = changes
+        self.commit_changes_list.Set(rows)
+        self.commit_changes_list.SetSelection(0)
+        self.ShowCommitDiff(history, 0)
+
+    def OnCommitChangeSelected(self, event):
+        """Show the tag differences of one changed file or chunk"""
+        index = event.GetSelection()
+        if self.history and 0 <= index < len(self.commit_changes):
+            self.ShowCommitDiff(self.history, index)
+
+    def ShowCommitDiff(self, history, index):
+        """Diff the files or chunks of a row of the changes list against the commit's first
+        parent on a background thread; only documents whose git objects changed are loaded"""
+        commit, targets = self.commit_changes[index]
+        parent = commit.parents[0] if commit.parents else None
+        self.commit_diff.SetValue("Comparing with the parent commit...")
+
+        def diff():
+            from Core.nbtDiff import commit_documents, diff_documents, describe_difference
+            lines = []
+            try:
+                for path, label in targets:
+                    old, new = commit_documents(history.repo, commit.id, parent, path)
+                    if label is not None:
+                        old = {label: old[label]} if label in old else {}
+                        new = {label: new[label]} if label in new else {}
+                    for document, differences in diff_documents(old, new):
+                        lines.append(f"{path} chunk ({document.replace(',', ', ')}):" if document
+                                     else f"{path}:")
+                        lines += ["  " + describe_difference(difference) for difference in differences]
+                        if len(lines) >= MAX_DIFF_ROWS:
+                            break
+                    if len(lines) >= MAX_DIFF_ROWS:
+                        lines = lines[:MAX_DIFF_ROWS] + ["... diff truncated"]
+                        break
+            except (OSError, RuntimeError, ValueError) as e:
+                lines.append(f"Failed to compare: {e}")
+            wx.CallAfter(self.ShowDiff, history, commit, index, lines)
+
+        threading.Thread(target=diff, daemon=True).start()
+
+    def ShowDiff(self, history, commit, index, lines):
+        if not self or history is not self.history:
+            return
+        # Only the diff of the row still selected is shown
+        selected = self.commit_changes_list.GetSelection()
+        if selected != index or index >= len(self.commit_changes) or self.commit_changes[index][0] != commit:
+            return
+        self.commit_diff.SetValue('\n'.join(lines) or "No tag differences")
+
+    def OnViewHistory(self, event):
+        self.notebook.SetSelection(self.history_page)
 
     def OnRemoveSave(self, event):
         selected = self.savesTree.GetSelection()
-        if selected.IsOk() and selected != self.savesTree.GetRootItem():
+        if selected.IsOk() and self.savesTree.GetItemData(selected) in self.save_infos:
             save_name = self.savesTree.GetItemText(selected)
             
             # Confirm removal
@@ -299,13 +1033,9 @@ class MainFrame(wx.Frame):
             )
             
             if dlg.ShowModal() == wx.ID_YES:
+                self.ForgetTreePath(self.savesTree.GetItemData(selected))
                 self.savesTree.Delete(selected)
-                # Reset display
-                if self.current_save_label:
-                    self.current_save_label.SetLabel("Current Save: None")
-                if self.save_path_label:
-                    self.save_path_label.SetLabel("Not selected")
-                self.current_save_dir = ""
+                self.ClearSaveDisplay()
                 self.SetStatusText(f"Removed from list: {save_name}")
             
             dlg.Destroy()
@@ -317,10 +1047,421 @@ class MainFrame(wx.Frame):
         if item.IsOk() and item != self.savesTree.GetRootItem():
             save_name = self.savesTree.GetItemText(item)
             directory = self.savesTree.GetItemData(item)
-            if directory:
+            # Only worlds change the current save, not the folders and files below them
+            if directory in self.save_infos:
                 self.UpdateSaveDisplay(save_name, directory)
+            elif directory and os.path.isfile(directory):
+                from Core.nbtBrowser import is_browsable
+                if is_browsable(directory):
+                    self.OpenNbtPath(directory)
+
+    def GetWorkspaceDir(self, save_dir, name):
+        """Return a folder of the save's workspace: translation, repository or build"""
+        return os.path.join(save_dir.rstrip(os.sep) + WORKSPACE_SUFFIX, name)
+
+    def GetSelectedSaveDir(self):
+        if self.current_save_dir and os.path.isdir(self.current_save_dir):
+            return self.current_save_dir
+        wx.MessageBox("Select a save first.", "No Save Selected", wx.OK | wx.ICON_INFORMATION)
+        return None
+
+    def SubmitJob(self, save_dir, action, label, function, *args, **kwargs):
+        """Queue a job for a save; repeated requests for the same job are merged"""
+        job, queued = self.jobs.submit((action, save_dir), f"{label} {os.path.basename(save_dir)}",
+                                       function, *args, **kwargs)
+        if not queued:
+            self.SetStatusText(f"{job.label} is already {job.state}")
+        elif job.state == 'queued' and self.jobs.pending() > 1:
+            self.SetStatusText(f"Queued: {job.label} ({self.jobs.pending() - 1} ahead)")
+
+    def AskCommitMessage(self, save_dir):
+        dlg = wx.TextEntryDialog(self, "Commit message:", "Commit Changes",
+                                 f"Update {os.path.basename(save_dir)}")
+        message = dlg.GetValue().strip() if dlg.ShowModal() == wx.ID_OK else None
+        dlg.Destroy()
+        return message or None
+
+    def SubmitCommit(self, save_dir, label, message):
+        """Commit a save; the entity index is updated with each commit, so its rows carry commit ids"""
+        from Core.gitFastImport import commit_save
+        from Core.entityIndex import INDEX_NAME
+        self.SubmitJob(save_dir, 'commit', label, commit_save, save_dir,
+                       self.GetWorkspaceDir(save_dir, 'repository'), message,
+                       index=self.GetWorkspaceDir(save_dir, INDEX_NAME), **translate_options())
+
+    def SubmitTranslate(self, save_dir):
+        from Core.savePipeline import translate_save
+        self.SubmitJob(save_dir, 'translate', "Translating", translate_save, save_dir,
+                       self.GetWorkspaceDir(save_dir, 'translation'), **translate_options())
+
+    def OnTranslateSave(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        if save_dir:
+            self.SubmitTranslate(save_dir)
+
+    def OnCommitChanges(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        message = save_dir and self.AskCommitMessage(save_dir)
+        if message:
+            self.SubmitCommit(save_dir, "Committing", message)
+
+    def OnCommitAndTranslate(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        message = save_dir and self.AskCommitMessage(save_dir)
+        if message:
+            self.SubmitTranslate(save_dir)
+            self.SubmitCommit(save_dir, "Committing", message)
+
+    def OnBuildSave(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        if not save_dir:
+            return
+        translation_dir = self.GetWorkspaceDir(save_dir, 'translation')
+        if not os.path.isdir(translation_dir):
+            wx.MessageBox("Translate the save before building it.", "Nothing to Build",
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        if self.backup_check and self.backup_check.GetValue():
+            self.SubmitBackup(save_dir)
+        from Core.saveBuilder import build_save
+        from Core.chunkStore import default_store_dir
+        self.SubmitJob(save_dir, 'build', "Building", build_save, translation_dir,
+                       self.GetWorkspaceDir(save_dir, 'build'), store=default_store_dir())
+
+    def SubmitBackup(self, save_dir):
+        """Snapshot a save into the shared chunk store; unchanged chunks cost nothing"""
+        from Core.chunkStore import backup_save, default_store_dir
+        self.SubmitJob(save_dir, 'backup', "Backing up", backup_save, save_dir, default_store_dir())
+
+    def OnBackupSave(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        if save_dir:
+            self.SubmitBackup(save_dir)
+
+    def OnPruneStore(self, event):
+        """Remove what no backup snapshot references any more from the chunk store"""
+        from Core.chunkStore import prune_store, default_store_dir
+        store_dir = default_store_dir()
+        if not os.path.isdir(store_dir):
+            self.SetStatusText("There is no backup store to prune")
+            return
+        job, queued = self.jobs.submit(('prune', store_dir), "Pruning the backup store", prune_store, store_dir)
+        if not queued:
+            self.SetStatusText(f"{job.label} is already {job.state}")
+
+    def OnSearchIndex(self, event):
+        save_dir = self.GetSelectedSaveDir()
+        if not save_dir:
+            return
+        from Core.entityIndex import INDEX_NAME, INDEX_KINDS, search_index, format_position, short_revision
+        index = self.GetWorkspaceDir(save_dir, INDEX_NAME)
+        if not os.path.isfile(index):
+            wx.MessageBox("The index is written when the save is committed. Commit it first.",
+                          "No Index", wx.OK | wx.ICON_INFORMATION)
+            return
+        selection = self.search_kind_choice.GetSelection()
+        kind = INDEX_KINDS[selection - 1] if selection > 0 else None
+        try:
+            records = search_index(index, kind=kind, type=self.search_type_text.GetValue().strip() or None,
+                                   name=self.search_name_text.GetValue().strip() or None,
+                                   history=self.search_history_check.GetValue(),
+                                   limit=MAX_SEARCH_ROWS + 1)
+        except Exception as e:
+            self.SetStatusText(f"Search failed: {e}")
+            return
+        self.search_results.DeleteAllItems()
+        for record in records[:MAX_SEARCH_ROWS]:
+            row = self.search_results.InsertItem(self.search_results.GetItemCount(), record.type or record.kind)
+            self.search_results.SetItem(row, 1, record.name or record.uuid or "")
+            self.search_results.SetItem(row, 2, format_position(record))
+            self.search_results.SetItem(row, 3, record.dimension or "")
+            self.search_results.SetItem(row, 4, short_revision(record.added))
+            self.search_results.SetItem(row, 5, short_revision(record.removed) if record.removed else "")
+        shown = min(len(records), MAX_SEARCH_ROWS)
+        more = " (refine the search to see the rest)" if len(records) > MAX_SEARCH_ROWS else ""
+        self.SetStatusText(f"{shown} result{'s' if shown != 1 else ''} found{more}")
+
+    def OnOpenNbtFile(self, event):
+        dlg = wx.FileDialog(self, "Open an NBT file", defaultDir=self.current_save_dir,
+                            wildcard="NBT files (*.dat;*.nbt;*.mca;*.mcstructure)|*.dat;*.dat_old;*.nbt;*.mca;*.mcr;*.mcstructure"
+                                     "|All files (*.*)|*.*",
+                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.OpenNbtPath(dlg.GetPath())
+        dlg.Destroy()
+
+    def OpenNbtPath(self, path):
+        """Show a file in the NBT browser; region files list their chunks and open the first"""
+        if not self.ConfirmNbtEdits():
+            return
+        from Core.nbtBrowser import is_region, region_chunk_list
+        if not is_region(path):
+            self.nbt_region = None
+            self.nbt_chunk_choice.Hide()
+            self.nbt_chunk_choice.GetParent().Layout()
+            self.OpenNbtDocument(path, None)
+            return
+        try:
+            chunks = region_chunk_list(path)
+        except OSError as e:
+            self.SetStatusText(f"Failed to read {os.path.basename(path)}: {e}")
+            return
+        self.nbt_region = path
+        self.nbt_chunks = chunks
+        self.nbt_chunk_choice.Set([f"Chunk ({chunk_x}, {chunk_z})" for chunk_x, chunk_z in chunks])
+        self.nbt_chunk_choice.Show(bool(chunks))
+        self.nbt_chunk_choice.GetParent().Layout()
+        if chunks:
+            self.nbt_chunk_choice.SetSelection(0)
+            self.OpenNbtDocument(path, chunks[0])
+        else:
+            self.ShowNbtDocument((path, None), ValueError("the region file has no chunks"))
+
+    def OnNbtChunkChosen(self, event):
+        selection = self.nbt_chunk_choice.GetSelection()
+        if self.nbt_region is None or selection < 0:
+            return
+        if not self.ConfirmNbtEdits():
+            # Stay on the chunk that has the edits
+            document = self.nbt_document
+            if document is not None and document.chunk in self.nbt_chunks:
+                self.nbt_chunk_choice.SetSelection(self.nbt_chunks.index(document.chunk))
+            return
+        self.OpenNbtDocument(self.nbt_region, self.nbt_chunks[selection])
+
+    def OpenNbtDocument(self, path, chunk):
+        """Parse a file or chunk on a background thread; recently opened ones come from the cache"""
+        self.nbt_wanted = (path, chunk)
+        self.nbt_path_label.SetLabel(f"Loading {path}...")
+        if self.nbt_documents is None:
+            from Core.nbtBrowser import DocumentCache
+            self.nbt_documents = DocumentCache()
+
+        def load():
+            try:
+                document = self.nbt_documents.open(path, chunk)
+            except Exception as e:
+                document = e
+            wx.CallAfter(self.ShowNbtDocument, (path, chunk), document)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def ShowNbtDocument(self, wanted, document):
+        if not self or wanted != self.nbt_wanted:
+            return
+        from Core.nbtBrowser import DocumentChanged
+        if isinstance(document, DocumentChanged):
+            answer = wx.MessageBox(f"{document}. Discard your unsaved edits and load it again?",
+                                   "File Changed", wx.YES_NO | wx.ICON_WARNING)
+            if answer == wx.YES:
+                self.nbt_documents.discard(document.document)
+                self.OpenNbtDocument(*wanted)
+                return
+            # Keep showing the edits; saving them fails until they are discarded
+            document = document.document
+        self.nbt_tree.DeleteAllItems()
+        root = self.nbt_tree.AddRoot("")
+        if isinstance(document, Exception):
+            self.nbt_document = None
+            self.nbt_path_label.SetLabel(f"Failed to open {wanted[0]}: {document}")
+            self.nbt_save_button.Disable()
+            return
+        self.nbt_document = document
+        self.nbt_path_label.SetLabel(document.path + (f" chunk ({document.chunk[0]}, {document.chunk[1]})"
+                                                      if document.chunk else ""))
+        self.nbt_tree.SetItemData(root, ('tag', ()))
+        self.AppendNbtChildren(root, (), 0)
+        self.nbt_save_button.Enable(document.dirty)
+
+    def AppendNbtChildren(self, item, path, start):
+        """Add one page of a container's children; a last node stands for the rest"""
+        from Core.nbtBrowser import CHILD_PAGE, resolve, is_container, iter_children, describe_tag
+        tag = resolve(self.nbt_document.root, path)
+        self.nbt_tree.Freeze()
+        try:
+            for step, child in iter_children(tag, start, CHILD_PAGE):
+                node = self.nbt_tree.AppendItem(item, describe_tag(step, child))
+                self.nbt_tree.SetItemData(node, ('tag', path + (step,)))
+                if is_container(child) and len(child):
+                    self.nbt_tree.SetItemHasChildren(node, True)
+            remaining = len(tag) - start - CHILD_PAGE
+            if remaining > 0:
+                node = self.nbt_tree.AppendItem(item, f"... {remaining} more (double-click to show)")
+                self.nbt_tree.SetItemData(node, ('more', path, start + CHILD_PAGE))
+        finally:
+            self.nbt_tree.Thaw()
+
+    def OnNbtExpanding(self, event):
+        item = event.GetItem()
+        data = self.nbt_tree.GetItemData(item)
+        if self.nbt_document is None or not data or self.nbt_tree.GetChildrenCount(item, False):
+            return
+        self.AppendNbtChildren(item, data[1], 0)
+
+    def OnNbtActivated(self, event):
+        """Double-click: show the next page of children, or edit a value"""
+        item = event.GetItem()
+        data = self.nbt_tree.GetItemData(item)
+        document = self.nbt_document
+        if document is None or not data:
+            return
+        if data[0] == 'more':
+            parent = self.nbt_tree.GetItemParent(item)
+            self.nbt_tree.Delete(item)
+            self.AppendNbtChildren(parent, data[1], data[2])
+            return
+        from Core.nbtBrowser import resolve, is_container, describe_tag, edit_text
+        path = data[1]
+        tag = resolve(document.root, path)
+        if is_container(tag):
+            event.Skip()
+            return
+        dlg = wx.TextEntryDialog(self, f"New value of {describe_tag(path[-1], tag)}:", "Edit Value",
+                                 edit_text(tag))
+        if dlg.ShowModal() == wx.ID_OK:
+            try:
+                tag = document.set_value(path, dlg.GetValue())
+            except ValueError as e:
+                wx.MessageBox(f"Invalid value: {e}", "Edit Value", wx.OK | wx.ICON_ERROR)
+            else:
+                self.nbt_tree.SetItemText(item, describe_tag(path[-1], tag))
+                self.nbt_save_button.Enable()
+                self.SetStatusText(f"Edited {document.label} (not saved)")
+        dlg.Destroy()
+
+    def FindSaveOf(self, path):
+        """Return the known world a file belongs to, or None"""
+        for save_dir in self.save_infos:
+            if path.startswith(save_dir.rstrip(os.sep) + os.sep):
+                return save_dir
+        return None
+
+    def OnSaveNbt(self, event):
+        """Write the edited document back as a job: only its file, or its chunk of the region"""
+        document = self.nbt_document
+        if document is None or not document.dirty:
+            return
+        save_dir = self.FindSaveOf(document.path) or os.path.dirname(document.path)
+        if self.backup_check and self.backup_check.GetValue() and save_dir in self.save_infos:
+            self.SubmitBackup(save_dir)
+        from Core.nbtBrowser import write_document
+        encoded = document.encode()
+        self.jobs.submit(('edit', document.key, encoded[0]), f"Saving {document.label}",
+                         write_document, document, encoded)
+        self.nbt_save_button.Disable()
+
+    def ConfirmNbtEdits(self, write_now=False):
+        """Ask what to do with unsaved edits before leaving a document; False means stay"""
+        document = self.nbt_document
+        if document is None or not document.dirty:
+            return True
+        dlg = wx.MessageDialog(self, f"Save the changes to {document.label}?", "Unsaved Changes",
+                               wx.YES_NO | wx.CANCEL | wx.ICON_QUESTION)
+        answer = dlg.ShowModal()
+        dlg.Destroy()
+        if answer == wx.ID_CANCEL:
+            return False
+        if answer == wx.ID_NO:
+            self.nbt_documents.discard(document)
+        elif write_now:
+            document.write(document.encode())
+        else:
+            self.OnSaveNbt(None)
+        return True
+
+    def OnCancelJobs(self, event):
+        if self.jobs.pending():
+            self.jobs.cancel()
+            self.SetStatusText("Cancelling...")
+
+    def OnJobStarted(self, job):
+        if self:
+            self.SetStatusText(f"{job.label}...")
+
+    def OnJobProgress(self, job, stats):
+        if not self or job.state != 'running':
+            return
+        queued = self.jobs.pending() - 1
+        self.SetStatusText(f"{job.label}: {stats.files} files ({stats.files_per_second:.1f} files/s)"
+                           + (f", {queued} more queued" if queued > 0 else ""))
+
+    def OnJobFinished(self, job):
+        if not self:
+            return
+        if job.state == 'failed':
+            self.SetStatusText(f"{job.label} failed: {job.error}")
+        elif job.state == 'cancelled':
+            self.SetStatusText(f"{job.label} cancelled")
+        else:
+            # commit_save and backup_save return (stats, result); the other jobs return their stats
+            stats = job.result[0] if isinstance(job.result, tuple) else job.result
+            self.SetStatusText(f"{job.label} finished: {stats.summary()}")
+            if job.metrics is not None:
+                self.stats_text.SetValue(f"{job.label}\n{job.metrics.summary()}")
+            if job.key == ('commit', self.current_save_dir):
+                self.RefreshModifiedFiles(self.current_save_dir)
+                self.RefreshHistory()
+            elif job.key[0] == 'edit' and self.current_save_dir:
+                self.RefreshModifiedFiles(self.current_save_dir)
+        if job.key[0] == 'edit' and self.nbt_document is not None:
+            self.nbt_save_button.Enable(self.nbt_document.dirty)
+
+    def OnCollectMetrics(self, event):
+        """Time the stages of the following jobs; recording costs nothing while this is off"""
+        collect = self.metrics_check.GetValue()
+        self.jobs.collect_metrics = collect
+        self.stats_pane.Show(collect)
+        if collect and not self.stats_text.GetValue():
+            self.stats_text.SetValue("Statistics appear here when the next job finishes.")
+        self.Layout()
+
+    def OnWatchSave(self, event):
+        """Toggle watching the current save; every quiet period after changes becomes a commit"""
+        save_dir = self.GetSelectedSaveDir()
+        if not save_dir:
+            self.GetMenuBar().Check(ID_WATCH_SAVE, False)
+            return
+        watcher = self.watchers.pop(save_dir, None)
+        if watcher:
+            watcher.stop(wait=False)
+            self.SetStatusText(f"Stopped watching {os.path.basename(save_dir)}")
+        else:
+            from Core.saveWatcher import SaveWatcher
+            watcher = SaveWatcher(save_dir, lambda changed: wx.CallAfter(self.OnSaveChanged, save_dir, changed))
+            watcher.start()
+            self.watchers[save_dir] = watcher
+            self.SetStatusText(f"Watching {os.path.basename(save_dir)} for changes")
+        self.GetMenuBar().Check(ID_WATCH_SAVE, save_dir in self.watchers)
+
+    def OnSaveChanged(self, save_dir, changed):
+        if not self or save_dir not in self.watchers:
+            return
+        message = f"Autosave: {len(changed)} changed file{'s' if len(changed) != 1 else ''}"
+        self.SubmitCommit(save_dir, "Auto-committing", message)
+
+    def OnClose(self, event):
+        try:
+            if not self.ConfirmNbtEdits(write_now=True) and event.CanVeto():
+                event.Veto()
+                return
+        except (OSError, ValueError, RuntimeError) as e:
+            wx.MessageBox(f"Failed to save the changes: {e}", "Error", wx.OK | wx.ICON_ERROR)
+            if event.CanVeto():
+                event.Veto()
+                return
+        for watcher in self.watchers.values():
+            watcher.stop(wait=False)
+        # Stop before the next file; running worker processes finish their current task
+        self.jobs.shutdown(wait=False)
+        if self.history is not None:
+            self.history.close()
+        self.StoreSession()
+        event.Skip()
 
 if __name__ == '__main__':
+    # Created here rather than at import time: worker processes re-import this module
+    app = wx.App(False)
+
     default_font = wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
     default_font.SetFaceName("Segoe UI")
 
@@ -0,0 +1,94 @@
+import os
+import sys
+import struct
+
+import nbtlib
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Core.syntheticWorld import generate_world, write_region
+from Core.regionParser import iter_region_chunks
+from Core.nbtFormat import get_format, parse_nbt
+
+
+@pytest.fixture
+def world(tmp_path):
+    """
+    A small synthetic world: one region of four chunks with entities, a
+    level.dat, a player and a Bedrock structure.
+    """
+    path = str(tmp_path / 'world')
+    generate_world(path, chunks=4, sections=2, entities=1, players=1, structures=1, structure_size=2)
+    return path
+
+
+@pytest.fixture
+def git_identity(monkeypatch):
+    for name in ('GIT_AUTHOR', 'GIT_COMMITTER'):
+        monkeypatch.setenv(name + '_NAME', 'test')
+        monkeypatch.setenv(name + '_EMAIL', 'test@example.com')
+
+
+def read_chunks(filepath):
+    """
+    Return {(chunk_x, chunk_z): (timestamp, nbt)} of a region file.
+    """
+    return {(chunk_x, chunk_z): (timestamp, nbt_data)
+            for chunk_x, chunk_z, timestamp, compression, nbt_data in iter_region_chunks(filepath)}
+
+
+def read_world(path):
+    """
+    Return {relative path: contents} of a world folder, with region files as
+    read_chunks() and every other file as its parsed NBT.
+    """
+    contents = {}
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            filepath = os.path.join(root, name)
+            rel_path = os.path.relpath(filepath, path).replace(os.sep, '/')
+            if name.endswith('.mca'):
+                contents[rel_path] = read_chunks(filepath)
+            elif name.endswith(('.dat', '.mcstructure')):
+                contents[rel_path] = parse_nbt(filepath, get_format(filepath))
+    return contents
+
+
+def edit_chunk(world_dir, chunk=(1, 0), timestamp=2):
+    """
+    Change one block of a chunk of the world's terrain region and bump its
+    timestamp, like the game saving an edit.
+    """
+    filepath = os.path.join(world_dir, 'region', 'r.0.0.mca')
+    chunks = read_chunks(filepath)
+    block_states = chunks[chunk][1]['sections'][0]['block_states']
+    data = [int(value) for value in block_states['data']]
+    data[0] ^= 1
+    block_states['data'] = nbtlib.LongArray(data)
+    chunks[chunk] = (timestamp, chunks[chunk][1])
+    write_region(filepath, chunks)
+
+
+def tick_chunk(world_dir, chunk=(1, 0), timestamp=2):
+    """
+    Change only the volatile LastUpdate of a chunk and bump its timestamp,
+    like the game saving a chunk nobody touched.
+    """
+    filepath = os.path.join(world_dir, 'region', 'r.0.0.mca')
+    chunks = read_chunks(filepath)
+    nbt_data = chunks[chunk][1]
+    nbt_data['LastUpdate'] = nbtlib.Long(nbt_data['LastUpdate'] + 20)
+    chunks[chunk] = (timestamp, nbt_data)
+    write_region(filepath, chunks)
+
+
+def corrupt_chunk(filepath, index=1):
+    """
+    Overwrite the compressed data of one chunk of a region file.
+    """
+    with open(filepath, 'r+b') as f:
+        f.seek(index * 4)
+        sector = struct.unpack('>I', f.read(4))[0] >> 8
+        f.seek(sector * 4096 + 5)
+        f.write(b'\xff' * 16)
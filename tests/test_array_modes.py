@@ -0,0 +1,54 @@
+import json
+
+import nbtlib
+import pytest
+
+from Core.defaultNbtParser import (ARRAY_MODES, encode_array, decode_array, iter_json_text,
+                                   nbt_to_json_serializable)
+
+ARRAYS = [
+    nbtlib.ByteArray([-128, 0, 1, 127]),
+    nbtlib.IntArray([-2 ** 31, 0, 7, 2 ** 31 - 1]),
+    nbtlib.LongArray([-2 ** 63, 0, 9, 2 ** 63 - 1]),
+]
+
+
+def sample():
+    return nbtlib.Compound({
+        'bytes': ARRAYS[0],
+        'ints': ARRAYS[1],
+        'nested': nbtlib.List[nbtlib.Compound]([nbtlib.Compound({'longs': ARRAYS[2]})]),
+        'name': nbtlib.String('test'),
+        'empty': nbtlib.IntArray([]),
+    })
+
+
+@pytest.mark.parametrize('array_mode', ['base64', 'hex'])
+@pytest.mark.parametrize('array', ARRAYS, ids=lambda array: type(array).__name__)
+def test_compact_arrays_decode_to_the_same_tag(array, array_mode):
+    encoded = encode_array(array, array_mode)
+    decoded = decode_array(json.loads(json.dumps(encoded)))
+    assert type(decoded) is type(array)
+    assert decoded.tolist() == array.tolist()
+
+
+def test_list_mode_writes_plain_numbers():
+    assert encode_array(ARRAYS[1], 'list') == [-2 ** 31, 0, 7, 2 ** 31 - 1]
+
+
+def test_unknown_mode_is_refused():
+    with pytest.raises(ValueError):
+        encode_array(ARRAYS[0], 'octal')
+
+
+def test_streamed_text_equals_json_dumps_in_list_mode():
+    data = sample()
+    expected = json.dumps(nbt_to_json_serializable(data, 'list'), indent=2)
+    assert ''.join(iter_json_text(data)) == expected
+
+
+@pytest.mark.parametrize('array_mode', ARRAY_MODES)
+def test_streamed_text_parses_to_the_serializable_data(array_mode):
+    data = sample()
+    text = ''.join(iter_json_text(data, array_mode=array_mode, sort_keys=True))
+    assert json.loads(text) == nbt_to_json_serializable(data, array_mode)
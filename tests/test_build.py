@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from Core.savePipeline import translate_save
+from Core.saveBuilder import build_save
+from conftest import read_world
+
+
+@pytest.mark.parametrize('array_mode', ['list', 'base64'])
+def test_typed_translation_builds_the_same_world(world, tmp_path, array_mode):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    assert translate_save(world, translated, jobs=1, output_format='typed', array_mode=array_mode).errors == 0
+    assert build_save(translated, built, jobs=1).errors == 0
+    assert read_world(built) == read_world(world)
+
+
+def test_build_cache_reuses_regions(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    translate_save(world, translated, jobs=1, output_format='typed')
+    build_save(translated, str(tmp_path / 'first'), jobs=1)
+    stats = build_save(translated, str(tmp_path / 'second'), jobs=1)
+    assert stats.reused == 2
+    assert read_world(str(tmp_path / 'second')) == read_world(world)
+
+
+def test_json_translation_is_not_built(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    translate_save(world, translated, jobs=1, output_format='json')
+    assert build_save(translated, built, jobs=1).errors > 0
+    assert not os.path.exists(os.path.join(built, 'region', 'r.0.0.mca'))
+
+
+def test_region_with_a_broken_chunk_is_not_written(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    translate_save(world, translated, jobs=1, output_format='typed')
+    with open(os.path.join(translated, 'region', 'r.0.0.mca.chunks', 'c.1.0.json'), 'w') as f:
+        f.write('{')
+    stats = build_save(translated, built, jobs=1, use_cache=False)
+    assert stats.errors == 1
+    assert not os.path.exists(os.path.join(built, 'region', 'r.0.0.mca'))
+    assert os.path.exists(os.path.join(built, 'entities', 'r.0.0.mca'))
@@ -0,0 +1,41 @@
+import os
+
+from Core.canonicalLayout import CHUNK_MAIN_FILE, load_canonical_chunk
+from Core.savePipeline import translate_save
+from Core.saveBuilder import build_save
+from conftest import read_world, read_chunks, edit_chunk
+
+CHUNK = os.path.join('region', 'r.0.0.mca.chunks', 'c.1.0')
+
+
+def test_chunks_are_split_into_folders(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    assert translate_save(world, translated, jobs=1, layout='canonical').errors == 0
+    names = sorted(os.listdir(os.path.join(translated, CHUNK)))
+    assert CHUNK_MAIN_FILE in names and 'sections' in names and 'block_entities.json' in names
+    assert len(os.listdir(os.path.join(translated, CHUNK, 'sections'))) == 2
+    header, chunk = load_canonical_chunk(os.path.join(translated, CHUNK))
+    assert chunk == read_chunks(os.path.join(world, 'region', 'r.0.0.mca'))[1, 0][1]
+
+
+def test_canonical_translation_builds_the_same_world(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    translate_save(world, translated, jobs=1, layout='canonical')
+    assert build_save(translated, built, jobs=1).errors == 0
+    assert read_world(built) == read_world(world)
+
+
+def test_edit_rewrites_only_the_changed_section(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    translate_save(world, translated, jobs=1, layout='canonical')
+    folder = os.path.join(translated, CHUNK)
+    before = {name: os.stat(os.path.join(root, name)).st_mtime_ns
+              for root, dirs, names in os.walk(folder) for name in names}
+    edit_chunk(world)
+    translate_save(world, translated, jobs=1, layout='canonical')
+    after = {name: os.stat(os.path.join(root, name)).st_mtime_ns
+             for root, dirs, names in os.walk(folder) for name in names}
+    changed = sorted(name for name in after if after[name] != before.get(name))
+    # The header moves with the timestamp; edit_chunk() changed the section at Y=-4
+    assert changed == sorted([CHUNK_MAIN_FILE, '-4.json'])
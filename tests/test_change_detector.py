@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pytest
+
+from Core.changeDetector import detect_changes, describe_change, status_command
+from Core.gitFastImport import commit_save
+from Core.manifest import Manifest
+from Core.savePipeline import translate_save
+from Core.syntheticWorld import write_region
+from conftest import read_chunks, edit_chunk
+
+REGION = os.path.join('region', 'r.0.0.mca')
+
+
+@pytest.fixture
+def translated(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1)
+    return output
+
+
+def changes(world, output):
+    return [describe_change(change) for change in detect_changes(world, Manifest.load(output))]
+
+
+def test_untouched_save_has_no_changes(world, translated):
+    assert changes(world, translated) == []
+
+
+def test_region_rewritten_with_the_same_chunks_is_unchanged(world, translated):
+    region = os.path.join(world, REGION)
+    write_region(region, read_chunks(region))
+    assert changes(world, translated) == []
+
+
+def test_changes_are_ranked_by_chunk_count(world, translated):
+    edit_chunk(world, (1, 0))
+    edit_chunk(world, (2, 0))
+    entities = os.path.join(world, 'entities', 'r.0.0.mca')
+    chunks = read_chunks(entities)
+    del chunks[min(chunks)]
+    write_region(entities, chunks)
+    with open(os.path.join(world, 'level.dat'), 'ab') as f:
+        f.write(b'\0')
+    os.remove(os.path.join(world, 'structures', 'structure_0.mcstructure'))
+    shutil.copyfile(os.path.join(world, 'level.dat'), os.path.join(world, 'playerdata', 'new.dat'))
+    found = detect_changes(world, Manifest.load(translated))
+    assert [(change.path, change.status, change.chunks) for change in found[:1]] == [
+        (REGION, 'modified', [1, 2])]
+    assert changes(world, translated) == [
+        'M region/r.0.0.mca (2 chunks)',
+        'M entities/r.0.0.mca (1 chunk)',
+        'M level.dat',
+        'A playerdata/new.dat',
+        'D structures/structure_0.mcstructure',
+    ]
+
+
+def test_symbolic_links_are_skipped(world, translated, tmp_path):
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    (outside / 'other.dat').write_bytes(b'not nbt')
+    os.symlink(str(outside), os.path.join(world, 'linked'))
+    os.symlink(os.path.join(world, 'level.dat'), os.path.join(world, 'copy.dat'))
+    assert changes(world, translated) == []
+
+
+def test_status_command_reads_translations_and_repositories(world, translated, tmp_path, git_identity,
+                                                             capsys):
+    repo = str(tmp_path / 'repo')
+    commit_save(world, repo, 'initial', jobs=1)
+    edit_chunk(world)
+    capsys.readouterr()
+    for output in (translated, repo):
+        assert status_command([world, output]) == 0
+        assert capsys.readouterr().out == 'M region/r.0.0.mca (1 chunk)\n'
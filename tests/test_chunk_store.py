@@ -0,0 +1,96 @@
+import os
+
+from Core.chunkStore import backup_save, restore_backup, prune_store, iter_snapshots, snapshot_dir
+from Core.syntheticWorld import generate_world
+from Core.savePipeline import translate_save
+from conftest import read_world, edit_chunk, corrupt_chunk
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_backup_restore_round_trip(world, tmp_path):
+    store = str(tmp_path / 'store')
+    stats, snapshot = backup_save(world, store)
+    assert stats.errors == 0
+    assert snapshot is not None
+    restored = str(tmp_path / 'restored')
+    assert restore_backup(snapshot, restored) == stats.files
+    assert read_world(restored) == read_world(world)
+
+
+def test_second_backup_is_deduplicated(world, tmp_path):
+    store = str(tmp_path / 'store')
+    first, snapshot = backup_save(world, store, name='first')
+    second, snapshot = backup_save(world, store, name='second')
+    assert first.stored > 0
+    assert second.stored == 0
+    edit_chunk(world)
+    third, snapshot = backup_save(world, store, name='third')
+    assert 0 < third.stored < first.stored
+    restored = str(tmp_path / 'restored')
+    restore_backup(snapshot, restored)
+    assert read_world(restored) == read_world(world)
+
+
+def test_unreadable_chunk_fails_the_backup(world, tmp_path):
+    store = str(tmp_path / 'store')
+    corrupt_chunk(os.path.join(world, 'region', 'r.0.0.mca'))
+    stats, snapshot = backup_save(world, store)
+    assert stats.errors == 1
+    assert snapshot is None
+    assert not list(iter_snapshots(store))
+
+
+def test_prune_keeps_what_snapshots_need(world, tmp_path):
+    store = str(tmp_path / 'store')
+    backup_save(world, store, name='first')
+    original = read_world(world)
+    edit_chunk(world)
+    stats, latest = backup_save(world, store, name='second')
+    stats = prune_store(store, keep=1)
+    assert stats.removed_snapshots == 1
+    assert stats.removed > 0
+    assert [path for path, snapshot in iter_snapshots(store)] == [latest]
+    restored = str(tmp_path / 'restored')
+    restore_backup(latest, restored)
+    assert read_world(restored) == read_world(world) != original
+
+
+def test_translation_through_the_store(world, tmp_path):
+    store = str(tmp_path / 'store')
+    first = str(tmp_path / 'first')
+    second = str(tmp_path / 'second')
+    assert translate_save(world, first, jobs=1, output_format='typed', store=store).errors == 0
+    # A second save with the same chunks reuses the stored translations
+    assert translate_save(world, second, jobs=1, output_format='typed', store=store).errors == 0
+    plain = str(tmp_path / 'plain')
+    translate_save(world, plain, jobs=1, output_format='typed')
+    chunks = os.path.join('region', 'r.0.0.mca.chunks')
+    for name in os.listdir(os.path.join(plain, chunks)):
+        expected = read_file(os.path.join(plain, chunks, name))
+        assert read_file(os.path.join(first, chunks, name)) == expected
+        assert read_file(os.path.join(second, chunks, name)) == expected
+
+
+def test_worlds_with_the_same_name_keep_their_snapshots(tmp_path):
+    store = str(tmp_path / 'store')
+    worlds = [str(tmp_path / server / 'world') for server in ('serverA', 'serverB')]
+    snapshots = {}
+    for seed, world in enumerate(worlds):
+        generate_world(world, chunks=2, sections=1, seed=seed)
+        for name in ('first', 'second'):
+            stats, snapshots[world, name] = backup_save(world, store, name=name)
+    assert snapshot_dir(store, worlds[0]) != snapshot_dir(store, worlds[1])
+    assert os.path.basename(snapshot_dir(store, worlds[0])).startswith('world-')
+
+    stats = prune_store(store, keep=1)
+    assert (stats.snapshots, stats.removed_snapshots) == (2, 2)
+    assert sorted(path for path, snapshot in iter_snapshots(store)) == sorted(
+        snapshots[world, 'second'] for world in worlds)
+    for world in worlds:
+        restored = str(tmp_path / 'restored' / os.path.basename(os.path.dirname(world)))
+        restore_backup(snapshots[world, 'second'], restored)
+        assert read_world(restored) == read_world(world)
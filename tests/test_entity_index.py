@@ -0,0 +1,125 @@
+import os
+
+import nbtlib
+import pytest
+
+from Core.entityIndex import update_index, search_index, IndexWriter, open_index
+from Core.syntheticWorld import write_region
+from conftest import read_chunks
+
+FIRST, SECOND, THIRD = 'a' * 40, 'b' * 40, 'c' * 40
+
+
+@pytest.fixture
+def index(world, tmp_path):
+    path = str(tmp_path / 'index.sqlite')
+    update = update_index(world, path, commit=FIRST, jobs=1)
+    assert (update.added, update.removed, update.updated) == (10, 0, 0)
+    return path
+
+
+def edit_region(world, folder, edit, timestamp=2):
+    """
+    Apply edit(chunks) to the chunks of a region and save it with every
+    chunk timestamp bumped.
+    """
+    filepath = os.path.join(world, folder, 'r.0.0.mca')
+    chunks = {coords: nbt_data for coords, (_, nbt_data) in read_chunks(filepath).items()}
+    edit(chunks)
+    write_region(filepath, {coords: (timestamp, nbt_data) for coords, nbt_data in chunks.items()})
+
+
+def cows(index_path, history=False):
+    return search_index(index_path, type='cow', history=history)
+
+
+def test_unchanged_save_adds_no_revision(world, index):
+    update = update_index(world, index, commit=SECOND, jobs=1)
+    assert (update.documents, update.added, update.removed, update.updated) == (0, 0, 0, 0)
+    connection = open_index(index)
+    try:
+        assert connection.execute('SELECT commit_id FROM revisions').fetchall() == [(FIRST,)]
+    finally:
+        connection.close()
+
+
+def test_entity_moving_to_another_chunk_keeps_its_record(world, index):
+    before = {record.uuid: record for record in cows(index)}
+
+    def move(chunks):
+        entity = chunks[0, 0]['Entities'].pop()
+        entity['Pos'][0] = nbtlib.Double(40.0)
+        chunks[2, 0]['Entities'].append(entity)
+
+    edit_region(world, 'entities', move)
+    update = update_index(world, index, commit=SECOND, jobs=1)
+    assert (update.added, update.removed, update.updated) == (0, 0, 1)
+    after = {record.uuid: record for record in cows(index)}
+    assert after.keys() == before.keys()
+    moved = [uuid for uuid in after if after[uuid].chunk_x != before[uuid].chunk_x]
+    assert len(moved) == 1
+    assert (after[moved[0]].chunk_x, after[moved[0]].x, after[moved[0]].added) == (2, 40.0, FIRST)
+    assert len(cows(index, history=True)) == 4
+
+
+def test_removed_objects_are_labelled_with_their_commit(world, index):
+    def kill(chunks):
+        del chunks[1, 0]['Entities'][0]
+
+    def break_chest(chunks):
+        del chunks[3, 0]['block_entities'][0]
+
+    before = {record.uuid: record.chunk_x for record in cows(index)}
+    edit_region(world, 'entities', kill)
+    edit_region(world, 'region', break_chest)
+    update = update_index(world, index, commit=SECOND, jobs=1)
+    assert (update.added, update.removed, update.updated) == (0, 2, 0)
+    gone = before.keys() - {record.uuid for record in cows(index)}
+    assert [before[uuid] for uuid in gone] == [1]
+    removed = [record for record in search_index(index, history=True) if record.removed]
+    assert sorted((record.type, record.removed) for record in removed) == [
+        ('minecraft:chest', SECOND), ('minecraft:cow', SECOND)]
+    assert search_index(index, near=(48, 64, 0), radius=0) == []
+
+
+def test_new_objects_belong_to_their_revision(world, index):
+    def place(chunks):
+        chest = nbtlib.Compound(chunks[0, 0]['block_entities'][0])
+        chest['y'] = nbtlib.Int(70)
+        chunks[0, 0]['block_entities'].append(chest)
+
+    edit_region(world, 'region', place)
+    update = update_index(world, index, commit=SECOND, jobs=1)
+    assert (update.added, update.removed, update.updated) == (1, 0, 0)
+    record, = search_index(index, near=(0, 70, 0), radius=0)
+    assert (record.added, record.removed) == (SECOND, None)
+
+
+def test_deleted_player_file_removes_the_player(world, index):
+    folder = os.path.join(world, 'playerdata')
+    name, = os.listdir(folder)
+    os.remove(os.path.join(folder, name))
+    update_index(world, index, commit=THIRD, jobs=1)
+    players = search_index(index, kind='player', history=True)
+    assert sorted((record.source, record.removed) for record in players) == [
+        ('level.dat', None), ('playerdata/' + name, THIRD)]
+
+
+def test_writer_matches_objects_across_chunks(tmp_path):
+    connection = open_index(str(tmp_path / 'index.sqlite'))
+    record = ('entity', 'minecraft:cow', 'uuid-1', None, 'minecraft:overworld', 1.0, 64.0, 1.0)
+    writer = IndexWriter(connection, commit=FIRST)
+    writer.replace('entities/r.0.0.mca', {}, (0, 0), [record])
+    writer.finish()
+    assert (writer.added, writer.revision) == (1, 1)
+
+    moved = record[:5] + (17.0, 64.0, 1.0)
+    writer = IndexWriter(connection, commit=SECOND)
+    live = writer.live_records('entities/r.0.0.mca')
+    writer.replace('entities/r.0.0.mca', live, (0, 0), [])
+    writer.replace('entities/r.0.0.mca', live, (1, 0), [moved])
+    writer.finish()
+    assert (writer.added, writer.removed, writer.updated, writer.revision) == (0, 0, 1, None)
+    rows = connection.execute('SELECT chunk_x, x, added, removed FROM records').fetchall()
+    assert rows == [(1, 17.0, 1, None)]
+    connection.close()
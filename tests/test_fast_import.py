@@ -0,0 +1,102 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from Core.gitFastImport import commit_save
+from Core.savePipeline import translate_save
+from Core.manifest import MANIFEST_NAME
+from Core.syntheticWorld import write_region
+from conftest import read_chunks, edit_chunk, corrupt_chunk
+
+
+def git(repo, *args):
+    return subprocess.run(['git', '-C', repo] + list(args), check=True, capture_output=True).stdout
+
+
+def committed_files(repo, commit):
+    """
+    Return {path: contents} of the tree of a commit.
+    """
+    paths = git(repo, 'ls-tree', '-r', '-z', '--name-only', commit).split(b'\0')
+    return {path.decode('utf-8'): git(repo, 'cat-file', 'blob', f"{commit}:{path.decode('utf-8')}")
+            for path in paths if path}
+
+
+def translated_files(output_dir):
+    files = {}
+    for root, dirs, names in os.walk(output_dir):
+        for name in names:
+            if name == MANIFEST_NAME:
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, output_dir).replace(os.sep, '/')] = f.read()
+    return files
+
+
+@pytest.fixture
+def repo(tmp_path, git_identity):
+    return str(tmp_path / 'repo')
+
+
+@pytest.mark.parametrize('output_format', ['json', 'typed'])
+def test_commit_matches_translation(world, tmp_path, repo, output_format):
+    stats, commit = commit_save(world, repo, 'initial', jobs=1, output_format=output_format)
+    assert stats.errors == 0
+    assert commit is not None
+    translated = str(tmp_path / 'translated')
+    translate_save(world, translated, jobs=1, output_format=output_format)
+    assert committed_files(repo, commit) == translated_files(translated)
+    # The working tree is left alone
+    assert sorted(os.listdir(repo)) == ['.git']
+
+
+def test_unchanged_save_commits_nothing(world, repo):
+    stats, first = commit_save(world, repo, 'initial', jobs=1)
+    stats, second = commit_save(world, repo, 'again', jobs=1)
+    assert second is None
+    assert stats.files == 0
+    assert git(repo, 'rev-parse', 'HEAD').strip().decode() == first
+
+
+def test_edit_commits_one_chunk(world, repo):
+    stats, first = commit_save(world, repo, 'initial', jobs=1)
+    edit_chunk(world)
+    stats, second = commit_save(world, repo, 'edit', jobs=1)
+    assert second is not None
+    assert stats.chunks == 1
+    changed = git(repo, 'diff', '--name-only', first, second).decode().split()
+    assert changed == ['region/r.0.0.mca.chunks/c.1.0.json']
+    assert git(repo, 'rev-parse', second + '^').strip().decode() == first
+
+
+def test_deleted_file_is_removed_from_the_tree(world, repo):
+    stats, first = commit_save(world, repo, 'initial', jobs=1)
+    shutil.rmtree(os.path.join(world, 'structures'))
+    stats, second = commit_save(world, repo, 'delete', jobs=1)
+    assert git(repo, 'diff', '--name-status', first, second).decode().split() == [
+        'D', 'structures/structure_0.mcstructure.json']
+
+
+def test_failed_chunk_is_committed_on_the_next_run(world, repo):
+    region = os.path.join(world, 'region', 'r.0.0.mca')
+    chunks = read_chunks(region)
+    corrupt_chunk(region, index=1)
+    stats, first = commit_save(world, repo, 'initial', jobs=1)
+    assert stats.errors == 1
+    write_region(region, chunks)
+    stats, second = commit_save(world, repo, 'retry', jobs=1)
+    assert (stats.chunks, stats.errors) == (1, 0)
+    changed = git(repo, 'diff', '--name-only', first, second).decode().split()
+    assert changed == ['region/r.0.0.mca.chunks/c.1.0.json']
+
+
+def test_unusual_file_names(world, repo):
+    source = os.path.join(world, 'structures', 'structure_0.mcstructure')
+    name = 'café "quoted"\tname.mcstructure'
+    shutil.copyfile(source, os.path.join(world, 'structures', name))
+    stats, commit = commit_save(world, repo, 'initial', jobs=1)
+    assert stats.errors == 0
+    assert 'structures/' + name + '.json' in committed_files(repo, commit)
@@ -0,0 +1,102 @@
+import os
+import shutil
+
+import pytest
+
+from Core.gitFastImport import commit_save, git
+from Core.gitHistory import (GitHistory, CatFile, DiffTree, ChangeSummary, summarize, describe_summary,
+                             source_path)
+from Core.volatileFields import sidecar_path
+from conftest import edit_chunk
+
+
+@pytest.fixture
+def repo(world, tmp_path, git_identity):
+    """
+    A commit-save repository of two commits: the world, then one edited
+    chunk and a deleted structure.
+    """
+    path = str(tmp_path / 'repo')
+    commit_save(world, path, 'initial', jobs=1, layout='canonical')
+    edit_chunk(world)
+    shutil.rmtree(os.path.join(world, 'structures'))
+    commit_save(world, path, 'edit\n\nOne chunk and a structure', jobs=1, layout='canonical')
+    return path
+
+
+def test_source_paths_of_translations():
+    assert source_path('level.dat.json') == 'level.dat'
+    assert source_path('region/r.0.0.mca.chunks/c.1.0.nbtsnap') == 'region/r.0.0.mca.chunks/c.1.0'
+    assert source_path(sidecar_path('level.dat.json')) is None
+    assert source_path('.pygitmc-manifest') is None
+
+
+def test_canonical_chunk_folders_count_once():
+    summary = summarize([('A', 'region/r.0.0.mca.chunks/c.1.0/chunk.json'),
+                         ('A', 'region/r.0.0.mca.chunks/c.1.0/sections/0.json'),
+                         ('M', 'region/r.0.0.mca.chunks/c.2.0/chunk.json'),
+                         ('D', 'region/r.0.0.mca.chunks/c.2.0/sections/1.json'),
+                         ('M', 'level.dat.json')])
+    assert summary == ChangeSummary([('M', 'level.dat')], {'region/r.0.0.mca': [('A', 1, 0), ('M', 2, 0)]})
+    assert describe_summary(summary) == "1 file, 2 chunks in 1 region"
+    assert describe_summary(ChangeSummary([], {})) == "no changes"
+
+
+def test_diff_tree_lists_a_commit_against_its_parent(repo):
+    head, parent = git(repo, 'rev-parse', 'HEAD', 'HEAD~1').split()
+    diff_tree = DiffTree(repo)
+    try:
+        summary = summarize(diff_tree.changes(head, parent))
+        assert summary.chunks == {'region/r.0.0.mca': [('M', 1, 0)]}
+        assert summary.files == [('D', 'structures/structure_0.mcstructure')]
+        # The root commit is compared with nothing; the process answers again
+        root = summarize(diff_tree.changes(parent))
+        assert sorted(root.chunks) == ['entities/r.0.0.mca', 'region/r.0.0.mca']
+        assert all(status == 'A' for status, path in root.files)
+    finally:
+        diff_tree.close()
+
+
+def test_cat_file_reads_objects(repo):
+    cat_file = CatFile(repo)
+    try:
+        kind, data = cat_file.read('HEAD~1:structures/structure_0.mcstructure.json')
+        assert kind == 'blob' and data.startswith(b'{')
+        assert cat_file.read('HEAD:structures/structure_0.mcstructure.json') is None
+        kind, data = cat_file.read('HEAD')
+        assert kind == 'commit' and data.endswith(b'\n\nOne chunk and a structure')
+    finally:
+        cat_file.close()
+
+
+def test_history_pages_and_summaries(repo):
+    history = GitHistory(repo, page_size=1)
+    try:
+        assert len(history) == 2
+        assert history.loaded(0) is None
+        edit, initial = history.commits(0, 5)
+        assert (edit.subject, initial.subject) == ('edit', 'initial')
+        assert edit.parents == (initial.id,) and initial.parents == ()
+        assert history.message(edit) == 'edit\n\nOne chunk and a structure'
+        assert describe_summary(history.changes(edit)) == "1 file, 1 chunk in 1 region"
+        assert history.summaries.get(edit.id) is not None
+        assert history.commit(2) is None
+    finally:
+        history.close()
+
+
+def test_refresh_follows_new_commits(repo, world):
+    history = GitHistory(repo)
+    try:
+        head = history.commit(0)
+        assert history.refresh() is False
+        edit_chunk(world, (2, 0), timestamp=3)
+        commit_save(world, repo, 'another', jobs=1, layout='canonical')
+        assert history.refresh() is True
+        assert len(history) == 3
+        assert history.commit(0).subject == 'another'
+        assert history.commit(1) == head
+    finally:
+        history.close()
+    with pytest.raises(RuntimeError):
+        history.changes(head)
@@ -0,0 +1,100 @@
+import os
+import shutil
+
+from Core.manifest import MANIFEST_NAME, Manifest
+from Core.savePipeline import translate_save
+from Core.syntheticWorld import write_region
+from conftest import read_chunks, edit_chunk, corrupt_chunk
+
+CHUNKS = os.path.join('region', 'r.0.0.mca.chunks')
+
+
+def output_files(output_dir):
+    """
+    Return {relative path: mtime} of the translated files.
+    """
+    files = {}
+    for root, dirs, names in os.walk(output_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            files[os.path.relpath(path, output_dir).replace(os.sep, '/')] = os.stat(path).st_mtime_ns
+    return files
+
+
+def test_unchanged_save_translates_nothing(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    first = translate_save(world, output, jobs=1)
+    assert first.files > 0
+    second = translate_save(world, output, jobs=1)
+    assert (second.files, second.chunks, second.errors) == (0, 0, 0)
+
+
+def test_edited_chunk_is_translated_alone(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1)
+    before = output_files(output)
+    edit_chunk(world)
+    stats = translate_save(world, output, jobs=1)
+    assert stats.chunks == 1
+    after = output_files(output)
+    changed = sorted(path for path in after if after[path] != before.get(path))
+    assert changed == sorted([MANIFEST_NAME, 'region/r.0.0.mca.chunks/c.1.0.json'])
+
+
+def test_deleted_chunk_and_file_lose_their_outputs(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1)
+    region = os.path.join(world, 'region', 'r.0.0.mca')
+    chunks = read_chunks(region)
+    del chunks[2, 0]
+    write_region(region, chunks)
+    shutil.rmtree(os.path.join(world, 'structures'))
+    translate_save(world, output, jobs=1)
+    assert not os.path.exists(os.path.join(output, CHUNKS, 'c.2.0.json'))
+    assert os.path.exists(os.path.join(output, CHUNKS, 'c.1.0.json'))
+    assert not os.path.exists(os.path.join(output, 'structures', 'structure_0.mcstructure.json'))
+
+
+def test_full_run_removes_outputs_of_deleted_files(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1)
+    shutil.rmtree(os.path.join(world, 'structures'))
+    stats = translate_save(world, output, jobs=1, incremental=False)
+    assert stats.files > 0
+    assert not os.path.exists(os.path.join(output, 'structures', 'structure_0.mcstructure.json'))
+
+
+def test_changed_options_translate_everything_again(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1)
+    stats = translate_save(world, output, jobs=1, array_mode='base64')
+    assert stats.chunks == 8
+    with open(os.path.join(output, CHUNKS, 'c.0.0.json'), encoding='utf-8') as f:
+        assert '"base64"' in f.read()
+
+
+def test_failed_chunk_is_retried_alone(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    region = os.path.join(world, 'region', 'r.0.0.mca')
+    chunks = read_chunks(region)
+    corrupt_chunk(region, index=1)
+    stats = translate_save(world, output, jobs=1)
+    assert stats.errors == 1
+    assert not os.path.exists(os.path.join(output, CHUNKS, 'c.1.0.json'))
+    assert os.path.exists(os.path.join(output, CHUNKS, 'c.2.0.json'))
+
+    # The region keeps its fingerprint; only the failed chunk is forgotten
+    entry = Manifest.load(output).get('region/r.0.0.mca')
+    assert {'size', 'mtime', 'hash'} <= set(entry)
+    assert sorted(entry['chunks']) == [0, 2, 3]
+    assert entry['failed'] == [1]
+
+    # Still broken: only that chunk is tried again
+    stats = translate_save(world, output, jobs=1)
+    assert (stats.chunks, stats.errors) == (0, 1)
+    write_region(region, chunks)
+    stats = translate_save(world, output, jobs=1)
+    assert (stats.chunks, stats.errors) == (1, 0)
+    assert os.path.exists(os.path.join(output, CHUNKS, 'c.1.0.json'))
+    assert 'failed' not in Manifest.load(output).get('region/r.0.0.mca')
+    assert translate_save(world, output, jobs=1).chunks == 0
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from Core.jobQueue import JobQueue
+
+
+@pytest.fixture
+def queue():
+    finished = []
+    done = threading.Event()
+
+    def on_finish(job):
+        finished.append(job)
+        if job.key == 'last':
+            done.set()
+
+    jobs = JobQueue(on_finish=on_finish)
+    jobs.finished, jobs.done = finished, done
+    yield jobs
+    jobs.shutdown()
+
+
+def blocking(started, release):
+    def run(progress=None, cancel=None):
+        started.set()
+        release.wait(5)
+        return 'cancelled' if cancel.is_set() else 'done'
+    return run
+
+
+def test_jobs_run_in_order(queue):
+    order = []
+    for key in ('first', 'second', 'last'):
+        queue.submit(key, key, lambda key=key, **kwargs: order.append(key) or key)
+    assert queue.done.wait(5)
+    assert order == ['first', 'second', 'last']
+    assert [(job.state, job.result) for job in queue.finished] == [
+        ('done', 'first'), ('done', 'second'), ('done', 'last')]
+
+
+def test_same_key_returns_the_pending_job(queue):
+    started, release = threading.Event(), threading.Event()
+    running, queued = queue.submit('translate', 'Translating', blocking(started, release))
+    assert started.wait(5)
+    again, queued = queue.submit('translate', 'Translating', blocking(started, release))
+    assert (again, queued) == (running, False)
+    other, queued = queue.submit('build', 'Building', lambda **kwargs: None)
+    assert queued and other is not running
+    assert queue.pending() == 2
+    release.set()
+    queue.submit('last', 'Last', lambda **kwargs: None)
+    assert queue.done.wait(5)
+    assert [job.key for job in queue.finished] == ['translate', 'build', 'last']
+
+
+def test_cancel_stops_the_running_job_and_drops_queued_ones(queue):
+    started, release = threading.Event(), threading.Event()
+    running, _ = queue.submit('translate', 'Translating', blocking(started, release))
+    assert started.wait(5)
+    waiting, _ = queue.submit('build', 'Building', lambda **kwargs: None)
+    queue.cancel()
+    assert waiting.state == 'cancelled'
+    release.set()
+    queue.submit('last', 'Last', lambda **kwargs: None)
+    assert queue.done.wait(5)
+    assert (running.state, running.result) == ('cancelled', 'cancelled')
+    assert [job.key for job in queue.finished] == ['build', 'translate', 'last']
+
+
+def test_cancelled_key_can_be_submitted_again(queue):
+    started, release = threading.Event(), threading.Event()
+    running, _ = queue.submit('translate', 'Translating', blocking(started, release))
+    assert started.wait(5)
+    queue.cancel(running)
+    again, queued = queue.submit('translate', 'Translating', lambda **kwargs: 'again')
+    assert queued and again is not running
+    release.set()
+    queue.submit('last', 'Last', lambda **kwargs: None)
+    assert queue.done.wait(5)
+    assert again.result == 'again'
+
+
+def test_failing_job_is_reported(queue):
+    def fail(**kwargs):
+        raise OSError("disk full")
+
+    job, _ = queue.submit('translate', 'Translating', fail)
+    queue.submit('last', 'Last', lambda **kwargs: None)
+    assert queue.done.wait(5)
+    assert job.state == 'failed' and str(job.error) == "disk full"
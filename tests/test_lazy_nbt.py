@@ -0,0 +1,113 @@
+import io
+import os
+
+import nbtlib
+import pytest
+
+from Core.lazyNbt import LazyNbt, parse_path, join_path, query_file
+
+
+def sample():
+    return nbtlib.File({
+        'name': nbtlib.String('héllo'),
+        'empty': nbtlib.String(''),
+        'bytes': nbtlib.ByteArray([1, -2, 3]),
+        'longs': nbtlib.LongArray([2 ** 40, -1]),
+        'odd.key': nbtlib.Int(7),
+        'Data': nbtlib.Compound({
+            'Player': nbtlib.Compound({
+                'Pos': nbtlib.List[nbtlib.Double]([1.5, 64.0, -3.25]),
+                'Inventory': nbtlib.List[nbtlib.Compound]([
+                    nbtlib.Compound({'Slot': nbtlib.Byte(0), 'id': nbtlib.String('minecraft:stone')}),
+                    nbtlib.Compound({'Slot': nbtlib.Byte(1), 'id': nbtlib.String('minecraft:dirt')}),
+                ]),
+            }),
+        }),
+        'names': nbtlib.List[nbtlib.String](['a', 'bc', '']),
+        'arrays': nbtlib.List[nbtlib.IntArray]([nbtlib.IntArray([1, 2]), nbtlib.IntArray([])]),
+        'grid': nbtlib.List[nbtlib.List]([
+            nbtlib.List[nbtlib.Int]([1, 2]),
+            nbtlib.List[nbtlib.String](['x', 'y', 'z']),
+        ]),
+        'after': nbtlib.Short(9),
+    })
+
+
+def lazy(byteorder='big'):
+    buffer = io.BytesIO()
+    sample().write(buffer, byteorder)
+    return LazyNbt(buffer.getvalue(), byteorder)
+
+
+@pytest.mark.parametrize('byteorder', ['big', 'little'])
+@pytest.mark.parametrize('path, expected', [
+    ('name', 'héllo'),
+    ('empty', ''),
+    ('Data.Player.Pos[2]', -3.25),
+    ('Data.Player.Inventory[1].id', 'minecraft:dirt'),
+    ('Data.Player.Inventory[-1].Slot', 1),
+    ('names[1]', 'bc'),
+    ('grid[1][2]', 'z'),
+    ('grid[0][1]', 2),
+    ('"odd.key"', 7),
+    # Reaching these steps over every string, array and nested list before them
+    ('after', 9),
+])
+def test_paths_decode_the_same_value_as_nbtlib(path, expected, byteorder):
+    assert lazy(byteorder).get(path) == expected
+
+
+def test_arrays_are_decoded_with_their_type():
+    reader = lazy()
+    assert reader.get('longs').tolist() == [2 ** 40, -1]
+    assert type(reader.get('bytes')) is nbtlib.ByteArray
+    assert reader.get('arrays[0]').tolist() == [1, 2]
+    assert reader.get('arrays[1]').tolist() == []
+
+
+def test_subtrees_decode_whole():
+    assert lazy().get('Data.Player.Inventory[0]') == sample()['Data']['Player']['Inventory'][0]
+    assert lazy().get('grid') == sample()['grid']
+
+
+def test_wildcards_yield_every_match():
+    reader = lazy()
+    assert [(path, str(tag)) for path, tag in reader.query('Data.Player.Inventory[*].id')] == [
+        ('Data.Player.Inventory[0].id', 'minecraft:stone'),
+        ('Data.Player.Inventory[1].id', 'minecraft:dirt')]
+    assert [path for path, tag in reader.query('grid[*][0]')] == ['grid[0][0]', 'grid[1][0]']
+    assert [path for path, tag in reader.query('Data.*.Pos')] == ['Data.Player.Pos']
+
+
+def test_missing_paths_return_the_default():
+    reader = lazy()
+    assert reader.get('names[3]') is None
+    assert reader.get('name.inner', 'missing') == 'missing'
+    assert reader.get('Data[0]') is None
+    assert list(reader.query('nothing[*]')) == []
+
+
+def test_keys_are_listed_without_decoding():
+    assert lazy().keys('Data.Player') == ['Pos', 'Inventory']
+    assert lazy().keys('name') == []
+
+
+def test_paths_round_trip_through_join_path():
+    steps = parse_path('Data."odd.key"[3].x')
+    assert steps == [('key', b'Data'), ('key', b'odd.key'), ('index', 3), ('key', b'x')]
+    path = ''
+    for step in steps:
+        path = join_path(path, step)
+    assert path == 'Data."odd.key"[3].x'
+    with pytest.raises(ValueError):
+        parse_path('Data[x]')
+
+
+def test_data_must_start_with_a_compound():
+    with pytest.raises(ValueError):
+        LazyNbt(b'\x08\x00\x00\x00\x00')
+
+
+def test_region_chunks_are_queried(world):
+    results = query_file(os.path.join(world, 'region', 'r.0.0.mca'), ['xPos', 'sections[*].Y'], indices=[2])
+    assert results == [('2,0', 'xPos', '2'), ('2,0', 'sections[0].Y', '-4'), ('2,0', 'sections[1].Y', '-3')]
@@ -0,0 +1,101 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import nbtlib
+
+from Core import metrics
+from Core.savePipeline import translate_save
+
+
+def test_nothing_is_recorded_outside_a_recording():
+    assert metrics.current() is None
+    with metrics.stage('parse'):
+        metrics.count('tags', 3)
+    assert not metrics.enabled()
+
+
+def test_nested_stages_are_not_counted_twice():
+    with metrics.recording() as recorder:
+        with metrics.stage('convert'):
+            time.sleep(0.02)
+            with metrics.stage('write'):
+                time.sleep(0.05)
+    assert recorder.calls['convert'] == recorder.calls['write'] == 1
+    assert recorder.seconds['write'] >= 0.05
+    assert recorder.seconds['convert'] >= 0.02
+    assert recorder.seconds['convert'] + recorder.seconds['write'] <= recorder.elapsed
+
+
+def test_other_threads_do_not_record_into_a_recording():
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def browse():
+        # The NBT browser parsing a file while a job is measured
+        started.wait(5)
+        seen.append(metrics.current())
+        with metrics.stage('parse'):
+            metrics.count('tags', 100)
+        release.set()
+
+    thread = threading.Thread(target=browse)
+    thread.start()
+    with metrics.recording() as recorder:
+        started.set()
+        assert release.wait(5)
+        with metrics.stage('detect'):
+            metrics.count('tags', 1)
+    thread.join()
+    assert seen == [None]
+    assert (recorder.calls['parse'], recorder.counters) == (0, {'tags': 1})
+
+
+def test_recordings_on_two_threads_stay_apart():
+    barrier = threading.Barrier(2)
+
+    def record(name):
+        with metrics.recording() as recorder:
+            barrier.wait(5)
+            with metrics.stage(name):
+                metrics.count(name)
+            barrier.wait(5)
+        return recorder
+
+    with ThreadPoolExecutor(2) as pool:
+        first, second = pool.map(record, ['parse', 'write'])
+    assert (first.counters, first.calls['parse'], first.calls['write']) == ({'parse': 1}, 1, 0)
+    assert (second.counters, second.calls['parse'], second.calls['write']) == ({'write': 1}, 0, 1)
+
+
+def test_worker_results_are_merged():
+    def task(item):
+        metrics.count('tags', 5)
+        metrics.count('bytes_in', 10)
+        return item[0]
+
+    with metrics.recording() as recorder:
+        result, recorded = metrics.run_measured(task, ('value', 'region/r.0.0.mca'))
+        assert metrics.task_result((result, recorded)) == 'value'
+    assert recorder.counters == {'tags': 5, 'bytes_in': 10}
+    path, seconds, bytes_in, bytes_out, tags = recorder.slowest_files()[0]
+    assert (path, bytes_in, tags) == ('region/r.0.0.mca', 10, 5)
+
+
+def test_tag_count():
+    tree = nbtlib.Compound({
+        'numbers': nbtlib.List[nbtlib.Int]([1, 2, 3]),
+        'array': nbtlib.LongArray([1, 2, 3]),
+        'nested': nbtlib.List[nbtlib.Compound]([nbtlib.Compound({'a': nbtlib.Byte(1)})]),
+    })
+    # root, the list and its 3 numbers, the array, the nested list, its compound and byte
+    assert metrics.tag_count(tree) == 9
+
+
+def test_translation_records_its_stages(world, tmp_path):
+    with metrics.recording() as recorder:
+        translate_save(world, str(tmp_path / 'translated'), jobs=1)
+    for name in ('detect', 'decompress', 'parse', 'serialize', 'write'):
+        assert recorder.calls[name] > 0, name
+    assert recorder.counters['bytes_in'] > 0 and recorder.counters['tags'] > 0
+    assert 'stages' in recorder.to_dict() and recorder.summary().startswith('stage')
@@ -0,0 +1,114 @@
+import os
+import sys
+import subprocess
+
+import nbtlib
+import pytest
+
+from Core.nbtBrowser import (SESSION_LOCK, DocumentCache, DocumentChanged, world_in_use, load_chunk_document,
+                             load_file_document, parse_value)
+from conftest import read_chunks, edit_chunk
+
+REGION = os.path.join('region', 'r.0.0.mca')
+
+# Holds the lock Minecraft takes on session.lock until its stdin closes
+LOCK_HOLDER = """
+import sys, fcntl
+f = open(sys.argv[1], 'r+b')
+fcntl.lockf(f, fcntl.LOCK_EX)
+print('locked', flush=True)
+sys.stdin.read()
+"""
+
+
+@pytest.fixture
+def game(world):
+    """
+    Open the world in a stand-in for the game: another process holding
+    session.lock. Yields a function that closes it.
+    """
+    lock_path = os.path.join(world, SESSION_LOCK)
+    with open(lock_path, 'wb') as f:
+        f.write(b'\xe2\x98\x83')
+    process = subprocess.Popen([sys.executable, '-c', LOCK_HOLDER, lock_path], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE)
+    assert process.stdout.readline() == b'locked\n'
+
+    def close():
+        if process.poll() is None:
+            process.stdin.close()
+            process.wait(5)
+            process.stdout.close()
+
+    yield close
+    close()
+
+
+def test_chunk_edit_is_written_back(world):
+    region = os.path.join(world, REGION)
+    before = read_chunks(region)
+    document = load_chunk_document(region, 1, 0)
+    document.set_value(['LastUpdate'], '1234')
+    document.set_value(['sections', 0, 'block_states', 'data', 0], '7')
+    assert document.dirty
+    document.write(document.encode())
+    assert not document.dirty
+    chunks = read_chunks(region)
+    assert chunks[1, 0][1]['LastUpdate'] == 1234
+    assert int(chunks[1, 0][1]['sections'][0]['block_states']['data'][0]) == 7
+    # The other chunks are left as they were
+    assert {coords: chunk for coords, chunk in chunks.items() if coords != (1, 0)} == {
+        coords: chunk for coords, chunk in before.items() if coords != (1, 0)}
+
+
+def test_file_edit_keeps_its_format(world):
+    path = os.path.join(world, 'level.dat')
+    document = load_file_document(path)
+    document.set_value(['Data', 'Player', 'Health'], '4.5')
+    document.write(document.encode())
+    assert nbtlib.load(path)['Data']['Player']['Health'] == 4.5
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="the lock holder uses fcntl")
+def test_write_is_refused_while_the_game_has_the_world_open(world, game):
+    path = os.path.join(world, 'level.dat')
+    with open(path, 'rb') as f:
+        before = f.read()
+    assert world_in_use(world)
+    document = load_file_document(path)
+    document.set_value(['Data', 'Player', 'Health'], '1')
+    encoded = document.encode()
+    with pytest.raises(RuntimeError):
+        document.write(encoded)
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert document.dirty
+
+    game()
+    assert not world_in_use(world)
+    document.write(encoded)
+    assert nbtlib.load(path)['Data']['Player']['Health'] == 1.0
+
+
+def test_changed_source_is_not_overwritten(world):
+    cache = DocumentCache()
+    region = os.path.join(world, REGION)
+    document = cache.open(region, (1, 0))
+    assert cache.open(region, (1, 0)) is document
+    document.set_value(['LastUpdate'], '5')
+    edit_chunk(world, (1, 0))
+    with pytest.raises(DocumentChanged):
+        document.write(document.encode())
+    with pytest.raises(DocumentChanged):
+        cache.open(region, (1, 0))
+    cache.discard(document)
+    assert cache.open(region, (1, 0)) is not document
+
+
+def test_values_keep_their_type():
+    assert type(parse_value(nbtlib.Byte(1), '5b')) is nbtlib.Byte
+    assert parse_value(nbtlib.Long(1), ' 20L ') == 20
+    assert type(parse_value(nbtlib.Float(1), '2.5')) is nbtlib.Float
+    assert parse_value(nbtlib.String('a'), ' b ') == ' b '
+    with pytest.raises(ValueError):
+        parse_value(nbtlib.Int(1), 'ten')
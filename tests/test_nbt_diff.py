@@ -0,0 +1,123 @@
+import os
+import shutil
+
+import nbtlib
+import pytest
+
+from Core.gitFastImport import commit_save, git
+from Core.nbtDiff import (TreeHasher, diff_tags, diff_documents, open_documents, open_source,
+                          commit_documents, describe_difference)
+from conftest import edit_chunk
+
+
+def entity(uuid, health):
+    return nbtlib.Compound({'UUID': nbtlib.IntArray(uuid), 'Health': nbtlib.Float(health)})
+
+
+def test_entities_are_paired_by_uuid():
+    old = nbtlib.Compound({'Entities': nbtlib.List[nbtlib.Compound]([
+        entity([1, 0, 0, 0], 20), entity([2, 0, 0, 0], 10)])})
+    # Reordered, one removed and one hurt
+    new = nbtlib.Compound({'Entities': nbtlib.List[nbtlib.Compound]([
+        entity([3, 0, 0, 0], 5), entity([1, 0, 0, 0], 18)])})
+    differences = {(difference.path, difference.kind) for difference in diff_tags(old, new)}
+    assert differences == {('Entities[1].Health', 'changed'), ('Entities[0]', 'added'),
+                           ('Entities[1]', 'removed')}
+
+
+@pytest.mark.parametrize('items', [
+    [{'x': 0, 'y': 64, 'z': 0}, {'x': 1, 'y': 64, 'z': 0}],
+    [{'Slot': 0}, {'Slot': 5}],
+    [{'Y': -4}, {'Y': 0}],
+], ids=['pos', 'Slot', 'Y'])
+def test_list_elements_are_paired_by_identity(items):
+    tags = [nbtlib.Compound({key: nbtlib.Int(value) for key, value in item.items()}) for item in items]
+    for tag, name in zip(tags, ('a', 'b')):
+        tag['name'] = nbtlib.String(name)
+    old = nbtlib.List[nbtlib.Compound](tags)
+    new = nbtlib.List[nbtlib.Compound]([nbtlib.Compound(tags[1]), nbtlib.Compound(tags[0])])
+    assert diff_tags(old, new) == []
+    new[0]['name'] = nbtlib.String('c')
+    assert [(difference.path, difference.kind) for difference in diff_tags(old, new)] == [
+        ('[0].name', 'changed')]
+
+
+def test_elements_without_identity_are_paired_by_position():
+    old = nbtlib.List[nbtlib.Int]([1, 2])
+    new = nbtlib.List[nbtlib.Int]([2, 1, 3])
+    assert [(difference.path, difference.kind) for difference in diff_tags(old, new)] == [
+        ('[0]', 'changed'), ('[1]', 'changed'), ('[2]', 'added')]
+
+
+class CountingHasher(TreeHasher):
+    def __init__(self):
+        super().__init__()
+        self.hashed = []
+
+    def digest(self, tag):
+        self.hashed.append(tag)
+        return super().digest(tag)
+
+
+def test_identical_subtrees_are_not_descended():
+    same = nbtlib.Compound({'deep': nbtlib.Compound({'leaf': nbtlib.Int(1)})})
+    old = nbtlib.Compound({'same': same, 'value': nbtlib.Int(1)})
+    new = nbtlib.Compound({'same': nbtlib.Compound(same), 'value': nbtlib.Int(2)})
+    hasher = CountingHasher()
+    assert [difference.path for difference in diff_tags(old, new, hasher)] == ['value']
+    # Hashing the roots reached 'deep' once per side; the diff stopped at the
+    # equal digests of 'same' and never asked for it again
+    deep = [tag for tag in hasher.hashed if tag is old['same']['deep'] or tag is new['same']['deep']]
+    assert len(deep) == 2
+
+
+def test_unchanged_chunks_are_not_loaded(world, tmp_path):
+    region = os.path.join(world, 'region', 'r.0.0.mca')
+    copy = str(tmp_path / 'r.0.0.mca')
+    shutil.copyfile(region, copy)
+    old = open_documents(copy)
+    edit_chunk(world)
+    new = open_documents(region)
+    loaded = []
+    for documents in (old, new):
+        for label, document in documents.items():
+            documents[label] = document._replace(
+                load=lambda load=document.load, label=label: loaded.append(label) or load())
+    changes = list(diff_documents(old, new))
+    assert [label for label, differences in changes] == ['1,0']
+    assert loaded == ['1,0', '1,0']
+    assert describe_difference(changes[0][1][0]).startswith('~ sections[0].block_states.data: ')
+
+
+@pytest.fixture
+def history(world, tmp_path, git_identity):
+    repo = str(tmp_path / 'repo')
+    commit_save(world, repo, 'initial', jobs=1, output_format='typed')
+    edit_chunk(world)
+    commit_save(world, repo, 'edit', jobs=1, output_format='typed')
+    return repo
+
+
+def test_revisions_are_read_from_the_repository(history):
+    old = open_source('HEAD~1:region/r.0.0.mca.chunks', history)
+    new = open_source('HEAD:region/r.0.0.mca.chunks', history)
+    assert sorted(new) == ['0,0', '1,0', '2,0', '3,0']
+    changes = list(diff_documents(old, new))
+    assert [label for label, differences in changes] == ['1,0']
+    level = open_source(':level.dat.json', history)
+    assert level[''].load()['Data']['Player']['Dimension'] == 'minecraft:overworld'
+    with pytest.raises(ValueError):
+        open_source('HEAD:missing.json', history)
+
+
+def test_commit_documents_pair_a_commit_with_its_parent(history):
+    head, parent = git(history, 'rev-parse', 'HEAD', 'HEAD~1').split()
+    old, new = commit_documents(history, head, parent, 'region/r.0.0.mca')
+    assert [label for label, differences in diff_documents(old, new)] == ['1,0']
+    old, new = commit_documents(history, head, parent, 'level.dat')
+    assert list(old) == list(new) == ['']
+    assert list(diff_documents(old, new)) == []
+    # The root commit adds everything
+    old, new = commit_documents(history, parent, None, 'level.dat')
+    assert old == {}
+    assert [differences[0].kind for label, differences in diff_documents(old, new)] == ['added']
@@ -0,0 +1,55 @@
+import os
+import json
+
+from Core.regionParser import (chunk_index, chunk_coords, region_timestamps, iter_region_chunks,
+                               translate_region)
+
+
+def region_path(world):
+    return os.path.join(world, 'region', 'r.0.0.mca')
+
+
+def test_chunk_slots_and_coordinates():
+    assert chunk_index(1, 0) == 1
+    assert chunk_index(-1, -1) == 1023
+    assert chunk_coords('r.-1.2.mca', 33) == (-31, 65)
+
+
+def test_region_chunks_are_read_lazily(world):
+    chunks = list(iter_region_chunks(region_path(world)))
+    assert [(chunk_x, chunk_z) for chunk_x, chunk_z, *_ in chunks] == [(0, 0), (1, 0), (2, 0), (3, 0)]
+    for chunk_x, chunk_z, timestamp, compression, nbt_data in chunks:
+        assert (nbt_data['xPos'], nbt_data['zPos']) == (chunk_x, chunk_z)
+        assert timestamp == 1
+    assert region_timestamps(region_path(world)) == {0: 1, 1: 1, 2: 1, 3: 1}
+
+
+def test_translate_region_writes_one_file_per_chunk(world):
+    assert translate_region(region_path(world), verbose=False) == 4
+    output_dir = region_path(world) + '.chunks'
+    assert sorted(os.listdir(output_dir)) == [f"c.{x}.0.json" for x in range(4)]
+    with open(os.path.join(output_dir, 'c.2.0.json'), encoding='utf-8') as f:
+        assert json.load(f)['xPos'] == 2
+
+
+def test_translate_region_limited_to_slots(world, tmp_path):
+    output_dir = str(tmp_path / 'chunks')
+    assert translate_region(region_path(world), output_dir, indices=[1, 3], verbose=False) == 2
+    assert sorted(os.listdir(output_dir)) == ['c.1.0.json', 'c.3.0.json']
+
+
+def test_translate_region_renders_without_writing(world, tmp_path):
+    output_dir = str(tmp_path / 'chunks')
+    rendered = []
+    assert translate_region(region_path(world), output_dir, verbose=False, rendered=rendered) == 4
+    assert not os.path.exists(output_dir)
+    paths = [path for path, data in rendered]
+    assert paths == [os.path.join(output_dir, f"c.{x}.0.json") for x in range(4)]
+    assert json.loads(rendered[0][1])['xPos'] == 0
+
+
+def test_empty_region_translates_nothing(tmp_path):
+    path = str(tmp_path / 'r.0.0.mca')
+    open(path, 'wb').close()
+    assert list(iter_region_chunks(path)) == []
+    assert translate_region(path, str(tmp_path / 'chunks'), verbose=False) == 0
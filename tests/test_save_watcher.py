@@ -0,0 +1,73 @@
+import os
+import time
+import queue
+
+import pytest
+
+from Core.saveWatcher import PollingWatcher, SaveWatcher
+from Core.syntheticWorld import write_region
+from conftest import read_chunks, edit_chunk
+
+DEBOUNCE = 0.3
+POLL_INTERVAL = 0.05
+
+
+@pytest.fixture
+def batches(world):
+    """
+    Start a polling SaveWatcher on the world; yields the queue its batches
+    arrive on, as (time, changed paths).
+    """
+    received = queue.Queue()
+    watcher = SaveWatcher(world, lambda changed: received.put((time.monotonic(), changed)),
+                          debounce=DEBOUNCE, min_interval=1.0, polling=True, poll_interval=POLL_INTERVAL)
+    watcher.start()
+    # Let the watcher take its first scan before anything changes
+    time.sleep(0.2)
+    yield received
+    watcher.stop()
+
+
+def touch(path, data=b'changed'):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def test_polling_watcher_reports_changed_files(world):
+    watcher = PollingWatcher(world, interval=POLL_INTERVAL)
+    assert watcher.wait(0.1) == set()
+    touch(os.path.join(world, 'level.dat'))
+    os.remove(os.path.join(world, 'structures', 'structure_0.mcstructure'))
+    assert watcher.wait(1.0) == {'level.dat', os.path.join('structures', 'structure_0.mcstructure')}
+
+
+def test_burst_of_writes_is_one_batch(world, batches):
+    touch(os.path.join(world, 'level.dat'))
+    time.sleep(0.1)
+    player = os.listdir(os.path.join(world, 'playerdata'))[0]
+    touch(os.path.join(world, 'playerdata', player))
+    last_write = time.monotonic()
+    # Files that are not part of the save are not reported
+    touch(os.path.join(world, 'session.lock'))
+    when, changed = batches.get(timeout=5)
+    assert changed == sorted(['level.dat', os.path.join('playerdata', player)])
+    assert when - last_write >= DEBOUNCE
+    with pytest.raises(queue.Empty):
+        batches.get(timeout=DEBOUNCE * 2)
+
+
+def test_rewritten_region_with_the_same_chunks_is_ignored(world, batches):
+    region = os.path.join(world, 'region', 'r.0.0.mca')
+    write_region(region, read_chunks(region))
+    touch(os.path.join(world, 'level.dat'))
+    when, changed = batches.get(timeout=5)
+    assert changed == ['level.dat']
+
+
+def test_batches_are_min_interval_apart(world, batches):
+    touch(os.path.join(world, 'level.dat'))
+    first, changed = batches.get(timeout=5)
+    edit_chunk(world)
+    second, changed = batches.get(timeout=5)
+    assert changed == [os.path.join('region', 'r.0.0.mca')]
+    assert second - first >= 1.0
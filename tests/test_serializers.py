@@ -0,0 +1,67 @@
+import os
+
+import nbtlib
+import pytest
+
+from Core.savePipeline import translate_save
+from Core.saveBuilder import build_save
+from Core.serializers import SERIALIZERS, get_serializer, open_snapshot, read_snapshot_header
+from conftest import read_world, read_chunks
+
+LOSSLESS = sorted(name for name, serializer in SERIALIZERS.items() if serializer.lossless)
+LOSSY = sorted(name for name, serializer in SERIALIZERS.items() if not serializer.lossless)
+
+
+def sample():
+    return nbtlib.File({
+        'name': nbtlib.String('test'),
+        'count': nbtlib.Byte(3),
+        'longs': nbtlib.LongArray([-2 ** 63, 0, 2 ** 63 - 1]),
+        'items': nbtlib.List[nbtlib.Compound]([nbtlib.Compound({'Slot': nbtlib.Byte(0)})]),
+    })
+
+
+@pytest.mark.parametrize('output_format', LOSSLESS)
+def test_lossless_formats_decode_to_the_same_tree(output_format):
+    serializer = get_serializer(output_format)
+    data = serializer.encode(sample(), header={'source': 'test'})
+    header, decoded = serializer.decode(data)
+    assert header['source'] == 'test'
+    assert decoded == sample()
+    assert type(decoded['count']) is nbtlib.Byte
+
+
+@pytest.mark.parametrize('output_format', LOSSLESS)
+def test_lossless_translation_builds_the_same_world(world, tmp_path, output_format):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    assert translate_save(world, translated, jobs=1, output_format=output_format).errors == 0
+    assert build_save(translated, built, jobs=1).errors == 0
+    assert read_world(built) == read_world(world)
+
+
+@pytest.mark.parametrize('output_format', LOSSY)
+def test_lossy_translation_is_not_built(world, tmp_path, output_format):
+    translated = str(tmp_path / 'translated')
+    built = str(tmp_path / 'built')
+    assert translate_save(world, translated, jobs=1, output_format=output_format).errors == 0
+    assert build_save(translated, built, jobs=1).errors > 0
+    assert not os.path.exists(os.path.join(built, 'region', 'r.0.0.mca'))
+
+
+def test_snapshot_fields_are_read_without_parsing(world, tmp_path):
+    translated = str(tmp_path / 'translated')
+    translate_save(world, translated, jobs=1, output_format='binary')
+    path = os.path.join(translated, 'region', 'r.0.0.mca.chunks', 'c.1.0.nbtsnap')
+    header, lazy = open_snapshot(path)
+    chunk = read_chunks(os.path.join(world, 'region', 'r.0.0.mca'))[1, 0][1]
+    assert lazy.get('xPos') == chunk['xPos']
+    data = chunk['sections'][0]['block_states']['data']
+    assert lazy.get('sections[0].block_states.data').tolist() == data.tolist()
+
+
+def test_other_files_are_not_snapshots():
+    with pytest.raises(ValueError):
+        read_snapshot_header(b'{"not": "a snapshot"}')
+    with pytest.raises(ValueError):
+        read_snapshot_header(b'PGMC')
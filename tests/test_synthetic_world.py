@@ -0,0 +1,35 @@
+import os
+import filecmp
+
+import nbtlib
+
+from Core.lazyNbt import LazyNbt
+from Core.syntheticWorld import generate_world
+
+
+def test_level_player_is_a_compound(world):
+    level = nbtlib.load(os.path.join(world, 'level.dat'))
+    player = level['Data']['Player']
+    assert len(player['Pos']) == 3
+    assert player['Dimension'] == 'minecraft:overworld'
+
+
+def test_level_player_position_can_be_queried(world):
+    lazy = LazyNbt.open(os.path.join(world, 'level.dat'))
+    assert len(lazy.get('Data.Player.Pos')) == 3
+
+
+def test_playerdata_files_hold_a_player(world):
+    folder = os.path.join(world, 'playerdata')
+    names = os.listdir(folder)
+    assert len(names) == 1
+    player = nbtlib.load(os.path.join(folder, names[0]))
+    assert 'Pos' in player and 'Inventory' in player
+
+
+def test_same_seed_writes_the_same_world(tmp_path):
+    first, second = str(tmp_path / 'first'), str(tmp_path / 'second')
+    for path in (first, second):
+        generate_world(path, chunks=2, sections=1, players=1, structures=1, structure_size=2, seed=3)
+    region = os.path.join('region', 'r.0.0.mca')
+    assert filecmp.cmp(os.path.join(first, region), os.path.join(second, region), shallow=False)
@@ -0,0 +1,123 @@
+import os
+import subprocess
+
+import nbtlib
+import pytest
+
+from Core.savePipeline import translate_save
+from Core.saveBuilder import build_save
+from Core.manifest import MANIFEST_NAME, Manifest
+from Core.changeDetector import detect_changes
+from Core.volatileFields import DEFAULT_RULES, VOLATILE_SUFFIX
+from conftest import read_world, edit_chunk, tick_chunk
+
+
+def git(repo, *args):
+    return subprocess.run(['git', '-C', repo] + list(args), check=True, capture_output=True,
+                          text=True).stdout
+
+
+def sidecars(path):
+    return [name for root, dirs, names in os.walk(path) for name in names if name.endswith(VOLATILE_SUFFIX)]
+
+
+@pytest.fixture
+def masked_repo(world, tmp_path, git_identity):
+    """
+    A git repository holding a typed translation of `world` with the default
+    volatile fields masked, and a clone of it.
+    """
+    repo = str(tmp_path / 'repo')
+    stats = translate_save(world, repo, jobs=1, output_format='typed', volatile=DEFAULT_RULES)
+    assert stats.errors == 0
+    git(repo, 'init', '-q')
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-q', '-m', 'initial')
+    clone = str(tmp_path / 'clone')
+    subprocess.run(['git', 'clone', '-q', repo, clone], check=True)
+    return repo, clone
+
+
+def test_sidecars_stay_out_of_the_repository(masked_repo):
+    repo, clone = masked_repo
+    assert sidecars(repo)
+    assert not sidecars(clone)
+    assert git(repo, 'status', '--porcelain') == ''
+
+
+def test_build_with_sidecars_restores_the_world(world, masked_repo, tmp_path):
+    repo, clone = masked_repo
+    built = str(tmp_path / 'built')
+    assert build_save(repo, built, jobs=1).errors == 0
+    assert read_world(built) == read_world(world)
+
+
+def test_build_from_a_clone_is_refused(masked_repo, tmp_path):
+    repo, clone = masked_repo
+    built = str(tmp_path / 'built')
+    stats = build_save(clone, built, jobs=1)
+    assert stats.errors > 0
+    assert not os.path.exists(os.path.join(built, 'level.dat'))
+
+
+def test_build_from_a_clone_without_volatile_values(world, masked_repo, tmp_path):
+    repo, clone = masked_repo
+    built = str(tmp_path / 'built')
+    assert build_save(clone, built, jobs=1, require_volatile=False).errors == 0
+    original, rebuilt = read_world(world), read_world(built)
+    assert original['level.dat']['Data']['Time'] != 0
+    assert rebuilt['level.dat']['Data']['Time'] == 0
+    assert rebuilt['region/r.0.0.mca'].keys() == original['region/r.0.0.mca'].keys()
+    for key, (timestamp, chunk) in rebuilt['region/r.0.0.mca'].items():
+        assert chunk['sections'] == original['region/r.0.0.mca'][key][1]['sections']
+
+
+def test_ticking_leaves_the_translation_unchanged(world, masked_repo):
+    repo, clone = masked_repo
+    level = nbtlib.load(os.path.join(world, 'level.dat'))
+    level['Data']['Time'] = nbtlib.Long(level['Data']['Time'] + 20)
+    level['Data']['DayTime'] = nbtlib.Long(level['Data']['DayTime'] + 20)
+    level.save()
+    assert translate_save(world, repo, jobs=1, output_format='typed', volatile=DEFAULT_RULES).errors == 0
+    # Only the manifest records the new level.dat
+    assert git(repo, 'status', '--porcelain', '--', '.', ':!' + MANIFEST_NAME) == ''
+
+
+def tick_level(world):
+    level = nbtlib.load(os.path.join(world, 'level.dat'))
+    level['Data']['Time'] = nbtlib.Long(level['Data']['Time'] + 20)
+    level.save()
+
+
+def changed_paths(world, output):
+    return [(change.path.replace(os.sep, '/'), change.chunks)
+            for change in detect_changes(world, Manifest.load(output))]
+
+
+def test_detector_ignores_ticked_chunks_and_files(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1, output_format='typed', volatile=DEFAULT_RULES)
+    tick_chunk(world, (1, 0))
+    tick_level(world)
+    assert changed_paths(world, output) == []
+    edit_chunk(world, (2, 0))
+    assert changed_paths(world, output) == [('region/r.0.0.mca', [2])]
+
+
+def test_detector_reports_ticks_without_masking(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1, output_format='typed')
+    tick_chunk(world, (1, 0))
+    tick_level(world)
+    assert sorted(changed_paths(world, output)) == [('level.dat', []), ('region/r.0.0.mca', [1])]
+
+
+def test_detector_keeps_digests_across_runs(world, tmp_path):
+    output = str(tmp_path / 'translated')
+    translate_save(world, output, jobs=1, output_format='typed', volatile=DEFAULT_RULES)
+    edit_chunk(world, (2, 0))
+    translate_save(world, output, jobs=1, output_format='typed', volatile=DEFAULT_RULES)
+    assert sorted(Manifest.load(output).get('region/r.0.0.mca')['masked']) == [0, 1, 2, 3]
+    tick_chunk(world, (2, 0), timestamp=3)
+    tick_chunk(world, (3, 0), timestamp=3)
+    assert changed_paths(world, output) == []